@@ -9,6 +9,8 @@ from pathlib import Path
 from typing import Any, Iterable
 from urllib.parse import quote
 
+from calc_core.schema_caps import schema_caps
+
 INPUT_META_TABLE = "ui_input_meta"
 
 SUBSYSTEM_RTM = "RTM"
@@ -52,21 +54,15 @@ def tx(conn: sqlite3.Connection) -> Iterable[sqlite3.Connection]:
 
 
 def table_exists(conn: sqlite3.Connection, table: str) -> bool:
-    row = conn.execute(
-        "SELECT name FROM sqlite_master WHERE type='table' AND name=?",
-        (table,),
-    ).fetchone()
-    return row is not None
+    return schema_caps(conn).has_table(table)
 
 
 def column_exists(conn: sqlite3.Connection, table: str, column: str) -> bool:
-    rows = conn.execute(f"PRAGMA table_info({table})").fetchall()
-    return any(str(r[1]) == column for r in rows)
+    return schema_caps(conn).has_column(table, column)
 
 
 def list_tables(conn: sqlite3.Connection) -> set[str]:
-    rows = conn.execute("SELECT name FROM sqlite_master WHERE type='table'").fetchall()
-    return {str(r[0]) for r in rows}
+    return set(schema_caps(conn).tables)
 
 
 def schema_status(conn: sqlite3.Connection) -> dict[str, Any]:
@@ -125,10 +121,11 @@ def schema_status(conn: sqlite3.Connection) -> dict[str, Any]:
         },
     }
     missing_columns: dict[str, list[str]] = {}
+    caps = schema_caps(conn)
     for table, cols in required_columns.items():
         if table not in tables:
             continue
-        actual = {str(r[1]) for r in conn.execute(f"PRAGMA table_info({table})").fetchall()}
+        actual = caps.columns_of(table)
         missing_for_table = sorted(cols - actual)
         if missing_for_table:
             missing_columns[table] = missing_for_table
@@ -983,8 +980,9 @@ def apply_default_mode_rules(conn: sqlite3.Connection, panel_id: str) -> int:
 
 def list_circuits(conn: sqlite3.Connection, panel_id: str) -> list[dict[str, Any]]:
     """List circuits for panel: id, name, phases, i_calc_a, phase (nullable), phase_source (if exists)."""
-    has_phase_source = column_exists(conn, "circuits", "phase_source")
-    has_bus_section_id = column_exists(conn, "circuits", "bus_section_id")
+    caps = schema_caps(conn)
+    has_phase_source = caps.phase_source
+    has_bus_section_id = caps.bus_section_id
     bus_section_expr = "c.bus_section_id" if has_bus_section_id else "NULL"
     if has_phase_source:
         rows = conn.execute(
@@ -1045,7 +1043,7 @@ def update_circuit_phase(
         val = str(phase_or_none).strip().upper()
         if val not in ("L1", "L2", "L3"):
             raise ValueError(f"phase must be L1, L2, L3 or empty; got {phase_or_none!r}")
-        if column_exists(conn, "circuits", "phase_source") and phase_source is not None:
+        if schema_caps(conn).phase_source and phase_source is not None:
             if phase_source not in ("AUTO", "MANUAL"):
                 raise ValueError(f"phase_source must be AUTO or MANUAL; got {phase_source!r}")
             conn.execute(
@@ -1058,7 +1056,7 @@ def update_circuit_phase(
                 (val, circuit_id),
             )
     else:
-        if column_exists(conn, "circuits", "phase_source") and phase_source is not None:
+        if schema_caps(conn).phase_source and phase_source is not None:
             if phase_source not in ("AUTO", "MANUAL"):
                 raise ValueError(f"phase_source must be AUTO or MANUAL; got {phase_source!r}")
             conn.execute(
@@ -1076,7 +1074,7 @@ def update_circuit_bus_section(
     conn: sqlite3.Connection, circuit_id: str, bus_section_id_or_none: str | None
 ) -> None:
     """Update circuit bus section binding (nullable FK -> bus_sections.id)."""
-    if not column_exists(conn, "circuits", "bus_section_id"):
+    if not schema_caps(conn).bus_section_id:
         raise RuntimeError("circuits.bus_section_id column is missing (apply migrations)")
     if bus_section_id_or_none is None or str(bus_section_id_or_none).strip() == "":
         conn.execute("UPDATE circuits SET bus_section_id = NULL WHERE id = ?", (circuit_id,))
@@ -1091,18 +1089,37 @@ def get_panel_phase_balance(
     conn: sqlite3.Connection, panel_id: str, mode: str = "NORMAL"
 ) -> dict[str, Any] | None:
     """Read panel_phase_balance for given panel and mode."""
-    if not table_exists(conn, "panel_phase_balance"):
+    caps = schema_caps(conn)
+    if not caps.phase_balance:
         return None
     cols = ["i_l1", "i_l2", "i_l3", "unbalance_pct", "updated_at"]
-    if column_exists(conn, "panel_phase_balance", "invalid_manual_count"):
-        cols.append("invalid_manual_count")
-    if column_exists(conn, "panel_phase_balance", "warnings_json"):
-        cols.append("warnings_json")
+    if caps.pb_warnings:
+        cols += ["invalid_manual_count", "warnings_json"]
     sql = f"SELECT {', '.join(cols)} FROM panel_phase_balance WHERE panel_id = ? AND mode = ?"
     row = conn.execute(sql, (panel_id, mode)).fetchone()
     return dict(row) if row else None
 
 
+def list_section_phase_balance(
+    conn: sqlite3.Connection, panel_id: str, mode: str = "NORMAL"
+) -> list[dict[str, Any]]:
+    """Per-bus-section phase balance totals (empty if the table is missing)."""
+    if not schema_caps(conn).section_phase_balance:
+        return []
+    rows = conn.execute(
+        """
+        SELECT spb.bus_section_id, spb.circuit_count, spb.i_l1, spb.i_l2, spb.i_l3,
+               spb.unbalance_pct, spb.updated_at, bs.name AS bus_section_name
+        FROM panel_section_phase_balance spb
+        LEFT JOIN bus_sections bs ON bs.id = spb.bus_section_id
+        WHERE spb.panel_id = ? AND spb.mode = ?
+        ORDER BY bs.name
+        """,
+        (panel_id, mode),
+    ).fetchall()
+    return [dict(r) for r in rows]
+
+
 def list_section_calc(
     conn: sqlite3.Connection, panel_id: str, mode: str
 ) -> list[dict[str, Any]]:
@@ -76,13 +76,13 @@ def render(conn, state: dict) -> None:
 
             if panel.get("system_type") == "1PH":
                 try:
-                    from calc_core import phase_balance  # type: ignore
+                    from calc_core.rtm_phase_calc import calc_panel_phase_calc
 
                     ph_conn = sqlite3.connect(state["db_path"])
                     try:
                         ph_conn.row_factory = sqlite3.Row
                         ph_conn.execute("PRAGMA foreign_keys = ON;")
-                        phase_balance.balance_panel(ph_conn, panel_id)
+                        calc_panel_phase_calc(ph_conn, [panel_id])
                         ph_conn.commit()
                     finally:
                         ph_conn.close()
@@ -133,22 +133,70 @@ def render(conn, state: dict) -> None:
     st.subheader(t("calculate.run_sections"))
     if st.button(t("calculate.aggregate_btn", mode=sections_mode_label)):
         try:
+            from calc_core.diagnostics import Diagnostics
             from calc_core.section_aggregation import calc_section_loads
 
+            diagnostics = Diagnostics()
             sec_conn = sqlite3.connect(state["db_path"])
             try:
                 sec_conn.row_factory = sqlite3.Row
                 sec_conn.execute("PRAGMA foreign_keys = ON;")
-                count = calc_section_loads(sec_conn, panel_id, mode=sections_mode)
+                count = calc_section_loads(
+                    sec_conn, panel_id, mode=sections_mode, diagnostics=diagnostics
+                ).section_count
                 sec_conn.commit()
             finally:
                 sec_conn.close()
             db.update_state_after_write(state, state["db_path"])
             st.success(t("calculate.sections_aggregated", count=count))
+            _render_diagnostics(diagnostics)
+        except Exception as exc:  # pragma: no cover - UI error path
+            st.error(t("errors.sections_failed", exc=exc))
+    if st.button(t("calculate.aggregate_all_btn")):
+        try:
+            from calc_core.diagnostics import Diagnostics
+            from calc_core.section_aggregation import calc_section_loads_all_modes
+
+            diagnostics = Diagnostics()
+            sec_conn = sqlite3.connect(state["db_path"])
+            try:
+                sec_conn.row_factory = sqlite3.Row
+                sec_conn.execute("PRAGMA foreign_keys = ON;")
+                counts = calc_section_loads_all_modes(
+                    sec_conn, panel_id, diagnostics=diagnostics
+                ).section_counts[panel_id]
+            finally:
+                sec_conn.close()
+            db.update_state_after_write(state, state["db_path"])
+            st.success(
+                t(
+                    "calculate.sections_aggregated_all",
+                    normal=counts.get("NORMAL", 0),
+                    emergency=counts.get("EMERGENCY", counts.get("RESERVE", 0)),
+                )
+            )
+            _render_diagnostics(diagnostics)
         except Exception as exc:  # pragma: no cover - UI error path
             st.error(t("errors.sections_failed", exc=exc))
 
 
+def _render_diagnostics(diagnostics) -> None:
+    """Warning counts per code and a bounded sample table (nothing when there are none)."""
+    if not diagnostics.total:
+        return
+    codes = ", ".join(f"{code}: {count}" for code, count in sorted(diagnostics.counts.items()))
+    st.warning(t("calculate.diagnostics_summary", total=diagnostics.total, codes=codes))
+    with st.expander(t("calculate.diagnostics_samples")):
+        st.dataframe(
+            [
+                {"code": code, **sample}
+                for code, samples in sorted(diagnostics.samples.items())
+                for sample in samples
+            ],
+            use_container_width=True,
+        )
+
+
 def _render_phase_balance_section(conn, state: dict, panel_id: str, panel: dict) -> None:
     """Phase balance section: Run button, totals, circuits table (1PH only)."""
     st.subheader(t("phase_balance.section"))
@@ -168,22 +216,55 @@ def _render_phase_balance_section(conn, state: dict, panel_id: str, panel: dict)
         key="phase_balance_respect_manual",
     )
 
+    joint = st.checkbox(
+        t("phase_balance.joint"),
+        value=False,
+        key="phase_balance_joint",
+        help=t("phase_balance.joint_help"),
+    )
+    per_section = st.checkbox(
+        t("phase_balance.per_section"),
+        value=False,
+        key="phase_balance_per_section",
+        help=t("phase_balance.per_section_help"),
+        disabled=joint,
+    )
+
     if is_edit and st.button(t("phase_balance.run_btn")):
         try:
-            from calc_core.phase_balance import calc_phase_balance
+            from calc_core.phase_balance import (
+                calc_phase_balance,
+                calc_phase_balance_joint,
+                calc_phase_balance_sections,
+            )
 
             pb_conn = sqlite3.connect(state["db_path"])
             try:
                 pb_conn.row_factory = sqlite3.Row
                 pb_conn.execute("PRAGMA foreign_keys = ON;")
-                count = calc_phase_balance(
-                    pb_conn, panel_id, mode=pb_mode, respect_manual=respect_manual
-                )
+                if joint:
+                    pb_result = calc_phase_balance_joint(
+                        pb_conn, panel_id, respect_manual=respect_manual
+                    )[pb_mode]
+                elif per_section:
+                    pb_result = calc_phase_balance_sections(
+                        pb_conn, panel_id, mode=pb_mode, respect_manual=respect_manual
+                    )
+                else:
+                    pb_result = calc_phase_balance(
+                        pb_conn, panel_id, mode=pb_mode, respect_manual=respect_manual
+                    )
                 pb_conn.commit()
             finally:
                 pb_conn.close()
             db.update_state_after_write(state, state["db_path"])
-            st.success(t("phase_balance.run_success", count=count))
+            st.success(
+                t(
+                    "phase_balance.run_success",
+                    count=pb_result.circuit_count,
+                    changed=pb_result.changed_count,
+                )
+            )
         except Exception as exc:  # pragma: no cover - UI error path
             st.error(t("phase_balance.run_error", exc=exc))
 
@@ -196,6 +277,23 @@ def _render_phase_balance_section(conn, state: dict, panel_id: str, panel: dict)
         cols[2].metric(t("phase_balance.i_l3"), f"{float(balance['i_l3']):.2f} A")
         cols[3].metric(t("phase_balance.unbalance_pct"), f"{float(balance['unbalance_pct']):.1f}%")
         st.caption(t("phase_balance.updated_at", at=balance.get("updated_at") or t("common.dash")))
+        section_rows = db.list_section_phase_balance(conn, panel_id, mode=pb_mode)
+        if section_rows:
+            st.caption(t("phase_balance.sections_caption"))
+            st.dataframe(
+                [
+                    {
+                        t("phase_balance.col_bus_section"): r.get("bus_section_name") or r["bus_section_id"],
+                        t("phase_balance.col_circuit_count"): r["circuit_count"],
+                        t("phase_balance.i_l1"): round(float(r["i_l1"]), 2),
+                        t("phase_balance.i_l2"): round(float(r["i_l2"]), 2),
+                        t("phase_balance.i_l3"): round(float(r["i_l3"]), 2),
+                        t("phase_balance.unbalance_pct"): round(float(r["unbalance_pct"]), 1),
+                    }
+                    for r in section_rows
+                ],
+                use_container_width=True,
+            )
         invalid_count = int(balance.get("invalid_manual_count") or 0) if isinstance(balance, dict) else 0
         raw = balance.get("warnings_json")
         items: list[dict] = []
@@ -211,6 +309,9 @@ def _render_phase_balance_section(conn, state: dict, panel_id: str, panel: dict)
         if any(str(it.get("reason") or "").strip().upper() == "EMERGENCY_SECTIONS_NOT_COMPUTED" for it in items):
             st.warning(t("phase_balance.emergency_sections_not_computed"))
 
+        if any(str(it.get("reason") or "").strip().upper() == "SEARCH_TIME_CAP" for it in items):
+            st.warning(t("phase_balance.search_time_cap"))
+
         if invalid_count > 0:
             st.warning(t("phase_balance.invalid_manual_banner", count=invalid_count))
 
@@ -218,7 +319,8 @@ def _render_phase_balance_section(conn, state: dict, panel_id: str, panel: dict)
         circuit_items = [
             it
             for it in items
-            if str(it.get("reason") or "").strip().upper() != "EMERGENCY_SECTIONS_NOT_COMPUTED"
+            if str(it.get("reason") or "").strip().upper()
+            not in ("EMERGENCY_SECTIONS_NOT_COMPUTED", "SEARCH_TIME_CAP")
         ]
         if invalid_count > 0:
             if not circuit_items:
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import csv
-import json
+import os
 from pathlib import Path
 import streamlit as st
 
@@ -41,19 +41,20 @@ def render(conn, state: dict) -> None:
     out_json = st.text_input(t("export.output_json"), value=str(default_json))
     if st.button(t("export.json_btn")):
         try:
-            from calc_core.export_payload import build_payload
+            from calc_core.export_payload import write_payload
 
+            out_path = Path(out_json)
+            out_path.parent.mkdir(parents=True, exist_ok=True)
+            # Streamed to a temp file: a failed export keeps the previous payload intact.
+            tmp_path = out_path.with_name(out_path.name + ".tmp")
             ro_conn = db.connect(state["db_path"], read_only=True)
             try:
-                payload = build_payload(ro_conn, panel_id)
+                with tmp_path.open("w", encoding="utf-8") as fp:
+                    write_payload(ro_conn, panel_id, fp)
+                os.replace(tmp_path, out_path)
             finally:
+                tmp_path.unlink(missing_ok=True)
                 ro_conn.close()
-            out_path = Path(out_json)
-            out_path.parent.mkdir(parents=True, exist_ok=True)
-            out_path.write_text(
-                json.dumps(payload, ensure_ascii=False, indent=2) + "\n",
-                encoding="utf-8",
-            )
             st.success(t("export.json_exported", path=str(out_path)))
             st.download_button(
                 t("export.download_json"),
@@ -75,7 +76,7 @@ def render(conn, state: dict) -> None:
         try:
             from calc_core.export_attributes_csv import (
                 build_rows_from_payload,
-                load_mapping,
+                load_compiled_mapping,
             )
             from calc_core.export_payload import build_payload
 
@@ -85,7 +86,7 @@ def render(conn, state: dict) -> None:
             finally:
                 ro_conn.close()
 
-            mapping = load_mapping(mapping_path)
+            mapping = load_compiled_mapping(mapping_path)
             rows = build_rows_from_payload(payload, mapping)
             out_dir_path = Path(out_dir)
             _write_csv(
@@ -287,13 +287,13 @@ def render(conn, state: dict) -> None:
 
             if panel.get("system_type") == "1PH":
                 try:
-                    from calc_core import phase_balance  # type: ignore
+                    from calc_core.rtm_phase_calc import calc_panel_phase_calc
 
                     ph_conn = sqlite3.connect(state["db_path"])
                     try:
                         ph_conn.row_factory = sqlite3.Row
                         ph_conn.execute("PRAGMA foreign_keys = ON;")
-                        phase_balance.balance_panel(ph_conn, panel_id)
+                        calc_panel_phase_calc(ph_conn, [panel_id])
                         ph_conn.commit()
                     finally:
                         ph_conn.close()
@@ -8,14 +8,18 @@ MVP-0.1:
 DWG/AutoCAD интеграция намеренно отсутствует: в архитектуре DWG = рендер.
 """
 
+from .diagnostics import Diagnostics
 from .kr_resolver import get_kr, resolve_kr
 from .phase_balance import calc_phase_balance
 from .rtm_f636 import run_panel_calc
+from .rtm_phase_calc import calc_panel_phase_calc
 
 __all__ = [
     "get_kr",
     "resolve_kr",
     "run_panel_calc",
     "calc_phase_balance",
+    "calc_panel_phase_calc",
+    "Diagnostics",
 ]
 
@@ -0,0 +1,229 @@
+"""
+N-1 contingency analysis over feeds and bus sections (Feeds v2).
+
+Every scenario takes exactly one element out of service:
+- FEED: one consumer_feeds row;
+- BUS_SECTION: one bus section (every feed connected to it).
+
+Consumers whose active feed is lost are re-resolved with the SECTION_AGG_V2
+rules on the remaining feeds (active role by min priority, else MAIN, else any
+feed by priority). Section loads use a consumer x section incidence matrix kept
+sparse (one non-zero per consumer: its active section). The base load vector is
+computed once; a scenario only changes the columns of re-routed consumers, so
+its section loads are base + A·Δx with Δx non-zero for those consumers only and
+each scenario costs O(affected consumers). The deltas are applied in a plain
+Python loop over the affected consumers; this is not vectorized.
+
+Reported per section: the worst case (max I) over the base state and all
+scenarios, plus consumers left without any feed per scenario. Nothing is
+written to the DB. Consumers without any feed are not part of the analysis and
+are recorded as CONSUMER_NO_ACTIVE_FEED (optional diagnostics collector,
+per-call counts in ContingencyResult.warning_counts).
+"""
+
+from __future__ import annotations
+
+import sqlite3
+from dataclasses import dataclass
+from typing import Callable
+
+from .diagnostics import Diagnostics
+from .section_aggregation import (
+    Feed,
+    consumer_load,
+    default_role,
+    feeds_v2_enabled,
+    load_feeds_v2,
+    load_rtm_panel_calcs,
+    normalize_mode,
+    pick_feed,
+    rtm_load_refs,
+    select_consumers,
+)
+
+SCENARIO_FEED = "FEED"
+SCENARIO_BUS_SECTION = "BUS_SECTION"
+
+# Relative tolerance for "strictly worse" comparisons on float sums.
+_EPS = 1e-9
+
+
+@dataclass(frozen=True)
+class ContingencyScenario:
+    kind: str
+    outage_id: str
+
+
+@dataclass(frozen=True)
+class SectionWorstCase:
+    bus_section_id: str
+    section_name: str
+    base_s_kva: float
+    base_i_a: float
+    worst_s_kva: float
+    worst_i_a: float
+    # None: no scenario loads the section more than the base state.
+    worst_scenario: ContingencyScenario | None
+
+
+@dataclass(frozen=True)
+class ContingencyResult:
+    mode: str
+    scenario_count: int
+    sections: tuple[SectionWorstCase, ...]
+    # Scenarios that leave consumers without any feed -> consumer ids.
+    unserved: tuple[tuple[ContingencyScenario, tuple[str, ...]], ...]
+    # (code, count) of diagnostics recorded by this call, ordered by code.
+    warning_counts: tuple[tuple[str, int], ...] = ()
+
+
+def run_n1_contingency(
+    conn: sqlite3.Connection,
+    panel_ids: list[str] | None = None,
+    *,
+    mode: str = "NORMAL",
+    feeds: bool = True,
+    bus_sections: bool = True,
+    diagnostics: Diagnostics | None = None,
+) -> ContingencyResult:
+    """
+    Enumerate every single feed (feeds=True) and bus section (bus_sections=True)
+    outage for consumers of panel_ids (None = all panels) in `mode` and return
+    the worst-case load per bus section. Requires Feeds v2.
+    """
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON;")
+
+    if not feeds_v2_enabled(conn):
+        raise ValueError(
+            "N-1 contingency requires Feeds v2 (consumer_feeds.feed_role_id / priority)"
+        )
+    mode_norm = normalize_mode(mode, feeds_v2=True)
+
+    selected: list[str] | None = None
+    if panel_ids is not None:
+        selected = sorted({str(p).strip() for p in panel_ids if p and str(p).strip()})
+        if not selected:
+            return ContingencyResult(mode_norm, 0, (), ())
+
+    active_roles, feeds_by_consumer = load_feeds_v2(conn, selected, (mode_norm,))
+    # Consumers without any feed are never served (aggregate_section_loads skips them).
+    rows: list[sqlite3.Row] = []
+    no_feed_count = 0
+    for r in select_consumers(conn, selected):
+        if feeds_by_consumer.get(str(r["consumer_id"])):
+            rows.append(r)
+            continue
+        no_feed_count += 1
+        if diagnostics is not None:
+            diagnostics.warn(
+                "CONSUMER_NO_ACTIVE_FEED",
+                consumer_id=str(r["consumer_id"]),
+                consumer_name=str(r["consumer_name"]),
+                mode=mode_norm,
+            )
+    consumer_ids = [str(r["consumer_id"]) for r in rows]
+    rtm_loads = load_rtm_panel_calcs(conn, rtm_load_refs(rows, set(consumer_ids)))
+    # Load vector x: one (P, Q, S, I) per consumer.
+    x = [consumer_load(r, rtm_loads) for r in rows]
+    consumer_feeds = [feeds_by_consumer[cid] for cid in consumer_ids]
+    mode_role = default_role(mode_norm)
+    roles = [active_roles.get((mode_norm, cid), mode_role) for cid in consumer_ids]
+
+    section_names: dict[str, str] = {}
+    for fl in consumer_feeds:
+        for f in fl:
+            name = f.bus_section_name if f.bus_section_name is not None else f.bus_section_id
+            section_names.setdefault(f.bus_section_id, name)
+
+    # Base state: active feed per consumer (incidence column) and base section loads.
+    active: list[Feed] = []
+    base: dict[str, list[float]] = {sid: [0.0, 0.0, 0.0, 0.0] for sid in section_names}
+    by_feed: dict[str, list[int]] = {}
+    by_section: dict[str, list[int]] = {}
+    for k, (fl, role) in enumerate(zip(consumer_feeds, roles)):
+        f = pick_feed(fl, role)
+        if f is None:
+            # Consumers without feeds are filtered out above; anything else is inconsistent data.
+            raise ValueError(f"No feed to pick for consumer_id={consumer_ids[k]} (mode={mode_norm})")
+        active.append(f)
+        _add(base, f.bus_section_id, x[k], 1.0)
+        by_feed.setdefault(f.feed_id, []).append(k)
+        by_section.setdefault(f.bus_section_id, []).append(k)
+
+    scale = max([1.0] + [abs(v[3]) for v in base.values()])
+    eps = _EPS * scale
+    worst_i = {sid: v[3] for sid, v in base.items()}
+    worst_s = {sid: v[2] for sid, v in base.items()}
+    worst_scenario: dict[str, ContingencyScenario | None] = {sid: None for sid in base}
+    unserved: list[tuple[ContingencyScenario, tuple[str, ...]]] = []
+
+    def _run(
+        scenario: ContingencyScenario, affected: list[int], lost: Callable[[Feed], bool]
+    ) -> None:
+        delta: dict[str, list[float]] = {}
+        lost_consumers: list[str] = []
+        for k in affected:
+            _add(delta, active[k].bus_section_id, x[k], -1.0)
+            f = pick_feed([g for g in consumer_feeds[k] if not lost(g)], roles[k])
+            if f is None:
+                lost_consumers.append(consumer_ids[k])
+            else:
+                _add(delta, f.bus_section_id, x[k], 1.0)
+        for sid, d in delta.items():
+            i_a = base[sid][3] + d[3]
+            if i_a > worst_i[sid] + eps:
+                worst_i[sid] = i_a
+                worst_s[sid] = base[sid][2] + d[2]
+                worst_scenario[sid] = scenario
+        if lost_consumers:
+            unserved.append((scenario, tuple(sorted(lost_consumers))))
+
+    scenario_count = 0
+    if feeds:
+        feed_ids = sorted({f.feed_id for fl in consumer_feeds for f in fl})
+        for feed_id in feed_ids:
+            scenario_count += 1
+            _run(
+                ContingencyScenario(SCENARIO_FEED, feed_id),
+                by_feed.get(feed_id, []),
+                lambda g, feed_id=feed_id: g.feed_id == feed_id,
+            )
+    if bus_sections:
+        for sid in sorted(section_names):
+            scenario_count += 1
+            _run(
+                ContingencyScenario(SCENARIO_BUS_SECTION, sid),
+                by_section.get(sid, []),
+                lambda g, sid=sid: g.bus_section_id == sid,
+            )
+
+    sections = tuple(
+        SectionWorstCase(
+            bus_section_id=sid,
+            section_name=section_names[sid],
+            base_s_kva=base[sid][2],
+            base_i_a=base[sid][3],
+            worst_s_kva=worst_s[sid],
+            worst_i_a=worst_i[sid],
+            worst_scenario=worst_scenario[sid],
+        )
+        for sid in sorted(section_names, key=lambda s: (section_names[s], s))
+    )
+    return ContingencyResult(
+        mode=mode_norm,
+        scenario_count=scenario_count,
+        sections=sections,
+        unserved=tuple(unserved),
+        warning_counts=(("CONSUMER_NO_ACTIVE_FEED", no_feed_count),) if no_feed_count else (),
+    )
+
+
+def _add(
+    acc: dict[str, list[float]], section_id: str, load: tuple[float, ...], sign: float
+) -> None:
+    v = acc.get(section_id)
+    if v is None:
+        v = acc[section_id] = [0.0, 0.0, 0.0, 0.0]
+    for j in range(4):
+        v[j] += sign * load[j]
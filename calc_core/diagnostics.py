@@ -0,0 +1,67 @@
+"""
+Diagnostics sink for calc_core entry points.
+
+Warnings are counted per code and only the first `sample_limit` contexts of each
+code are kept, so a misconfigured project with thousands of identical problems
+costs one dict update per warning (no stdout writes). Nothing is allocated while
+no warning is recorded.
+
+Codes:
+- CONSUMER_NO_ACTIVE_FEED: section aggregation (Feeds v2) / N-1 contingency —
+  consumer has no feed for the mode and is skipped;
+- CONSUMER_NO_FEED: section aggregation (legacy Feeds v1) — no feed of the role;
+- phase balance warnings use their warnings_json `reason` as the code
+  (MANUAL_INVALID_PHASE, EMERGENCY_SECTIONS_NOT_COMPUTED, PHASE_*...).
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Iterable
+
+DEFAULT_SAMPLE_LIMIT = 20
+
+
+@dataclass
+class Diagnostics:
+    sample_limit: int = DEFAULT_SAMPLE_LIMIT
+    counts: dict[str, int] = field(default_factory=dict)
+    # code -> first sample_limit contexts (keyword arguments of warn()).
+    samples: dict[str, list[dict[str, object]]] = field(default_factory=dict)
+
+    def __post_init__(self) -> None:
+        if int(self.sample_limit) < 0:
+            raise ValueError("sample_limit must be >= 0")
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    def warn(self, code: str, **context: object) -> None:
+        seen = self.counts.get(code, 0)
+        self.counts[code] = seen + 1
+        if seen < self.sample_limit:
+            self.samples.setdefault(code, []).append(context)
+
+    def extend(self, warnings: Iterable[dict[str, object]]) -> None:
+        """Record warnings_json-style dicts: {"reason": code, **context}."""
+        for w in warnings:
+            context = {k: v for k, v in w.items() if k != "reason"}
+            self.warn(str(w.get("reason") or "UNKNOWN"), **context)
+
+    def merge(self, other: Diagnostics) -> None:
+        for code, count in other.counts.items():
+            seen = self.counts.get(code, 0)
+            self.counts[code] = seen + count
+            room = self.sample_limit - len(self.samples.get(code, ()))
+            if room > 0 and other.samples.get(code):
+                self.samples.setdefault(code, []).extend(other.samples[code][:room])
+
+    def to_dict(self) -> dict[str, object]:
+        """JSON-ready summary: total, counts and samples ordered by code."""
+        codes = sorted(self.counts)
+        return {
+            "total": self.total,
+            "counts": {code: self.counts[code] for code in codes},
+            "samples": {code: list(self.samples.get(code, ())) for code in codes},
+        }
@@ -0,0 +1,326 @@
+"""
+Headless attribute import into ASCII DXF (IMPORT_ATTRS without AutoCAD).
+
+The drawing is streamed as (group code, value) line pairs; only one INSERT
+with its ATTRIB records is buffered at a time, so memory does not depend on
+the drawing size. Matching and counters follow dwg/lisp/import_attrs.lsp:
+blocks are matched by their GUID attribute, section blocks additionally by
+MODE, only existing attributes are updated and GUID is never written.
+Unchanged lines are copied byte for byte (line endings included).
+"""
+
+from __future__ import annotations
+
+import csv
+import itertools
+import os
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import BinaryIO, Callable, Iterator
+
+from .export_attributes_csv import TOMBSTONE_KINDS, parse_grouped
+
+# Files written by tools/export_attributes_csv.py (read in this order of preference).
+GROUPED_FILE = "attrs_grouped.sexp"
+CSV_FILES = {
+    "panel": "attrs_panel.csv",
+    "circuits": "attrs_circuits.csv",
+    "sections": "attrs_sections.csv",
+}
+
+# First DXF version written in UTF-8 (AutoCAD 2007); older ones use $DWGCODEPAGE.
+_UTF8_ACADVER = "AC1021"
+_DEFAULT_ENCODING = "cp1252"
+_BINARY_SENTINEL = b"AutoCAD Binary DXF"
+_UNICODE_ESCAPE = re.compile(r"\\U\+([0-9A-Fa-f]{4})")
+
+
+@dataclass
+class AttributeValues:
+    """Values to apply: GUID -> {TAG: VALUE} and (GUID, MODE) -> {TAG: VALUE}; tags upper-case."""
+
+    blocks: dict[str, dict[str, str]] = field(default_factory=dict)
+    sections: dict[tuple[str, str], dict[str, str]] = field(default_factory=dict)
+
+    @classmethod
+    def from_rows(cls, rows: dict[str, list[list[str]]]) -> AttributeValues:
+        """From build_rows_from_payload-shaped rows (panel / circuits / sections)."""
+        values = cls()
+        values.add_rows(rows)
+        return values
+
+    def add_rows(self, rows: dict[str, list[list[str]]]) -> None:
+        for kind in ("panel", "circuits"):
+            for guid, attr, value in rows.get(kind, []):
+                self.blocks.setdefault(guid, {})[attr.upper()] = value
+        for guid, mode, attr, value in rows.get("sections", []):
+            self.sections.setdefault((guid, mode), {})[attr.upper()] = value
+
+    def values_for(self, guid: str, mode: str | None) -> dict[str, str]:
+        """Merged attributes of one block: section (GUID + MODE) values win, as in IMPORT_ATTRS."""
+        merged = dict(self.blocks.get(guid, {}))
+        if mode is not None:
+            merged.update(self.sections.get((guid, mode), {}))
+        return merged
+
+
+@dataclass
+class PatchSummary:
+    """Same counters as the IMPORT_ATTRS summary."""
+
+    blocks_scanned: int = 0
+    blocks_with_guid: int = 0
+    updated_attrs_count: int = 0
+    blocks_skipped_no_guid: int = 0
+    guid_not_found_in_csv: int = 0
+
+    def lines(self) -> list[str]:
+        return [f"{name}: {value}" for name, value in vars(self).items()]
+
+
+def load_export_dir(path: str | Path) -> AttributeValues:
+    """Values from an export directory: attrs_grouped.sexp if present, else the three CSVs."""
+    out_dir = Path(path)
+    grouped_path = out_dir / GROUPED_FILE
+    if grouped_path.exists():
+        return AttributeValues.from_rows(parse_grouped(grouped_path.read_text(encoding="utf-8")))
+
+    rows: dict[str, list[list[str]]] = {kind: [] for kind in TOMBSTONE_KINDS}
+    found = False
+    for kind, filename in CSV_FILES.items():
+        csv_path = out_dir / filename
+        if not csv_path.exists():
+            continue
+        found = True
+        width = 4 if kind == "sections" else 3
+        with csv_path.open("r", encoding="utf-8", newline="") as handle:
+            reader = csv.reader(handle)
+            next(reader, None)  # header
+            for lineno, row in enumerate(reader, start=2):
+                if not row:
+                    continue
+                if len(row) != width:
+                    raise ValueError(f"Expected {width} columns in {csv_path} at line {lineno}")
+                rows[kind].append(row)
+    if not found:
+        raise ValueError(f"No {GROUPED_FILE} or attrs_*.csv files in {out_dir}")
+    return AttributeValues.from_rows(rows)
+
+
+def patch_dxf(src: BinaryIO, dst: BinaryIO, values: AttributeValues) -> PatchSummary:
+    """
+    Copy an ASCII DXF from src to dst, updating ATTRIB values (group 1) of
+    INSERTs in model space and paper space layouts (ENTITIES section and
+    *Paper_Space blocks); INSERTs inside other block definitions are left as is.
+    """
+    head = src.read(len(_BINARY_SENTINEL))
+    if head == _BINARY_SENTINEL:
+        raise ValueError("Binary DXF is not supported; save the drawing as ASCII DXF")
+    summary = PatchSummary()
+    state = _StreamState()
+    buffer: list[tuple[bytes, bytes]] | None = None
+    write = dst.write
+    # Header / section / block names are only tracked outside ENTITIES (hot path).
+    observe = True
+
+    for code_line, value_line in _iter_pairs(head, src):
+        if code_line.strip() != b"0":
+            if buffer is not None:
+                buffer.append((code_line, value_line))
+            else:
+                write(code_line + value_line)
+                if observe:
+                    state.observe(code_line.strip(), value_line)
+            continue
+
+        entity = value_line.strip()
+        if buffer is not None:
+            if entity == b"ATTRIB":
+                buffer.append((code_line, value_line))
+                continue
+            _flush_insert(buffer, values, state.encoding, summary, write)
+            buffer = None
+        state.start_entity(entity)
+        observe = state.section != b"ENTITIES"
+        if entity == b"INSERT" and state.patch_space():
+            buffer = [(code_line, value_line)]
+        else:
+            write(code_line + value_line)
+
+    if buffer is not None:
+        _flush_insert(buffer, values, state.encoding, summary, write)
+    return summary
+
+
+def patch_dxf_file(src: str | Path, dst: str | Path, values: AttributeValues) -> PatchSummary:
+    """patch_dxf between files; dst is replaced atomically (dst may be src)."""
+    dst_path = Path(dst)
+    tmp_path = dst_path.with_name(dst_path.name + ".tmp")
+    try:
+        with Path(src).open("rb") as fin, tmp_path.open("wb") as fout:
+            summary = patch_dxf(fin, fout, values)
+        os.replace(tmp_path, dst_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+    return summary
+
+
+class _StreamState:
+    """Section / block / header tracking outside buffered INSERTs."""
+
+    def __init__(self) -> None:
+        self.section: bytes | None = None
+        self.block_name = ""
+        self.entity: bytes | None = None
+        self.header_var: bytes | None = None
+        self.acadver = ""
+        self.codepage = ""
+        self.encoding = _DEFAULT_ENCODING
+
+    def start_entity(self, entity: bytes) -> None:
+        if entity == b"ENDSEC":
+            self.section = None
+        elif entity == b"ENDBLK":
+            self.block_name = ""
+        self.entity = entity
+
+    def observe(self, code: bytes, value_line: bytes) -> None:
+        if code == b"2":
+            if self.entity == b"SECTION" and self.section is None:
+                self.section = value_line.strip().upper()
+            elif self.entity == b"BLOCK" and self.section == b"BLOCKS":
+                self.block_name = value_line.strip().decode("ascii", "replace").upper()
+        elif self.section == b"HEADER":
+            if code == b"9":
+                self.header_var = value_line.strip().upper()
+            elif self.header_var == b"$ACADVER":
+                self.acadver = value_line.strip().decode("ascii", "replace").upper()
+                self._update_encoding()
+            elif self.header_var == b"$DWGCODEPAGE":
+                self.codepage = value_line.strip().decode("ascii", "replace").upper()
+                self._update_encoding()
+
+    def patch_space(self) -> bool:
+        if self.section == b"ENTITIES":
+            return True
+        return self.section == b"BLOCKS" and self.block_name.startswith("*PAPER_SPACE")
+
+    def _update_encoding(self) -> None:
+        if self.acadver >= _UTF8_ACADVER:
+            self.encoding = "utf-8"
+            return
+        codepage = self.codepage
+        if codepage.startswith("ANSI_") and codepage[5:].isdigit():
+            self.encoding = f"cp{codepage[5:]}"
+        else:
+            self.encoding = _DEFAULT_ENCODING
+
+
+def _iter_pairs(head: bytes, src: BinaryIO) -> Iterator[tuple[bytes, bytes]]:
+    """(group code line, value line) pairs, line endings kept."""
+    parts = head.splitlines(keepends=True)
+    if parts and not parts[-1].endswith(b"\n"):
+        parts[-1] += src.readline()
+    lines = itertools.chain(parts, src)
+    # A dangling last line (e.g. trailing blank line) is copied as is.
+    return itertools.zip_longest(lines, lines, fillvalue=b"")
+
+
+def _flush_insert(
+    buffer: list[tuple[bytes, bytes]],
+    values: AttributeValues,
+    encoding: str,
+    summary: PatchSummary,
+    write: Callable[[bytes], object],
+) -> None:
+    summary.blocks_scanned += 1
+    has_attribs = False
+    # (tag, index of the group 1 pair) per ATTRIB, in order
+    attribs: list[tuple[str, int | None]] = []
+    tag: str | None = None
+    value_idx: int | None = None
+    in_insert = True
+    embedded = False
+    for idx, (code_line, value_line) in enumerate(buffer):
+        code = code_line.strip()
+        if code == b"0":
+            if not in_insert and tag is not None:
+                attribs.append((tag, value_idx))
+            in_insert = idx == 0
+            tag, value_idx, embedded = None, None, False
+        elif in_insert:
+            if code == b"66" and value_line.strip() == b"1":
+                has_attribs = True
+        elif embedded:
+            continue
+        elif code == b"101":
+            # Embedded MTEXT of a multiline attribute (R2018): its groups are not the ATTRIB's.
+            embedded = True
+        elif code == b"2":
+            tag = _decode(value_line, encoding).strip().upper()
+        elif code == b"1":
+            value_idx = idx
+    if not in_insert and tag is not None:
+        attribs.append((tag, value_idx))
+
+    current = {t: _decode(buffer[i][1], encoding) for t, i in attribs if i is not None}
+    guid = current.get("GUID", "").strip()
+    if not has_attribs or not attribs or not guid:
+        summary.blocks_skipped_no_guid += 1
+    else:
+        summary.blocks_with_guid += 1
+        new_values = values.values_for(guid, current.get("MODE"))
+        if not new_values:
+            summary.guid_not_found_in_csv += 1
+        else:
+            for attr_tag, idx in attribs:
+                if attr_tag == "GUID" or idx is None or attr_tag not in new_values:
+                    continue
+                code_line, value_line = buffer[idx]
+                buffer[idx] = (
+                    code_line,
+                    _encode(new_values[attr_tag], encoding) + _line_ending(value_line),
+                )
+                summary.updated_attrs_count += 1
+
+    for code_line, value_line in buffer:
+        write(code_line)
+        write(value_line)
+
+
+def _decode(value_line: bytes, encoding: str) -> str:
+    text = value_line.rstrip(b"\r\n").decode(encoding, "replace")
+    if encoding != "utf-8":
+        text = _UNICODE_ESCAPE.sub(lambda m: chr(int(m.group(1), 16)), text)
+    return text
+
+
+def _encode(value: str, encoding: str) -> bytes:
+    """DXF text: control characters in caret notation (^J), \\U+XXXX outside the code page."""
+    chars = []
+    for ch in value:
+        if ch == "^":
+            chars.append("^ ")
+        elif ord(ch) < 0x20:
+            chars.append("^" + chr(ord(ch) + 0x40))
+        else:
+            chars.append(ch)
+    text = "".join(chars)
+    if encoding == "utf-8":
+        return text.encode("utf-8")
+    out = bytearray()
+    for ch in text:
+        try:
+            out += ch.encode(encoding)
+        except UnicodeEncodeError:
+            out += f"\\U+{ord(ch):04X}".encode("ascii")
+    return bytes(out)
+
+
+def _line_ending(line: bytes) -> bytes:
+    if line.endswith(b"\r\n"):
+        return b"\r\n"
+    if line.endswith(b"\n"):
+        return b"\n"
+    return b""
@@ -1,39 +1,120 @@
 from __future__ import annotations
 
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable
+import copy
+import hashlib
+import itertools
+import json
 import math
+import os
+import re
+import threading
+
+EXPORT_STATE_VERSION = 1
+
+# rows kind -> KIND column of the tombstone list / grouped layout
+TOMBSTONE_KINDS = {"panel": "PANEL", "circuits": "CIRCUIT", "sections": "SECTION"}
+
+# KIND of the grouped (s-expression) layout -> rows kind
+_GROUPED_ROWS_KINDS = {kind: rows_kind for rows_kind, kind in TOMBSTONE_KINDS.items()}
+
+# AutoLISP string escapes (backslash is the escape character in LISP strings).
+_SEXP_ESCAPES = str.maketrans(
+    {"\\": "\\\\", '"': '\\"', "\n": "\\n", "\r": "\\r", "\t": "\\t"}
+)
+_SEXP_UNESCAPES = {"n": "\n", "r": "\r", "t": "\t", "e": "\x1b"}
+_DOT = object()  # "." of a dotted pair while parsing
+_SEXP_TOKEN = re.compile(r'\s*(?:(\()|(\))|"((?:[^"\\]|\\.)*)"|([^\s()"]+))', re.S)
+
+# Joins GUID / MODE / ATTR into one state key (never part of GUIDs or attribute names).
+_KEY_SEP = "\x1f"
+
+# Max cached mapping files (path + mtime + size) before the cache is reset.
+_MAPPING_CACHE_MAX = 32
+
+# (resolved path, st_mtime_ns, st_size) -> (parsed mapping, compiled mapping)
+_mapping_cache: dict[tuple[str, int, int], tuple[dict, CompiledMapping]] = {}
+_mapping_cache_lock = threading.Lock()
+
+# Attribute getter + formatter: payload object -> VALUE string.
+AttrFn = Callable[[object], str]
+
+
+@dataclass(frozen=True)
+class CompiledMapping:
+    """
+    Mapping resolved once: paths pre-split, decimals pre-derived, {MODE}
+    substituted per mode. Entries are (ATTR, getter/formatter), in mapping order.
+    """
+
+    panel: tuple[tuple[str, AttrFn], ...]
+    circuits: tuple[tuple[str, AttrFn], ...]
+    # (MODE, attributes of that mode), in sections.modes order
+    sections: tuple[tuple[str, tuple[tuple[str, AttrFn], ...]], ...]
 
 
 def load_mapping(path: str | Path) -> dict:
-    mapping_path = Path(path)
-    text = mapping_path.read_text(encoding="utf-8")
-    try:
-        import yaml  # type: ignore
-    except ImportError:
-        data = _parse_simple_yaml(text, mapping_path)
-    else:
-        data = yaml.safe_load(text)
-    if not isinstance(data, dict):
-        raise ValueError(f"Mapping root must be a dict: {mapping_path}")
-    return data
+    """Parsed mapping (cached by path + mtime + size; the caller gets its own copy)."""
+    data, _compiled = _load_mapping_cached(Path(path))
+    return copy.deepcopy(data)
 
 
-def build_rows_from_payload(payload: dict, mapping: dict) -> dict[str, list[list[str]]]:
-    if not isinstance(payload, dict):
-        raise ValueError("payload must be a dict")
+def load_compiled_mapping(path: str | Path) -> CompiledMapping:
+    """compile_mapping(load_mapping(path)), cached together with the parsed file."""
+    _data, compiled = _load_mapping_cached(Path(path))
+    return compiled
+
+
+def compile_mapping(mapping: dict) -> CompiledMapping:
     if not isinstance(mapping, dict):
         raise ValueError("mapping must be a dict")
-
     panel_cfg = _require_mapping_section(mapping, "panel")
     circuits_cfg = _require_mapping_section(mapping, "circuits")
     sections_cfg = _require_mapping_section(mapping, "sections")
+    modes = sections_cfg.get("modes")
+    if not isinstance(modes, list) or not modes:
+        raise ValueError("Mapping 'sections.modes' must be a non-empty list")
+
+    section_modes = []
+    for mode in modes:
+        mode_str = str(mode)
+        section_modes.append(
+            (
+                mode_str,
+                tuple(
+                    (str(attr), _compile_attr(str(path).replace("{MODE}", mode_str)))
+                    for attr, path in sections_cfg["attributes"].items()
+                ),
+            )
+        )
+    return CompiledMapping(
+        panel=tuple(
+            (str(attr), _compile_attr(str(path)))
+            for attr, path in panel_cfg["attributes"].items()
+        ),
+        circuits=tuple(
+            (str(attr), _compile_attr(str(path)))
+            for attr, path in circuits_cfg["attributes"].items()
+        ),
+        sections=tuple(section_modes),
+    )
+
+
+def build_rows_from_payload(
+    payload: dict, mapping: dict | CompiledMapping
+) -> dict[str, list[list[str]]]:
+    """Rows per CSV; pass a CompiledMapping to skip compiling the mapping per payload."""
+    if not isinstance(payload, dict):
+        raise ValueError("payload must be a dict")
+    compiled = mapping if isinstance(mapping, CompiledMapping) else compile_mapping(mapping)
 
     panel_guid = _require_guid(_get_path_value(payload, "panel.panel_id"), "panel.panel_id")
-    panel_rows = _build_panel_rows(payload, panel_cfg, panel_guid)
+    panel_rows = [[panel_guid, attr, fn(payload)] for attr, fn in compiled.panel]
 
-    circuits_rows = _build_circuits_rows(payload, circuits_cfg)
-    sections_rows = _build_sections_rows(payload, sections_cfg)
+    circuits_rows = _build_circuits_rows(payload, compiled.circuits)
+    sections_rows = _build_sections_rows(payload, compiled.sections)
 
     return {
         "panel": panel_rows,
@@ -42,6 +123,167 @@ def build_rows_from_payload(payload: dict, mapping: dict) -> dict[str, list[list
     }
 
 
+def attribute_hashes(rows: dict[str, list[list[str]]]) -> dict[str, str]:
+    """State key (kind, GUID[, MODE], ATTR) -> hash of VALUE for build_rows_from_payload rows."""
+    out: dict[str, str] = {}
+    for kind, kind_rows in rows.items():
+        for row in kind_rows:
+            out[_KEY_SEP.join([kind, *row[:-1]])] = _value_hash(row[-1])
+    return out
+
+
+def diff_rows(
+    rows: dict[str, list[list[str]]], previous: dict[str, str]
+) -> tuple[dict[str, list[list[str]]], list[list[str]], dict[str, str]]:
+    """
+    Incremental export of one panel: (rows whose value changed or is new,
+    tombstones [KIND, GUID, MODE, ATTR] of keys exported last time and now gone,
+    current hashes to store as the new state).
+    """
+    current = attribute_hashes(rows)
+    changed = {
+        kind: [
+            row
+            for row in kind_rows
+            if previous.get(_KEY_SEP.join([kind, *row[:-1]])) != _value_hash(row[-1])
+        ]
+        for kind, kind_rows in rows.items()
+    }
+    tombstones: list[list[str]] = []
+    for key in sorted(previous.keys() - current.keys()):
+        kind, *parts = key.split(_KEY_SEP)
+        guid, attr = parts[0], parts[-1]
+        mode = parts[1] if len(parts) == 3 else ""
+        tombstones.append([TOMBSTONE_KINDS.get(kind, kind.upper()), guid, mode, attr])
+    return changed, tombstones, current
+
+
+def load_export_state(path: str | Path) -> dict[str, dict[str, str]]:
+    """panel_id -> attribute hashes of the last incremental export ({} if absent)."""
+    state_path = Path(path)
+    if not state_path.exists():
+        return {}
+    data = json.loads(state_path.read_text(encoding="utf-8"))
+    if not isinstance(data, dict) or data.get("version") != EXPORT_STATE_VERSION:
+        raise ValueError(f"Unsupported export state file: {state_path} (use --reset-state)")
+    panels = data.get("panels")
+    if not isinstance(panels, dict):
+        raise ValueError(f"Export state 'panels' must be a dict: {state_path}")
+    return panels
+
+
+def save_export_state(path: str | Path, panels: dict[str, dict[str, str]]) -> None:
+    """Write the state atomically (temp file + rename)."""
+    state_path = Path(path)
+    state_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = state_path.with_name(state_path.name + ".tmp")
+    tmp_path.write_text(
+        json.dumps(
+            {"version": EXPORT_STATE_VERSION, "panels": panels},
+            ensure_ascii=False,
+            sort_keys=True,
+        ),
+        encoding="utf-8",
+    )
+    os.replace(tmp_path, state_path)
+
+
+def grouped_lines(rows: dict[str, list[list[str]]]) -> list[tuple[tuple[str, str, str], str]]:
+    """
+    Grouped layout of build_rows_from_payload rows: one s-expression per GUID
+    (and MODE for sections), readable by AutoLISP `read`:
+
+        ("CIRCUIT" "<guid>" nil ("I_A" . "12.3") ("DU_PCT" . "1.05"))
+        ("SECTION" "<guid>" "NORMAL" ("PP_KW" . "8.50") ...)
+
+    Returns (sort key (GUID, KIND, MODE), line) pairs; the caller sorts them
+    (several panels go into one file).
+    """
+    out: list[tuple[tuple[str, str, str], str]] = []
+    for rows_kind, kind_rows in rows.items():
+        kind = TOMBSTONE_KINDS[rows_kind]
+        for group, items in itertools.groupby(kind_rows, key=lambda row: tuple(row[:-2])):
+            guid = group[0]
+            mode = group[1] if len(group) > 1 else ""
+            attrs = " ".join(
+                f"({_sexp_str(row[-2])} . {_sexp_str(row[-1])})" for row in items
+            )
+            mode_sexp = _sexp_str(mode) if mode else "nil"
+            out.append(
+                ((guid, kind, mode), f"({_sexp_str(kind)} {_sexp_str(guid)} {mode_sexp} {attrs})")
+            )
+    return out
+
+
+def parse_grouped(text: str) -> dict[str, list[list[str]]]:
+    """Rows (as build_rows_from_payload) of a grouped s-expression file."""
+    rows: dict[str, list[list[str]]] = {kind: [] for kind in TOMBSTONE_KINDS}
+    for lineno, line in enumerate(text.splitlines(), start=1):
+        if not line.strip():
+            continue
+        record = _parse_sexp(line, lineno)
+        if not isinstance(record, list) or len(record) < 3:
+            raise ValueError(f"Grouped record must be (KIND GUID MODE ATTRS...) at line {lineno}")
+        kind, guid, mode, *pairs = record
+        rows_kind = _GROUPED_ROWS_KINDS.get(kind) if isinstance(kind, str) else None
+        if rows_kind is None or not isinstance(guid, str):
+            raise ValueError(f"Invalid grouped record at line {lineno}")
+        prefix = [guid, mode] if rows_kind == "sections" else [guid]
+        for pair in pairs:
+            if not isinstance(pair, tuple):
+                raise ValueError(f"Expected (ATTR . VALUE) at line {lineno}")
+            rows[rows_kind].append([*prefix, pair[0], pair[1]])
+    return rows
+
+
+def _sexp_str(value: str) -> str:
+    return '"' + value.translate(_SEXP_ESCAPES) + '"'
+
+
+def _parse_sexp(line: str, lineno: int) -> object:
+    """Subset used by grouped_lines: lists, strings, nil and dotted pairs (as tuples)."""
+    stack: list[list[object]] = [[]]
+    pos = 0
+    while pos < len(line):
+        match = _SEXP_TOKEN.match(line, pos)
+        if match is None:
+            if line[pos:].strip():
+                raise ValueError(f"Invalid s-expression at line {lineno}")
+            break
+        pos = match.end()
+        open_paren, close_paren, string, atom = match.groups()
+        if open_paren:
+            stack.append([])
+        elif close_paren:
+            if len(stack) < 2:
+                raise ValueError(f"Unbalanced ')' at line {lineno}")
+            items = stack.pop()
+            if len(items) == 3 and items[1] is _DOT:
+                stack[-1].append((items[0], items[2]))
+            else:
+                stack[-1].append(items)
+        elif string is not None:
+            stack[-1].append(re.sub(r"\\(.)", _sexp_unescape, string, flags=re.S))
+        elif atom == ".":
+            stack[-1].append(_DOT)
+        elif atom.lower() == "nil":
+            stack[-1].append(None)
+        else:
+            raise ValueError(f"Unexpected atom {atom!r} at line {lineno}")
+    if len(stack) != 1 or len(stack[0]) != 1:
+        raise ValueError(f"Expected one s-expression at line {lineno}")
+    return stack[0][0]
+
+
+def _sexp_unescape(match: re.Match[str]) -> str:
+    ch = match.group(1)
+    return _SEXP_UNESCAPES.get(ch, ch)
+
+
+def _value_hash(value: str) -> str:
+    return hashlib.blake2b(value.encode("utf-8"), digest_size=8).hexdigest()
+
+
 def _require_mapping_section(mapping: dict, key: str) -> dict:
     section = mapping.get(key)
     if not isinstance(section, dict):
@@ -52,53 +294,98 @@ def _require_mapping_section(mapping: dict, key: str) -> dict:
     return section
 
 
-def _build_panel_rows(payload: dict, panel_cfg: dict, panel_guid: str) -> list[list[str]]:
-    attrs = panel_cfg["attributes"]
-    rows: list[list[str]] = []
-    for attr, path in attrs.items():
-        value = _get_path_value(payload, str(path))
-        rows.append([panel_guid, str(attr), _format_value(str(path), value)])
-    return rows
+def _load_mapping_cached(mapping_path: Path) -> tuple[dict, CompiledMapping]:
+    resolved = mapping_path.resolve()
+    st = resolved.stat()
+    key = (str(resolved), st.st_mtime_ns, st.st_size)
+    cached = _mapping_cache.get(key)
+    if cached is not None:
+        return cached
+
+    text = resolved.read_text(encoding="utf-8")
+    try:
+        import yaml  # type: ignore
+    except ImportError:
+        data = _parse_simple_yaml(text, mapping_path)
+    else:
+        data = yaml.safe_load(text)
+    if not isinstance(data, dict):
+        raise ValueError(f"Mapping root must be a dict: {mapping_path}")
+    entry = (data, compile_mapping(data))
+    with _mapping_cache_lock:
+        if len(_mapping_cache) >= _MAPPING_CACHE_MAX:
+            _mapping_cache.clear()
+        _mapping_cache[key] = entry
+    return entry
+
+
+def clear_mapping_cache() -> None:
+    with _mapping_cache_lock:
+        _mapping_cache.clear()
+
+
+def _compile_attr(path: str) -> AttrFn:
+    """Getter + formatter equivalent to _format_value(path, _get_path_value(obj, path))."""
+    decimals = _decimals_for_path(path)
+    if not path:
+        empty = _format_value_with(None, decimals)
+        return lambda obj: empty
+    parts = tuple(part for part in path.split(".") if part)
+
+    if len(parts) == 1:
+        (key,) = parts
+
+        def get_one(obj: object) -> str:
+            value = obj.get(key) if isinstance(obj, dict) else None
+            return _format_value_with(value, decimals)
 
+        return get_one
 
-def _build_circuits_rows(payload: dict, circuits_cfg: dict) -> list[list[str]]:
-    attrs = circuits_cfg["attributes"]
+    def get_path(obj: object) -> str:
+        current = obj
+        for part in parts:
+            if isinstance(current, dict) and part in current:
+                current = current[part]
+            else:
+                return ""
+        return _format_value_with(current, decimals)
+
+    return get_path
+
+
+def _build_circuits_rows(
+    payload: dict, attrs: tuple[tuple[str, AttrFn], ...]
+) -> list[list[str]]:
     circuits = payload.get("circuits", [])
     if not isinstance(circuits, list):
         raise ValueError("payload.circuits must be a list")
     rows: list[list[str]] = []
+    append = rows.append
     for circuit in circuits:
         if not isinstance(circuit, dict):
             raise ValueError("payload.circuits[] must be dicts")
         guid = _require_guid(circuit.get("circuit_id"), "circuits[].circuit_id")
-        for attr, path in attrs.items():
-            value = _get_path_value(circuit, str(path))
-            rows.append([guid, str(attr), _format_value(str(path), value)])
+        for attr, fn in attrs:
+            append([guid, attr, fn(circuit)])
     return rows
 
 
-def _build_sections_rows(payload: dict, sections_cfg: dict) -> list[list[str]]:
-    attrs = sections_cfg["attributes"]
-    modes = sections_cfg.get("modes")
-    if not isinstance(modes, list) or not modes:
-        raise ValueError("Mapping 'sections.modes' must be a non-empty list")
+def _build_sections_rows(
+    payload: dict, modes: tuple[tuple[str, tuple[tuple[str, AttrFn], ...]], ...]
+) -> list[list[str]]:
     sections = payload.get("bus_sections", [])
     if not isinstance(sections, list):
         raise ValueError("payload.bus_sections must be a list")
 
     rows: list[list[str]] = []
+    append = rows.append
     for section in sections:
         if not isinstance(section, dict):
             raise ValueError("payload.bus_sections[] must be dicts")
         guid = _require_guid(section.get("bus_section_id"), "bus_sections[].bus_section_id")
-        for mode in modes:
-            mode_str = str(mode)
-            for attr, path in attrs.items():
-                path_str = str(path).replace("{MODE}", mode_str)
-                value = _get_path_value(section, path_str)
-                rows.append(
-                    [guid, mode_str, str(attr), _format_value(path_str, value)]
-                )
+        for mode, attrs in modes:
+            for attr, fn in attrs:
+                append([guid, mode, attr, fn(section)])
     return rows
 
 
@@ -126,6 +413,10 @@ def _get_path_value(obj: object, path: str) -> object:
 
 
 def _format_value(path: str, value: object) -> str:
+    return _format_value_with(value, _decimals_for_path(path))
+
+
+def _format_value_with(value: object, decimals: int | None) -> str:
     if value is None:
         return ""
     if isinstance(value, bool):
@@ -134,7 +425,6 @@ def _format_value(path: str, value: object) -> str:
         num = float(value)
         if not math.isfinite(num):
             return ""
-        decimals = _decimals_for_path(path)
         if decimals is None:
             return _format_default_number(num)
         return f"{num:.{decimals}f}"
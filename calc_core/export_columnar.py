@@ -0,0 +1,315 @@
+"""
+Columnar export of calculation results for analytics.
+
+rtm_panel_calc, section_calc, circuit_calc (circuits + circuit_calc, as in the
+payload) and panel_phase_balance of the whole project are written one file per
+table from one read transaction, with the SELECTs of export_payload. Columns are
+typed (str / float64 / int64; the panel_phase_balance counters are nullable
+int64, since DBs whose columns were added outside the migrations can hold NULL):
+
+  arrow    Arrow IPC file, uncompressed (pyarrow; memory-mapped, zero-copy read)
+  parquet  Parquet (pyarrow)
+  npz      uncompressed NumPy .npz, one .npy member per column (no pyarrow);
+           NULL is NaN for floats and "" for strings; nullable int columns
+           are float64 with NaN for NULL (npz has no integer NULL)
+
+Arrow / Parquet are written in record batches of batch_rows rows. The default
+format is arrow when pyarrow is installed, else npz. load_columnar() reads any
+of them memory-mapped.
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import struct
+import zipfile
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+
+from .export_payload import _RTM_SQL, _SECTION_CALC_SQL, _circuits_sql
+from .schema_caps import schema_caps
+
+try:
+    import numpy as _np
+except ImportError:
+    _np = None
+
+try:
+    import pyarrow as _pa
+    import pyarrow.ipc as _pa_ipc
+    import pyarrow.parquet as _pq
+except ImportError:
+    _pa = None
+
+COLUMNAR_FORMATS = {"arrow": ".arrow", "parquet": ".parquet", "npz": ".npz"}
+
+# Rows fetched per cursor round trip / Arrow record batch.
+BATCH_ROWS = 50_000
+
+# Local file header of a ZIP member: fixed part, name / extra lengths at offset 26.
+_ZIP_LOCAL_HEADER = 30
+
+
+@dataclass(frozen=True)
+class _Table:
+    name: str
+    sql: str
+    # (output column, column of the SELECT, kind: "str" | "float" | "int" | "nullable_int")
+    columns: tuple[tuple[str, str, str], ...]
+
+
+def default_format() -> str:
+    return "arrow" if _pa is not None else "npz"
+
+
+def export_columnar(
+    conn: sqlite3.Connection,
+    out_dir: str | Path,
+    *,
+    fmt: str | None = None,
+    batch_rows: int = BATCH_ROWS,
+) -> dict[str, Path]:
+    """Write every result table to out_dir/<table><ext>; returns table -> path."""
+    fmt = fmt or default_format()
+    if fmt not in COLUMNAR_FORMATS:
+        raise ValueError(f"Unknown columnar format: {fmt} (expected {', '.join(COLUMNAR_FORMATS)})")
+    if fmt in ("arrow", "parquet") and _pa is None:
+        raise ValueError(f"Format '{fmt}' requires pyarrow (use 'npz')")
+    if fmt == "npz" and _np is None:
+        raise ValueError("Format 'npz' requires numpy")
+    if batch_rows <= 0:
+        raise ValueError("batch_rows must be > 0")
+
+    out_path = Path(out_dir)
+    out_path.mkdir(parents=True, exist_ok=True)
+    written: dict[str, Path] = {}
+    own_tx = not conn.in_transaction
+    if own_tx:
+        conn.execute("BEGIN")
+    try:
+        for table in _tables(conn):
+            path = out_path / f"{table.name}{COLUMNAR_FORMATS[fmt]}"
+            tmp_path = path.with_name(path.name + ".tmp")
+            try:
+                cur = conn.execute(table.sql)
+                if fmt == "npz":
+                    _write_npz(cur, table, tmp_path, batch_rows)
+                else:
+                    _write_arrow(cur, table, tmp_path, batch_rows, parquet=fmt == "parquet")
+                os.replace(tmp_path, path)
+            finally:
+                tmp_path.unlink(missing_ok=True)
+            written[table.name] = path
+    finally:
+        if own_tx:
+            # Read-only snapshot: nothing to commit.
+            conn.rollback()
+    return written
+
+
+def load_columnar(path: str | Path):
+    """
+    Memory-mapped read: pyarrow.Table for .arrow / .parquet, dict column ->
+    numpy array (np.memmap for non-empty columns) for .npz.
+    """
+    file_path = Path(path)
+    suffix = file_path.suffix.lower()
+    if suffix in (".arrow", ".parquet"):
+        if _pa is None:
+            raise ValueError(f"Reading {file_path.name} requires pyarrow")
+        if suffix == ".parquet":
+            return _pq.read_table(file_path, memory_map=True)
+        with _pa.memory_map(str(file_path), "r") as source:
+            return _pa_ipc.open_file(source).read_all()
+    if suffix == ".npz":
+        if _np is None:
+            raise ValueError(f"Reading {file_path.name} requires numpy")
+        return _npz_memmap(file_path)
+    raise ValueError(f"Unknown columnar file: {file_path}")
+
+
+def _tables(conn: sqlite3.Connection) -> list[_Table]:
+    caps = schema_caps(conn)
+    circuits_sql, has_phase, has_phase_source = _circuits_sql(conn)
+    circuit_columns = [
+        ("panel_id", "panel_id", "str"),
+        ("circuit_id", "circuit_id", "str"),
+        ("name", "name", "str"),
+        ("phases", "phases", "int"),
+    ]
+    if has_phase:
+        circuit_columns.append(("phase", "phase", "str"))
+    if has_phase_source:
+        circuit_columns.append(("phase_source", "phase_source", "str"))
+    circuit_columns += [
+        ("length_m", "length_m", "float"),
+        ("material", "material", "str"),
+        ("cos_phi", "cos_phi", "float"),
+        ("load_kind", "load_kind", "str"),
+        ("calc_status", "calc_status", "str"),
+        ("i_calc_a", "circuit_i_calc_a", "float"),
+        ("du_v", "du_v", "float"),
+        ("du_pct", "du_pct", "float"),
+        ("du_limit_pct", "du_limit_pct", "float"),
+        ("s_mm2_selected", "s_mm2_selected", "float"),
+    ]
+
+    tables = [
+        _Table(
+            "rtm_panel_calc",
+            f"{_RTM_SQL} ORDER BY panel_id",
+            (("panel_id", "panel_id", "str"),)
+            + tuple((c, c, "float") for c in ("pp_kw", "qp_kvar", "sp_kva", "ip_a", "kr", "ne")),
+        ),
+        _Table(
+            "section_calc",
+            f"{_SECTION_CALC_SQL} ORDER BY panel_id, bus_section_id, mode",
+            tuple((c, c, "str") for c in ("panel_id", "bus_section_id", "mode"))
+            + tuple((c, c, "float") for c in ("p_kw", "q_kvar", "s_kva", "i_a")),
+        ),
+        _Table(
+            "circuit_calc",
+            f"""
+            SELECT
+              t.*,
+              CASE WHEN t.calc_circuit_id IS NULL THEN 'NO_CALC' ELSE 'OK' END AS calc_status
+            FROM ({circuits_sql}) t
+            ORDER BY t.panel_id, t.name, t.circuit_id
+            """,
+            tuple(circuit_columns),
+        ),
+    ]
+
+    if caps.phase_balance:
+        pb_columns = [
+            ("panel_id", "panel_id", "str"),
+            ("mode", "mode", "str"),
+            ("i_l1", "i_l1", "float"),
+            ("i_l2", "i_l2", "float"),
+            ("i_l3", "i_l3", "float"),
+            ("unbalance_pct", "unbalance_pct", "float"),
+        ]
+        if caps.pb_warnings:
+            pb_columns.append(("invalid_manual_count", "invalid_manual_count", "nullable_int"))
+        if caps.pb_change_counts:
+            pb_columns += [
+                ("changed_count", "changed_count", "nullable_int"),
+                ("unchanged_count", "unchanged_count", "nullable_int"),
+            ]
+        tables.append(
+            _Table(
+                "panel_phase_balance",
+                f"""
+                SELECT {', '.join(source for _name, source, _kind in pb_columns)}
+                FROM panel_phase_balance
+                ORDER BY panel_id, mode
+                """,
+                tuple(pb_columns),
+            )
+        )
+    return tables
+
+
+def _source_indexes(cur: sqlite3.Cursor, table: _Table) -> list[int]:
+    names = [d[0] for d in cur.description]
+    return [names.index(source) for _name, source, _kind in table.columns]
+
+
+def _write_arrow(
+    cur: sqlite3.Cursor, table: _Table, path: Path, batch_rows: int, *, parquet: bool
+) -> None:
+    types = {
+        "str": _pa.string(),
+        "float": _pa.float64(),
+        "int": _pa.int64(),
+        "nullable_int": _pa.int64(),
+    }
+    schema = _pa.schema([(name, types[kind]) for name, _source, kind in table.columns])
+    indexes = _source_indexes(cur, table)
+    if parquet:
+        writer = _pq.ParquetWriter(str(path), schema)
+    else:
+        writer = _pa_ipc.new_file(str(path), schema)
+    try:
+        while True:
+            rows = cur.fetchmany(batch_rows)
+            if not rows:
+                break
+            arrays = [
+                _pa.array([row[i] for row in rows], type=field.type)
+                for i, field in zip(indexes, schema)
+            ]
+            writer.write_batch(_pa.RecordBatch.from_arrays(arrays, schema=schema))
+    finally:
+        writer.close()
+
+
+def _write_npz(cur: sqlite3.Cursor, table: _Table, path: Path, batch_rows: int) -> None:
+    indexes = _source_indexes(cur, table)
+    # Packed arrays (8 bytes per value) for numbers; strings are sized at the end.
+    buffers: list = [
+        [] if kind == "str" else array("q" if kind == "int" else "d")
+        for _name, _source, kind in table.columns
+    ]
+    nan = float("nan")
+    while True:
+        rows = cur.fetchmany(batch_rows)
+        if not rows:
+            break
+        for (name, _source, kind), i, buf in zip(table.columns, indexes, buffers):
+            if kind == "str":
+                buf.extend("" if row[i] is None else str(row[i]) for row in rows)
+            elif kind in ("float", "nullable_int"):
+                buf.extend(nan if row[i] is None else float(row[i]) for row in rows)
+            else:
+                for row in rows:
+                    if row[i] is None:
+                        raise ValueError(f"{table.name}.{name} is NULL (npz has no integer NULL)")
+                    buf.append(int(row[i]))
+
+    columns = {}
+    for (name, _source, kind), buf in zip(table.columns, buffers):
+        if kind == "str":
+            width = max((len(s) for s in buf), default=1) or 1
+            columns[name] = _np.array(buf, dtype=f"<U{width}")
+        else:
+            columns[name] = _np.frombuffer(buf, dtype="<i8" if kind == "int" else "<f8")
+    with path.open("wb") as fp:
+        # Uncompressed members can be memory-mapped in place (see _npz_memmap).
+        _np.savez(fp, **columns)
+
+
+def _npz_memmap(path: Path) -> dict:
+    out = {}
+    with zipfile.ZipFile(path) as zf, path.open("rb") as fh:
+        for info in zf.infolist():
+            name = info.filename[:-4] if info.filename.endswith(".npy") else info.filename
+            if info.compress_type != zipfile.ZIP_STORED:
+                with zf.open(info) as member:
+                    out[name] = _np.lib.format.read_array(member)
+                continue
+            fh.seek(info.header_offset)
+            local = fh.read(_ZIP_LOCAL_HEADER)
+            name_len, extra_len = struct.unpack("<HH", local[26:30])
+            fh.seek(info.header_offset + _ZIP_LOCAL_HEADER + name_len + extra_len)
+            version = _np.lib.format.read_magic(fh)
+            if version == (1, 0):
+                shape, fortran_order, dtype = _np.lib.format.read_array_header_1_0(fh)
+            else:
+                shape, fortran_order, dtype = _np.lib.format.read_array_header_2_0(fh)
+            if dtype.hasobject:
+                raise ValueError(f"Object arrays are not supported: {path}:{info.filename}")
+            if 0 in shape:
+                out[name] = _np.empty(shape, dtype=dtype)
+                continue
+            out[name] = _np.memmap(
+                path,
+                dtype=dtype,
+                mode="r",
+                shape=shape,
+                order="F" if fortran_order else "C",
+                offset=fh.tell(),
+            )
+    return out
@@ -1,7 +1,26 @@
 from __future__ import annotations
 
+import json
 import sqlite3
+from dataclasses import dataclass
 from datetime import datetime, timezone
+from typing import Iterable, Iterator, TextIO
+
+from .schema_caps import schema_caps
+
+# Circuits fetched from the cursor and written per write() call in write_payload.
+STREAM_CHUNK_ROWS = 500
+
+# Max bound parameters per IN (...) list (SQLite default limit is 999 on older builds).
+_IN_CHUNK = 500
+
+
+@dataclass(frozen=True)
+class PanelPayload:
+    panel_id: str
+    # None when the panel could not be exported (see error).
+    payload: dict | None
+    error: str | None = None
 
 
 def _iso_utc_now() -> str:
@@ -27,55 +46,235 @@ def _optional_float(value: object) -> float | None:
 
 
 def build_payload(conn: sqlite3.Connection, panel_id: str) -> dict:
+    panel_id = _require_panel_id(panel_id)
+    head = _payload_head(conn, panel_id)
+    cur, has_phase, has_phase_source = _circuits_cursor(conn, panel_id)
+    circuits_payload = [_circuit_entry(row, has_phase, has_phase_source) for row in cur]
+    return {**head, "circuits": circuits_payload, "dwg_contract": _dwg_contract()}
+
+
+def write_payload(
+    conn: sqlite3.Connection,
+    panel_id: str,
+    fp: TextIO,
+    *,
+    chunk_size: int = STREAM_CHUNK_ROWS,
+) -> int:
+    """
+    Stream the build_payload document to a text file handle: panel header and
+    bus sections first, then circuits straight from the cursor, `chunk_size`
+    rows per write. Output is byte-identical to
+    json.dumps(build_payload(conn, panel_id), ensure_ascii=False, indent=2) + "\n";
+    memory does not grow with the number of circuits. Returns the circuit count.
+    """
+    if int(chunk_size) <= 0:
+        raise ValueError("chunk_size must be > 0")
+    panel_id = _require_panel_id(panel_id)
+    head = _payload_head(conn, panel_id)
+    cur, has_phase, has_phase_source = _circuits_cursor(conn, panel_id)
+
+    fp.write("{\n")
+    for key, value in head.items():
+        fp.write(_json_member(key, value) + ",\n")
+    fp.write('  "circuits": ')
+    count = 0
+    while True:
+        rows = cur.fetchmany(int(chunk_size))
+        if not rows:
+            break
+        parts = []
+        for row in rows:
+            entry = _circuit_entry(row, has_phase, has_phase_source)
+            parts.append("[\n    " if count == 0 else ",\n    ")
+            parts.append(json.dumps(entry, ensure_ascii=False, indent=2).replace("\n", "\n    "))
+            count += 1
+        fp.write("".join(parts))
+    fp.write("\n  ],\n" if count else "[],\n")
+    fp.write(_json_member("dwg_contract", _dwg_contract()) + "\n}\n")
+    return count
+
+
+def iter_payloads(
+    conn: sqlite3.Connection, panel_ids: Iterable[str] | None = None
+) -> Iterator[PanelPayload]:
+    """
+    Payloads of many panels (None = every panel) from one read transaction, so
+    all panels come from the same DB snapshot. Each table is queried once per
+    _IN_CHUNK panels; circuits come from one cursor ordered by panel. Panels are
+    yielded by name, ids that do not exist last. A panel that cannot be exported
+    (not found, no rtm_panel_calc, NULL values) yields an error entry and the
+    export goes on. All payloads share one generated_at.
+    """
+    chunks: list[list[str] | None] = [None]
+    if panel_ids is not None:
+        wanted = list(dict.fromkeys(_require_panel_id(p) for p in panel_ids))
+        chunks = [wanted[i : i + _IN_CHUNK] for i in range(0, len(wanted), _IN_CHUNK)]
+
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON;")
+    generated_at = _iso_utc_now()
+    own_tx = not conn.in_transaction
+    if own_tx:
+        conn.execute("BEGIN")
+    try:
+        for chunk in chunks:
+            yield from _iter_chunk_payloads(conn, chunk, generated_at)
+    finally:
+        if own_tx:
+            # Read-only snapshot: nothing to commit.
+            conn.rollback()
+
+
+def _iter_chunk_payloads(
+    conn: sqlite3.Connection, chunk: list[str] | None, generated_at: str
+) -> Iterator[PanelPayload]:
+    params: tuple[str, ...] = tuple(chunk or ())
+
+    def panel_filter(column: str) -> str:
+        if chunk is None:
+            return "1 = 1"
+        return f"{column} IN ({', '.join(['?'] * len(chunk))})"
+
+    panels = conn.execute(
+        f"{_PANELS_SQL} WHERE {panel_filter('id')} ORDER BY name ASC, id ASC", params
+    ).fetchall()
+    rtm_by_panel = {
+        str(r["panel_id"]): r
+        for r in conn.execute(f"{_RTM_SQL} WHERE {panel_filter('panel_id')}", params)
+    }
+    bus_by_panel: dict[str, list[sqlite3.Row]] = {}
+    for r in conn.execute(
+        f"{_BUS_SECTIONS_SQL} WHERE {panel_filter('panel_id')} ORDER BY panel_id, name ASC",
+        params,
+    ):
+        bus_by_panel.setdefault(str(r["panel_id"]), []).append(r)
+    section_calc_by_panel: dict[str, list[sqlite3.Row]] = {}
+    for r in conn.execute(f"{_SECTION_CALC_SQL} WHERE {panel_filter('panel_id')}", params):
+        section_calc_by_panel.setdefault(str(r["panel_id"]), []).append(r)
+
+    sql, has_phase, has_phase_source = _circuits_sql(conn)
+    # Same panel order as `panels`, so circuits are consumed panel by panel.
+    circuit_rows = iter(
+        conn.execute(
+            f"""
+            {sql}
+            JOIN panels p ON p.id = c.panel_id
+            WHERE {panel_filter('c.panel_id')}
+            ORDER BY p.name ASC, p.id ASC, c.name ASC
+            """,
+            params,
+        )
+    )
+    pending = next(circuit_rows, None)
+
+    for panel in panels:
+        panel_id = str(panel["id"])
+        rows: list[sqlite3.Row] = []
+        while pending is not None and str(pending["panel_id"]) == panel_id:
+            rows.append(pending)
+            pending = next(circuit_rows, None)
+        try:
+            head = _head_from_rows(
+                panel_id,
+                panel,
+                rtm_by_panel.get(panel_id),
+                bus_by_panel.get(panel_id, []),
+                section_calc_by_panel.get(panel_id, []),
+                generated_at=generated_at,
+            )
+            circuits_payload = [_circuit_entry(r, has_phase, has_phase_source) for r in rows]
+        except ValueError as exc:
+            yield PanelPayload(panel_id, None, str(exc))
+            continue
+        yield PanelPayload(
+            panel_id, {**head, "circuits": circuits_payload, "dwg_contract": _dwg_contract()}
+        )
+
+    if chunk is not None:
+        found = {str(p["id"]) for p in panels}
+        for panel_id in chunk:
+            if panel_id not in found:
+                yield PanelPayload(panel_id, None, f"Panel not found: {panel_id}")
+
+
+def _json_member(key: str, value: object) -> str:
+    """`"key": value` of a top-level object member, as json.dumps(indent=2) renders it."""
+    rendered = json.dumps(value, ensure_ascii=False, indent=2).replace("\n", "\n  ")
+    return f"  {json.dumps(key, ensure_ascii=False)}: {rendered}"
+
+
+def _require_panel_id(panel_id: str) -> str:
     if not isinstance(panel_id, str) or not panel_id.strip():
         raise ValueError("panel_id is required")
-    panel_id = panel_id.strip()
+    return panel_id.strip()
 
+
+def _dwg_contract() -> dict:
+    return {
+        "mapping_version": "0.4",
+        "block_guid_attr": "GUID",
+    }
+
+
+def _payload_head(
+    conn: sqlite3.Connection, panel_id: str, *, generated_at: str | None = None
+) -> dict:
+    """version, generated_at, panel and bus_sections members (everything before circuits)."""
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA foreign_keys = ON;")
 
-    panel = conn.execute(
-        """
-        SELECT
-          id, name, system_type, u_ll_v, u_ph_v,
-          du_limit_lighting_pct, du_limit_other_pct
-        FROM panels
-        WHERE id = ?
-        """,
-        (panel_id,),
-    ).fetchone()
+    panel = conn.execute(f"{_PANELS_SQL} WHERE id = ?", (panel_id,)).fetchone()
     if panel is None:
         raise ValueError(f"Panel not found: {panel_id}")
-
-    rtm = conn.execute(
-        """
-        SELECT pp_kw, qp_kvar, sp_kva, ip_a, kr, ne
-        FROM rtm_panel_calc
-        WHERE panel_id = ?
-        """,
-        (panel_id,),
-    ).fetchone()
-    if rtm is None:
-        raise ValueError(f"rtm_panel_calc not found for panel_id={panel_id}")
-
+    rtm = conn.execute(f"{_RTM_SQL} WHERE panel_id = ?", (panel_id,)).fetchone()
     bus_sections_rows = conn.execute(
-        """
-        SELECT id, name
-        FROM bus_sections
-        WHERE panel_id = ?
-        ORDER BY name ASC
-        """,
-        (panel_id,),
+        f"{_BUS_SECTIONS_SQL} WHERE panel_id = ? ORDER BY name ASC", (panel_id,)
     ).fetchall()
-
     section_calc_rows = conn.execute(
-        """
-        SELECT bus_section_id, mode, p_kw, q_kvar, s_kva, i_a
-        FROM section_calc
-        WHERE panel_id = ?
-        """,
-        (panel_id,),
+        f"{_SECTION_CALC_SQL} WHERE panel_id = ?", (panel_id,)
     ).fetchall()
+    return _head_from_rows(
+        panel_id,
+        panel,
+        rtm,
+        bus_sections_rows,
+        section_calc_rows,
+        generated_at=generated_at if generated_at is not None else _iso_utc_now(),
+    )
+
+
+_PANELS_SQL = """
+    SELECT
+      id, name, system_type, u_ll_v, u_ph_v,
+      du_limit_lighting_pct, du_limit_other_pct
+    FROM panels
+"""
+_RTM_SQL = """
+    SELECT panel_id, pp_kw, qp_kvar, sp_kva, ip_a, kr, ne
+    FROM rtm_panel_calc
+"""
+_BUS_SECTIONS_SQL = """
+    SELECT panel_id, id, name
+    FROM bus_sections
+"""
+_SECTION_CALC_SQL = """
+    SELECT panel_id, bus_section_id, mode, p_kw, q_kvar, s_kva, i_a
+    FROM section_calc
+"""
+
+
+def _head_from_rows(
+    panel_id: str,
+    panel: sqlite3.Row,
+    rtm: sqlite3.Row | None,
+    bus_sections_rows: list[sqlite3.Row],
+    section_calc_rows: list[sqlite3.Row],
+    *,
+    generated_at: str,
+) -> dict:
+    if rtm is None:
+        raise ValueError(f"rtm_panel_calc not found for panel_id={panel_id}")
+
     section_calc_by_key: dict[tuple[str, str], dict[str, float]] = {}
     for row in section_calc_rows:
         bus_section_id = str(row["bus_section_id"])
@@ -105,100 +304,9 @@ def build_payload(conn: sqlite3.Connection, panel_id: str) -> dict:
             }
         )
 
-    circuits_cols = [r[1] for r in conn.execute("PRAGMA table_info(circuits)").fetchall()]
-    has_phase = "phase" in circuits_cols
-    has_phase_source = "phase_source" in circuits_cols
-    phase_col = "c.phase," if has_phase else ""
-    phase_source_col = "c.phase_source," if has_phase_source else ""
-    circuits_rows = conn.execute(
-        f"""
-        SELECT
-          c.id AS circuit_id,
-          c.name,
-          c.phases,
-          {phase_col}
-          {phase_source_col}
-          c.length_m,
-          c.material,
-          c.cos_phi,
-          c.load_kind,
-          c.i_calc_a AS circuit_i_calc_a,
-          cc.circuit_id AS calc_circuit_id,
-          cc.du_v,
-          cc.du_pct,
-          cc.du_limit_pct,
-          cc.s_mm2_selected
-        FROM circuits c
-        LEFT JOIN circuit_calc cc ON cc.circuit_id = c.id
-        WHERE c.panel_id = ?
-        ORDER BY c.name ASC
-        """,
-        (panel_id,),
-    ).fetchall()
-
-    circuits_payload = []
-    for row in circuits_rows:
-        circuit_id = str(row["circuit_id"])
-        calc_status = "OK" if row["calc_circuit_id"] is not None else "NO_CALC"
-        if calc_status == "OK":
-            du_v = _optional_float(row["du_v"])
-            du_pct = _optional_float(row["du_pct"])
-            du_limit_pct = _optional_float(row["du_limit_pct"])
-            s_mm2_selected = _optional_float(row["s_mm2_selected"])
-        else:
-            du_v = None
-            du_pct = None
-            du_limit_pct = None
-            s_mm2_selected = None
-
-        phases = int(row["phases"])
-        phase_raw = row["phase"] if has_phase else None
-        phase_val = None
-        if phases == 1 and phase_raw is not None:
-            s = str(phase_raw).strip()
-            if s in ("L1", "L2", "L3"):
-                phase_val = s
-
-        phase_source_val = None
-        if has_phase_source:
-            # NOTE: sqlite3.Row does not support .get(); use [] access.
-            ps = row["phase_source"]
-            if ps is not None:
-                s = str(ps).strip()
-                if s in ("AUTO", "MANUAL"):
-                    phase_source_val = s
-
-        circuit_entry: dict = {
-            "circuit_id": circuit_id,
-            "name": row["name"],
-            "phases": phases,
-            "phase": phase_val,
-            "length_m": _required_float(
-                row["length_m"], "length_m", f"circuits.id={circuit_id}"
-            ),
-            "material": str(row["material"]),
-            "cos_phi": _required_float(
-                row["cos_phi"], "cos_phi", f"circuits.id={circuit_id}"
-            ),
-            "load_kind": str(row["load_kind"]),
-            "calc": {
-                "status": calc_status,
-                "i_calc_a": _required_float(
-                    row["circuit_i_calc_a"], "i_calc_a", f"circuits.id={circuit_id}"
-                ),
-                "du_v": du_v,
-                "du_pct": du_pct,
-                "du_limit_pct": du_limit_pct,
-                "s_mm2_selected": s_mm2_selected,
-            },
-        }
-        if has_phase_source:
-            circuit_entry["phase_source"] = phase_source_val
-        circuits_payload.append(circuit_entry)
-
-    payload = {
+    return {
         "version": "0.4",
-        "generated_at": _iso_utc_now(),
+        "generated_at": generated_at,
         "panel": {
             "panel_id": str(panel["id"]),
             "name": str(panel["name"]),
@@ -239,10 +347,104 @@ def build_payload(conn: sqlite3.Connection, panel_id: str) -> dict:
             },
         },
         "bus_sections": bus_sections_payload,
-        "circuits": circuits_payload,
-        "dwg_contract": {
-            "mapping_version": "0.4",
-            "block_guid_attr": "GUID",
+    }
+
+
+def _circuits_sql(conn: sqlite3.Connection) -> tuple[str, bool, bool]:
+    """SELECT of circuits + circuit_calc (no WHERE) + has_phase, has_phase_source."""
+    caps = schema_caps(conn)
+    has_phase = caps.phase_balance
+    has_phase_source = caps.phase_source
+    phase_col = "c.phase," if has_phase else ""
+    phase_source_col = "c.phase_source," if has_phase_source else ""
+    sql = f"""
+        SELECT
+          c.panel_id,
+          c.id AS circuit_id,
+          c.name,
+          c.phases,
+          {phase_col}
+          {phase_source_col}
+          c.length_m,
+          c.material,
+          c.cos_phi,
+          c.load_kind,
+          c.i_calc_a AS circuit_i_calc_a,
+          cc.circuit_id AS calc_circuit_id,
+          cc.du_v,
+          cc.du_pct,
+          cc.du_limit_pct,
+          cc.s_mm2_selected
+        FROM circuits c
+        LEFT JOIN circuit_calc cc ON cc.circuit_id = c.id
+    """
+    return sql, has_phase, has_phase_source
+
+
+def _circuits_cursor(
+    conn: sqlite3.Connection, panel_id: str
+) -> tuple[sqlite3.Cursor, bool, bool]:
+    """Open cursor over the panel circuits (ordered by name) + has_phase, has_phase_source."""
+    sql, has_phase, has_phase_source = _circuits_sql(conn)
+    cur = conn.execute(f"{sql} WHERE c.panel_id = ? ORDER BY c.name ASC", (panel_id,))
+    return cur, has_phase, has_phase_source
+
+
+def _circuit_entry(row: sqlite3.Row, has_phase: bool, has_phase_source: bool) -> dict:
+    circuit_id = str(row["circuit_id"])
+    calc_status = "OK" if row["calc_circuit_id"] is not None else "NO_CALC"
+    if calc_status == "OK":
+        du_v = _optional_float(row["du_v"])
+        du_pct = _optional_float(row["du_pct"])
+        du_limit_pct = _optional_float(row["du_limit_pct"])
+        s_mm2_selected = _optional_float(row["s_mm2_selected"])
+    else:
+        du_v = None
+        du_pct = None
+        du_limit_pct = None
+        s_mm2_selected = None
+
+    phases = int(row["phases"])
+    phase_raw = row["phase"] if has_phase else None
+    phase_val = None
+    if phases == 1 and phase_raw is not None:
+        s = str(phase_raw).strip()
+        if s in ("L1", "L2", "L3"):
+            phase_val = s
+
+    phase_source_val = None
+    if has_phase_source:
+        # NOTE: sqlite3.Row does not support .get(); use [] access.
+        ps = row["phase_source"]
+        if ps is not None:
+            s = str(ps).strip()
+            if s in ("AUTO", "MANUAL"):
+                phase_source_val = s
+
+    circuit_entry: dict = {
+        "circuit_id": circuit_id,
+        "name": row["name"],
+        "phases": phases,
+        "phase": phase_val,
+        "length_m": _required_float(
+            row["length_m"], "length_m", f"circuits.id={circuit_id}"
+        ),
+        "material": str(row["material"]),
+        "cos_phi": _required_float(
+            row["cos_phi"], "cos_phi", f"circuits.id={circuit_id}"
+        ),
+        "load_kind": str(row["load_kind"]),
+        "calc": {
+            "status": calc_status,
+            "i_calc_a": _required_float(
+                row["circuit_i_calc_a"], "i_calc_a", f"circuits.id={circuit_id}"
+            ),
+            "du_v": du_v,
+            "du_pct": du_pct,
+            "du_limit_pct": du_limit_pct,
+            "s_mm2_selected": s_mm2_selected,
         },
     }
-    return payload
+    if has_phase_source:
+        circuit_entry["phase_source"] = phase_source_val
+    return circuit_entry
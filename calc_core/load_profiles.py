@@ -0,0 +1,395 @@
+"""
+Time-series load profiles and coincident-peak section aggregation.
+
+consumer_load_profiles (migration 0016) optionally stores P(t) and Q(t) of a
+consumer as little-endian float32 BLOBs: 8760 hourly points take 35 KB per
+series, a typical day (24 points) 96 bytes. q_kvar NULL means Q(t) follows
+P(t) with the Q/P ratio of the consumer peak load.
+
+calc_section_profile_peaks assigns every consumer to the active bus section of
+each mode with the same rules as aggregate_section_loads and sums per step t:
+  P(t), Q(t), S(t) = sum of sqrt(Pc(t)² + Qc(t)²), I(t) = sum of Sc(t) · ic / sc
+where ic / sc is the current per kVA of the consumer peak load. Consumers
+without a profile contribute their peak load at every step (flat profile), so a
+section without profiles reproduces section_calc. The coincident peak is the
+step with max I(t) (first one on ties).
+
+Profiles of one call must share step_minutes; a shorter profile whose length
+divides the longest one is repeated (typical day inside a year). NumPy is used
+when installed (one vector operation per consumer and series, O(consumers ×
+points)); without it a pure-Python fallback returns the same result, slower.
+Nothing is written to the DB.
+"""
+
+from __future__ import annotations
+
+import math
+import sqlite3
+import sys
+from array import array
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Iterable
+
+from .diagnostics import Diagnostics
+from .schema_caps import schema_caps
+from .section_aggregation import (
+    consumer_load,
+    consumer_sections_v1,
+    consumer_sections_v2,
+    load_rtm_panel_calcs,
+    normalize_mode,
+    rtm_load_refs,
+    select_consumers,
+    select_in_chunks,
+)
+
+try:
+    import numpy as _np
+except ImportError:
+    _np = None
+
+# Stored points are float32, little-endian (4 bytes each).
+_POINT_SIZE = 4
+
+
+@dataclass(frozen=True)
+class SectionProfilePeak:
+    panel_id: str
+    mode: str
+    bus_section_id: str
+    section_name: str
+    # Section load at the coincident peak step.
+    p_kw: float
+    q_kvar: float
+    s_kva: float
+    i_a: float
+    peak_step: int
+    step_minutes: int
+    # Sum of consumer peak loads (= section_calc), for the diversity factor.
+    static_s_kva: float
+    static_i_a: float
+    consumer_count: int
+    profiled_count: int
+
+    @property
+    def peak_hour(self) -> float:
+        """Offset of the peak step from the profile start, hours."""
+        return self.peak_step * self.step_minutes / 60.0
+
+
+def encode_profile(values: Iterable[float]) -> bytes:
+    """Pack values as little-endian float32 (storage format of consumer_load_profiles)."""
+    packed = array("f", (float(v) for v in values))
+    if not packed:
+        raise ValueError("profile must contain at least one point")
+    if not all(math.isfinite(v) for v in packed):
+        raise ValueError("profile values must be finite")
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def decode_profile(blob: bytes) -> list[float]:
+    """Inverse of encode_profile."""
+    if len(blob) % _POINT_SIZE:
+        raise ValueError(f"profile BLOB length {len(blob)} is not a multiple of {_POINT_SIZE}")
+    packed = array("f")
+    packed.frombytes(blob)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return packed.tolist()
+
+
+def set_consumer_profile(
+    conn: sqlite3.Connection,
+    consumer_id: str,
+    p_kw: Iterable[float],
+    q_kvar: Iterable[float] | None = None,
+    *,
+    step_minutes: int = 60,
+) -> int:
+    """Insert or replace the profile of a consumer; returns the number of points."""
+    if not consumer_id:
+        raise ValueError("consumer_id is required")
+    if int(step_minutes) <= 0:
+        raise ValueError("step_minutes must be > 0")
+    if not schema_caps(conn).load_profiles:
+        raise ValueError("consumer_load_profiles is missing (apply migration 0016)")
+    p_blob = encode_profile(p_kw)
+    q_blob = encode_profile(q_kvar) if q_kvar is not None else None
+    if q_blob is not None and len(q_blob) != len(p_blob):
+        raise ValueError("p_kw and q_kvar profiles must have the same number of points")
+    points = len(p_blob) // _POINT_SIZE
+
+    conn.execute("PRAGMA foreign_keys = ON;")
+    try:
+        conn.execute(
+            """
+            INSERT INTO consumer_load_profiles (
+              consumer_id, step_minutes, points, p_kw, q_kvar, updated_at
+            )
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(consumer_id) DO UPDATE SET
+              step_minutes = excluded.step_minutes,
+              points = excluded.points,
+              p_kw = excluded.p_kw,
+              q_kvar = excluded.q_kvar,
+              updated_at = excluded.updated_at
+            """,
+            (
+                consumer_id,
+                int(step_minutes),
+                points,
+                p_blob,
+                q_blob,
+                datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            ),
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return points
+
+
+def delete_consumer_profile(conn: sqlite3.Connection, consumer_id: str) -> bool:
+    """Remove the profile of a consumer (it falls back to its flat peak load)."""
+    try:
+        cur = conn.execute(
+            "DELETE FROM consumer_load_profiles WHERE consumer_id = ?", (consumer_id,)
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return cur.rowcount > 0
+
+
+def calc_section_profile_peaks(
+    conn: sqlite3.Connection,
+    panel_ids: list[str] | None = None,
+    *,
+    modes: tuple[str, ...] | list[str] | None = None,
+    diagnostics: Diagnostics | None = None,
+) -> list[SectionProfilePeak]:
+    """
+    Coincident peak per (panel, mode, bus section) for consumers of panel_ids
+    (None = all panels). modes=None: both modes of the DB schema.
+    Ordered by panel_id, mode (as requested), section name.
+    """
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON;")
+
+    caps = schema_caps(conn)
+    if not caps.load_profiles:
+        raise ValueError("consumer_load_profiles is missing (apply migration 0016)")
+    feeds_v2 = caps.feeds_v2
+    if modes is None:
+        modes = ("NORMAL", "EMERGENCY") if feeds_v2 else ("NORMAL", "RESERVE")
+    modes_norm = tuple(dict.fromkeys(normalize_mode(m, feeds_v2=feeds_v2) for m in modes))
+    if not modes_norm:
+        raise ValueError("modes must not be empty")
+
+    selected: list[str] | None = None
+    if panel_ids is not None:
+        selected = sorted({str(p).strip() for p in panel_ids if p and str(p).strip()})
+        if not selected:
+            return []
+
+    consumers = select_consumers(conn, selected)
+    if feeds_v2:
+        sections_by_mode = consumer_sections_v2(conn, selected, consumers, modes_norm)
+    else:
+        sections_by_mode = consumer_sections_v1(conn, selected, modes_norm)
+    sectioned = {cid for m in modes_norm for cid in sections_by_mode[m]}
+    rtm_loads = load_rtm_panel_calcs(conn, rtm_load_refs(consumers, sectioned))
+    profiles = _load_profile_rows(conn, sectioned)
+    step_minutes, points = _common_grid(profiles)
+
+    # (panel_id, mode, bus_section_id) -> accumulators
+    names: dict[tuple[str, str, str], str] = {}
+    static: dict[tuple[str, str, str], list[float]] = {}
+    # Consumers without a profile: constant load at every step.
+    flat: dict[tuple[str, str, str], list[float]] = {}
+    series: dict[tuple[str, str, str], list[object]] = {}
+    counts: dict[tuple[str, str, str], list[int]] = {}
+
+    for row in consumers:
+        consumer_id = str(row["consumer_id"])
+        targets = []
+        for m in modes_norm:
+            chosen = sections_by_mode[m].get(consumer_id)
+            if chosen is None:
+                if diagnostics is not None:
+                    diagnostics.warn(
+                        "CONSUMER_NO_ACTIVE_FEED" if feeds_v2 else "CONSUMER_NO_FEED",
+                        consumer_id=consumer_id,
+                        consumer_name=str(row["consumer_name"]),
+                        mode=m,
+                    )
+                continue
+            key = (str(row["panel_id"]), m, chosen[0])
+            names.setdefault(key, chosen[1] if chosen[1] is not None else chosen[0])
+            targets.append(key)
+        if not targets:
+            continue
+
+        p_kw, q_kvar, s_kva, i_a = consumer_load(row, rtm_loads)
+        profile = profiles.get(consumer_id)
+        for key in targets:
+            for acc in (static, flat) if profile is None else (static,):
+                v = acc.setdefault(key, [0.0, 0.0, 0.0, 0.0])
+                v[0] += p_kw
+                v[1] += q_kvar
+                v[2] += s_kva
+                v[3] += i_a
+            n = counts.setdefault(key, [0, 0])
+            n[0] += 1
+            n[1] += profile is not None
+        if profile is None:
+            continue
+
+        if s_kva <= 0.0 and diagnostics is not None:
+            diagnostics.warn(
+                "PROFILE_ZERO_PEAK_LOAD",
+                consumer_id=consumer_id,
+                consumer_name=str(row["consumer_name"]),
+            )
+        p_t, q_t, s_t = _consumer_series(profile, points, q_per_p=q_kvar / p_kw if p_kw else 0.0)
+        i_per_kva = i_a / s_kva if s_kva > 0.0 else 0.0
+        for key in targets:
+            acc_t = series.get(key)
+            if acc_t is None:
+                acc_t = series[key] = [_zeros(points) for _ in range(4)]
+            _add(acc_t[0], p_t, 1.0)
+            _add(acc_t[1], q_t, 1.0)
+            _add(acc_t[2], s_t, 1.0)
+            _add(acc_t[3], s_t, i_per_kva)
+
+    mode_order = {m: k for k, m in enumerate(modes_norm)}
+    out: list[SectionProfilePeak] = []
+    for key in sorted(names, key=lambda k: (k[0], mode_order[k[1]], names[k], k[2])):
+        panel_id, mode, bus_section_id = key
+        s_static = static[key]
+        base = flat.get(key, [0.0, 0.0, 0.0, 0.0])
+        acc_t = series.get(key)
+        if acc_t is None:
+            peak_step = 0
+            peak = base
+        else:
+            peak_step = _argmax(acc_t[3])
+            peak = [base[j] + float(acc_t[j][peak_step]) for j in range(4)]
+        out.append(
+            SectionProfilePeak(
+                panel_id=panel_id,
+                mode=mode,
+                bus_section_id=bus_section_id,
+                section_name=names[key],
+                p_kw=peak[0],
+                q_kvar=peak[1],
+                s_kva=peak[2],
+                i_a=peak[3],
+                peak_step=peak_step,
+                step_minutes=step_minutes,
+                static_s_kva=s_static[2],
+                static_i_a=s_static[3],
+                consumer_count=counts[key][0],
+                profiled_count=counts[key][1],
+            )
+        )
+    return out
+
+
+@dataclass(frozen=True)
+class _Profile:
+    step_minutes: int
+    points: int
+    p_kw: bytes
+    q_kvar: bytes | None
+
+
+def _load_profile_rows(conn: sqlite3.Connection, consumer_ids: set[str]) -> dict[str, _Profile]:
+    """Profile BLOBs of the given consumers only (consumer_id IN (...) per _IN_CHUNK ids)."""
+    if not consumer_ids:
+        return {}
+    rows = select_in_chunks(
+        conn,
+        """
+        SELECT consumer_id, step_minutes, points, p_kw, q_kvar
+        FROM consumer_load_profiles
+        WHERE {id_filter}
+        """,
+        sorted(consumer_ids),
+        "consumer_id",
+    )
+    return {
+        str(r["consumer_id"]): _Profile(
+            step_minutes=int(r["step_minutes"]),
+            points=int(r["points"]),
+            p_kw=bytes(r["p_kw"]),
+            q_kvar=bytes(r["q_kvar"]) if r["q_kvar"] is not None else None,
+        )
+        for r in rows
+    }
+
+
+def _common_grid(profiles: dict[str, _Profile]) -> tuple[int, int]:
+    """(step_minutes, points) shared by all profiles; (60, 1) when there are none."""
+    if not profiles:
+        return 60, 1
+    steps = {p.step_minutes for p in profiles.values()}
+    if len(steps) > 1:
+        raise ValueError(f"load profiles mix step_minutes={sorted(steps)}")
+    points = max(p.points for p in profiles.values())
+    bad = sorted({p.points for p in profiles.values() if points % p.points})
+    if bad:
+        raise ValueError(
+            f"load profiles of {bad} points cannot be repeated to {points} points"
+        )
+    return steps.pop(), points
+
+
+def _consumer_series(
+    profile: _Profile, points: int, *, q_per_p: float
+) -> tuple[object, object, object]:
+    """P(t), Q(t), S(t) of one consumer on the common grid (float64)."""
+    reps = points // profile.points
+    if _np is not None:
+        p_t = _np.frombuffer(profile.p_kw, dtype="<f4").astype(_np.float64)
+        if profile.q_kvar is not None:
+            q_t = _np.frombuffer(profile.q_kvar, dtype="<f4").astype(_np.float64)
+        else:
+            q_t = p_t * q_per_p
+        if reps > 1:
+            p_t = _np.tile(p_t, reps)
+            q_t = _np.tile(q_t, reps)
+        return p_t, q_t, _np.hypot(p_t, q_t)
+
+    p_t = decode_profile(profile.p_kw) * reps
+    if profile.q_kvar is not None:
+        q_t = decode_profile(profile.q_kvar) * reps
+    else:
+        q_t = [v * q_per_p for v in p_t]
+    return p_t, q_t, [math.hypot(p, q) for p, q in zip(p_t, q_t)]
+
+
+def _zeros(points: int) -> object:
+    return _np.zeros(points) if _np is not None else [0.0] * points
+
+
+def _add(acc: object, values: object, scale: float) -> None:
+    if _np is not None:
+        if scale == 1.0:
+            acc += values
+        else:
+            acc += values * scale
+        return
+    for t, v in enumerate(values):
+        acc[t] += v * scale
+
+
+def _argmax(values: object) -> int:
+    if _np is not None:
+        return int(_np.argmax(values))
+    return max(range(len(values)), key=values.__getitem__)
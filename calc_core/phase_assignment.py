@@ -0,0 +1,878 @@
+"""
+Phase assignment solvers for 1PH circuits (MVP-BAL).
+
+Pure functions without DB access: they take the fixed per-phase base sums
+(e.g. MANUAL circuits) plus the reassignable items and return phase indices
+0/1/2 (L1/L2/L3). DB I/O stays in calc_core.phase_balance.
+"""
+
+from __future__ import annotations
+
+import random
+import time
+from dataclasses import dataclass
+from typing import Sequence
+
+try:
+    import numpy as _np
+except ImportError:
+    _np = None
+
+PHASE_CODES = ("L1", "L2", "L3")
+
+# Relative tolerance for "strict improvement" comparisons on float sums.
+_EPS = 1e-9
+
+# How many candidate evaluations run between wall-clock checks.
+_CLOCK_CHECK_EVERY = 256
+
+# Default evaluation budget of local_search / joint_local_search.
+LOCAL_SEARCH_MAX_EVALS = 2_000_000
+
+# joint_local_search with NumPy: candidates evaluated per array operation. A block
+# starts small after an accepted candidate (the rest of it is re-evaluated) and
+# doubles while nothing is accepted.
+_JOINT_BLOCK_MIN = 32
+_JOINT_BLOCK_MAX = 4096
+# Below this many items the per-block array overhead outweighs the scalar scan.
+_JOINT_NUMPY_MIN_ITEMS = 200
+
+# Other two phases of phase a, ascending (move candidates in scan order).
+_OTHER_PHASES = ((1, 2), (0, 2), (0, 1))
+
+
+@dataclass
+class SearchStats:
+    """
+    Work done by one solver call (pass stats=SearchStats() to collect it).
+
+    evals counts local search candidate evaluations or branch-and-bound nodes.
+    The deterministic budget (max_evals / node_limit) sets budget_exhausted;
+    the wall-clock safety cap sets time_capped: only then the result may depend
+    on machine load.
+    """
+
+    evals: int = 0
+    budget_exhausted: bool = False
+    time_capped: bool = False
+
+
+def unbalance_pct(i_l1: float, i_l2: float, i_l3: float) -> float:
+    """unbalance_pct per PHASE_BALANCE_V0_1.md §4.3."""
+    i_max = max(i_l1, i_l2, i_l3)
+    i_avg = (i_l1 + i_l2 + i_l3) / 3.0
+    return 0.0 if i_avg == 0 else (100.0 * (i_max - i_avg) / i_avg)
+
+
+def greedy_assign(base_sums: Sequence[float], currents: Sequence[float]) -> list[int]:
+    """
+    Greedy bin-packing (PHASE_BALANCE_V0_1.md §5).
+
+    `currents` must already be in processing order (I desc, circuit_id asc).
+    Each item goes to the phase with the minimal running sum; ties resolve to
+    the lowest phase index (L1, then L2, then L3).
+    """
+    sums = [float(base_sums[0]), float(base_sums[1]), float(base_sums[2])]
+    out: list[int] = []
+    for i_a in currents:
+        min_sum = min(sums)
+        if sums[0] == min_sum:
+            p = 0
+        elif sums[1] == min_sum:
+            p = 1
+        else:
+            p = 2
+        sums[p] += i_a
+        out.append(p)
+    return out
+
+
+def phase_sums(
+    base_sums: Sequence[float], currents: Sequence[float], assign: Sequence[int]
+) -> list[float]:
+    sums = [float(base_sums[0]), float(base_sums[1]), float(base_sums[2])]
+    for i_a, p in zip(currents, assign):
+        sums[p] += i_a
+    return sums
+
+
+def local_search(
+    base_sums: Sequence[float],
+    currents: Sequence[float],
+    assign: Sequence[int],
+    *,
+    max_evals: int = LOCAL_SEARCH_MAX_EVALS,
+    time_cap_s: float | None = None,
+    seed: int = 0,
+    stats: SearchStats | None = None,
+) -> list[int]:
+    """
+    Anytime improvement of an existing assignment by move/swap local search.
+
+    Neighbourhood:
+    - move: one item to another phase;
+    - swap: two items on different phases exchange phases.
+
+    Each candidate is evaluated in O(1) from the three running sums. A candidate
+    is accepted when it lowers max(I_Lx) (which, with a fixed total, is exactly
+    lowering unbalance_pct), or keeps it and lowers the sum of squares of the
+    phase sums (tie-break that lets the search leave plateaus). The search stops
+    when a full pass finds no accepted candidate or after `max_evals` candidate
+    evaluations.
+
+    Scan order is shuffled with random.Random(seed), so for a given seed the
+    result is deterministic. `time_cap_s` is only a safety cap on wall-clock
+    time; when it fires the result depends on machine load and
+    stats.time_capped is set.
+    """
+    n = len(currents)
+    result = list(assign)
+    if n == 0 or max_evals <= 0:
+        return result
+
+    budget = _Budget(max_evals, time_cap_s, stats)
+    rng = random.Random(seed)
+    x = [float(v) for v in currents]
+    s = phase_sums(base_sums, x, result)
+    scale = max(1.0, max(abs(v) for v in s))
+    eps = _EPS * scale
+    eps_sq = eps * scale
+
+    order = list(range(n))
+    improved = True
+    while improved:
+        improved = False
+        rng.shuffle(order)
+
+        # 1) Moves: item k from phase a to phase b.
+        for k in order:
+            xk = x[k]
+            if xk == 0.0:
+                continue
+            a = result[k]
+            for b in (0, 1, 2):
+                if b == a:
+                    continue
+                if budget.step():
+                    return result
+                c = 3 - a - b
+                new_a = s[a] - xk
+                new_b = s[b] + xk
+                if _accept(s, a, b, c, new_a, new_b, eps, eps_sq):
+                    s[a] = new_a
+                    s[b] = new_b
+                    result[k] = b
+                    improved = True
+                    break
+
+        # 2) Swaps: items k (phase a) and m (phase b) exchange phases.
+        for idx, k in enumerate(order):
+            for m in order[idx + 1 :]:
+                a = result[k]
+                b = result[m]
+                if a == b:
+                    continue
+                delta = x[k] - x[m]
+                if delta == 0.0:
+                    continue
+                if budget.step():
+                    return result
+                c = 3 - a - b
+                new_a = s[a] - delta
+                new_b = s[b] + delta
+                if _accept(s, a, b, c, new_a, new_b, eps, eps_sq):
+                    s[a] = new_a
+                    s[b] = new_b
+                    result[k] = b
+                    result[m] = a
+                    improved = True
+
+        if improved and budget.expired():
+            break
+
+    return result
+
+
+class _Budget:
+    """
+    Deterministic work budget (max_evals steps) plus the wall-clock safety cap;
+    both record into stats.
+    """
+
+    def __init__(self, max_evals: int | None, cap_s: float | None, stats: SearchStats | None) -> None:
+        self.stats = stats if stats is not None else SearchStats()
+        self._max_evals = max_evals
+        self._deadline = None if cap_s is None else time.perf_counter() + float(cap_s)
+
+    def step(self) -> bool:
+        """Counts one evaluation / node; True when the search must stop."""
+        st = self.stats
+        if self._max_evals is not None and st.evals >= self._max_evals:
+            st.budget_exhausted = True
+            return True
+        st.evals += 1
+        return st.evals % _CLOCK_CHECK_EVERY == 0 and self.expired()
+
+    def expired(self) -> bool:
+        if self._deadline is None or time.perf_counter() < self._deadline:
+            return False
+        self.stats.time_capped = True
+        return True
+
+    def room(self, wanted: int) -> int:
+        """How many of `wanted` further evaluations fit the budget."""
+        if self._max_evals is None:
+            return wanted
+        return min(wanted, max(0, self._max_evals - self.stats.evals))
+
+    def spend(self, count: int) -> bool:
+        """Counts `count` evaluations done in one batch; True when the safety cap fired."""
+        before = self.stats.evals
+        self.stats.evals = before + count
+        crossed = self.stats.evals // _CLOCK_CHECK_EVERY != before // _CLOCK_CHECK_EVERY
+        return crossed and self.expired()
+
+
+def _accept(
+    s: list[float],
+    a: int,
+    b: int,
+    c: int,
+    new_a: float,
+    new_b: float,
+    eps: float,
+    eps_sq: float,
+) -> bool:
+    old_max = max(s[0], s[1], s[2])
+    new_max = max(new_a, new_b, s[c])
+    if new_max < old_max - eps:
+        return True
+    if new_max > old_max + eps:
+        return False
+    old_sq = s[a] * s[a] + s[b] * s[b]
+    new_sq = new_a * new_a + new_b * new_b
+    return new_sq < old_sq - eps_sq
+
+
+def exact_assign(
+    base_sums: Sequence[float],
+    currents: Sequence[float],
+    *,
+    incumbent: Sequence[int] | None = None,
+    node_limit: int = 2_000_000,
+    time_limit_s: float | None = 2.0,
+    stats: SearchStats | None = None,
+) -> tuple[list[int], bool]:
+    """
+    Exact minimization of max(I_Lx) by depth-first branch-and-bound.
+
+    - items are branched in the given order (callers pass I desc);
+    - symmetry breaking: phases with equal running sums are interchangeable for
+      the objective, only the first of them is branched;
+    - lower bound: max(current max, (current total + remaining) / 3,
+      min running sum + current item);
+    - memoization: (depth, sorted running sums) states already expanded are
+      skipped (the objective depends only on the multiset of sums);
+    - node_limit caps the search deterministically; time_limit_s is a wall-clock
+      safety cap on top of it (stats.time_capped tells that it fired).
+
+    `incumbent` (e.g. greedy or local search result) seeds the upper bound.
+    Returns (assignment, proven_optimal). When a cap is hit the best assignment
+    found so far is returned (never worse than `incumbent`) with proven_optimal=False.
+    """
+    n = len(currents)
+    x = [float(v) for v in currents]
+    base = [float(base_sums[0]), float(base_sums[1]), float(base_sums[2])]
+    if incumbent is None:
+        incumbent = greedy_assign(base, x)
+    best_assign = list(incumbent)
+    if n == 0:
+        return best_assign, True
+
+    best_max = max(phase_sums(base, x, best_assign))
+    scale = max(1.0, best_max)
+    eps = _EPS * scale
+
+    # remaining[k] = sum of x[k:]
+    remaining = [0.0] * (n + 1)
+    for k in range(n - 1, -1, -1):
+        remaining[k] = remaining[k + 1] + x[k]
+
+    global_lb = max(max(base), (sum(base) + remaining[0]) / 3.0)
+    if best_max <= global_lb + eps:
+        return best_assign, True
+
+    budget = _Budget(node_limit, time_limit_s, stats)
+    memo: set[tuple[int, tuple[float, ...]]] = set()
+    memo_cap = max(10_000, int(node_limit))
+    path = [0] * n
+    sums = list(base)
+    capped = False
+    done = False
+
+    def _dfs(k: int) -> None:
+        nonlocal best_max, best_assign, capped, done
+        if done or capped:
+            return
+        if budget.step():
+            capped = True
+            return
+
+        cur_max = max(sums)
+        if k == n:
+            if cur_max < best_max - eps:
+                best_max = cur_max
+                best_assign = list(path)
+                if best_max <= global_lb + eps:
+                    done = True
+            return
+
+        lb = max(cur_max, (sums[0] + sums[1] + sums[2] + remaining[k]) / 3.0, min(sums) + x[k])
+        if lb >= best_max - eps:
+            return
+
+        key = (k, tuple(sorted(round(v, 9) for v in sums)))
+        if key in memo:
+            return
+        if len(memo) < memo_cap:
+            memo.add(key)
+
+        xk = x[k]
+        tried: list[float] = []
+        for p in sorted((0, 1, 2), key=lambda q: (sums[q], q)):
+            sp = sums[p]
+            if any(abs(sp - t) <= eps for t in tried):
+                continue
+            tried.append(sp)
+            if sp + xk >= best_max - eps:
+                continue
+            sums[p] = sp + xk
+            path[k] = p
+            _dfs(k + 1)
+            sums[p] = sp
+            if done or capped:
+                return
+
+    _dfs(0)
+    return best_assign, not capped
+
+
+def constrained_assign(
+    base_sums: Sequence[float],
+    base_counts: Sequence[int],
+    currents: Sequence[float],
+    *,
+    max_count: int | None = None,
+    caps: Sequence[float | None] = (None, None, None),
+    allowed: Sequence[Sequence[int]] | None = None,
+    same_groups: Sequence[Sequence[int]] = (),
+    diff_groups: Sequence[Sequence[int]] = (),
+    node_limit: int = 2_000_000,
+    time_limit_s: float | None = 2.0,
+    stats: SearchStats | None = None,
+) -> tuple[list[int], bool, bool]:
+    """
+    Minimization of max(I_Lx) under placement constraints (pruned depth-first search).
+
+    Constraints:
+    - max_count: at most this many circuits per phase (base_counts included);
+    - caps: per-phase current limit (base_sums included), None = no limit;
+    - allowed[k]: phases item k may take (e.g. fixed by a MANUAL group member);
+    - same_groups: items that must share a phase (merged into one block);
+    - diff_groups: items that must be on pairwise different phases.
+
+    Blocks are branched by current desc. A branch is cut as soon as a phase would
+    exceed its slot/current limit, conflicts with an already placed block, the
+    remaining circuits/current no longer fit into the free slots/amps, or the
+    lower bound (as in exact_assign) cannot beat the incumbent. The first leaf
+    is a feasible assignment; node_limit / time_limit_s cap the search as in
+    exact_assign.
+
+    Returns (assignment, feasible, proven_optimal). When no feasible assignment is
+    found within the caps, a best-effort greedy assignment is returned (lightest
+    phase satisfying as many constraints as possible) with feasible=False.
+    """
+    n = len(currents)
+    x = [float(v) for v in currents]
+    base = [float(base_sums[0]), float(base_sums[1]), float(base_sums[2])]
+    counts = [int(base_counts[0]), int(base_counts[1]), int(base_counts[2])]
+    slot_cap = [float("inf") if max_count is None else int(max_count)] * 3
+    amp_cap = [float("inf") if c is None else float(c) for c in caps]
+    if n == 0:
+        return [], True, True
+
+    # Union-find over same-phase groups -> blocks.
+    parent = list(range(n))
+
+    def _find(k: int) -> int:
+        while parent[k] != k:
+            parent[k] = parent[parent[k]]
+            k = parent[k]
+        return k
+
+    for group in same_groups:
+        members = list(group)
+        for k in members[1:]:
+            ra, rb = _find(members[0]), _find(k)
+            if ra != rb:
+                parent[max(ra, rb)] = min(ra, rb)
+
+    roots = sorted({_find(k) for k in range(n)})
+    block_of = {r: b for b, r in enumerate(roots)}
+    nb = len(roots)
+    bx = [0.0] * nb
+    bn = [0] * nb
+    bmask = [{0, 1, 2} for _ in range(nb)]
+    for k in range(n):
+        b = block_of[_find(k)]
+        bx[b] += x[k]
+        bn[b] += 1
+        if allowed is not None:
+            bmask[b] &= set(allowed[k])
+    conflicts: list[set[int]] = [set() for _ in range(nb)]
+    for group in diff_groups:
+        blocks = [block_of[_find(k)] for k in group]
+        for i, a in enumerate(blocks):
+            for b in blocks[i + 1 :]:
+                if a != b:
+                    conflicts[a].add(b)
+                    conflicts[b].add(a)
+
+    # Branching order: heaviest blocks first (stable on first item index).
+    order = sorted(range(nb), key=lambda b: (-bx[b], roots[b]))
+    rank = {b: i for i, b in enumerate(order)}
+    ox = [bx[b] for b in order]
+    on = [bn[b] for b in order]
+    omask = [sorted(bmask[b]) for b in order]
+    # Conflicts with blocks placed earlier in the branching order.
+    oprev = [sorted(rank[c] for c in conflicts[b] if rank[c] < i) for i, b in enumerate(order)]
+    rem_x = [0.0] * (nb + 1)
+    rem_n = [0] * (nb + 1)
+    for i in range(nb - 1, -1, -1):
+        rem_x[i] = rem_x[i + 1] + ox[i]
+        rem_n[i] = rem_n[i + 1] + on[i]
+
+    scale = max(1.0, sum(base) + rem_x[0])
+    eps = _EPS * scale
+
+    def _fits(i: int, p: int, sums: list[float], cnts: list[int], path: list[int]) -> bool:
+        return (
+            p in omask[i]
+            and cnts[p] + on[i] <= slot_cap[p]
+            and sums[p] + ox[i] <= amp_cap[p] + eps
+            and all(path[j] != p for j in oprev[i])
+        )
+
+    # 1) Best-effort greedy: lightest phase that fits; otherwise lightest allowed phase.
+    g_sums, g_cnts, g_path = list(base), list(counts), [-1] * nb
+    g_feasible = True
+    for i in range(nb):
+        by_load = sorted((0, 1, 2), key=lambda q: (g_sums[q], q))
+        fit = [p for p in by_load if _fits(i, p, g_sums, g_cnts, g_path)]
+        if fit:
+            p = fit[0]
+        else:
+            g_feasible = False
+            fallback = [p for p in by_load if p in omask[i] and all(g_path[j] != p for j in oprev[i])]
+            p = (fallback or [q for q in by_load if q in omask[i]] or by_load)[0]
+        g_path[i] = p
+        g_sums[p] += ox[i]
+        g_cnts[p] += on[i]
+
+    best_path = list(g_path)
+    best_max = max(g_sums) if g_feasible else float("inf")
+    found = g_feasible
+
+    # 2) Pruned depth-first search (iterative: panels may have many blocks).
+    global_lb = max(max(base), (sum(base) + rem_x[0]) / 3.0)
+    budget = _Budget(node_limit, time_limit_s, stats)
+    sums, cnts, path = list(base), list(counts), [-1] * nb
+    capped = False
+
+    def _candidates(i: int) -> list[int]:
+        if max(max(sums), (sums[0] + sums[1] + sums[2] + rem_x[i]) / 3.0) >= best_max - eps:
+            return []
+        free_n = sum(slot_cap[p] - cnts[p] for p in (0, 1, 2))
+        free_x = sum(amp_cap[p] - sums[p] for p in (0, 1, 2))
+        if rem_n[i] > free_n or rem_x[i] > free_x + eps:
+            return []
+        return [
+            p
+            for p in sorted((0, 1, 2), key=lambda q: (sums[q], q))
+            if _fits(i, p, sums, cnts, path) and sums[p] + ox[i] < best_max - eps
+        ]
+
+    if not (found and best_max <= global_lb + eps):
+        cand: list[list[int]] = [[] for _ in range(nb)]
+        pos = [0] * nb
+        cand[0] = _candidates(0)
+        i = 0
+        while i >= 0:
+            if pos[i] >= len(cand[i]):
+                i -= 1
+                if i >= 0:
+                    p = path[i]
+                    sums[p] -= ox[i]
+                    cnts[p] -= on[i]
+                    path[i] = -1
+                continue
+            if budget.step():
+                capped = True
+                break
+            p = cand[i][pos[i]]
+            pos[i] += 1
+            path[i] = p
+            sums[p] += ox[i]
+            cnts[p] += on[i]
+            if i + 1 == nb:
+                cur_max = max(sums)
+                if cur_max < best_max - eps:
+                    best_max = cur_max
+                    best_path = list(path)
+                    found = True
+                sums[p] -= ox[i]
+                cnts[p] -= on[i]
+                path[i] = -1
+                if found and best_max <= global_lb + eps:
+                    break
+                continue
+            i += 1
+            cand[i] = _candidates(i)
+            pos[i] = 0
+
+    block_phase = {order[i]: best_path[i] for i in range(nb)}
+    assign = [block_phase[block_of[_find(k)]] for k in range(n)]
+    return assign, found, found and not capped
+
+
+def joint_objective(sums_by_mode: Sequence[Sequence[float]], weights: Sequence[float]) -> float:
+    """Weighted sum of per-mode unbalance_pct (joint NORMAL/EMERGENCY objective)."""
+    return sum(w * unbalance_pct(s[0], s[1], s[2]) for s, w in zip(sums_by_mode, weights))
+
+
+def joint_greedy_assign(
+    base_sums_by_mode: Sequence[Sequence[float]],
+    currents: Sequence[float],
+    masks: Sequence[Sequence[bool]],
+    weights: Sequence[float],
+) -> list[int]:
+    """
+    Greedy seed for the joint objective.
+
+    masks[m][k] tells whether item k belongs to mode m. Each item (in the given
+    order, I desc) goes to the phase with the minimal weighted load over the
+    modes it belongs to; loads are normalized by the mode total so that modes
+    of different size weigh as their unbalance_pct does. Ties resolve to L1.
+    """
+    s, contrib, _, norm = _joint_state(base_sums_by_mode, currents, masks, weights)
+    out: list[int] = []
+    for k in range(len(currents)):
+        ck = contrib[k]
+        best_p = 0
+        best_v = float("inf")
+        for p in (0, 1, 2):
+            v = sum(norm[m] * s[m][p] for m in range(len(s)) if ck[m])
+            if v < best_v:
+                best_v = v
+                best_p = p
+        for m, d in enumerate(ck):
+            s[m][best_p] += d
+        out.append(best_p)
+    return out
+
+
+def joint_local_search(
+    base_sums_by_mode: Sequence[Sequence[float]],
+    currents: Sequence[float],
+    masks: Sequence[Sequence[bool]],
+    weights: Sequence[float],
+    assign: Sequence[int],
+    *,
+    max_evals: int = LOCAL_SEARCH_MAX_EVALS,
+    time_cap_s: float | None = None,
+    seed: int = 0,
+    stats: SearchStats | None = None,
+) -> list[int]:
+    """
+    Move/swap local search (as local_search, same budget and safety cap) on the
+    joint objective.
+
+    Every candidate updates the per-mode sum vectors at once: item k carries a
+    per-mode contribution vector (I_k where it belongs to the mode, else 0), and a
+    move/swap shifts that vector between two phases in every mode. A candidate is
+    accepted when joint_objective decreases, or stays equal while the weighted,
+    total-normalized sum of squares of phase sums decreases.
+
+    With NumPy installed and at least _JOINT_NUMPY_MIN_ITEMS items, candidates are
+    evaluated in blocks: the (item x mode) contribution matrix of a block is
+    applied to the per-mode sums with array operations and the first accepted
+    candidate in scan order is taken, so the result and stats.evals equal the
+    pure-Python scan (used for small inputs or without NumPy).
+    """
+    n = len(currents)
+    result = list(assign)
+    if n == 0 or max_evals <= 0:
+        return result
+
+    budget = _Budget(max_evals, time_cap_s, stats)
+    rng = random.Random(seed)
+    modes = range(len(base_sums_by_mode))
+    s, contrib, totals, _ = _joint_state(base_sums_by_mode, currents, masks, weights)
+    for k, p in enumerate(result):
+        for m in modes:
+            s[m][p] += contrib[k][m]
+    sq_w = [
+        (float(weights[m]) / (totals[m] * totals[m])) if totals[m] > 0 else 0.0 for m in modes
+    ]
+    cur_obj = joint_objective(s, weights)
+    cur_sq = sum(sq_w[m] * (s[m][0] ** 2 + s[m][1] ** 2 + s[m][2] ** 2) for m in modes)
+    if _np is not None and n >= _JOINT_NUMPY_MIN_ITEMS:
+        return _joint_search_blocks(
+            s, contrib, weights, sq_w, result, cur_obj, cur_sq, rng=rng, budget=budget
+        )
+
+    def _evaluate(a: int, b: int, d: Sequence[float]) -> tuple[float, float]:
+        c = 3 - a - b
+        obj = 0.0
+        sq = 0.0
+        for m in modes:
+            sm = s[m]
+            na = sm[a] - d[m]
+            nb = sm[b] + d[m]
+            nc = sm[c]
+            obj += weights[m] * unbalance_pct(na, nb, nc)
+            sq += sq_w[m] * (na * na + nb * nb + nc * nc)
+        return obj, sq
+
+    def _accept_joint(obj: float, sq: float) -> bool:
+        eps = _EPS * max(1.0, cur_obj)
+        if obj < cur_obj - eps:
+            return True
+        if obj > cur_obj + eps:
+            return False
+        return sq < cur_sq - _EPS * max(1.0, cur_sq)
+
+    def _apply(a: int, b: int, d: Sequence[float], obj: float, sq: float) -> None:
+        nonlocal cur_obj, cur_sq
+        for m in modes:
+            s[m][a] -= d[m]
+            s[m][b] += d[m]
+        cur_obj = obj
+        cur_sq = sq
+
+    order = list(range(n))
+    improved = True
+    while improved:
+        improved = False
+        rng.shuffle(order)
+
+        # 1) Moves: item k from phase a to phase b.
+        for k in order:
+            ck = contrib[k]
+            if not any(ck):
+                continue
+            a = result[k]
+            for b in (0, 1, 2):
+                if b == a:
+                    continue
+                if budget.step():
+                    return result
+                obj, sq = _evaluate(a, b, ck)
+                if _accept_joint(obj, sq):
+                    _apply(a, b, ck, obj, sq)
+                    result[k] = b
+                    improved = True
+                    break
+
+        # 2) Swaps: items k (phase a) and j (phase b) exchange phases.
+        for idx, k in enumerate(order):
+            for j in order[idx + 1 :]:
+                a = result[k]
+                b = result[j]
+                if a == b:
+                    continue
+                d = [contrib[k][m] - contrib[j][m] for m in modes]
+                if not any(d):
+                    continue
+                if budget.step():
+                    return result
+                obj, sq = _evaluate(a, b, d)
+                if _accept_joint(obj, sq):
+                    _apply(a, b, d, obj, sq)
+                    result[k] = b
+                    result[j] = a
+                    improved = True
+
+        if improved and budget.expired():
+            break
+
+    return result
+
+
+def _joint_search_blocks(
+    s: list[list[float]],
+    contrib: list[list[float]],
+    weights: Sequence[float],
+    sq_w: list[float],
+    result: list[int],
+    cur_obj: float,
+    cur_sq: float,
+    *,
+    rng: random.Random,
+    budget: _Budget,
+) -> list[int]:
+    """joint_local_search scan with block-wise NumPy candidate evaluation."""
+    n = len(result)
+    modes = range(len(s))
+    w = [float(v) for v in weights]
+    sums = _np.array(s, dtype=_np.float64)  # modes x 3
+    x = _np.array(contrib, dtype=_np.float64).reshape(n, len(s))  # items x modes
+    nonzero = x.any(axis=1)
+    res = _np.array(result, dtype=_np.intp)
+    other = _np.array(_OTHER_PHASES, dtype=_np.intp)
+
+    def _evaluate(a, b, d):
+        """Joint objective and sum of squares of candidates (row d moves from a to b)."""
+        c = 3 - a - b
+        obj = _np.zeros(len(a))
+        sq = _np.zeros(len(a))
+        for m in modes:
+            sm = sums[m]
+            na = sm[a] - d[:, m]
+            nb = sm[b] + d[:, m]
+            nc = sm[c]
+            i_max = _np.maximum(_np.maximum(na, nb), nc)
+            i_avg = (na + nb + nc) / 3.0
+            with _np.errstate(divide="ignore", invalid="ignore"):
+                u = _np.where(i_avg == 0, 0.0, 100.0 * (i_max - i_avg) / i_avg)
+            obj += w[m] * u
+            sq += sq_w[m] * (na * na + nb * nb + nc * nc)
+        return obj, sq
+
+    def _scan(pos: int, candidates) -> tuple[int | None, int, bool]:
+        """
+        Evaluates candidates(pos, block) -> (positions, a, b, d, end) block by block
+        in scan order and applies the first accepted one to the sums. Returns (its
+        scan position or None, its target phase, stop flag).
+        """
+        nonlocal cur_obj, cur_sq
+        block = _JOINT_BLOCK_MIN
+        while True:
+            cand = candidates(pos, block)
+            if cand is None:
+                return None, -1, False
+            positions, a, b, d, end = cand
+            count = budget.room(len(a))
+            obj, sq = _evaluate(a[:count], b[:count], d[:count])
+            eps = _EPS * max(1.0, cur_obj)
+            ok = (obj < cur_obj - eps) | (
+                ~(obj > cur_obj + eps) & (sq < cur_sq - _EPS * max(1.0, cur_sq))
+            )
+            hits = _np.flatnonzero(ok)
+            if len(hits):
+                i = int(hits[0])
+                sums[:, a[i]] -= d[i]
+                sums[:, b[i]] += d[i]
+                cur_obj = float(obj[i])
+                cur_sq = float(sq[i])
+                return int(positions[i]), int(b[i]), budget.spend(i + 1)
+            stop = budget.spend(count)
+            if count < len(a):
+                budget.stats.budget_exhausted = True
+                return None, -1, True
+            if stop:
+                return None, -1, True
+            pos = end
+            block = min(2 * block, _JOINT_BLOCK_MAX)
+
+    order = list(range(n))
+    improved = True
+    while improved:
+        improved = False
+        rng.shuffle(order)
+        order_arr = _np.array(order, dtype=_np.intp)
+
+        # 1) Moves: item k from phase a to another phase (b ascending), items in scan order.
+        def _moves(pos: int, block: int):
+            while pos < n:
+                end = min(n, pos + block)
+                ks = order_arr[pos:end]
+                keep = nonzero[ks]
+                if keep.any():
+                    ks = ks[keep]
+                    positions = _np.arange(pos, end)[keep].repeat(2)
+                    b = other[res[ks]].ravel()
+                    ks = ks.repeat(2)
+                    return positions, res[ks], b, x[ks], end
+                pos = end
+            return None
+
+        pos = 0
+        while True:
+            found, b, stop = _scan(pos, _moves)
+            if found is not None:
+                res[order_arr[found]] = b
+                improved = True
+                pos = found + 1
+            if stop:
+                return res.tolist()
+            if found is None:
+                break
+
+        # 2) Swaps: items k (phase a) and j (phase b) exchange phases.
+        for idx in range(n):
+            k = int(order_arr[idx])
+
+            def _swaps(pos: int, block: int):
+                while pos < n:
+                    end = min(n, pos + block)
+                    js = order_arr[pos:end]
+                    d = x[k] - x[js]
+                    keep = (res[js] != res[k]) & d.any(axis=1)
+                    if keep.any():
+                        js = js[keep]
+                        positions = _np.arange(pos, end)[keep]
+                        return positions, _np.full(len(js), res[k]), res[js], d[keep], end
+                    pos = end
+                return None
+
+            pos = idx + 1
+            while True:
+                found, b, stop = _scan(pos, _swaps)
+                if found is not None:
+                    j = int(order_arr[found])
+                    res[j] = res[k]
+                    res[k] = b
+                    improved = True
+                    pos = found + 1
+                if stop:
+                    return res.tolist()
+                if found is None:
+                    break
+
+        if improved and budget.expired():
+            break
+
+    return res.tolist()
+
+
+def _joint_state(
+    base_sums_by_mode: Sequence[Sequence[float]],
+    currents: Sequence[float],
+    masks: Sequence[Sequence[bool]],
+    weights: Sequence[float],
+) -> tuple[list[list[float]], list[list[float]], list[float], list[float]]:
+    """
+    Returns (per-mode running sums initialized to base, per-item contribution
+    vectors, per-mode totals, per-mode weight / total normalizers).
+    """
+    if len(masks) != len(base_sums_by_mode) or len(weights) != len(base_sums_by_mode):
+        raise ValueError("base_sums_by_mode, masks and weights must have the same length")
+    s = [[float(b[0]), float(b[1]), float(b[2])] for b in base_sums_by_mode]
+    contrib = [
+        [float(currents[k]) if masks[m][k] else 0.0 for m in range(len(s))]
+        for k in range(len(currents))
+    ]
+    totals = [sum(s[m]) + sum(c[m] for c in contrib) for m in range(len(s))]
+    norm = [(float(weights[m]) / totals[m]) if totals[m] > 0 else 0.0 for m in range(len(s))]
+    return s, contrib, totals, norm
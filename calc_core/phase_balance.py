@@ -3,25 +3,172 @@ Phase balance for 1PH circuits (MVP-BAL v0.1).
 
 Greedy bin-packing assignment of 1Φ circuits to L1/L2/L3 to minimize
 current unbalance. Per docs/contracts/PHASE_BALANCE_V0_1.md.
+
+Optional: move/swap local search after the greedy stage (improve_max_evals
+and/or improve_budget_s), see calc_core.phase_assignment.local_search.
+Optional: method="EXACT" — branch-and-bound for small panels
+(calc_core.phase_assignment.exact_assign), heuristic fallback on caps.
+
+Writes are change-only: circuits.phase is updated in one executemany batch
+and only for circuits whose phase actually changes.
+
+Optional: constraints=PhaseConstraints — per-phase slot counts and current caps,
+same/different phase groups (calc_core.phase_assignment.constrained_assign);
+violations that cannot be avoided are reported in warnings_json.
+
+calc_phase_balance_joint: one assignment optimized for NORMAL and EMERGENCY
+at once (weighted sum of both modes' unbalance_pct).
+
+calc_phase_balance_sections: each bus section balanced as its own three-phase
+system; per-section totals go to panel_section_phase_balance.
+
+calc_phase_balance_project: many panels from one query, one transaction.
+
+place_circuit_phase: incremental placement of one added/changed circuit onto the
+lightest phase using the sums stored in panel_phase_balance (circuits.phase_i_a).
+
+Search budgets are deterministic (evaluations / nodes); the wall-clock limits
+(improve_budget_s, exact_time_limit_s) are safety caps only. When one fires, the
+result may depend on machine load and a SEARCH_TIME_CAP warning is persisted.
+
+Every entry point accepts diagnostics=Diagnostics: the warnings persisted to
+warnings_json are also recorded there (code = reason, with panel_id and mode);
+PhaseBalanceResult.warning_counts holds the per-call counts.
 """
 
 from __future__ import annotations
 
 import json
 import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timezone
 
+from .diagnostics import Diagnostics
+from .phase_assignment import (
+    LOCAL_SEARCH_MAX_EVALS,
+    PHASE_CODES,
+    SearchStats,
+    constrained_assign,
+    exact_assign,
+    greedy_assign,
+    joint_greedy_assign,
+    joint_local_search,
+    local_search,
+    unbalance_pct,
+)
+from .schema_caps import SchemaCaps, schema_caps
+
 PHASES_1PH = 1
 PHASES_VALID = (1, 3)
 MODE_VALID = ("NORMAL", "EMERGENCY")
+METHOD_VALID = ("GREEDY", "EXACT")
 
+# EXACT is attempted only up to this many AUTO circuits; larger panels use the heuristic.
+EXACT_MAX_CIRCUITS = 40
 
-def _table_exists(conn: sqlite3.Connection, table: str) -> bool:
-    row = conn.execute(
-        "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?",
-        (table,),
-    ).fetchone()
-    return row is not None
+# Default local search budget for the joint mode (its greedy seed is only a heuristic start).
+JOINT_IMPROVE_BUDGET_S = 1.0
+
+# Per-section mode: sections with at least this many AUTO circuits are solved in worker
+# processes (only when two or more sections qualify; smaller ones stay in-process).
+SECTION_PARALLEL_MIN_CIRCUITS = 2000
+
+# place_circuit_phase: above this unbalance_pct the incremental result is discarded and
+# the panel is rebalanced in full (None disables the fallback).
+INCREMENTAL_REBALANCE_THRESHOLD_PCT = 15.0
+
+# place_circuit_phase: stored sums must match SUM(phase_i_a) within this relative tolerance.
+_SUMS_REL_TOL = 1e-6
+
+# Max bound parameters per IN (...) list (SQLite default limit is 999 on older builds).
+_IN_CHUNK = 500
+
+
+@dataclass(frozen=True)
+class PhaseBalanceResult:
+    panel_id: str
+    mode: str
+    circuit_count: int
+    changed_count: int
+    unchanged_count: int
+    i_l1: float
+    i_l2: float
+    i_l3: float
+    unbalance_pct: float
+    method: str = "GREEDY"
+    optimal: bool = False
+    sections: tuple[SectionPhaseBalance, ...] = ()
+    # (reason, count) of the warnings written to warnings_json, ordered by reason.
+    warning_counts: tuple[tuple[str, int], ...] = ()
+
+
+@dataclass(frozen=True)
+class SectionPhaseBalance:
+    bus_section_id: str | None
+    circuit_count: int
+    i_l1: float
+    i_l2: float
+    i_l3: float
+    unbalance_pct: float
+
+
+@dataclass(frozen=True)
+class PhaseConstraints:
+    """
+    Board limits for calc_phase_balance (None / empty = no limit):
+    - max_circuits_per_phase: breaker slots per phase (MANUAL circuits included);
+    - max_current_per_phase_a: current cap for L1/L2/L3;
+    - same_phase_groups: circuit_id groups that must share one phase;
+    - different_phase_groups: circuit_id groups whose members must be on different phases.
+    """
+
+    max_circuits_per_phase: int | None = None
+    max_current_per_phase_a: tuple[float | None, float | None, float | None] = (None, None, None)
+    same_phase_groups: tuple[tuple[str, ...], ...] = ()
+    different_phase_groups: tuple[tuple[str, ...], ...] = ()
+
+    def __post_init__(self) -> None:
+        if self.max_circuits_per_phase is not None and int(self.max_circuits_per_phase) < 0:
+            raise ValueError("max_circuits_per_phase must be >= 0")
+        if len(self.max_current_per_phase_a) != 3:
+            raise ValueError("max_current_per_phase_a must have 3 values (L1, L2, L3)")
+        if any(v is not None and float(v) < 0 for v in self.max_current_per_phase_a):
+            raise ValueError("max_current_per_phase_a values must be >= 0")
+
+    @classmethod
+    def from_dict(cls, data: dict[str, object]) -> PhaseConstraints:
+        """Build from a JSON-like dict; max_current_per_phase_a may be one number for all phases."""
+        caps = data.get("max_current_per_phase_a")
+        if caps is None or isinstance(caps, (int, float)):
+            caps = (caps, caps, caps)
+        max_count = data.get("max_circuits_per_phase")
+        return cls(
+            max_circuits_per_phase=None if max_count is None else int(max_count),
+            max_current_per_phase_a=tuple(None if v is None else float(v) for v in caps),
+            same_phase_groups=tuple(
+                tuple(str(cid) for cid in g) for g in data.get("same_phase_groups") or ()
+            ),
+            different_phase_groups=tuple(
+                tuple(str(cid) for cid in g) for g in data.get("different_phase_groups") or ()
+            ),
+        )
+
+
+@dataclass
+class _AutoCircuit:
+    circuit_id: str
+    i_a: float
+    phase: str | None
+    # Current accounted in panel_phase_balance at last placement (circuits.phase_i_a).
+    phase_i_a: float | None = None
+
+
+def _valid_phase(value: object) -> str | None:
+    if value is None:
+        return None
+    s = str(value).strip()
+    return s if s in PHASE_CODES else None
 
 
 def calc_phase_balance(
@@ -30,7 +177,15 @@ def calc_phase_balance(
     *,
     mode: str = "NORMAL",
     respect_manual: bool = True,
-) -> int:
+    improve_budget_s: float | None = None,
+    improve_max_evals: int | None = None,
+    seed: int = 0,
+    method: str = "GREEDY",
+    exact_node_limit: int = 2_000_000,
+    exact_time_limit_s: float | None = 2.0,
+    constraints: PhaseConstraints | None = None,
+    diagnostics: Diagnostics | None = None,
+) -> PhaseBalanceResult:
     """
     Assign phases L1/L2/L3 to all 1PH circuits of a panel using greedy bin-packing.
     Writes circuits.phase and upserts panel_phase_balance.
@@ -41,7 +196,28 @@ def calc_phase_balance(
     and persisted as warnings.
     When respect_manual=False: algorithm may overwrite any phase.
 
-    Returns number of 1PH circuits processed.
+    When improve_max_evals > 0 or improve_budget_s > 0: after the greedy stage, AUTO
+    circuits are refined by move/swap local search for at most improve_max_evals
+    candidate evaluations (LOCAL_SEARCH_MAX_EVALS when not given). The search never
+    worsens unbalance_pct and is deterministic for a given seed; improve_budget_s
+    only caps its wall-clock time (SEARCH_TIME_CAP warning when it fires).
+
+    When method="EXACT" and there are at most EXACT_MAX_CIRCUITS AUTO circuits:
+    branch-and-bound finds an assignment with provably minimal unbalance_pct.
+    The heuristic result (greedy + optional local search) seeds the bound; if
+    exact_node_limit (or the exact_time_limit_s safety cap) is hit, the best
+    assignment found so far is used (never worse than the heuristic).
+
+    When constraints are given: a pruned depth-first search (method "CONSTRAINED")
+    minimizes unbalance_pct subject to slot counts, per-phase current caps and
+    same/different phase groups (MANUAL members pin their group); method and
+    improve_budget_s are not used, exact_node_limit / exact_time_limit_s cap the
+    search. If no feasible assignment is found, a best-effort greedy one is written
+    and every violated constraint is reported in warnings_json.
+
+    Only circuits whose phase changes are written. Returns PhaseBalanceResult:
+    number of 1PH circuits processed and changed/unchanged counts of reassigned
+    circuits (the counts are also persisted to panel_phase_balance).
     """
     if not panel_id or not isinstance(panel_id, str) or not panel_id.strip():
         raise ValueError("panel_id is required")
@@ -51,44 +227,840 @@ def calc_phase_balance(
     if mode_norm not in MODE_VALID:
         raise ValueError(f"mode must be one of {MODE_VALID}")
 
+    method_norm = method.strip().upper()
+    if method_norm not in METHOD_VALID:
+        raise ValueError(f"method must be one of {METHOD_VALID}")
+
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA foreign_keys = ON;")
 
-    # Check if phase_source column exists (migration 0008)
-    circuits_cols = [r[1] for r in conn.execute("PRAGMA table_info(circuits)").fetchall()]
-    has_phase_source = "phase_source" in circuits_cols
-    has_bus_section_id = "bus_section_id" in circuits_cols
+    # 1) Select all 1PH circuits of the mode with I, phase, and optionally phase_source
+    rows, pre_warnings, caps = _load_mode_rows(conn, panel_id, mode_norm)
+
+    # 2-3) Split into manual (excluded from reassignment) and auto (sorted, reassignable)
+    base_sums, auto_circuits, manual_warnings, manual_circuits = _split_manual_auto(
+        rows, respect_manual=respect_manual, has_phase_source=caps.phase_source
+    )
+
+    # 4) Assignment (greedy, optional local search / exact / constrained) + change-only write
+    if constraints is not None:
+        assign, optimal, time_capped = _solve_constrained(
+            base_sums,
+            auto_circuits,
+            manual_circuits,
+            constraints,
+            node_limit=exact_node_limit,
+            time_limit_s=exact_time_limit_s,
+        )
+        method_used = "CONSTRAINED"
+    else:
+        assign, method_used, optimal, time_capped = _solve(
+            base_sums,
+            [c.i_a for c in auto_circuits],
+            improve_budget_s=improve_budget_s,
+            improve_max_evals=improve_max_evals,
+            seed=seed,
+            method=method_norm,
+            exact_node_limit=exact_node_limit,
+            exact_time_limit_s=exact_time_limit_s,
+        )
+    changed_count, unchanged_count = _write_changed_phases(
+        conn,
+        auto_circuits,
+        assign,
+        manual_circuits,
+        track_current=caps.phase_i_a,
+    )
+
+    sums = list(base_sums)
+    for c, p in zip(auto_circuits, assign):
+        sums[p] += c.i_a
+    constraint_warnings: list[dict[str, object]] = []
+    if constraints is not None:
+        constraint_warnings = _constraint_violations(
+            constraints, auto_circuits, assign, manual_circuits, sums
+        )
+
+    # 5) Compute unbalance_pct and upsert panel_phase_balance
+    warnings = pre_warnings + manual_warnings + constraint_warnings
+    warnings += _time_cap_warnings(time_capped, mode_norm)
+    warning_counts = _record_warnings(diagnostics, warnings, panel_id=panel_id, mode=mode_norm)
+    _upsert_panel_phase_balance(
+        conn,
+        panel_id,
+        mode_norm,
+        sums[0],
+        sums[1],
+        sums[2],
+        invalid_manual_count=len(manual_warnings),
+        warnings_json=_warnings_json(warnings),
+        changed_count=changed_count,
+        unchanged_count=unchanged_count,
+    )
+    conn.commit()
+    return PhaseBalanceResult(
+        panel_id=panel_id,
+        mode=mode_norm,
+        circuit_count=len(rows),
+        changed_count=changed_count,
+        unchanged_count=unchanged_count,
+        i_l1=sums[0],
+        i_l2=sums[1],
+        i_l3=sums[2],
+        unbalance_pct=unbalance_pct(sums[0], sums[1], sums[2]),
+        method=method_used,
+        optimal=optimal,
+        warning_counts=warning_counts,
+    )
+
+
+def calc_phase_balance_joint(
+    conn: sqlite3.Connection,
+    panel_id: str,
+    *,
+    respect_manual: bool = True,
+    weight_normal: float = 0.5,
+    weight_emergency: float = 0.5,
+    improve_budget_s: float | None = JOINT_IMPROVE_BUDGET_S,
+    improve_max_evals: int | None = None,
+    seed: int = 0,
+    diagnostics: Diagnostics | None = None,
+) -> dict[str, PhaseBalanceResult]:
+    """
+    Joint NORMAL/EMERGENCY phase balance: one circuits.phase assignment minimizing
+    weight_normal * unbalance_pct(NORMAL) + weight_emergency * unbalance_pct(EMERGENCY).
+
+    NORMAL covers all 1PH circuits; EMERGENCY covers circuits of active emergency
+    bus sections (same filtering and fallback warning as calc_phase_balance with
+    mode="EMERGENCY"). MANUAL circuits contribute to each mode they belong to.
+    Greedy seed + move/swap local search on the joint objective (budget and
+    safety cap as in calc_phase_balance).
+
+    Changed phases are written once (change-only), both panel_phase_balance rows
+    are upserted, and everything is committed in one transaction.
+    Returns {"NORMAL": PhaseBalanceResult, "EMERGENCY": PhaseBalanceResult}.
+    """
+    if not panel_id or not isinstance(panel_id, str) or not panel_id.strip():
+        raise ValueError("panel_id is required")
+    panel_id = panel_id.strip()
+
+    weights = (float(weight_normal), float(weight_emergency))
+    if min(weights) < 0 or sum(weights) <= 0:
+        raise ValueError("weights must be >= 0 and not both zero")
+
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON;")
+
+    caps = schema_caps(conn)
+    has_phase_source = caps.phase_source
+    has_bus_section_id = caps.bus_section_id
+    has_phase_i_a = caps.phase_i_a
+
+    rows = _select_1ph_circuits(
+        conn,
+        panel_id,
+        has_phase_source=has_phase_source,
+        has_bus_section_id=has_bus_section_id,
+        has_phase_i_a=has_phase_i_a,
+    )
 
-    # v0.3a: EMERGENCY mode may filter circuits by active emergency bus sections.
     pre_warnings: list[dict[str, object]] = []
-    section_filter_sql = ""
-    section_filter_params: list[object] = []
+    active_sections = set(_active_emergency_sections(conn, panel_id))
+    if has_bus_section_id and active_sections:
+        emergency_rows = [r for r in rows if r["bus_section_id"] in active_sections]
+    else:
+        emergency_rows = list(rows)
+        pre_warnings.append({"reason": "EMERGENCY_SECTIONS_NOT_COMPUTED", "mode": "EMERGENCY"})
+
+    base_n, auto_circuits, warnings_n, manual_circuits = _split_manual_auto(
+        rows, respect_manual=respect_manual, has_phase_source=has_phase_source
+    )
+    base_e, auto_e, warnings_e, _ = _split_manual_auto(
+        emergency_rows, respect_manual=respect_manual, has_phase_source=has_phase_source
+    )
+    emergency_ids = {c.circuit_id for c in auto_e}
+    masks = (
+        [True] * len(auto_circuits),
+        [c.circuit_id in emergency_ids for c in auto_circuits],
+    )
+
+    currents = [c.i_a for c in auto_circuits]
+    assign = joint_greedy_assign((base_n, base_e), currents, masks, weights)
+    stats = SearchStats()
+    max_evals = _local_search_evals(improve_budget_s, improve_max_evals)
+    if max_evals:
+        assign = joint_local_search(
+            (base_n, base_e),
+            currents,
+            masks,
+            weights,
+            assign,
+            max_evals=max_evals,
+            time_cap_s=_time_cap(improve_budget_s),
+            seed=int(seed),
+            stats=stats,
+        )
+    _write_changed_phases(
+        conn, auto_circuits, assign, manual_circuits, track_current=has_phase_i_a
+    )
+
+    results: dict[str, PhaseBalanceResult] = {}
+    per_mode = (
+        ("NORMAL", base_n, masks[0], len(rows), warnings_n, []),
+        ("EMERGENCY", base_e, masks[1], len(emergency_rows), warnings_e, pre_warnings),
+    )
+    for mode, base, mask, circuit_count, manual_warnings, extra_warnings in per_mode:
+        sums = list(base)
+        changed_count = 0
+        unchanged_count = 0
+        for c, p, in_mode in zip(auto_circuits, assign, mask):
+            if not in_mode:
+                continue
+            sums[p] += c.i_a
+            if c.phase != PHASE_CODES[p]:
+                changed_count += 1
+            else:
+                unchanged_count += 1
+        warnings = extra_warnings + manual_warnings + _time_cap_warnings(stats.time_capped, mode)
+        warning_counts = _record_warnings(diagnostics, warnings, panel_id=panel_id, mode=mode)
+        _upsert_panel_phase_balance(
+            conn,
+            panel_id,
+            mode,
+            sums[0],
+            sums[1],
+            sums[2],
+            invalid_manual_count=len(manual_warnings),
+            warnings_json=_warnings_json(warnings),
+            changed_count=changed_count,
+            unchanged_count=unchanged_count,
+        )
+        results[mode] = PhaseBalanceResult(
+            panel_id=panel_id,
+            mode=mode,
+            circuit_count=circuit_count,
+            changed_count=changed_count,
+            unchanged_count=unchanged_count,
+            i_l1=sums[0],
+            i_l2=sums[1],
+            i_l3=sums[2],
+            unbalance_pct=unbalance_pct(sums[0], sums[1], sums[2]),
+            method="JOINT",
+            warning_counts=warning_counts,
+        )
+    conn.commit()
+    return results
+
+
+def calc_phase_balance_sections(
+    conn: sqlite3.Connection,
+    panel_id: str,
+    *,
+    mode: str = "NORMAL",
+    respect_manual: bool = True,
+    improve_budget_s: float | None = None,
+    improve_max_evals: int | None = None,
+    seed: int = 0,
+    method: str = "GREEDY",
+    exact_node_limit: int = 2_000_000,
+    exact_time_limit_s: float | None = 2.0,
+    parallel_min_circuits: int = SECTION_PARALLEL_MIN_CIRCUITS,
+    max_workers: int | None = None,
+    diagnostics: Diagnostics | None = None,
+) -> PhaseBalanceResult:
+    """
+    Section-aware phase balance: every bus section is its own three-phase system.
+
+    Circuits are read in one query and partitioned by circuits.bus_section_id;
+    each section (plus the pool of circuits without a section) is balanced
+    independently with the same options as calc_phase_balance. Sections with at
+    least parallel_min_circuits AUTO circuits are solved in a process pool when
+    two or more of them qualify.
+
+    Writes changed circuits.phase (change-only), replaces the panel's rows in
+    panel_section_phase_balance for this mode (unbound circuits are not stored
+    there) and upserts panel totals (sum over sections) to panel_phase_balance.
+    """
+    if not panel_id or not isinstance(panel_id, str) or not panel_id.strip():
+        raise ValueError("panel_id is required")
+    panel_id = panel_id.strip()
+
+    mode_norm = mode.strip().upper()
+    if mode_norm not in MODE_VALID:
+        raise ValueError(f"mode must be one of {MODE_VALID}")
+
+    method_norm = method.strip().upper()
+    if method_norm not in METHOD_VALID:
+        raise ValueError(f"method must be one of {METHOD_VALID}")
+
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON;")
+
+    rows, pre_warnings, caps = _load_mode_rows(conn, panel_id, mode_norm)
+    if not caps.bus_section_id:
+        raise ValueError("circuits.bus_section_id is missing (apply migration 0010)")
+    has_phase_source = caps.phase_source
+
+    # Partition by bus section (None = circuits without a section), stable order.
+    groups: dict[str | None, list[sqlite3.Row]] = {}
+    for r in rows:
+        bs = r["bus_section_id"]
+        groups.setdefault(None if bs is None else str(bs), []).append(r)
+    keys = sorted(groups, key=lambda k: (k is None, k or ""))
+
+    split = {
+        k: _split_manual_auto(groups[k], respect_manual=respect_manual, has_phase_source=has_phase_source)
+        for k in keys
+    }
+    solve_kwargs = dict(
+        improve_budget_s=improve_budget_s,
+        improve_max_evals=improve_max_evals,
+        seed=seed,
+        method=method_norm,
+        exact_node_limit=exact_node_limit,
+        exact_time_limit_s=exact_time_limit_s,
+    )
+    large = [k for k in keys if len(split[k][1]) >= max(1, int(parallel_min_circuits))]
+    solved: dict[str | None, tuple[list[int], str, bool, bool]] = {}
+    if len(large) >= 2:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = {
+                k: pool.submit(
+                    _solve_section, split[k][0], [c.i_a for c in split[k][1]], solve_kwargs
+                )
+                for k in large
+            }
+            for k in keys:
+                if k not in futures:
+                    solved[k] = _solve_section(split[k][0], [c.i_a for c in split[k][1]], solve_kwargs)
+            for k, fut in futures.items():
+                solved[k] = fut.result()
+    else:
+        for k in keys:
+            solved[k] = _solve_section(split[k][0], [c.i_a for c in split[k][1]], solve_kwargs)
+
+    all_auto: list[_AutoCircuit] = []
+    all_assign: list[int] = []
+    all_manual: list[_AutoCircuit] = []
+    manual_warnings: list[dict[str, object]] = []
+    sections: list[SectionPhaseBalance] = []
+    totals = [0.0, 0.0, 0.0]
+    methods: set[str] = set()
+    optimal = True
+    time_capped = False
+    for k in keys:
+        base, auto_circuits, warnings, manual_circuits = split[k]
+        assign, method_used, section_optimal, section_capped = solved[k]
+        time_capped = time_capped or section_capped
+        all_auto.extend(auto_circuits)
+        all_assign.extend(assign)
+        all_manual.extend(manual_circuits)
+        manual_warnings.extend(warnings)
+        methods.add(method_used)
+        optimal = optimal and section_optimal
+        sums = list(base)
+        for c, p in zip(auto_circuits, assign):
+            sums[p] += c.i_a
+        for p in (0, 1, 2):
+            totals[p] += sums[p]
+        sections.append(
+            SectionPhaseBalance(
+                bus_section_id=k,
+                circuit_count=len(groups[k]),
+                i_l1=sums[0],
+                i_l2=sums[1],
+                i_l3=sums[2],
+                unbalance_pct=unbalance_pct(sums[0], sums[1], sums[2]),
+            )
+        )
+
+    changed_count, unchanged_count = _write_changed_phases(
+        conn, all_auto, all_assign, all_manual, track_current=caps.phase_i_a
+    )
+    _replace_section_phase_balance(conn, panel_id, mode_norm, sections)
+    warnings = pre_warnings + manual_warnings + _time_cap_warnings(time_capped, mode_norm)
+    warning_counts = _record_warnings(diagnostics, warnings, panel_id=panel_id, mode=mode_norm)
+    _upsert_panel_phase_balance(
+        conn,
+        panel_id,
+        mode_norm,
+        totals[0],
+        totals[1],
+        totals[2],
+        invalid_manual_count=len(manual_warnings),
+        warnings_json=_warnings_json(warnings),
+        changed_count=changed_count,
+        unchanged_count=unchanged_count,
+    )
+    conn.commit()
+    return PhaseBalanceResult(
+        panel_id=panel_id,
+        mode=mode_norm,
+        circuit_count=len(rows),
+        changed_count=changed_count,
+        unchanged_count=unchanged_count,
+        i_l1=totals[0],
+        i_l2=totals[1],
+        i_l3=totals[2],
+        unbalance_pct=unbalance_pct(totals[0], totals[1], totals[2]),
+        method="EXACT" if "EXACT" in methods else "GREEDY",
+        optimal=bool(keys) and optimal,
+        sections=tuple(sections),
+        warning_counts=warning_counts,
+    )
+
+
+def _solve_section(
+    base_sums: tuple[float, float, float], currents: list[float], solve_kwargs: dict
+) -> tuple[list[int], str, bool, bool]:
+    # Module-level so that it can be pickled into ProcessPoolExecutor workers.
+    return _solve(base_sums, currents, **solve_kwargs)
+
+
+def _replace_section_phase_balance(
+    conn: sqlite3.Connection, panel_id: str, mode: str, sections: list[SectionPhaseBalance]
+) -> None:
+    if not schema_caps(conn).section_phase_balance:
+        return
+    updated_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    # Replace, not upsert: sections that lost all 1PH circuits must not keep stale totals.
+    conn.execute(
+        "DELETE FROM panel_section_phase_balance WHERE panel_id = ? AND mode = ?",
+        (panel_id, mode),
+    )
+    conn.executemany(
+        """
+        INSERT INTO panel_section_phase_balance (
+          panel_id, bus_section_id, mode, circuit_count, i_l1, i_l2, i_l3, unbalance_pct, updated_at
+        )
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        [
+            (
+                panel_id,
+                sec.bus_section_id,
+                mode,
+                sec.circuit_count,
+                sec.i_l1,
+                sec.i_l2,
+                sec.i_l3,
+                sec.unbalance_pct,
+                updated_at,
+            )
+            for sec in sections
+            if sec.bus_section_id is not None
+        ],
+    )
+
+
+def calc_phase_balance_project(
+    conn: sqlite3.Connection,
+    mode: str = "NORMAL",
+    panel_ids: list[str] | None = None,
+    *,
+    respect_manual: bool = True,
+    improve_budget_s: float | None = None,
+    improve_max_evals: int | None = None,
+    seed: int = 0,
+    method: str = "GREEDY",
+    exact_node_limit: int = 2_000_000,
+    exact_time_limit_s: float | None = 2.0,
+    diagnostics: Diagnostics | None = None,
+) -> list[PhaseBalanceResult]:
+    """
+    Project-wide phase balance: same per-panel result as calc_phase_balance, but
+    schema probing runs once, 1PH circuits of all selected panels (None = all
+    panels) come from one query ordered by panel_id, and all circuits.phase /
+    panel_phase_balance writes are committed in one transaction.
+
+    Returns a per-panel summary ordered by panel_id (panels without 1PH circuits
+    get a zero row, as in calc_phase_balance).
+    """
+    mode_norm = mode.strip().upper()
+    if mode_norm not in MODE_VALID:
+        raise ValueError(f"mode must be one of {MODE_VALID}")
+
+    method_norm = method.strip().upper()
+    if method_norm not in METHOD_VALID:
+        raise ValueError(f"method must be one of {METHOD_VALID}")
+
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON;")
+
+    if panel_ids is None:
+        selected = [str(r[0]) for r in conn.execute("SELECT id FROM panels ORDER BY id").fetchall()]
+        query_ids: list[str] | None = None
+    else:
+        selected = sorted({str(p).strip() for p in panel_ids if p and str(p).strip()})
+        query_ids = selected
+    if not selected:
+        return []
+
+    caps = schema_caps(conn)
+    has_phase_source = caps.phase_source
+    has_bus_section_id = caps.bus_section_id
+    has_phase_i_a = caps.phase_i_a
+
+    rows_by_panel: dict[str, list[sqlite3.Row]] = {}
+    for r in _select_1ph_circuits_project(
+        conn,
+        query_ids,
+        has_phase_source=has_phase_source,
+        has_bus_section_id=has_bus_section_id,
+        has_phase_i_a=has_phase_i_a,
+    ):
+        rows_by_panel.setdefault(str(r["panel_id"]), []).append(r)
+
+    active_by_panel: dict[str, set[str]] = {}
     if mode_norm == "EMERGENCY":
-        active_sections: list[str] = []
-        if _table_exists(conn, "section_calc"):
-            sec_cols = [r[1] for r in conn.execute("PRAGMA table_info(section_calc)").fetchall()]
-            # schema uses s_kva (contracts may call it sp_kva); keep compatibility
-            kva_col = "sp_kva" if "sp_kva" in sec_cols else ("s_kva" if "s_kva" in sec_cols else None)
-            if kva_col is not None:
-                sec_rows = conn.execute(
-                    f"""
-                    SELECT bus_section_id
-                    FROM section_calc
-                    WHERE panel_id = ?
-                      AND mode = 'EMERGENCY'
-                      AND ({kva_col} > 0 OR i_a > 0)
-                    ORDER BY bus_section_id
-                    """,
-                    (panel_id,),
-                ).fetchall()
+        active_by_panel = _active_emergency_sections_by_panel(conn, query_ids)
+
+    results: list[PhaseBalanceResult] = []
+    all_auto: list[_AutoCircuit] = []
+    all_assign: list[int] = []
+    all_manual: list[_AutoCircuit] = []
+    balance_values: list[dict[str, object]] = []
+    for panel_id in selected:
+        rows = rows_by_panel.get(panel_id, [])
+        pre_warnings: list[dict[str, object]] = []
+        if mode_norm == "EMERGENCY":
+            active = active_by_panel.get(panel_id)
+            if has_bus_section_id and active:
+                rows = [r for r in rows if r["bus_section_id"] in active]
             else:
-                sec_rows = []
-            active_sections = [str(r[0]) for r in sec_rows if r and r[0] is not None]
+                pre_warnings.append({"reason": "EMERGENCY_SECTIONS_NOT_COMPUTED", "mode": "EMERGENCY"})
+
+        base_sums, auto_circuits, manual_warnings, manual_circuits = _split_manual_auto(
+            rows, respect_manual=respect_manual, has_phase_source=has_phase_source
+        )
+        all_manual.extend(manual_circuits)
+        assign, method_used, optimal, time_capped = _solve(
+            base_sums,
+            [c.i_a for c in auto_circuits],
+            improve_budget_s=improve_budget_s,
+            improve_max_evals=improve_max_evals,
+            seed=seed,
+            method=method_norm,
+            exact_node_limit=exact_node_limit,
+            exact_time_limit_s=exact_time_limit_s,
+        )
+        changed_count = sum(1 for c, p in zip(auto_circuits, assign) if c.phase != PHASE_CODES[p])
+        unchanged_count = len(auto_circuits) - changed_count
+        all_auto.extend(auto_circuits)
+        all_assign.extend(assign)
+
+        sums = list(base_sums)
+        for c, p in zip(auto_circuits, assign):
+            sums[p] += c.i_a
+        warnings = pre_warnings + manual_warnings + _time_cap_warnings(time_capped, mode_norm)
+        warning_counts = _record_warnings(diagnostics, warnings, panel_id=panel_id, mode=mode_norm)
+        balance_values.append(
+            _balance_values(
+                panel_id,
+                mode_norm,
+                sums,
+                invalid_manual_count=len(manual_warnings),
+                warnings_json=_warnings_json(warnings),
+                changed_count=changed_count,
+                unchanged_count=unchanged_count,
+            )
+        )
+        results.append(
+            PhaseBalanceResult(
+                panel_id=panel_id,
+                mode=mode_norm,
+                circuit_count=len(rows),
+                changed_count=changed_count,
+                unchanged_count=unchanged_count,
+                i_l1=sums[0],
+                i_l2=sums[1],
+                i_l3=sums[2],
+                unbalance_pct=unbalance_pct(sums[0], sums[1], sums[2]),
+                method=method_used,
+                optimal=optimal,
+                warning_counts=warning_counts,
+            )
+        )
+
+    try:
+        _write_changed_phases(conn, all_auto, all_assign, all_manual, track_current=has_phase_i_a)
+        _upsert_panel_phase_balance_many(conn, balance_values)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return results
+
+
+def place_circuit_phase(
+    conn: sqlite3.Connection,
+    circuit_id: str,
+    *,
+    mode: str = "NORMAL",
+    respect_manual: bool = True,
+    rebalance_threshold_pct: float | None = INCREMENTAL_REBALANCE_THRESHOLD_PCT,
+    verify: bool = False,
+    diagnostics: Diagnostics | None = None,
+) -> PhaseBalanceResult:
+    """
+    Incremental placement of one added or changed 1PH circuit; other circuits keep
+    their phases.
+
+    The stored panel_phase_balance sums of `mode` are adjusted in place: the old
+    contribution of the circuit (circuits.phase_i_a on its current phase) is
+    removed, then an AUTO circuit goes to the lightest phase (ties: L1 → L2 → L3),
+    a MANUAL circuit (respect_manual=True) keeps its phase. One circuits row and the
+    stored panel_phase_balance rows are written (the other mode's row is adjusted
+    too when the circuit takes part in it and its sums can be trusted). Stored
+    changed_count / unchanged_count describe the last full balance and are kept;
+    the result carries the counts of this placement. Result method is "INCREMENTAL".
+
+    The stored sums are trusted: they are kept consistent by the single write of
+    each placement and full run, so a placement costs O(1) reads plus one write.
+    Phase edits made outside this module (e.g. a manual phase change in the DB)
+    leave them out of date; pass verify=True to compare them first with the
+    per-phase SUM(phase_i_a) of the mode's 1PH circuits (one O(n) aggregate query).
+
+    Falls back to a full calc_phase_balance (result method GREEDY) when the stored
+    sums cannot be used: no panel_phase_balance row for the mode, removing the old
+    contribution would make a phase sum negative, verify=True and the sums are out
+    of date, the circuit is not 1PH, it has a phase but no phase_i_a (accounted by
+    an older run), or it is MANUAL with an invalid phase. The full rebalance also
+    runs when the incremental result exceeds rebalance_threshold_pct (None = never).
+    """
+    if not circuit_id or not isinstance(circuit_id, str) or not circuit_id.strip():
+        raise ValueError("circuit_id is required")
+    circuit_id = circuit_id.strip()
+
+    mode_norm = mode.strip().upper()
+    if mode_norm not in MODE_VALID:
+        raise ValueError(f"mode must be one of {MODE_VALID}")
+
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON;")
+
+    caps = schema_caps(conn)
+    if not caps.phase_i_a:
+        raise ValueError("circuits.phase_i_a is missing (apply migration 0014)")
+    has_phase_source = caps.phase_source
+    has_bus_section_id = caps.bus_section_id
 
+    row = conn.execute(
+        f"""
+        SELECT
+          c.panel_id,
+          c.phases,
+          COALESCE(cc.i_calc_a, c.i_calc_a) AS i_a,
+          c.phase,
+          {"c.phase_source" if has_phase_source else "NULL"} AS phase_source,
+          {"c.bus_section_id" if has_bus_section_id else "NULL"} AS bus_section_id,
+          c.phase_i_a
+        FROM circuits c
+        LEFT JOIN circuit_calc cc ON cc.circuit_id = c.id
+        WHERE c.id = ?
+        """,
+        (circuit_id,),
+    ).fetchone()
+    if row is None:
+        raise ValueError(f"circuit not found: {circuit_id}")
+    panel_id = str(row["panel_id"])
+
+    def _full() -> PhaseBalanceResult:
+        return calc_phase_balance(
+            conn,
+            panel_id,
+            mode=mode_norm,
+            respect_manual=respect_manual,
+            diagnostics=diagnostics,
+        )
+
+    if int(row["phases"]) != PHASES_1PH:
+        # Not (or no longer) 1PH: drop its accounted current so it is never subtracted later.
+        conn.execute("UPDATE circuits SET phase_i_a = NULL WHERE id = ?", (circuit_id,))
+        return _full()
+
+    if row["i_a"] is None:
+        raise ValueError(f"i_calc_a is NULL for circuit_id={circuit_id}")
+    i_a = float(row["i_a"])
+    if i_a < 0:
+        raise ValueError(f"I must be >= 0 for circuit_id={circuit_id}, got {i_a}")
+
+    old_phase = _valid_phase(row["phase"])
+    old_i_a = None if row["phase_i_a"] is None else float(row["phase_i_a"])
+    is_manual = (
+        respect_manual and has_phase_source and str(row["phase_source"]).strip() == "MANUAL"
+    )
+    if (old_phase is not None and old_i_a is None) or (is_manual and old_phase is None):
+        return _full()
+
+    stored = {
+        str(r["mode"]): r
+        for r in conn.execute(
+            "SELECT * FROM panel_phase_balance WHERE panel_id = ?", (panel_id,)
+        ).fetchall()
+    }
+    if mode_norm not in stored:
+        return _full()
+
+    active = _active_emergency_sections(conn, panel_id) if "EMERGENCY" in stored else []
+    # Same membership as _load_mode_rows: no computed sections → all circuits.
+    section_filter = {
+        "NORMAL": None,
+        "EMERGENCY": active if has_bus_section_id and active else None,
+    }
+    in_mode = {
+        "NORMAL": True,
+        "EMERGENCY": section_filter["EMERGENCY"] is None or row["bus_section_id"] in active,
+    }
+
+    def _trusted(m: str) -> bool:
+        if not verify:
+            return True
+        r = stored[m]
+        accounted = _accounted_sums(conn, panel_id, section_filter[m])
+        if accounted is None:
+            return False
+        stored_sums = (float(r["i_l1"]), float(r["i_l2"]), float(r["i_l3"]))
+        tol = _SUMS_REL_TOL * max(1.0, sum(stored_sums))
+        return all(abs(a - b) <= tol for a, b in zip(accounted, stored_sums))
+
+    def _without_circuit(m: str) -> list[float] | None:
+        """Stored sums of `m` without the circuit; None when they cannot hold its old current."""
+        r = stored[m]
+        sums = [float(r["i_l1"]), float(r["i_l2"]), float(r["i_l3"])]
+        if old_phase is not None and old_i_a is not None:
+            k = PHASE_CODES.index(old_phase)
+            left = sums[k] - old_i_a
+            if left < -_SUMS_REL_TOL * max(1.0, sum(sums)):
+                return None
+            sums[k] = max(0.0, left)
+        return sums
+
+    if not in_mode[mode_norm]:
+        # Outside the active EMERGENCY sections: nothing to place in this mode.
+        r = stored[mode_norm]
+        return PhaseBalanceResult(
+            panel_id=panel_id,
+            mode=mode_norm,
+            circuit_count=0,
+            changed_count=0,
+            unchanged_count=0,
+            i_l1=float(r["i_l1"]),
+            i_l2=float(r["i_l2"]),
+            i_l3=float(r["i_l3"]),
+            unbalance_pct=float(r["unbalance_pct"]),
+            method="INCREMENTAL",
+        )
+
+    sums = _without_circuit(mode_norm) if _trusted(mode_norm) else None
+    if sums is None:
+        return _full()
+
+    if is_manual:
+        new_phase = old_phase
+    else:
+        new_phase = PHASE_CODES[sums.index(min(sums))]
+    k_new = PHASE_CODES.index(new_phase)
+    sums[k_new] += i_a
+    new_unbalance = unbalance_pct(sums[0], sums[1], sums[2])
+    if rebalance_threshold_pct is not None and new_unbalance > float(rebalance_threshold_pct):
+        return _full()
+
+    changed_count = 0 if is_manual or new_phase == old_phase else 1
+    unchanged_count = 0 if is_manual else 1 - changed_count
+    values = []
+    for m, r in sorted(stored.items()):
+        if m == mode_norm:
+            m_sums = sums
+        else:
+            m_sums = _without_circuit(m) if in_mode.get(m) and _trusted(m) else None
+            if m_sums is None:
+                # Out-of-date rows are left alone: their next placement falls back to a full run.
+                continue
+            m_sums[k_new] += i_a
+        values.append(
+            _balance_values(
+                panel_id,
+                m,
+                m_sums,
+                invalid_manual_count=_stored_count(r, "invalid_manual_count"),
+                warnings_json=r["warnings_json"],
+                changed_count=_stored_count(r, "changed_count"),
+                unchanged_count=_stored_count(r, "unchanged_count"),
+            )
+        )
+    conn.execute(
+        "UPDATE circuits SET phase = ?, phase_i_a = ? WHERE id = ?",
+        (new_phase, i_a, circuit_id),
+    )
+    _upsert_panel_phase_balance_many(conn, values)
+    conn.commit()
+    return PhaseBalanceResult(
+        panel_id=panel_id,
+        mode=mode_norm,
+        circuit_count=1,
+        changed_count=changed_count,
+        unchanged_count=unchanged_count,
+        i_l1=sums[0],
+        i_l2=sums[1],
+        i_l3=sums[2],
+        unbalance_pct=new_unbalance,
+        method="INCREMENTAL",
+    )
+
+
+def _accounted_sums(
+    conn: sqlite3.Connection, panel_id: str, section_filter: list[str] | None
+) -> list[float] | None:
+    """
+    Per-phase SUM(phase_i_a) of the panel's placed 1PH circuits (optionally of the
+    given bus sections). None when a placed circuit has no phase_i_a.
+    """
+    where = ""
+    params: list[object] = [panel_id, PHASES_1PH]
+    if section_filter:
+        where = f" AND c.bus_section_id IN ({', '.join(['?'] * len(section_filter))})"
+        params.extend(section_filter)
+    sums = [0.0, 0.0, 0.0]
+    for phase, total, untracked in conn.execute(
+        f"""
+        SELECT TRIM(c.phase), SUM(c.phase_i_a), COUNT(*) - COUNT(c.phase_i_a)
+        FROM circuits c
+        WHERE c.panel_id = ? AND c.phases = ? AND TRIM(c.phase) IN ('L1', 'L2', 'L3'){where}
+        GROUP BY TRIM(c.phase)
+        """,
+        params,
+    ):
+        if untracked:
+            return None
+        sums[PHASE_CODES.index(phase)] = float(total or 0.0)
+    return sums
+
+
+def _stored_count(row: sqlite3.Row, column: str) -> int:
+    """Counter of a stored panel_phase_balance row (0 when NULL or the column predates its migration)."""
+    return int(row[column] or 0) if column in row.keys() else 0
+
+
+def _load_mode_rows(
+    conn: sqlite3.Connection, panel_id: str, mode: str
+) -> tuple[list[sqlite3.Row], list[dict[str, object]], SchemaCaps]:
+    """
+    1PH circuits taking part in `mode` (EMERGENCY: active emergency bus sections only).
+    Returns (rows, panel-level warnings, schema capabilities).
+    """
+    # Optional columns: phase_source (0008), bus_section_id (0010), phase_i_a (0014)
+    caps = schema_caps(conn)
+    has_phase_source = caps.phase_source
+    has_bus_section_id = caps.bus_section_id
+
+    # v0.3a: EMERGENCY mode may filter circuits by active emergency bus sections.
+    pre_warnings: list[dict[str, object]] = []
+    section_filter: list[str] | None = None
+    if mode == "EMERGENCY":
+        active_sections = _active_emergency_sections(conn, panel_id)
         if has_bus_section_id and active_sections:
-            placeholders = ", ".join(["?"] * len(active_sections))
-            section_filter_sql = f" AND c.bus_section_id IN ({placeholders})"
-            section_filter_params = list(active_sections)
+            section_filter = active_sections
         else:
             # Fallback: cannot do real EMERGENCY filtering.
             pre_warnings.append(
@@ -98,67 +1070,149 @@ def calc_phase_balance(
                 }
             )
 
-    # 1) Select all 1PH circuits with I, phase, and optionally phase_source
-    if not has_phase_source:
-        rows = conn.execute(
-            (
-                """
-            SELECT
-              c.id AS circuit_id,
-              c.name AS circuit_name,
-              COALESCE(cc.i_calc_a, c.i_calc_a) AS i_a,
-              NULL AS phase,
-              NULL AS phase_source
-            FROM circuits c
-            LEFT JOIN circuit_calc cc ON cc.circuit_id = c.id
-            WHERE c.panel_id = ? AND c.phases = ?
-                """
-                + section_filter_sql
-            ),
-            (panel_id, PHASES_1PH, *section_filter_params),
-        ).fetchall()
-    else:
-        rows = conn.execute(
-            (
-                """
-            SELECT
-              c.id AS circuit_id,
-              c.name AS circuit_name,
-              COALESCE(cc.i_calc_a, c.i_calc_a) AS i_a,
-              c.phase,
-              c.phase_source
-            FROM circuits c
-            LEFT JOIN circuit_calc cc ON cc.circuit_id = c.id
-            WHERE c.panel_id = ? AND c.phases = ?
-                """
-                + section_filter_sql
-            ),
-            (panel_id, PHASES_1PH, *section_filter_params),
-        ).fetchall()
+    rows = _select_1ph_circuits(
+        conn,
+        panel_id,
+        has_phase_source=has_phase_source,
+        has_bus_section_id=has_bus_section_id,
+        has_phase_i_a=caps.phase_i_a,
+        section_filter=section_filter,
+    )
+    return rows, pre_warnings, caps
+
+
+def _active_emergency_sections(conn: sqlite3.Connection, panel_id: str) -> list[str]:
+    """Bus sections with non-zero EMERGENCY load in section_calc (empty if not computed)."""
+    return sorted(_active_emergency_sections_by_panel(conn, [panel_id]).get(panel_id, ()))
+
+
+def _active_emergency_sections_by_panel(
+    conn: sqlite3.Connection, panel_ids: list[str] | None
+) -> dict[str, set[str]]:
+    """panel_id -> active EMERGENCY bus sections; panel_ids=None reads all panels."""
+    caps = schema_caps(conn)
+    if not caps.has_table("section_calc"):
+        return {}
+    sec_cols = caps.columns_of("section_calc")
+    # schema uses s_kva (contracts may call it sp_kva); keep compatibility
+    kva_col = "sp_kva" if "sp_kva" in sec_cols else ("s_kva" if "s_kva" in sec_cols else None)
+    if kva_col is None:
+        return {}
+    sql = f"""
+        SELECT panel_id, bus_section_id
+        FROM section_calc
+        WHERE mode = 'EMERGENCY'
+          AND ({kva_col} > 0 OR i_a > 0)
+          AND bus_section_id IS NOT NULL
+        """
+    out: dict[str, set[str]] = {}
+    for chunk in _chunks(panel_ids):
+        params: list[object] = []
+        where = ""
+        if chunk is not None:
+            where = f" AND panel_id IN ({', '.join(['?'] * len(chunk))})"
+            params = list(chunk)
+        for r in conn.execute(sql + where, params).fetchall():
+            out.setdefault(str(r[0]), set()).add(str(r[1]))
+    return out
+
+
+def _chunks(ids: list[str] | None) -> list[list[str] | None]:
+    if ids is None:
+        return [None]
+    return [ids[i : i + _IN_CHUNK] for i in range(0, len(ids), _IN_CHUNK)]
+
+
+def _select_1ph_circuits(
+    conn: sqlite3.Connection,
+    panel_id: str,
+    *,
+    has_phase_source: bool,
+    has_bus_section_id: bool = False,
+    has_phase_i_a: bool = False,
+    section_filter: list[str] | None = None,
+) -> list[sqlite3.Row]:
+    phase_source_sql = "c.phase_source" if has_phase_source else "NULL"
+    bus_section_sql = "c.bus_section_id" if has_bus_section_id else "NULL"
+    phase_i_a_sql = "c.phase_i_a" if has_phase_i_a else "NULL"
+    section_filter_sql = ""
+    params: list[object] = [panel_id, PHASES_1PH]
+    if section_filter:
+        placeholders = ", ".join(["?"] * len(section_filter))
+        section_filter_sql = f" AND c.bus_section_id IN ({placeholders})"
+        params.extend(section_filter)
+    return conn.execute(
+        f"""
+        SELECT
+          c.id AS circuit_id,
+          c.name AS circuit_name,
+          COALESCE(cc.i_calc_a, c.i_calc_a) AS i_a,
+          c.phase,
+          {phase_source_sql} AS phase_source,
+          {bus_section_sql} AS bus_section_id,
+          {phase_i_a_sql} AS phase_i_a
+        FROM circuits c
+        LEFT JOIN circuit_calc cc ON cc.circuit_id = c.id
+        WHERE c.panel_id = ? AND c.phases = ?
+        """
+        + section_filter_sql,
+        params,
+    ).fetchall()
+
+
+def _select_1ph_circuits_project(
+    conn: sqlite3.Connection,
+    panel_ids: list[str] | None,
+    *,
+    has_phase_source: bool,
+    has_bus_section_id: bool,
+    has_phase_i_a: bool = False,
+) -> list[sqlite3.Row]:
+    """1PH circuits of many panels (None = all), ordered by panel_id."""
+    phase_source_sql = "c.phase_source" if has_phase_source else "NULL"
+    bus_section_sql = "c.bus_section_id" if has_bus_section_id else "NULL"
+    phase_i_a_sql = "c.phase_i_a" if has_phase_i_a else "NULL"
+    sql = f"""
+        SELECT
+          c.panel_id,
+          c.id AS circuit_id,
+          c.name AS circuit_name,
+          COALESCE(cc.i_calc_a, c.i_calc_a) AS i_a,
+          c.phase,
+          {phase_source_sql} AS phase_source,
+          {bus_section_sql} AS bus_section_id,
+          {phase_i_a_sql} AS phase_i_a
+        FROM circuits c
+        LEFT JOIN circuit_calc cc ON cc.circuit_id = c.id
+        WHERE c.phases = ?
+        """
+    rows: list[sqlite3.Row] = []
+    for chunk in _chunks(panel_ids):
+        params: list[object] = [PHASES_1PH]
+        where = ""
+        if chunk is not None:
+            where = f" AND c.panel_id IN ({', '.join(['?'] * len(chunk))})"
+            params.extend(chunk)
+        rows.extend(conn.execute(sql + where + " ORDER BY c.panel_id", params).fetchall())
+    return rows
 
-    if not rows:
-        # No 1PH circuits; still upsert panel_phase_balance with zeros.
-        # Explicitly clear warnings (G1): invalid_manual_count=0, warnings_json=NULL.
-        _upsert_panel_phase_balance(
-            conn,
-            panel_id,
-            mode_norm,
-            0.0,
-            0.0,
-            0.0,
-            invalid_manual_count=0,
-            warnings_json=None,
-        )
-        conn.commit()
-        return 0
 
-    # 2) Split into manual (excluded from reassignment) and auto (reassignable)
-    sum_l1 = 0.0
-    sum_l2 = 0.0
-    sum_l3 = 0.0
-    auto_circuits: list[tuple[str, float]] = []
-    invalid_manual_count = 0
-    warnings: list[dict[str, object]] = list(pre_warnings)
+def _split_manual_auto(
+    rows: list[sqlite3.Row],
+    *,
+    respect_manual: bool,
+    has_phase_source: bool,
+) -> tuple[
+    tuple[float, float, float], list[_AutoCircuit], list[dict[str, object]], list[_AutoCircuit]
+]:
+    """
+    Returns (per-phase sums of valid MANUAL circuits, AUTO circuits sorted by
+    I desc / circuit_id asc, MANUAL_INVALID_PHASE warnings, valid MANUAL circuits).
+    """
+    sums = [0.0, 0.0, 0.0]
+    auto_circuits: list[_AutoCircuit] = []
+    manual_circuits: list[_AutoCircuit] = []
+    warnings: list[dict[str, object]] = []
 
     for r in rows:
         cid = str(r["circuit_id"])
@@ -175,23 +1229,15 @@ def calc_phase_balance(
         phase_source_val = str(r["phase_source"]).strip() if has_phase_source else "AUTO"
 
         is_manual = respect_manual and has_phase_source and phase_source_val == "MANUAL"
-        phase_val: str | None = None
-        if phase_raw is not None:
-            s = str(phase_raw).strip()
-            if s in ("L1", "L2", "L3"):
-                phase_val = s
+        phase_val = _valid_phase(phase_raw)
+        phase_i_a = None if r["phase_i_a"] is None else float(r["phase_i_a"])
 
         if is_manual:
             # Preserve existing phase; add to sums if valid
             if phase_val is not None:
-                if phase_val == "L1":
-                    sum_l1 += i_float
-                elif phase_val == "L2":
-                    sum_l2 += i_float
-                else:
-                    sum_l3 += i_float
+                sums[PHASE_CODES.index(phase_val)] += i_float
+                manual_circuits.append(_AutoCircuit(cid, i_float, phase_val, phase_i_a))
             else:
-                invalid_manual_count += 1
                 warnings.append(
                     {
                         "circuit_id": cid,
@@ -203,46 +1249,258 @@ def calc_phase_balance(
                     }
                 )
         else:
-            auto_circuits.append((cid, i_float))
-
-    # 3) Sort auto circuits by I desc, tie-break by circuit_id (asc for stability)
-    auto_circuits.sort(key=lambda x: (-x[1], x[0]))
-
-    # 4) Greedy assignment: assign each auto circuit to phase with minimal current sum
-    for circuit_id, i_a in auto_circuits:
-        min_sum = min(sum_l1, sum_l2, sum_l3)
-        if sum_l1 == min_sum:
-            phase = "L1"
-            sum_l1 += i_a
-        elif sum_l2 == min_sum:
-            phase = "L2"
-            sum_l2 += i_a
-        else:
-            phase = "L3"
-            sum_l3 += i_a
-        conn.execute(
-            "UPDATE circuits SET phase = ? WHERE id = ?",
-            (phase, circuit_id),
+            auto_circuits.append(_AutoCircuit(cid, i_float, phase_val, phase_i_a))
+
+    # Sort auto circuits by I desc, tie-break by circuit_id (asc for stability)
+    auto_circuits.sort(key=lambda c: (-c.i_a, c.circuit_id))
+    return (sums[0], sums[1], sums[2]), auto_circuits, warnings, manual_circuits
+
+
+def _solve(
+    base_sums: tuple[float, float, float],
+    currents: list[float],
+    *,
+    improve_budget_s: float | None,
+    improve_max_evals: int | None = None,
+    seed: int,
+    method: str,
+    exact_node_limit: int,
+    exact_time_limit_s: float | None,
+) -> tuple[list[int], str, bool, bool]:
+    """
+    Returns (phase index per current, effective method, proven optimal,
+    a wall-clock safety cap fired).
+    """
+    # Greedy assignment: assign each auto circuit to phase with minimal current sum
+    assign = greedy_assign(base_sums, currents)
+    stats = SearchStats()
+
+    # Optional refinement (move/swap local search).
+    max_evals = _local_search_evals(improve_budget_s, improve_max_evals)
+    if max_evals:
+        assign = local_search(
+            base_sums,
+            currents,
+            assign,
+            max_evals=max_evals,
+            time_cap_s=_time_cap(improve_budget_s),
+            seed=int(seed),
+            stats=stats,
         )
 
-    # 5) Compute unbalance_pct and upsert panel_phase_balance
-    warnings_json: str | None = None
-    if warnings:
-        warnings.sort(key=lambda w: str(w.get("circuit_id") or ""))
-        warnings_json = json.dumps(warnings, ensure_ascii=False)
+    # Optional exact branch-and-bound for small panels.
+    if method == "EXACT" and 0 < len(currents) <= EXACT_MAX_CIRCUITS:
+        assign, optimal = exact_assign(
+            base_sums,
+            currents,
+            incumbent=assign,
+            node_limit=int(exact_node_limit),
+            time_limit_s=exact_time_limit_s,
+            stats=stats,
+        )
+        return assign, "EXACT", optimal, stats.time_capped
+    return assign, "GREEDY", False, stats.time_capped
 
-    _upsert_panel_phase_balance(
-        conn,
-        panel_id,
-        mode_norm,
-        sum_l1,
-        sum_l2,
-        sum_l3,
-        invalid_manual_count=invalid_manual_count,
-        warnings_json=warnings_json,
+
+def _local_search_evals(improve_budget_s: float | None, improve_max_evals: int | None) -> int:
+    """Evaluation budget of the local search; 0 = disabled."""
+    if improve_max_evals is not None:
+        return max(0, int(improve_max_evals))
+    if improve_budget_s is not None and improve_budget_s > 0:
+        return LOCAL_SEARCH_MAX_EVALS
+    return 0
+
+
+def _time_cap(improve_budget_s: float | None) -> float | None:
+    if improve_budget_s is None or improve_budget_s <= 0:
+        return None
+    return float(improve_budget_s)
+
+
+def _time_cap_warnings(time_capped: bool, mode: str) -> list[dict[str, object]]:
+    """Panel-level warning: a wall-clock safety cap stopped the search (load-dependent result)."""
+    return [{"reason": "SEARCH_TIME_CAP", "mode": mode}] if time_capped else []
+
+
+def _solve_constrained(
+    base_sums: tuple[float, float, float],
+    auto_circuits: list[_AutoCircuit],
+    manual_circuits: list[_AutoCircuit],
+    constraints: PhaseConstraints,
+    *,
+    node_limit: int,
+    time_limit_s: float | None,
+) -> tuple[list[int], bool, bool]:
+    """
+    Map circuit_id groups onto AUTO indices and run constrained_assign.
+    Returns (assignment, proven optimal, the time_limit_s safety cap fired).
+    """
+    index = {c.circuit_id: k for k, c in enumerate(auto_circuits)}
+    fixed = {c.circuit_id: PHASE_CODES.index(c.phase) for c in manual_circuits}
+    base_counts = [0, 0, 0]
+    for p in fixed.values():
+        base_counts[p] += 1
+
+    allowed = [{0, 1, 2} for _ in auto_circuits]
+    same_groups: list[list[int]] = []
+    for group in constraints.same_phase_groups:
+        members = [index[cid] for cid in group if cid in index]
+        pinned = {fixed[cid] for cid in group if cid in fixed}
+        if pinned:
+            for k in members:
+                allowed[k] &= pinned
+        same_groups.append(members)
+    diff_groups: list[list[int]] = []
+    for group in constraints.different_phase_groups:
+        members = [index[cid] for cid in group if cid in index]
+        pinned = {fixed[cid] for cid in group if cid in fixed}
+        for k in members:
+            allowed[k] -= pinned
+        diff_groups.append(members)
+
+    stats = SearchStats()
+    assign, _, optimal = constrained_assign(
+        base_sums,
+        base_counts,
+        [c.i_a for c in auto_circuits],
+        max_count=constraints.max_circuits_per_phase,
+        caps=constraints.max_current_per_phase_a,
+        allowed=[sorted(a) for a in allowed],
+        same_groups=same_groups,
+        diff_groups=diff_groups,
+        node_limit=int(node_limit),
+        time_limit_s=time_limit_s,
+        stats=stats,
     )
-    conn.commit()
-    return len(rows)
+    return assign, optimal, stats.time_capped
+
+
+def _constraint_violations(
+    constraints: PhaseConstraints,
+    auto_circuits: list[_AutoCircuit],
+    assign: list[int],
+    manual_circuits: list[_AutoCircuit],
+    sums: list[float],
+) -> list[dict[str, object]]:
+    """Warnings for every constraint the final assignment violates (circuits of the mode only)."""
+    phase_of = {c.circuit_id: c.phase for c in manual_circuits}
+    phase_of.update((c.circuit_id, PHASE_CODES[p]) for c, p in zip(auto_circuits, assign))
+    warnings: list[dict[str, object]] = []
+
+    limit = constraints.max_circuits_per_phase
+    if limit is not None:
+        for code in PHASE_CODES:
+            count = sum(1 for ph in phase_of.values() if ph == code)
+            if count > limit:
+                warnings.append(
+                    {
+                        "reason": "PHASE_MAX_CIRCUITS_EXCEEDED",
+                        "phase": code,
+                        "count": count,
+                        "limit": limit,
+                    }
+                )
+    for code, i_a, cap in zip(PHASE_CODES, sums, constraints.max_current_per_phase_a):
+        if cap is not None and i_a > float(cap) + 1e-9:
+            warnings.append(
+                {
+                    "reason": "PHASE_CURRENT_LIMIT_EXCEEDED",
+                    "phase": code,
+                    "i_a": i_a,
+                    "limit_a": float(cap),
+                }
+            )
+    for group in constraints.same_phase_groups:
+        members = sorted(cid for cid in set(group) if cid in phase_of)
+        phases = sorted({phase_of[cid] for cid in members})
+        if len(phases) > 1:
+            warnings.append(
+                {
+                    "reason": "SAME_PHASE_GROUP_SPLIT",
+                    "circuit_ids": members,
+                    "phases": phases,
+                }
+            )
+    for group in constraints.different_phase_groups:
+        members = sorted(cid for cid in set(group) if cid in phase_of)
+        phases = [phase_of[cid] for cid in members]
+        if len(set(phases)) < len(phases):
+            warnings.append(
+                {
+                    "reason": "DIFFERENT_PHASE_GROUP_CONFLICT",
+                    "circuit_ids": members,
+                    "phases": phases,
+                }
+            )
+    return warnings
+
+
+def _write_changed_phases(
+    conn: sqlite3.Connection,
+    auto_circuits: list[_AutoCircuit],
+    assign: list[int],
+    manual_circuits: list[_AutoCircuit] | tuple[()] = (),
+    *,
+    track_current: bool = False,
+) -> tuple[int, int]:
+    """
+    Diff the assignment against the current circuits.phase and batch-update only
+    changed rows. Unchanged rows are not touched (no data_version bump, no WAL
+    traffic). Returns (changed_count, unchanged_count).
+
+    track_current=True (circuits.phase_i_a exists, migration 0014): phase_i_a is
+    kept equal to the current accounted in the phase sums; rows whose current
+    changed are rewritten too (MANUAL circuits: phase_i_a only).
+    """
+    changed_count = sum(1 for c, p in zip(auto_circuits, assign) if c.phase != PHASE_CODES[p])
+    if not track_current:
+        changed = [
+            (PHASE_CODES[p], c.circuit_id)
+            for c, p in zip(auto_circuits, assign)
+            if c.phase != PHASE_CODES[p]
+        ]
+        if changed:
+            conn.executemany("UPDATE circuits SET phase = ? WHERE id = ?", changed)
+        return changed_count, len(auto_circuits) - changed_count
+
+    changed_rows = [
+        (PHASE_CODES[p], c.i_a, c.circuit_id)
+        for c, p in zip(auto_circuits, assign)
+        if c.phase != PHASE_CODES[p] or c.phase_i_a != c.i_a
+    ]
+    if changed_rows:
+        conn.executemany("UPDATE circuits SET phase = ?, phase_i_a = ? WHERE id = ?", changed_rows)
+    manual_rows = [(c.i_a, c.circuit_id) for c in manual_circuits if c.phase_i_a != c.i_a]
+    if manual_rows:
+        conn.executemany("UPDATE circuits SET phase_i_a = ? WHERE id = ?", manual_rows)
+    return changed_count, len(auto_circuits) - changed_count
+
+
+def _record_warnings(
+    diagnostics: Diagnostics | None,
+    warnings: list[dict[str, object]],
+    *,
+    panel_id: str,
+    mode: str,
+) -> tuple[tuple[str, int], ...]:
+    """Per-call (reason, count) summary; warnings also go to diagnostics when given."""
+    if not warnings:
+        return ()
+    counts: dict[str, int] = {}
+    for w in warnings:
+        reason = str(w.get("reason") or "UNKNOWN")
+        counts[reason] = counts.get(reason, 0) + 1
+    if diagnostics is not None:
+        diagnostics.extend({"panel_id": panel_id, "mode": mode, **w} for w in warnings)
+    return tuple(sorted(counts.items()))
+
+
+def _warnings_json(warnings: list[dict[str, object]]) -> str | None:
+    # Explicitly clear warnings (G1) when there are none: warnings_json=NULL.
+    if not warnings:
+        return None
+    warnings.sort(key=lambda w: str(w.get("circuit_id") or ""))
+    return json.dumps(warnings, ensure_ascii=False)
 
 
 def _upsert_panel_phase_balance(
@@ -255,60 +1513,72 @@ def _upsert_panel_phase_balance(
     *,
     invalid_manual_count: int = 0,
     warnings_json: str | None = None,
+    changed_count: int = 0,
+    unchanged_count: int = 0,
 ) -> None:
-    i_max = max(i_l1, i_l2, i_l3)
-    i_avg = (i_l1 + i_l2 + i_l3) / 3.0
-    unbalance_pct = 0.0 if i_avg == 0 else (100.0 * (i_max - i_avg) / i_avg)
-
-    updated_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
-    pb_cols = [r[1] for r in conn.execute("PRAGMA table_info(panel_phase_balance)").fetchall()]
-    has_invalid_manual_count = "invalid_manual_count" in pb_cols
-    has_warnings_json = "warnings_json" in pb_cols
-
-    if has_invalid_manual_count and has_warnings_json:
-        conn.execute(
-            """
-            INSERT INTO panel_phase_balance (
-              panel_id, mode, i_l1, i_l2, i_l3, unbalance_pct, updated_at,
-              invalid_manual_count, warnings_json
-            )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ON CONFLICT(panel_id, mode) DO UPDATE SET
-              i_l1 = excluded.i_l1,
-              i_l2 = excluded.i_l2,
-              i_l3 = excluded.i_l3,
-              unbalance_pct = excluded.unbalance_pct,
-              updated_at = excluded.updated_at,
-              invalid_manual_count = excluded.invalid_manual_count,
-              warnings_json = excluded.warnings_json
-            """,
-            (
+    _upsert_panel_phase_balance_many(
+        conn,
+        [
+            _balance_values(
                 panel_id,
                 mode,
-                i_l1,
-                i_l2,
-                i_l3,
-                unbalance_pct,
-                updated_at,
-                int(invalid_manual_count),
-                warnings_json,
-            ),
-        )
-        return
+                (i_l1, i_l2, i_l3),
+                invalid_manual_count=invalid_manual_count,
+                warnings_json=warnings_json,
+                changed_count=changed_count,
+                unchanged_count=unchanged_count,
+            )
+        ],
+    )
 
-    # Backward-compatible upsert (older DBs)
-    conn.execute(
-        """
-        INSERT INTO panel_phase_balance (
-          panel_id, mode, i_l1, i_l2, i_l3, unbalance_pct, updated_at
-        )
-        VALUES (?, ?, ?, ?, ?, ?, ?)
+
+def _balance_values(
+    panel_id: str,
+    mode: str,
+    sums: tuple[float, float, float] | list[float],
+    *,
+    invalid_manual_count: int,
+    warnings_json: str | None,
+    changed_count: int,
+    unchanged_count: int,
+) -> dict[str, object]:
+    return {
+        "panel_id": panel_id,
+        "mode": mode,
+        "i_l1": sums[0],
+        "i_l2": sums[1],
+        "i_l3": sums[2],
+        "unbalance_pct": unbalance_pct(sums[0], sums[1], sums[2]),
+        "updated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "invalid_manual_count": int(invalid_manual_count),
+        "warnings_json": warnings_json,
+        "changed_count": int(changed_count),
+        "unchanged_count": int(unchanged_count),
+    }
+
+
+def _upsert_panel_phase_balance_many(
+    conn: sqlite3.Connection, values: list[dict[str, object]]
+) -> None:
+    if not values:
+        return
+    # Optional columns: older DBs may predate migrations 0009 / 0012.
+    caps = schema_caps(conn)
+    skip = set()
+    if not caps.pb_warnings:
+        skip |= {"invalid_manual_count", "warnings_json"}
+    if not caps.pb_change_counts:
+        skip |= {"changed_count", "unchanged_count"}
+    cols = [c for c in values[0] if c not in skip]
+    updates = ",\n          ".join(
+        f"{c} = excluded.{c}" for c in cols if c not in ("panel_id", "mode")
+    )
+    conn.executemany(
+        f"""
+        INSERT INTO panel_phase_balance ({", ".join(cols)})
+        VALUES ({", ".join(["?"] * len(cols))})
         ON CONFLICT(panel_id, mode) DO UPDATE SET
-          i_l1 = excluded.i_l1,
-          i_l2 = excluded.i_l2,
-          i_l3 = excluded.i_l3,
-          unbalance_pct = excluded.unbalance_pct,
-          updated_at = excluded.updated_at
+          {updates}
         """,
-        (panel_id, mode, i_l1, i_l2, i_l3, unbalance_pct, updated_at),
+        [[v[c] for c in cols] for v in values],
     )
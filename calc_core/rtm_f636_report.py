@@ -0,0 +1,211 @@
+"""
+Отчёт по форме Ф636-92 для любого числа щитов: строки расчёта (rtm_rows +
+rtm_row_calc) и итог по щиту (rtm_panel_calc).
+
+Записи — кортежи в порядке REPORT_COLUMNS:
+- ROW: ввод строки (n, Pн, Ки, cos φ, tg φ) и расчёт rtm_row_calc
+  (n·Pн, Ки·Pн, Ки·Pн·tg φ, n·Pн²);
+- TOTAL: суммы тех же колонок, групповой Ки = ΣКи·Pн / ΣPн,
+  tg φ = ΣКи·Pн·tg φ / ΣКи·Pн и итоги rtm_panel_calc (nэ, Kр, Pр, Qр, Sр, Iр).
+Щиты идут по имени, строки щита — по имени (как в run_panel_calc), TOTAL —
+после строк своего щита. Щит без строк и без rtm_panel_calc в отчёт не попадает;
+нерассчитанные значения — None.
+
+Всё читается в одной read-транзакции (один снимок БД) двумя курсорами в одном
+порядке, поэтому память не зависит от числа щитов и строк.
+"""
+
+from __future__ import annotations
+
+import csv
+import json
+import sqlite3
+from typing import Iterable, Iterator, TextIO
+
+REPORT_COLUMNS = (
+    "kind",
+    "panel_id",
+    "panel_name",
+    "row_name",
+    "n",
+    "pn_kw",
+    "ki",
+    "cos_phi",
+    "tg_phi",
+    "pn_total",
+    "ki_pn",
+    "ki_pn_tg",
+    "n_pn2",
+    "ne",
+    "kr",
+    "pp_kw",
+    "qp_kvar",
+    "sp_kva",
+    "ip_a",
+)
+
+# Максимум параметров в одном IN (...) (как в export_payload).
+_IN_CHUNK = 500
+
+# ne, kr, pp_kw, qp_kvar, sp_kva, ip_a пустые в строках ROW.
+_NO_PANEL_CALC = (None,) * 6
+
+_PANELS_SQL = """
+    SELECT
+      p.id, p.name,
+      t.panel_id AS calc_panel_id,
+      t.sum_pn, t.sum_ki_pn, t.sum_ki_pn_tg, t.sum_np2,
+      t.ne, t.kr, t.pp_kw, t.qp_kvar, t.sp_kva, t.ip_a
+    FROM panels p
+    LEFT JOIN rtm_panel_calc t ON t.panel_id = p.id
+"""
+_ROWS_SQL = """
+    SELECT
+      r.panel_id, r.name, r.n, r.pn_kw, r.ki, r.cos_phi, r.tg_phi,
+      c.pn_total, c.ki_pn, c.ki_pn_tg, c.n_pn2
+    FROM rtm_rows r
+    JOIN panels p ON p.id = r.panel_id
+    LEFT JOIN rtm_row_calc c ON c.row_id = r.id
+"""
+
+
+def iter_f636_report(
+    conn: sqlite3.Connection, panel_ids: Iterable[str] | None = None
+) -> Iterator[tuple]:
+    """
+    Записи отчёта (см. модуль) для panel_ids (None = все щиты).
+    Неизвестный panel_id → ValueError до первой записи.
+    """
+    chunks: list[list[str] | None] = [None]
+    if panel_ids is not None:
+        wanted = list(dict.fromkeys(str(p) for p in panel_ids))
+        if not wanted:
+            return
+        chunks = [wanted[i : i + _IN_CHUNK] for i in range(0, len(wanted), _IN_CHUNK)]
+
+    own_tx = not conn.in_transaction
+    if own_tx:
+        conn.execute("BEGIN")
+    try:
+        if panel_ids is not None:
+            names: dict[str, str] = {}
+            for chunk in chunks:
+                for r in conn.execute(
+                    f"SELECT id, name FROM panels WHERE id IN ({', '.join(['?'] * len(chunk))})",
+                    chunk,
+                ):
+                    names[str(r[0])] = str(r[1])
+                missing = [p for p in chunk if p not in names]
+                if missing:
+                    raise ValueError(f"Panel not found: {missing[0]}")
+            # Порции по (name, id): каждая упорядочена сама, и вместе они идут подряд.
+            ordered = sorted(wanted, key=lambda p: (names[p], p))
+            chunks = [ordered[i : i + _IN_CHUNK] for i in range(0, len(ordered), _IN_CHUNK)]
+        for chunk in chunks:
+            yield from _iter_chunk(conn, chunk)
+    finally:
+        if own_tx:
+            # Только чтение: фиксировать нечего.
+            conn.rollback()
+
+
+def write_f636_csv(records: Iterable[tuple], fp: TextIO) -> int:
+    """CSV с заголовком REPORT_COLUMNS (None → пустая ячейка). Возвращает число записей."""
+    writer = csv.writer(fp)
+    writer.writerow(REPORT_COLUMNS)
+    count = 0
+    for record in records:
+        writer.writerow(["" if v is None else v for v in record])
+        count += 1
+    return count
+
+
+def write_f636_jsonl(records: Iterable[tuple], fp: TextIO) -> int:
+    """JSON Lines: один объект {колонка: значение} на запись."""
+    count = 0
+    for record in records:
+        fp.write(json.dumps(dict(zip(REPORT_COLUMNS, record)), ensure_ascii=False) + "\n")
+        count += 1
+    return count
+
+
+def write_f636_xlsx(records: Iterable[tuple], path: str) -> int:
+    """XLSX через write-only книгу openpyxl (строки сразу уходят на диск)."""
+    try:
+        from openpyxl import Workbook  # type: ignore
+    except ImportError as exc:
+        raise ValueError("XLSX export requires openpyxl (use csv or jsonl)") from exc
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("F636")
+    ws.append(list(REPORT_COLUMNS))
+    count = 0
+    for record in records:
+        ws.append(list(record))
+        count += 1
+    wb.save(path)
+    return count
+
+
+def _iter_chunk(conn: sqlite3.Connection, chunk: list[str] | None) -> Iterator[tuple]:
+    params: tuple[str, ...] = tuple(chunk or ())
+
+    def panel_filter(column: str) -> str:
+        if chunk is None:
+            return "1 = 1"
+        return f"{column} IN ({', '.join(['?'] * len(chunk))})"
+
+    panels = conn.execute(
+        f"{_PANELS_SQL} WHERE {panel_filter('p.id')} ORDER BY p.name ASC, p.id ASC", params
+    )
+    # Тот же порядок щитов, что и у panels: строки читаются щит за щитом.
+    rows = iter(
+        conn.execute(
+            f"""
+            {_ROWS_SQL}
+            WHERE {panel_filter('r.panel_id')}
+            ORDER BY p.name ASC, p.id ASC, r.name ASC, r.id ASC
+            """,
+            params,
+        )
+    )
+    pending = next(rows, None)
+
+    for panel in panels:
+        panel = tuple(panel)
+        panel_id = str(panel[0])
+        panel_name = str(panel[1])
+        n_total = 0
+        row_count = 0
+        while pending is not None and str(pending[0]) == panel_id:
+            r = tuple(pending)
+            n_total += int(r[2])
+            row_count += 1
+            yield ("ROW", panel_id, panel_name, str(r[1]), int(r[2]), *r[3:11], *_NO_PANEL_CALC)
+            pending = next(rows, None)
+
+        has_calc = panel[2] is not None
+        if not row_count and not has_calc:
+            continue
+        sum_pn, sum_ki_pn, sum_ki_pn_tg, sum_np2 = panel[3], panel[4], panel[5], panel[6]
+        yield (
+            "TOTAL",
+            panel_id,
+            panel_name,
+            None,
+            n_total,
+            None,
+            _ratio(sum_ki_pn, sum_pn),
+            None,
+            _ratio(sum_ki_pn_tg, sum_ki_pn),
+            sum_pn,
+            sum_ki_pn,
+            sum_ki_pn_tg,
+            sum_np2,
+            *panel[7:13],
+        )
+
+
+def _ratio(num: float | None, den: float | None) -> float | None:
+    if num is None or den is None or den == 0:
+        return None
+    return float(num) / float(den)
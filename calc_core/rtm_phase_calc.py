@@ -0,0 +1,248 @@
+"""
+Фазировка строк РТМ (rtm_rows) по фазам A/B/C → panel_phase_calc.
+
+Правила (см. docs/contracts/RTM_F636.md, раздел «Фазировка строк РТМ»):
+- ток строки считается по rtm_row_calc: S = sqrt(ki_pn² + ki_pn_tg²);
+  1Ф: I = S·1000 / U_ph, 3Ф: I = S·1000 / (√3·U_LL);
+- 3Ф строки добавляются ко всем трём фазам одинаково;
+- 1Ф FIXED — на фазу phase_fixed (не меняется);
+- 1Ф AUTO — greedy по I (I desc, id asc) на фазу с минимальным текущим током,
+  при равенстве A → B → C;
+- 1Ф NONE — не участвуют.
+
+Строки всех щитов читаются одним запросом (по _IN_CHUNK щитов на IN (...)) и
+пишутся одним executemany. Токи строк считаются по колонкам: NumPy, если
+установлен, иначе тот же расчёт чистым Python (медленнее).
+"""
+
+from __future__ import annotations
+
+import math
+import sqlite3
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Sequence
+
+from .phase_assignment import greedy_assign, unbalance_pct
+
+try:
+    import numpy as _np
+except ImportError:
+    _np = None
+
+METHOD = "greedy_I_AUTO"
+PHASE_FIXED_INDEX = {"A": 0, "B": 1, "C": 2}
+
+# Максимум параметров в одном IN (...) (как в export_payload).
+_IN_CHUNK = 500
+
+_ROWS_SQL = """
+    SELECT
+      r.panel_id, r.id AS row_id, r.phases, r.phase_mode, r.phase_fixed,
+      rc.ki_pn, rc.ki_pn_tg,
+      p.u_ll_v, p.u_ph_v
+    FROM rtm_rows r
+    JOIN panels p ON p.id = r.panel_id
+    LEFT JOIN rtm_row_calc rc ON rc.row_id = r.id
+"""
+
+
+@dataclass(frozen=True)
+class PanelPhaseCalc:
+    panel_id: str
+    ia_a: float
+    ib_a: float
+    ic_a: float
+
+    @property
+    def imax_a(self) -> float:
+        return max(self.ia_a, self.ib_a, self.ic_a)
+
+    @property
+    def iavg_a(self) -> float:
+        return (self.ia_a + self.ib_a + self.ic_a) / 3.0
+
+    @property
+    def unbalance_pct(self) -> float:
+        return unbalance_pct(self.ia_a, self.ib_a, self.ic_a)
+
+
+def allocate_panel_phases(
+    row_ids: Sequence[str],
+    phases: Sequence[int],
+    phase_modes: Sequence[str],
+    phase_fixed: Sequence[str | None],
+    currents: Sequence[float],
+) -> tuple[float, float, float]:
+    """
+    Pure allocation for one panel over column lists (same length, one item per row).
+    Returns (I_A, I_B, I_C).
+    """
+    base = [0.0, 0.0, 0.0]
+    auto: list[tuple[float, str]] = []
+    for rid, ph, mode, fixed, i_a in zip(row_ids, phases, phase_modes, phase_fixed, currents):
+        if ph == 3:
+            base[0] += i_a
+            base[1] += i_a
+            base[2] += i_a
+        elif mode == "FIXED":
+            if fixed not in PHASE_FIXED_INDEX:
+                raise ValueError(f"phase_fixed must be A/B/C for FIXED row_id={rid}")
+            base[PHASE_FIXED_INDEX[fixed]] += i_a
+        elif mode == "AUTO":
+            auto.append((i_a, rid))
+    auto.sort(key=lambda x: (-x[0], x[1]))
+    currents_auto = [i_a for i_a, _ in auto]
+    sums = list(base)
+    for i_a, p in zip(currents_auto, greedy_assign(base, currents_auto)):
+        sums[p] += i_a
+    return sums[0], sums[1], sums[2]
+
+
+def calc_panel_phase_calc(
+    conn: sqlite3.Connection, panel_ids: Sequence[str] | None = None
+) -> list[PanelPhaseCalc]:
+    """
+    Распределяет 1Ф строки РТМ по фазам и пишет panel_phase_calc (upsert) для
+    panel_ids (None = все щиты, у которых есть rtm_rows).
+
+    Строка panel_phase_calc щита без rtm_rows (из panel_ids, при None — любого)
+    удаляется: старые токи не остаются после удаления всех строк РТМ.
+
+    Требует актуального rtm_row_calc (run_panel_calc): строка без расчёта → ValueError.
+    Запись одним executemany; commit остаётся за вызывающим кодом.
+    """
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON;")
+
+    if panel_ids is None:
+        chunks: list[list[str]] = []
+        rows = conn.execute(f"{_ROWS_SQL} ORDER BY r.panel_id, r.id").fetchall()
+    else:
+        ids = sorted({str(p).strip() for p in panel_ids if p and str(p).strip()})
+        if not ids:
+            return []
+        chunks = [ids[i : i + _IN_CHUNK] for i in range(0, len(ids), _IN_CHUNK)]
+        rows = []
+        for chunk in chunks:
+            rows.extend(
+                conn.execute(
+                    f"""
+                    {_ROWS_SQL}
+                    WHERE r.panel_id IN ({', '.join(['?'] * len(chunk))})
+                    ORDER BY r.panel_id, r.id
+                    """,
+                    chunk,
+                ).fetchall()
+            )
+
+    currents = _row_currents(rows)
+
+    results: list[PanelPhaseCalc] = []
+    start = 0
+    while start < len(rows):
+        panel_id = str(rows[start]["panel_id"])
+        end = start
+        while end < len(rows) and str(rows[end]["panel_id"]) == panel_id:
+            end += 1
+        chunk = rows[start:end]
+        ia, ib, ic = allocate_panel_phases(
+            [str(r["row_id"]) for r in chunk],
+            [int(r["phases"]) for r in chunk],
+            [str(r["phase_mode"]) for r in chunk],
+            [r["phase_fixed"] for r in chunk],
+            currents[start:end],
+        )
+        results.append(PanelPhaseCalc(panel_id, ia, ib, ic))
+        start = end
+
+    updated_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    conn.executemany(
+        """
+        INSERT INTO panel_phase_calc (
+          panel_id, ia_a, ib_a, ic_a, imax_a, iavg_a, unbalance_pct, method, updated_at
+        )
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(panel_id) DO UPDATE SET
+          ia_a = excluded.ia_a,
+          ib_a = excluded.ib_a,
+          ic_a = excluded.ic_a,
+          imax_a = excluded.imax_a,
+          iavg_a = excluded.iavg_a,
+          unbalance_pct = excluded.unbalance_pct,
+          method = excluded.method,
+          updated_at = excluded.updated_at
+        """,
+        [
+            (r.panel_id, r.ia_a, r.ib_a, r.ic_a, r.imax_a, r.iavg_a, r.unbalance_pct, METHOD, updated_at)
+            for r in results
+        ],
+    )
+
+    # Щиты без rtm_rows: убрать устаревший результат.
+    if panel_ids is None:
+        conn.execute(
+            "DELETE FROM panel_phase_calc WHERE panel_id NOT IN (SELECT panel_id FROM rtm_rows)"
+        )
+    else:
+        computed = {r.panel_id for r in results}
+        for chunk in chunks:
+            stale = [p for p in chunk if p not in computed]
+            if stale:
+                conn.execute(
+                    f"DELETE FROM panel_phase_calc WHERE panel_id IN ({', '.join(['?'] * len(stale))})",
+                    stale,
+                )
+    return results
+
+
+def _row_currents(rows: Sequence[sqlite3.Row]) -> list[float]:
+    """Токи всех строк (в порядке rows) по колонкам; NumPy, если установлен."""
+    if _np is None or not rows:
+        return [_row_current(r) for r in rows]
+
+    # None → NaN (dtype=float).
+    ki_pn = _np.array([r["ki_pn"] for r in rows], dtype=float)
+    missing = _np.flatnonzero(_np.isnan(ki_pn))
+    if missing.size:
+        row_id = rows[int(missing[0])]["row_id"]
+        raise ValueError(f"rtm_row_calc missing for row_id={row_id}; run RTM calc first")
+    ki_pn_tg = _np.nan_to_num(_np.array([r["ki_pn_tg"] for r in rows], dtype=float))
+    s_kva = _np.hypot(ki_pn, ki_pn_tg)
+
+    sqrt3 = math.sqrt(3.0)
+    u_ll_v = _np.array([r["u_ll_v"] for r in rows], dtype=float)
+    u_ph_v = _np.array([r["u_ph_v"] for r in rows], dtype=float)
+    u_ph_v = _np.where(_np.isnan(u_ph_v), u_ll_v / sqrt3, u_ph_v)
+    u_ll_v = _np.where(_np.isnan(u_ll_v), u_ph_v * sqrt3, u_ll_v)
+    # NaN > 0 is False: an unset voltage is invalid too.
+    bad = _np.flatnonzero(~((u_ph_v > 0) & (u_ll_v > 0)))
+    if bad.size:
+        panel_id = rows[int(bad[0])]["panel_id"]
+        raise ValueError(f"u_ll_v/u_ph_v must be positive for panel_id={panel_id}")
+
+    three_phase = _np.array([int(r["phases"]) == 3 for r in rows])
+    currents = _np.where(three_phase, s_kva * 1000.0 / (sqrt3 * u_ll_v), s_kva * 1000.0 / u_ph_v)
+    return currents.tolist()
+
+
+def _row_current(r: sqlite3.Row) -> float:
+    row_id = r["row_id"]
+    if r["ki_pn"] is None:
+        raise ValueError(f"rtm_row_calc missing for row_id={row_id}; run RTM calc first")
+    p_kw = float(r["ki_pn"])
+    q_kvar = float(r["ki_pn_tg"] or 0.0)
+    s_kva = math.hypot(p_kw, q_kvar)
+
+    u_ll_v = float(r["u_ll_v"]) if r["u_ll_v"] is not None else None
+    u_ph_v = float(r["u_ph_v"]) if r["u_ph_v"] is not None else None
+    if u_ph_v is None and u_ll_v is not None:
+        u_ph_v = u_ll_v / math.sqrt(3.0)
+    if u_ll_v is None and u_ph_v is not None:
+        u_ll_v = u_ph_v * math.sqrt(3.0)
+    if u_ph_v is None or u_ph_v <= 0 or u_ll_v is None or u_ll_v <= 0:
+        raise ValueError(f"u_ll_v/u_ph_v must be positive for panel_id={r['panel_id']}")
+
+    if int(r["phases"]) == 3:
+        return (s_kva * 1000.0) / (math.sqrt(3.0) * u_ll_v)
+    return (s_kva * 1000.0) / u_ph_v
@@ -0,0 +1,149 @@
+"""
+Schema capability registry.
+
+calc_core and the UI support several schema generations (legacy Feeds v1,
+optional columns added by later migrations). Instead of probing sqlite_master /
+PRAGMA table_info on every call, schema_caps(conn) reads all tables and columns
+with one query and caches the result per database file.
+
+Cache key: (main database file, PRAGMA schema_version, number of sqlite_master
+objects), read with one statement per call. schema_version is bumped by every
+DDL statement (migrations included, from any connection), so a migrated DB is
+re-inspected on the next call. In-memory / temporary databases are not cached.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+from dataclasses import dataclass
+
+# Max cached schemas (distinct DB files / versions) before the cache is reset.
+_CACHE_MAX = 64
+
+_cache: dict[tuple[str, int, int], SchemaCaps] = {}
+_cache_lock = threading.Lock()
+
+_EMPTY: frozenset[str] = frozenset()
+
+
+@dataclass(frozen=True, eq=False)
+class SchemaCaps:
+    tables: frozenset[str]
+    # table -> column names
+    columns: dict[str, frozenset[str]]
+
+    def has_table(self, table: str) -> bool:
+        return table in self.tables
+
+    def has_column(self, table: str, column: str) -> bool:
+        return column in self.columns.get(table, _EMPTY)
+
+    def columns_of(self, table: str) -> frozenset[str]:
+        return self.columns.get(table, _EMPTY)
+
+    @property
+    def feeds_v2(self) -> bool:
+        """feed_roles / modes / consumer_mode_rules + consumer_feeds.feed_role_id, priority (0005)."""
+        return all(
+            self.has_table(t) for t in ("feed_roles", "modes", "consumer_mode_rules")
+        ) and all(self.has_column("consumer_feeds", c) for c in ("feed_role_id", "priority"))
+
+    @property
+    def active_section(self) -> bool:
+        """Trigger-maintained consumer_active_section (0015)."""
+        return self.has_table("consumer_active_section")
+
+    @property
+    def load_profiles(self) -> bool:
+        """consumer_load_profiles (0016)."""
+        return self.has_table("consumer_load_profiles")
+
+    @property
+    def phase_balance(self) -> bool:
+        """circuits.phase + panel_phase_balance (0007)."""
+        return self.has_column("circuits", "phase") and self.has_table("panel_phase_balance")
+
+    @property
+    def phase_source(self) -> bool:
+        """circuits.phase_source (0008)."""
+        return self.has_column("circuits", "phase_source")
+
+    @property
+    def bus_section_id(self) -> bool:
+        """circuits.bus_section_id (0010)."""
+        return self.has_column("circuits", "bus_section_id")
+
+    @property
+    def phase_i_a(self) -> bool:
+        """circuits.phase_i_a (0014)."""
+        return self.has_column("circuits", "phase_i_a")
+
+    @property
+    def pb_warnings(self) -> bool:
+        """panel_phase_balance.invalid_manual_count + warnings_json (0009)."""
+        return self.has_column("panel_phase_balance", "invalid_manual_count") and self.has_column(
+            "panel_phase_balance", "warnings_json"
+        )
+
+    @property
+    def pb_change_counts(self) -> bool:
+        """panel_phase_balance.changed_count + unchanged_count (0012)."""
+        return self.has_column("panel_phase_balance", "changed_count") and self.has_column(
+            "panel_phase_balance", "unchanged_count"
+        )
+
+    @property
+    def section_phase_balance(self) -> bool:
+        """panel_section_phase_balance (0013)."""
+        return self.has_table("panel_section_phase_balance")
+
+
+def schema_caps(conn: sqlite3.Connection) -> SchemaCaps:
+    """Capabilities of the connection's main database (cached, see module docstring)."""
+    db_file, schema_version, object_count = conn.execute(
+        """
+        SELECT
+          (SELECT file FROM pragma_database_list WHERE name = 'main'),
+          (SELECT schema_version FROM pragma_schema_version),
+          (SELECT COUNT(*) FROM sqlite_master)
+        """
+    ).fetchone()
+    key = (str(db_file or ""), int(schema_version), int(object_count))
+    if key[0]:
+        caps = _cache.get(key)
+        if caps is not None:
+            return caps
+
+    caps = _inspect(conn)
+    if key[0]:
+        with _cache_lock:
+            if len(_cache) >= _CACHE_MAX:
+                _cache.clear()
+            _cache[key] = caps
+    return caps
+
+
+def clear_schema_caps_cache() -> None:
+    with _cache_lock:
+        _cache.clear()
+
+
+def _inspect(conn: sqlite3.Connection) -> SchemaCaps:
+    rows = conn.execute(
+        """
+        SELECT m.name, p.name
+        FROM sqlite_master m
+        LEFT JOIN pragma_table_info(m.name) p
+        WHERE m.type = 'table'
+        """
+    ).fetchall()
+    columns: dict[str, set[str]] = {}
+    for table, column in rows:
+        cols = columns.setdefault(str(table), set())
+        if column is not None:
+            cols.add(str(column))
+    return SchemaCaps(
+        tables=frozenset(columns),
+        columns={table: frozenset(cols) for table, cols in columns.items()},
+    )
@@ -14,16 +14,32 @@ Compatibility aliases (to keep older UI/CLI working during transition):
 - For Feeds v2 DB: "RESERVE" is accepted as a deprecated alias for "EMERGENCY".
 - For legacy DB: "EMERGENCY" is accepted as a deprecated alias for "RESERVE".
 
-- If a consumer has no matching feed, the row is skipped and a warning is printed
-  (no logger infra in MVP).
+- If a consumer has no matching feed, the row is skipped and a warning is recorded
+  in the optional `diagnostics` collector (calc_core.diagnostics.Diagnostics):
+  CONSUMER_NO_ACTIVE_FEED (Feeds v2) / CONSUMER_NO_FEED (legacy). The
+  calc_section_loads* entry points also return the per-call counts in
+  SectionCalcResult.warning_counts.
 - Writing to section_calc is attempted only if the table exists; otherwise
   calc_section_loads raises a RuntimeError. Use aggregate_section_loads for
   read-only workflows (e.g. tools/run_calc.py).
+- calc_section_loads_all_modes aggregates several modes from one read of
+  consumers / feeds / mode rules and writes them in one transaction.
+- calc_section_loads_project does the same for many panels at once (one query
+  per input table, one bulk write).
+- Feeds v2 DB with consumer_active_section (migration 0015): the active section
+  per (consumer, mode) is maintained by triggers and aggregation is a single
+  GROUP BY join; older DBs resolve feeds in memory with the same rules.
 """
 
 import sqlite3
 from dataclasses import dataclass
 
+from .diagnostics import Diagnostics
+from .schema_caps import schema_caps
+
+# Max bound parameters per IN (...) list (SQLite default limit is 999 on older builds).
+_IN_CHUNK = 500
+
 
 @dataclass
 class SectionLoad:
@@ -35,37 +51,45 @@ class SectionLoad:
     i_a: float = 0.0
 
 
-def _resolve_mode(mode: str) -> str:
-    # Legacy helper kept for backward compatibility inside this module.
-    return _normalize_mode(mode, feeds_v2=False)
+@dataclass(frozen=True)
+class SectionCalcResult:
+    # panel_id -> mode -> number of section_calc rows written.
+    section_counts: dict[str, dict[str, int]]
+    # (code, count) of diagnostics recorded by this call, ordered by code.
+    warning_counts: tuple[tuple[str, int], ...] = ()
 
+    @property
+    def section_count(self) -> int:
+        return sum(n for by_mode in self.section_counts.values() for n in by_mode.values())
 
-def _table_exists(conn: sqlite3.Connection, table: str) -> bool:
-    row = conn.execute(
-        "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?",
-        (table,),
-    ).fetchone()
-    return row is not None
 
+def _call_diagnostics(diagnostics: Diagnostics | None) -> Diagnostics:
+    """Per-call collector (merged into `diagnostics` by _warning_counts)."""
+    if diagnostics is None:
+        return Diagnostics()
+    return Diagnostics(sample_limit=diagnostics.sample_limit)
 
-def _column_exists(conn: sqlite3.Connection, table: str, column: str) -> bool:
-    rows = conn.execute(f"PRAGMA table_info({table})").fetchall()
-    return any(str(r[1]) == column for r in rows)
 
+def _warning_counts(
+    local: Diagnostics, diagnostics: Diagnostics | None
+) -> tuple[tuple[str, int], ...]:
+    if diagnostics is not None:
+        diagnostics.merge(local)
+    return tuple(sorted(local.counts.items()))
 
-def _feeds_v2_enabled(conn: sqlite3.Connection) -> bool:
-    # All of these are introduced by Feeds v2 migrations.
-    required_tables = ("feed_roles", "modes", "consumer_mode_rules")
-    if not all(_table_exists(conn, t) for t in required_tables):
-        return False
-    if not _table_exists(conn, "consumer_feeds"):
-        return False
-    return _column_exists(conn, "consumer_feeds", "feed_role_id") and _column_exists(
-        conn, "consumer_feeds", "priority"
-    )
+
+def _resolve_mode(mode: str) -> str:
+    # Legacy helper kept for backward compatibility inside this module.
+    return normalize_mode(mode, feeds_v2=False)
+
+
+def feeds_v2_enabled(conn: sqlite3.Connection) -> bool:
+    """True if the DB has the Feeds v2 tables (consumer_mode_rules / feed roles)."""
+    return schema_caps(conn).feeds_v2
 
 
-def _normalize_mode(mode: str, *, feeds_v2: bool) -> str:
+def normalize_mode(mode: str, *, feeds_v2: bool) -> str:
+    """Upper-cased mode name valid for the given feeds model; raises ValueError otherwise."""
     if not isinstance(mode, str):
         raise TypeError("mode must be a string")
     mode_norm = mode.strip().upper()
@@ -93,22 +117,39 @@ def _coerce_float(value: object, field: str, ctx: str) -> float:
         raise ValueError(f"{field} is not a number for {ctx}") from exc
 
 
-def _load_from_rtm_panel(conn: sqlite3.Connection, panel_id: str) -> tuple[float, float, float, float]:
-    row = conn.execute(
-        """
-        SELECT pp_kw, qp_kvar, sp_kva, ip_a
-        FROM rtm_panel_calc
-        WHERE panel_id = ?
-        """,
-        (panel_id,),
-    ).fetchone()
-    if row is None:
-        raise ValueError(f"rtm_panel_calc not found for panel_id={panel_id}")
-    p_kw = _coerce_float(row[0], "pp_kw", f"rtm_panel_calc.panel_id={panel_id}")
-    q_kvar = _coerce_float(row[1], "qp_kvar", f"rtm_panel_calc.panel_id={panel_id}")
-    s_kva = _coerce_float(row[2], "sp_kva", f"rtm_panel_calc.panel_id={panel_id}")
-    i_a = _coerce_float(row[3], "ip_a", f"rtm_panel_calc.panel_id={panel_id}")
-    return p_kw, q_kvar, s_kva, i_a
+def load_rtm_panel_calcs(
+    conn: sqlite3.Connection, panel_ids: list[str]
+) -> dict[str, tuple[float, float, float, float]]:
+    """
+    Prefetch rtm_panel_calc loads for all referenced panels (one query per
+    _IN_CHUNK ids instead of one per consumer). Every missing row is reported
+    in a single ValueError.
+    """
+    wanted = list(dict.fromkeys(panel_ids))
+    out: dict[str, tuple[float, float, float, float]] = {}
+    for start in range(0, len(wanted), _IN_CHUNK):
+        chunk = wanted[start : start + _IN_CHUNK]
+        rows = conn.execute(
+            f"""
+            SELECT panel_id, pp_kw, qp_kvar, sp_kva, ip_a
+            FROM rtm_panel_calc
+            WHERE panel_id IN ({", ".join(["?"] * len(chunk))})
+            """,
+            chunk,
+        ).fetchall()
+        for row in rows:
+            panel_id = str(row[0])
+            ctx = f"rtm_panel_calc.panel_id={panel_id}"
+            out[panel_id] = (
+                _coerce_float(row[1], "pp_kw", ctx),
+                _coerce_float(row[2], "qp_kvar", ctx),
+                _coerce_float(row[3], "sp_kva", ctx),
+                _coerce_float(row[4], "ip_a", ctx),
+            )
+    missing = [panel_id for panel_id in wanted if panel_id not in out]
+    if missing:
+        raise ValueError(f"rtm_panel_calc not found for panel_id={', '.join(missing)}")
+    return out
 
 
 def _load_from_manual(row: sqlite3.Row, consumer_id: str) -> tuple[float, float, float, float]:
@@ -125,6 +166,7 @@ def aggregate_section_loads(
     parent_panel_id: str,
     *,
     mode: str = "NORMAL",
+    diagnostics: Diagnostics | None = None,
 ) -> dict[str, SectionLoad]:
     if not parent_panel_id:
         raise ValueError("parent_panel_id is required")
@@ -132,12 +174,59 @@ def aggregate_section_loads(
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA foreign_keys = ON;")
 
-    feeds_v2 = _feeds_v2_enabled(conn)
-    mode_norm = _normalize_mode(mode, feeds_v2=feeds_v2)
+    feeds_v2 = feeds_v2_enabled(conn)
+    mode_norm = normalize_mode(mode, feeds_v2=feeds_v2)
+    return _aggregate_modes(
+        conn, [parent_panel_id], (mode_norm,), feeds_v2=feeds_v2, diagnostics=diagnostics
+    )[parent_panel_id][mode_norm]
 
-    consumers = conn.execute(
+
+def select_in_chunks(
+    conn: sqlite3.Connection,
+    sql: str,
+    ids: list[str],
+    column: str,
+    *,
+    params: tuple[object, ...] = (),
+) -> list[sqlite3.Row]:
+    """
+    Run `sql` with {id_filter} replaced by `column IN (...)` once per _IN_CHUNK ids
+    and concatenate the rows. Filter parameters go last.
+    """
+    rows: list[sqlite3.Row] = []
+    for start in range(0, len(ids), _IN_CHUNK):
+        chunk = ids[start : start + _IN_CHUNK]
+        id_filter = f"{column} IN ({', '.join(['?'] * len(chunk))})"
+        cur = conn.execute(sql.format(id_filter=id_filter), (*params, *chunk))
+        rows.extend(cur.fetchall())
+    return rows
+
+
+def select_for_panels(
+    conn: sqlite3.Connection,
+    sql: str,
+    panel_ids: list[str] | None,
+    *,
+    column: str = "panel_id",
+    params: tuple[object, ...] = (),
+) -> list[sqlite3.Row]:
+    """
+    Run `sql` with {panel_filter} replaced by `column IN (...)` per _IN_CHUNK panel
+    ids (select_in_chunks; panel_ids=None: no filter, one query).
+    """
+    if panel_ids is None:
+        return conn.execute(sql.format(panel_filter="1 = 1"), params).fetchall()
+    return select_in_chunks(
+        conn, sql.format(panel_filter="{id_filter}"), panel_ids, column, params=params
+    )
+
+
+def select_consumers(conn: sqlite3.Connection, panel_ids: list[str] | None) -> list[sqlite3.Row]:
+    return select_for_panels(
+        conn,
         """
         SELECT
+          panel_id,
           id AS consumer_id,
           name AS consumer_name,
           load_ref_type,
@@ -147,156 +236,398 @@ def aggregate_section_loads(
           s_kva,
           i_a
         FROM consumers
-        WHERE panel_id = ?
-        ORDER BY name ASC
+        WHERE {panel_filter}
+        ORDER BY panel_id ASC, name ASC
+        """,
+        panel_ids,
+    )
+
+
+def _aggregate_modes(
+    conn: sqlite3.Connection,
+    panel_ids: list[str] | None,
+    modes: tuple[str, ...],
+    *,
+    feeds_v2: bool,
+    diagnostics: Diagnostics | None = None,
+) -> dict[str, dict[str, dict[str, SectionLoad]]]:
+    """
+    Aggregate several (normalized) modes of many panels (None = every panel with
+    consumers). Returns {panel_id: {mode: {bus_section_id: SectionLoad}}}.
+
+    Feeds v2 DB with consumer_active_section (0015): one GROUP BY join over the
+    trigger-maintained active sections. Otherwise consumers, feeds, mode rules
+    and rtm_panel_calc are read with one query per table and the active feed is
+    resolved per mode in memory.
+    """
+    if feeds_v2 and schema_caps(conn).active_section:
+        loads = _aggregate_modes_materialized(conn, panel_ids, modes, diagnostics)
+        if loads is not None:
+            return loads
+    return _aggregate_modes_in_memory(
+        conn, panel_ids, modes, feeds_v2=feeds_v2, diagnostics=diagnostics
+    )
+
+
+def _aggregate_modes_materialized(
+    conn: sqlite3.Connection,
+    panel_ids: list[str] | None,
+    modes: tuple[str, ...],
+    diagnostics: Diagnostics | None,
+) -> dict[str, dict[str, dict[str, SectionLoad]]] | None:
+    """
+    GROUP BY (panel, mode, section) over consumer_active_section. Returns None
+    when some consumer load cannot be resolved in SQL (RTM_ROW, missing or NULL
+    rtm_panel_calc): the in-memory path then raises the detailed error.
+    """
+    placeholders = ", ".join(["?"] * len(modes))
+    rows = select_for_panels(
+        conn,
+        f"""
+        SELECT
+          c.panel_id,
+          a.mode,
+          a.bus_section_id,
+          COALESCE(bs.name, a.bus_section_id) AS section_name,
+          SUM(CASE WHEN c.load_ref_type = 'MANUAL' THEN c.p_kw ELSE r.pp_kw END) AS p_kw,
+          SUM(CASE WHEN c.load_ref_type = 'MANUAL' THEN c.q_kvar ELSE r.qp_kvar END) AS q_kvar,
+          SUM(CASE WHEN c.load_ref_type = 'MANUAL' THEN c.s_kva ELSE r.sp_kva END) AS s_kva,
+          SUM(CASE WHEN c.load_ref_type = 'MANUAL' THEN c.i_a ELSE r.ip_a END) AS i_a,
+          SUM(
+            c.load_ref_type <> 'MANUAL'
+            AND (
+              r.panel_id IS NULL
+              OR r.pp_kw IS NULL OR r.qp_kvar IS NULL OR r.sp_kva IS NULL OR r.ip_a IS NULL
+            )
+          ) AS unresolved_count
+        FROM consumer_active_section a
+        JOIN consumers c ON c.id = a.consumer_id
+        LEFT JOIN bus_sections bs ON bs.id = a.bus_section_id
+        LEFT JOIN rtm_panel_calc r
+          ON c.load_ref_type = 'RTM_PANEL' AND r.panel_id = c.load_ref_id
+        WHERE a.mode IN ({placeholders}) AND {{panel_filter}}
+        GROUP BY c.panel_id, a.mode, a.bus_section_id
+        ORDER BY c.panel_id ASC, a.mode ASC, MIN(c.name) ASC
         """,
-        (parent_panel_id,),
-    ).fetchall()
+        panel_ids,
+        column="c.panel_id",
+        params=modes,
+    )
+    if any(r["unresolved_count"] for r in rows):
+        return None
+
+    if diagnostics is not None:
+        _collect_consumers_without_section(conn, panel_ids, modes, diagnostics)
+    if panel_ids is None:
+        panels = [str(r[0]) for r in conn.execute("SELECT DISTINCT panel_id FROM consumers")]
+    else:
+        panels = [str(pid) for pid in panel_ids]
+    out: dict[str, dict[str, dict[str, SectionLoad]]] = {
+        panel_id: {m: {} for m in modes} for panel_id in panels
+    }
+    for r in rows:
+        bus_section_id = str(r["bus_section_id"])
+        out[str(r["panel_id"])][str(r["mode"])][bus_section_id] = SectionLoad(
+            bus_section_id=bus_section_id,
+            section_name=str(r["section_name"]),
+            p_kw=float(r["p_kw"]),
+            q_kvar=float(r["q_kvar"]),
+            s_kva=float(r["s_kva"]),
+            i_a=float(r["i_a"]),
+        )
+    return out
 
-    # consumer_id -> (bus_section_id, bus_section_name)
-    consumer_section: dict[str, tuple[str, str | None]] = {}
 
+def _collect_consumers_without_section(
+    conn: sqlite3.Connection,
+    panel_ids: list[str] | None,
+    modes: tuple[str, ...],
+    diagnostics: Diagnostics,
+) -> None:
+    values = " UNION ALL ".join(["SELECT ? AS mode"] * len(modes))
+    rows = select_for_panels(
+        conn,
+        f"""
+        SELECT c.id AS consumer_id, c.name AS consumer_name, m.mode
+        FROM consumers c
+        CROSS JOIN ({values}) m
+        LEFT JOIN consumer_active_section a ON a.consumer_id = c.id AND a.mode = m.mode
+        WHERE a.consumer_id IS NULL AND {{panel_filter}}
+        ORDER BY c.panel_id ASC, c.name ASC
+        """,
+        panel_ids,
+        column="c.panel_id",
+        params=modes,
+    )
+    for r in rows:
+        diagnostics.warn(
+            "CONSUMER_NO_ACTIVE_FEED",
+            consumer_id=str(r["consumer_id"]),
+            consumer_name=str(r["consumer_name"]),
+            mode=str(r["mode"]),
+        )
+
+
+def _aggregate_modes_in_memory(
+    conn: sqlite3.Connection,
+    panel_ids: list[str] | None,
+    modes: tuple[str, ...],
+    *,
+    feeds_v2: bool,
+    diagnostics: Diagnostics | None = None,
+) -> dict[str, dict[str, dict[str, SectionLoad]]]:
+    consumers = select_consumers(conn, panel_ids)
+    consumers_by_panel: dict[str, list[sqlite3.Row]] = {
+        str(pid): [] for pid in (panel_ids or ())
+    }
+    for row in consumers:
+        consumers_by_panel.setdefault(str(row["panel_id"]), []).append(row)
+
+    # mode -> consumer_id -> (bus_section_id, bus_section_name)
     if feeds_v2:
-        # Defaults if consumer_mode_rules row is missing.
-        default_role = "MAIN" if mode_norm == "NORMAL" else "RESERVE"
-
-        rules_rows = conn.execute(
-            """
-            SELECT consumer_id, active_feed_role_id
-            FROM consumer_mode_rules
-            WHERE mode_id = ?
-              AND consumer_id IN (SELECT id FROM consumers WHERE panel_id = ?)
-            """,
-            (mode_norm, parent_panel_id),
-        ).fetchall()
-        active_role_by_consumer = {
-            str(r["consumer_id"]): str(r["active_feed_role_id"]) for r in rules_rows
+        sections_by_mode = consumer_sections_v2(conn, panel_ids, consumers, modes)
+    else:
+        sections_by_mode = consumer_sections_v1(conn, panel_ids, modes)
+
+    # All RTM_PANEL loads of consumers that have a section in any mode, prefetched at once.
+    sectioned = {cid for m in modes for cid in sections_by_mode[m]}
+    rtm_loads = load_rtm_panel_calcs(conn, rtm_load_refs(consumers, sectioned))
+    return {
+        panel_id: {
+            m: _sum_section_loads(
+                panel_consumers,
+                sections_by_mode[m],
+                rtm_loads,
+                mode=m,
+                feeds_v2=feeds_v2,
+                diagnostics=diagnostics,
+            )
+            for m in modes
         }
+        for panel_id, panel_consumers in consumers_by_panel.items()
+    }
 
-        feed_rows = conn.execute(
-            """
-            SELECT
-              f.id AS feed_id,
-              f.consumer_id,
-              f.bus_section_id,
-              bs.name AS bus_section_name,
-              f.feed_role_id,
-              f.priority
-            FROM consumer_feeds f
-            LEFT JOIN bus_sections bs ON bs.id = f.bus_section_id
-            WHERE f.consumer_id IN (SELECT id FROM consumers WHERE panel_id = ?)
-            ORDER BY f.consumer_id ASC, f.priority ASC, f.id ASC
-            """,
-            (parent_panel_id,),
-        ).fetchall()
 
-        best_by_consumer_role: dict[tuple[str, str], tuple[str, str | None]] = {}
-        best_any_by_consumer: dict[str, tuple[str, str | None]] = {}
+@dataclass(frozen=True)
+class Feed:
+    """One Feeds v2 feed of a consumer with its bus section."""
+
+    feed_id: str
+    bus_section_id: str
+    bus_section_name: str | None
+    role_id: str | None
 
-        for fr in feed_rows:
-            cid = str(fr["consumer_id"])
-            bs_id = fr["bus_section_id"]
-            if bs_id is None:
-                continue
-            bs_id_str = str(bs_id)
-            bs_name = fr["bus_section_name"]
-            bs_name_str = str(bs_name) if bs_name is not None else None
 
-            if cid not in best_any_by_consumer:
-                best_any_by_consumer[cid] = (bs_id_str, bs_name_str)
+def default_role(mode: str) -> str:
+    # Defaults if consumer_mode_rules row is missing.
+    return "MAIN" if mode == "NORMAL" else "RESERVE"
 
-            role_id = fr["feed_role_id"]
-            if role_id is None:
-                continue
-            key = (cid, str(role_id))
-            if key not in best_by_consumer_role:
-                best_by_consumer_role[key] = (bs_id_str, bs_name_str)
 
+def load_feeds_v2(
+    conn: sqlite3.Connection,
+    panel_ids: list[str] | None,
+    modes: tuple[str, ...],
+) -> tuple[dict[tuple[str, str], str], dict[str, list[Feed]]]:
+    """
+    Returns (active feed role by (mode, consumer_id) from consumer_mode_rules,
+    consumer_id -> feeds with a bus section ordered by priority, id).
+    """
+    placeholders = ", ".join(["?"] * len(modes))
+    rules_rows = select_for_panels(
+        conn,
+        f"""
+        SELECT consumer_id, mode_id, active_feed_role_id
+        FROM consumer_mode_rules
+        WHERE mode_id IN ({placeholders})
+          AND consumer_id IN (SELECT id FROM consumers WHERE {{panel_filter}})
+        """,
+        panel_ids,
+        params=modes,
+    )
+    active_role_by_mode_consumer = {
+        (str(r["mode_id"]), str(r["consumer_id"])): str(r["active_feed_role_id"])
+        for r in rules_rows
+    }
+
+    feed_rows = select_for_panels(
+        conn,
+        """
+        SELECT
+          f.id AS feed_id,
+          f.consumer_id,
+          f.bus_section_id,
+          bs.name AS bus_section_name,
+          f.feed_role_id,
+          f.priority
+        FROM consumer_feeds f
+        LEFT JOIN bus_sections bs ON bs.id = f.bus_section_id
+        WHERE f.consumer_id IN (SELECT id FROM consumers WHERE {panel_filter})
+        ORDER BY f.consumer_id ASC, f.priority ASC, f.id ASC
+        """,
+        panel_ids,
+    )
+    feeds_by_consumer: dict[str, list[Feed]] = {}
+    for fr in feed_rows:
+        bs_id = fr["bus_section_id"]
+        if bs_id is None:
+            continue
+        bs_name = fr["bus_section_name"]
+        role_id = fr["feed_role_id"]
+        feeds_by_consumer.setdefault(str(fr["consumer_id"]), []).append(
+            Feed(
+                feed_id=str(fr["feed_id"]),
+                bus_section_id=str(bs_id),
+                bus_section_name=str(bs_name) if bs_name is not None else None,
+                role_id=str(role_id) if role_id is not None else None,
+            )
+        )
+    return active_role_by_mode_consumer, feeds_by_consumer
+
+
+def pick_feed(feeds: list[Feed], active_role: str) -> Feed | None:
+    """
+    Active feed: min priority of active_role, else MAIN, else any feed
+    (feeds are priority-ordered).
+    """
+    for f in feeds:
+        if f.role_id == active_role:
+            return f
+    # Fallback: prefer MAIN if requested role isn't present (e.g. RESERVE missing).
+    if active_role != "MAIN":
+        for f in feeds:
+            if f.role_id == "MAIN":
+                return f
+    # Final fallback: any feed by min(priority).
+    return feeds[0] if feeds else None
+
+
+def consumer_sections_v2(
+    conn: sqlite3.Connection,
+    panel_ids: list[str] | None,
+    consumers: list[sqlite3.Row],
+    modes: tuple[str, ...],
+) -> dict[str, dict[str, tuple[str, str | None]]]:
+    """mode -> consumer_id -> (bus_section_id, bus_section_name) via Feeds v2."""
+    active_role_by_mode_consumer, feeds_by_consumer = load_feeds_v2(conn, panel_ids, modes)
+
+    out: dict[str, dict[str, tuple[str, str | None]]] = {}
+    for mode_norm in modes:
+        mode_role = default_role(mode_norm)
+        consumer_section: dict[str, tuple[str, str | None]] = {}
         for cr in consumers:
             cid = str(cr["consumer_id"])
-            active_role = active_role_by_consumer.get(cid, default_role)
-            chosen = best_by_consumer_role.get((cid, active_role))
-
-            # Fallback: prefer MAIN if requested role isn't present (e.g. RESERVE missing).
-            if chosen is None and active_role != "MAIN":
-                chosen = best_by_consumer_role.get((cid, "MAIN"))
-            # Final fallback: any feed by min(priority).
-            if chosen is None:
-                chosen = best_any_by_consumer.get(cid)
+            active_role = active_role_by_mode_consumer.get((mode_norm, cid), mode_role)
+            chosen = pick_feed(feeds_by_consumer.get(cid, []), active_role)
             if chosen is not None:
-                consumer_section[cid] = chosen
-    else:
-        # Legacy path: select by v1 consumer_feeds.feed_role = NORMAL|RESERVE.
-        feed_role = mode_norm
-        rows = conn.execute(
-            """
-            SELECT
-              c.id AS consumer_id,
-              c.name AS consumer_name,
-              f.bus_section_id,
-              bs.name AS bus_section_name
-            FROM consumers c
-            LEFT JOIN consumer_feeds f
-              ON f.consumer_id = c.id AND f.feed_role = ?
-            LEFT JOIN bus_sections bs
-              ON bs.id = f.bus_section_id
-            WHERE c.panel_id = ?
-            ORDER BY c.name ASC
-            """,
-            (feed_role, parent_panel_id),
-        ).fetchall()
+                consumer_section[cid] = (chosen.bus_section_id, chosen.bus_section_name)
+        out[mode_norm] = consumer_section
+    return out
 
-        seen_consumers: set[str] = set()
-        for r in rows:
-            cid = str(r["consumer_id"])
-            if cid in seen_consumers:
-                raise ValueError(
-                    f"Multiple feeds for consumer_id={cid} and feed_role={feed_role}"
-                )
-            seen_consumers.add(cid)
-            bs_id = r["bus_section_id"]
-            if bs_id is None:
-                continue
-            bs_name = r["bus_section_name"]
-            consumer_section[cid] = (str(bs_id), str(bs_name) if bs_name is not None else None)
 
+def consumer_sections_v1(
+    conn: sqlite3.Connection,
+    panel_ids: list[str] | None,
+    modes: tuple[str, ...],
+) -> dict[str, dict[str, tuple[str, str | None]]]:
+    """mode -> consumer_id -> (bus_section_id, bus_section_name) via v1 consumer_feeds."""
+    # Legacy path: select by v1 consumer_feeds.feed_role = NORMAL|RESERVE.
+    placeholders = ", ".join(["?"] * len(modes))
+    rows = select_for_panels(
+        conn,
+        f"""
+        SELECT
+          f.consumer_id,
+          f.feed_role,
+          f.bus_section_id,
+          bs.name AS bus_section_name
+        FROM consumer_feeds f
+        JOIN consumers c ON c.id = f.consumer_id
+        LEFT JOIN bus_sections bs
+          ON bs.id = f.bus_section_id
+        WHERE f.feed_role IN ({placeholders}) AND {{panel_filter}}
+        ORDER BY c.name ASC
+        """,
+        panel_ids,
+        column="c.panel_id",
+        params=modes,
+    )
+
+    out: dict[str, dict[str, tuple[str, str | None]]] = {m: {} for m in modes}
+    seen: set[tuple[str, str]] = set()
+    for r in rows:
+        cid = str(r["consumer_id"])
+        feed_role = str(r["feed_role"])
+        if (cid, feed_role) in seen:
+            raise ValueError(
+                f"Multiple feeds for consumer_id={cid} and feed_role={feed_role}"
+            )
+        seen.add((cid, feed_role))
+        bs_id = r["bus_section_id"]
+        if bs_id is None:
+            continue
+        bs_name = r["bus_section_name"]
+        out[feed_role][cid] = (str(bs_id), str(bs_name) if bs_name is not None else None)
+    return out
+
+
+def rtm_load_refs(consumers: list[sqlite3.Row], consumer_ids: set[str]) -> list[str]:
+    """load_ref_id of RTM_PANEL consumers among consumer_ids (input of load_rtm_panel_calcs)."""
+    return [
+        str(row["load_ref_id"])
+        for row in consumers
+        if row["load_ref_type"] == "RTM_PANEL"
+        and row["load_ref_id"]
+        and str(row["consumer_id"]) in consumer_ids
+    ]
+
+
+def consumer_load(
+    row: sqlite3.Row, rtm_loads: dict[str, tuple[float, float, float, float]]
+) -> tuple[float, float, float, float]:
+    """(P, Q, S, I) of one consumer row by its load_ref_type."""
+    consumer_id = str(row["consumer_id"])
+    load_ref_type = row["load_ref_type"]
+    load_ref_id = row["load_ref_id"]
+    if load_ref_type == "RTM_PANEL":
+        if not load_ref_id:
+            raise ValueError(f"load_ref_id is required for consumer_id={consumer_id}")
+        return rtm_loads[str(load_ref_id)]
+    if load_ref_type == "MANUAL":
+        return _load_from_manual(row, consumer_id)
+    if load_ref_type == "RTM_ROW":
+        raise NotImplementedError(
+            f"RTM_ROW load_ref_type is not supported (consumer_id={consumer_id})"
+        )
+    raise ValueError(f"Unsupported load_ref_type={load_ref_type} (consumer_id={consumer_id})")
+
+
+def _sum_section_loads(
+    consumers: list[sqlite3.Row],
+    consumer_section: dict[str, tuple[str, str | None]],
+    rtm_loads: dict[str, tuple[float, float, float, float]],
+    *,
+    mode: str,
+    feeds_v2: bool,
+    diagnostics: Diagnostics | None = None,
+) -> dict[str, SectionLoad]:
     loads: dict[str, SectionLoad] = {}
 
     for row in consumers:
         consumer_id = str(row["consumer_id"])
-        consumer_name = str(row["consumer_name"])
 
         chosen = consumer_section.get(consumer_id)
         if chosen is None:
-            if feeds_v2:
-                print(
-                    f"WARNING: consumer '{consumer_name}' ({consumer_id}) "
-                    f"has no active feed for mode={mode_norm}; skipping"
-                )
-            else:
-                print(
-                    f"WARNING: consumer '{consumer_name}' ({consumer_id}) "
-                    f"has no {mode_norm} feed; skipping"
+            if diagnostics is not None:
+                diagnostics.warn(
+                    "CONSUMER_NO_ACTIVE_FEED" if feeds_v2 else "CONSUMER_NO_FEED",
+                    consumer_id=consumer_id,
+                    consumer_name=str(row["consumer_name"]),
+                    mode=mode,
                 )
             continue
         bus_section_id, bus_section_name = chosen
 
-        load_ref_type = row["load_ref_type"]
-        load_ref_id = row["load_ref_id"]
-        if load_ref_type == "RTM_PANEL":
-            if not load_ref_id:
-                raise ValueError(f"load_ref_id is required for consumer_id={consumer_id}")
-            p_kw, q_kvar, s_kva, i_a = _load_from_rtm_panel(conn, str(load_ref_id))
-        elif load_ref_type == "MANUAL":
-            p_kw, q_kvar, s_kva, i_a = _load_from_manual(row, consumer_id)
-        elif load_ref_type == "RTM_ROW":
-            raise NotImplementedError(
-                f"RTM_ROW load_ref_type is not supported (consumer_id={consumer_id})"
-            )
-        else:
-            raise ValueError(
-                f"Unsupported load_ref_type={load_ref_type} (consumer_id={consumer_id})"
-            )
+        p_kw, q_kvar, s_kva, i_a = consumer_load(row, rtm_loads)
 
         section_name = bus_section_name if bus_section_name is not None else bus_section_id
 
@@ -321,15 +652,11 @@ def aggregate_section_loads(
 
 
 def _section_calc_exists(conn: sqlite3.Connection) -> bool:
-    row = conn.execute(
-        "SELECT name FROM sqlite_master WHERE type='table' AND name='section_calc'"
-    ).fetchone()
-    return row is not None
+    return schema_caps(conn).has_table("section_calc")
 
 
 def _ensure_section_calc_columns(conn: sqlite3.Connection) -> None:
-    cols = conn.execute("PRAGMA table_info(section_calc)").fetchall()
-    col_names = {str(c[1]) for c in cols}
+    col_names = schema_caps(conn).columns_of("section_calc")
     required = {
         "panel_id",
         "bus_section_id",
@@ -348,46 +675,155 @@ def calc_section_loads(
     conn: sqlite3.Connection,
     parent_panel_id: str,
     mode: str = "NORMAL",
-) -> int:
+    *,
+    diagnostics: Diagnostics | None = None,
+) -> SectionCalcResult:
     """
     Aggregates loads per bus section and upserts into section_calc if available.
-    Returns number of sections written.
+    Returns the number of sections written ({parent_panel_id: {mode: n}}) and the
+    per-call warning counts; skipped consumers also go to `diagnostics`.
+    """
+    local = _call_diagnostics(diagnostics)
+    loads = aggregate_section_loads(conn, parent_panel_id, mode=mode, diagnostics=local)
+    feeds_v2 = feeds_v2_enabled(conn)
+    mode_norm = normalize_mode(mode, feeds_v2=feeds_v2)
+    if loads:
+        _upsert_section_calc(conn, {parent_panel_id: {mode_norm: loads}})
+        conn.commit()
+    return SectionCalcResult(
+        section_counts={parent_panel_id: {mode_norm: len(loads)}},
+        warning_counts=_warning_counts(local, diagnostics),
+    )
+
+
+def calc_section_loads_all_modes(
+    conn: sqlite3.Connection,
+    parent_panel_id: str,
+    modes: list[str] | tuple[str, ...] | None = None,
+    *,
+    diagnostics: Diagnostics | None = None,
+) -> SectionCalcResult:
+    """
+    Aggregates several modes at once (None = NORMAL + EMERGENCY; legacy DB:
+    NORMAL + RESERVE). Consumers, feeds, mode rules and schema capabilities are
+    read once; all section_calc rows are upserted in one transaction.
+    Returns {parent_panel_id: {mode: number of sections written}} and the per-call
+    warning counts.
+    """
+    if not parent_panel_id:
+        raise ValueError("parent_panel_id is required")
+
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON;")
+
+    feeds_v2 = feeds_v2_enabled(conn)
+    if modes is None:
+        modes = ("NORMAL", "EMERGENCY")
+    modes_norm = tuple(dict.fromkeys(normalize_mode(m, feeds_v2=feeds_v2) for m in modes))
+    if not modes_norm:
+        return SectionCalcResult(section_counts={})
+
+    local = _call_diagnostics(diagnostics)
+    loads_by_mode = _aggregate_modes(
+        conn, [parent_panel_id], modes_norm, feeds_v2=feeds_v2, diagnostics=local
+    )[parent_panel_id]
+    if any(loads_by_mode.values()):
+        try:
+            _upsert_section_calc(conn, {parent_panel_id: loads_by_mode})
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return SectionCalcResult(
+        section_counts={parent_panel_id: {m: len(loads) for m, loads in loads_by_mode.items()}},
+        warning_counts=_warning_counts(local, diagnostics),
+    )
+
+
+def calc_section_loads_project(
+    conn: sqlite3.Connection,
+    panel_ids: list[str] | None = None,
+    modes: list[str] | tuple[str, ...] | None = None,
+    *,
+    diagnostics: Diagnostics | None = None,
+) -> SectionCalcResult:
+    """
+    Project-wide section aggregation: every panel (None = all panels with
+    consumers) and every mode (None = NORMAL + EMERGENCY) from one query per
+    input table; consumer -> section maps are built in memory and all
+    section_calc rows are upserted with one executemany in one transaction.
+    Returns {panel_id: {mode: number of sections written}} and the per-call
+    warning counts.
     """
-    loads = aggregate_section_loads(conn, parent_panel_id, mode=mode)
-    if not loads:
-        return 0
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON;")
 
+    feeds_v2 = feeds_v2_enabled(conn)
+    if modes is None:
+        modes = ("NORMAL", "EMERGENCY")
+    modes_norm = tuple(dict.fromkeys(normalize_mode(m, feeds_v2=feeds_v2) for m in modes))
+    selected: list[str] | None = None
+    if panel_ids is not None:
+        selected = sorted({str(p).strip() for p in panel_ids if p and str(p).strip()})
+        if not selected:
+            return SectionCalcResult(section_counts={})
+    if not modes_norm:
+        return SectionCalcResult(section_counts={})
+
+    local = _call_diagnostics(diagnostics)
+    loads_by_panel = _aggregate_modes(
+        conn, selected, modes_norm, feeds_v2=feeds_v2, diagnostics=local
+    )
+    if any(loads for by_mode in loads_by_panel.values() for loads in by_mode.values()):
+        try:
+            _upsert_section_calc(conn, loads_by_panel)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return SectionCalcResult(
+        section_counts={
+            panel_id: {m: len(loads) for m, loads in by_mode.items()}
+            for panel_id, by_mode in sorted(loads_by_panel.items())
+        },
+        warning_counts=_warning_counts(local, diagnostics),
+    )
+
+
+def _upsert_section_calc(
+    conn: sqlite3.Connection,
+    loads_by_panel: dict[str, dict[str, dict[str, SectionLoad]]],
+) -> None:
     if not _section_calc_exists(conn):
         raise RuntimeError("section_calc table does not exist; cannot persist results")
 
     _ensure_section_calc_columns(conn)
 
-    feeds_v2 = _feeds_v2_enabled(conn)
-    mode_norm = _normalize_mode(mode, feeds_v2=feeds_v2)
-    for entry in loads.values():
-        conn.execute(
-            """
-            INSERT INTO section_calc (
-              panel_id, bus_section_id, mode, p_kw, q_kvar, s_kva, i_a, updated_at
-            )
-            VALUES (?, ?, ?, ?, ?, ?, ?, datetime('now'))
-            ON CONFLICT(panel_id, bus_section_id, mode) DO UPDATE SET
-              p_kw = excluded.p_kw,
-              q_kvar = excluded.q_kvar,
-              s_kva = excluded.s_kva,
-              i_a = excluded.i_a,
-              updated_at = datetime('now')
-            """,
+    conn.executemany(
+        """
+        INSERT INTO section_calc (
+          panel_id, bus_section_id, mode, p_kw, q_kvar, s_kva, i_a, updated_at
+        )
+        VALUES (?, ?, ?, ?, ?, ?, ?, datetime('now'))
+        ON CONFLICT(panel_id, bus_section_id, mode) DO UPDATE SET
+          p_kw = excluded.p_kw,
+          q_kvar = excluded.q_kvar,
+          s_kva = excluded.s_kva,
+          i_a = excluded.i_a,
+          updated_at = datetime('now')
+        """,
+        [
             (
-                parent_panel_id,
+                panel_id,
                 entry.bus_section_id,
                 mode_norm,
                 entry.p_kw,
                 entry.q_kvar,
                 entry.s_kva,
                 entry.i_a,
-            ),
-        )
-
-    conn.commit()
-    return len(loads)
+            )
+            for panel_id, loads_by_mode in loads_by_panel.items()
+            for mode_norm, loads in loads_by_mode.items()
+            for entry in loads.values()
+        ],
+    )
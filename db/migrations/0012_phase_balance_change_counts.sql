@@ -0,0 +1,12 @@
+-- 0012_phase_balance_change_counts.sql
+-- MVP-BAL: change-only writes — how many reassignable circuits changed phase in the last run.
+-- Idempotent: ADD COLUMN is not idempotent in SQLite
+-- (migration relies on schema_migrations to run once).
+
+PRAGMA foreign_keys = ON;
+
+-- panel_phase_balance: AUTO circuits whose circuits.phase was rewritten by the last run
+ALTER TABLE panel_phase_balance ADD COLUMN changed_count INT NOT NULL DEFAULT 0;
+
+-- panel_phase_balance: AUTO circuits that kept their phase (not written)
+ALTER TABLE panel_phase_balance ADD COLUMN unchanged_count INT NOT NULL DEFAULT 0;
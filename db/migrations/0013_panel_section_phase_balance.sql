@@ -0,0 +1,19 @@
+-- 0013_panel_section_phase_balance.sql
+-- MVP-BAL: per-bus-section phase balance totals (each bus section is its own 3-phase system).
+
+PRAGMA foreign_keys = ON;
+
+CREATE TABLE IF NOT EXISTS panel_section_phase_balance (
+  panel_id TEXT NOT NULL REFERENCES panels(id) ON DELETE CASCADE,
+  bus_section_id TEXT NOT NULL REFERENCES bus_sections(id) ON DELETE CASCADE,
+  mode TEXT NOT NULL CHECK(mode IN ('NORMAL','EMERGENCY')),
+  circuit_count INT NOT NULL DEFAULT 0,
+  i_l1 REAL NOT NULL,
+  i_l2 REAL NOT NULL,
+  i_l3 REAL NOT NULL,
+  unbalance_pct REAL NOT NULL,
+  updated_at TEXT NOT NULL,
+  PRIMARY KEY(panel_id, bus_section_id, mode)
+);
+
+CREATE INDEX IF NOT EXISTS idx_panel_section_phase_balance_panel_id ON panel_section_phase_balance(panel_id);
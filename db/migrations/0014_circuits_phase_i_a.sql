@@ -0,0 +1,10 @@
+-- 0014_circuits_phase_i_a.sql
+-- MVP-BAL: incremental placement — current accounted in panel_phase_balance per circuit.
+-- Idempotent: ADD COLUMN is not idempotent in SQLite
+-- (migration relies on schema_migrations to run once).
+
+PRAGMA foreign_keys = ON;
+
+-- circuits.phase_i_a: I of the circuit included in the stored phase sums at its last
+-- placement (NULL = not accounted yet, e.g. circuit added after the last phase balance run)
+ALTER TABLE circuits ADD COLUMN phase_i_a REAL NULL;
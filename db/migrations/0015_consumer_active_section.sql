@@ -0,0 +1,130 @@
+-- 0015_consumer_active_section.sql
+-- Feeds v2: materialized active bus section per (consumer, mode), kept current by triggers.
+-- Resolution rules = SECTION_AGG_V2 (active role by min priority, else MAIN, else any feed).
+-- Idempotent: CREATE ... IF NOT EXISTS + backfill with INSERT OR REPLACE.
+
+PRAGMA foreign_keys = ON;
+
+-- Active feed per (consumer, mode): NULL when the consumer has no feeds.
+-- Role from consumer_mode_rules, default NORMAL -> MAIN, EMERGENCY -> RESERVE.
+-- Tiers: active role, then MAIN, then any role; each tier by priority, id.
+CREATE VIEW IF NOT EXISTS v_consumer_active_feed AS
+SELECT
+  cm.consumer_id,
+  cm.mode,
+  COALESCE(
+    (
+      SELECT f.id FROM consumer_feeds f
+      WHERE f.consumer_id = cm.consumer_id AND f.feed_role_id = cm.active_role
+      ORDER BY f.priority ASC, f.id ASC LIMIT 1
+    ),
+    (
+      SELECT f.id FROM consumer_feeds f
+      WHERE f.consumer_id = cm.consumer_id AND f.feed_role_id = 'MAIN'
+      ORDER BY f.priority ASC, f.id ASC LIMIT 1
+    ),
+    (
+      SELECT f.id FROM consumer_feeds f
+      WHERE f.consumer_id = cm.consumer_id
+      ORDER BY f.priority ASC, f.id ASC LIMIT 1
+    )
+  ) AS feed_id
+FROM (
+  SELECT
+    c.id AS consumer_id,
+    m.mode AS mode,
+    COALESCE(
+      r.active_feed_role_id,
+      CASE m.mode WHEN 'NORMAL' THEN 'MAIN' ELSE 'RESERVE' END
+    ) AS active_role
+  FROM consumers c
+  CROSS JOIN (SELECT 'NORMAL' AS mode UNION ALL SELECT 'EMERGENCY' AS mode) m
+  LEFT JOIN consumer_mode_rules r ON r.consumer_id = c.id AND r.mode_id = m.mode
+) cm;
+
+CREATE TABLE IF NOT EXISTS consumer_active_section (
+  consumer_id TEXT NOT NULL REFERENCES consumers(id) ON DELETE CASCADE,
+  mode TEXT NOT NULL CHECK(mode IN ('NORMAL','EMERGENCY')),
+  feed_id TEXT NOT NULL,
+  bus_section_id TEXT NOT NULL REFERENCES bus_sections(id) ON DELETE CASCADE,
+  PRIMARY KEY(consumer_id, mode)
+);
+
+CREATE INDEX IF NOT EXISTS idx_consumer_active_section_bus_section_id ON consumer_active_section(bus_section_id);
+CREATE INDEX IF NOT EXISTS idx_consumer_active_section_mode ON consumer_active_section(mode);
+
+-- Backfill for existing consumers.
+INSERT OR REPLACE INTO consumer_active_section (consumer_id, mode, feed_id, bus_section_id)
+SELECT v.consumer_id, v.mode, f.id, f.bus_section_id
+FROM v_consumer_active_feed v
+JOIN consumer_feeds f ON f.id = v.feed_id;
+
+-- Triggers: every change of consumer_feeds / consumer_mode_rules re-resolves both modes
+-- of the affected consumer(s). Deleted consumers/sections are handled by ON DELETE CASCADE
+-- (consumer_feeds rows removed by a cascade fire the consumer_feeds triggers).
+
+CREATE TRIGGER IF NOT EXISTS trg_consumer_feeds_ai_active_section
+AFTER INSERT ON consumer_feeds
+BEGIN
+  DELETE FROM consumer_active_section WHERE consumer_id = NEW.consumer_id;
+  INSERT INTO consumer_active_section (consumer_id, mode, feed_id, bus_section_id)
+  SELECT v.consumer_id, v.mode, f.id, f.bus_section_id
+  FROM v_consumer_active_feed v
+  JOIN consumer_feeds f ON f.id = v.feed_id
+  WHERE v.consumer_id = NEW.consumer_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_consumer_feeds_ad_active_section
+AFTER DELETE ON consumer_feeds
+BEGIN
+  DELETE FROM consumer_active_section WHERE consumer_id = OLD.consumer_id;
+  INSERT INTO consumer_active_section (consumer_id, mode, feed_id, bus_section_id)
+  SELECT v.consumer_id, v.mode, f.id, f.bus_section_id
+  FROM v_consumer_active_feed v
+  JOIN consumer_feeds f ON f.id = v.feed_id
+  WHERE v.consumer_id = OLD.consumer_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_consumer_feeds_au_active_section
+AFTER UPDATE OF id, consumer_id, bus_section_id, feed_role_id, priority ON consumer_feeds
+BEGIN
+  DELETE FROM consumer_active_section WHERE consumer_id IN (OLD.consumer_id, NEW.consumer_id);
+  INSERT INTO consumer_active_section (consumer_id, mode, feed_id, bus_section_id)
+  SELECT v.consumer_id, v.mode, f.id, f.bus_section_id
+  FROM v_consumer_active_feed v
+  JOIN consumer_feeds f ON f.id = v.feed_id
+  WHERE v.consumer_id IN (OLD.consumer_id, NEW.consumer_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_consumer_mode_rules_ai_active_section
+AFTER INSERT ON consumer_mode_rules
+BEGIN
+  DELETE FROM consumer_active_section WHERE consumer_id = NEW.consumer_id;
+  INSERT INTO consumer_active_section (consumer_id, mode, feed_id, bus_section_id)
+  SELECT v.consumer_id, v.mode, f.id, f.bus_section_id
+  FROM v_consumer_active_feed v
+  JOIN consumer_feeds f ON f.id = v.feed_id
+  WHERE v.consumer_id = NEW.consumer_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_consumer_mode_rules_ad_active_section
+AFTER DELETE ON consumer_mode_rules
+BEGIN
+  DELETE FROM consumer_active_section WHERE consumer_id = OLD.consumer_id;
+  INSERT INTO consumer_active_section (consumer_id, mode, feed_id, bus_section_id)
+  SELECT v.consumer_id, v.mode, f.id, f.bus_section_id
+  FROM v_consumer_active_feed v
+  JOIN consumer_feeds f ON f.id = v.feed_id
+  WHERE v.consumer_id = OLD.consumer_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_consumer_mode_rules_au_active_section
+AFTER UPDATE ON consumer_mode_rules
+BEGIN
+  DELETE FROM consumer_active_section WHERE consumer_id IN (OLD.consumer_id, NEW.consumer_id);
+  INSERT INTO consumer_active_section (consumer_id, mode, feed_id, bus_section_id)
+  SELECT v.consumer_id, v.mode, f.id, f.bus_section_id
+  FROM v_consumer_active_feed v
+  JOIN consumer_feeds f ON f.id = v.feed_id
+  WHERE v.consumer_id IN (OLD.consumer_id, NEW.consumer_id);
+END;
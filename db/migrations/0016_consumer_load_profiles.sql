@@ -0,0 +1,16 @@
+-- 0016_consumer_load_profiles.sql
+-- Optional time-series load profiles per consumer (coincident-peak section aggregation).
+-- Values: little-endian float32 (4 bytes per point), e.g. 8760 hourly points or a typical
+-- day (24 points at step_minutes=60). q_kvar NULL: Q(t) = P(t) * Q/P of the consumer peak.
+-- Idempotent: CREATE ... IF NOT EXISTS.
+
+PRAGMA foreign_keys = ON;
+
+CREATE TABLE IF NOT EXISTS consumer_load_profiles (
+  consumer_id TEXT PRIMARY KEY REFERENCES consumers(id) ON DELETE CASCADE,
+  step_minutes INTEGER NOT NULL DEFAULT 60 CHECK (step_minutes > 0),
+  points INTEGER NOT NULL CHECK (points > 0),
+  p_kw BLOB NOT NULL CHECK (length(p_kw) = 4 * points),
+  q_kvar BLOB CHECK (q_kvar IS NULL OR length(q_kvar) = 4 * points),
+  updated_at TEXT NOT NULL
+);
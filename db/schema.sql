@@ -2,7 +2,7 @@
 -- Агрегированный слепок схемы (MVP-0.3 + Feeds v2).
 -- Источник истины для эволюции схемы — миграции в db/migrations/.
 --
--- Схема: 0001..0004 + 0005_feeds_v2_refs + 0006_section_calc_mode_emergency + 0007_phase_balance + 0008_phase_source + 0009_phase_balance_warnings + 0010_circuits_bus_section + 0011_feeds_sections_a1
+-- Схема: 0001..0004 + 0005_feeds_v2_refs + 0006_section_calc_mode_emergency + 0007_phase_balance + 0008_phase_source + 0009_phase_balance_warnings + 0010_circuits_bus_section + 0011_feeds_sections_a1 + 0012_phase_balance_change_counts + 0013_panel_section_phase_balance + 0014_circuits_phase_i_a + 0015_consumer_active_section + 0016_consumer_load_profiles
 
 PRAGMA foreign_keys = ON;
 
@@ -117,6 +117,135 @@ CREATE TABLE IF NOT EXISTS consumer_mode_rules (
 CREATE INDEX IF NOT EXISTS idx_consumer_mode_rules_consumer_id ON consumer_mode_rules(consumer_id);
 CREATE INDEX IF NOT EXISTS idx_consumer_mode_rules_mode_id ON consumer_mode_rules(mode_id);
 
+-- Активная секция шин потребителя по режиму (материализовано, поддерживается триггерами)
+-- Active feed per (consumer, mode): NULL when the consumer has no feeds.
+-- Role from consumer_mode_rules, default NORMAL -> MAIN, EMERGENCY -> RESERVE.
+-- Tiers: active role, then MAIN, then any role; each tier by priority, id.
+CREATE VIEW IF NOT EXISTS v_consumer_active_feed AS
+SELECT
+  cm.consumer_id,
+  cm.mode,
+  COALESCE(
+    (
+      SELECT f.id FROM consumer_feeds f
+      WHERE f.consumer_id = cm.consumer_id AND f.feed_role_id = cm.active_role
+      ORDER BY f.priority ASC, f.id ASC LIMIT 1
+    ),
+    (
+      SELECT f.id FROM consumer_feeds f
+      WHERE f.consumer_id = cm.consumer_id AND f.feed_role_id = 'MAIN'
+      ORDER BY f.priority ASC, f.id ASC LIMIT 1
+    ),
+    (
+      SELECT f.id FROM consumer_feeds f
+      WHERE f.consumer_id = cm.consumer_id
+      ORDER BY f.priority ASC, f.id ASC LIMIT 1
+    )
+  ) AS feed_id
+FROM (
+  SELECT
+    c.id AS consumer_id,
+    m.mode AS mode,
+    COALESCE(
+      r.active_feed_role_id,
+      CASE m.mode WHEN 'NORMAL' THEN 'MAIN' ELSE 'RESERVE' END
+    ) AS active_role
+  FROM consumers c
+  CROSS JOIN (SELECT 'NORMAL' AS mode UNION ALL SELECT 'EMERGENCY' AS mode) m
+  LEFT JOIN consumer_mode_rules r ON r.consumer_id = c.id AND r.mode_id = m.mode
+) cm;
+
+CREATE TABLE IF NOT EXISTS consumer_active_section (
+  consumer_id TEXT NOT NULL REFERENCES consumers(id) ON DELETE CASCADE,
+  mode TEXT NOT NULL CHECK(mode IN ('NORMAL','EMERGENCY')),
+  feed_id TEXT NOT NULL,
+  bus_section_id TEXT NOT NULL REFERENCES bus_sections(id) ON DELETE CASCADE,
+  PRIMARY KEY(consumer_id, mode)
+);
+
+CREATE INDEX IF NOT EXISTS idx_consumer_active_section_bus_section_id ON consumer_active_section(bus_section_id);
+CREATE INDEX IF NOT EXISTS idx_consumer_active_section_mode ON consumer_active_section(mode);
+
+-- Triggers: every change of consumer_feeds / consumer_mode_rules re-resolves both modes
+-- of the affected consumer(s). Deleted consumers/sections are handled by ON DELETE CASCADE
+-- (consumer_feeds rows removed by a cascade fire the consumer_feeds triggers).
+
+CREATE TRIGGER IF NOT EXISTS trg_consumer_feeds_ai_active_section
+AFTER INSERT ON consumer_feeds
+BEGIN
+  DELETE FROM consumer_active_section WHERE consumer_id = NEW.consumer_id;
+  INSERT INTO consumer_active_section (consumer_id, mode, feed_id, bus_section_id)
+  SELECT v.consumer_id, v.mode, f.id, f.bus_section_id
+  FROM v_consumer_active_feed v
+  JOIN consumer_feeds f ON f.id = v.feed_id
+  WHERE v.consumer_id = NEW.consumer_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_consumer_feeds_ad_active_section
+AFTER DELETE ON consumer_feeds
+BEGIN
+  DELETE FROM consumer_active_section WHERE consumer_id = OLD.consumer_id;
+  INSERT INTO consumer_active_section (consumer_id, mode, feed_id, bus_section_id)
+  SELECT v.consumer_id, v.mode, f.id, f.bus_section_id
+  FROM v_consumer_active_feed v
+  JOIN consumer_feeds f ON f.id = v.feed_id
+  WHERE v.consumer_id = OLD.consumer_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_consumer_feeds_au_active_section
+AFTER UPDATE OF id, consumer_id, bus_section_id, feed_role_id, priority ON consumer_feeds
+BEGIN
+  DELETE FROM consumer_active_section WHERE consumer_id IN (OLD.consumer_id, NEW.consumer_id);
+  INSERT INTO consumer_active_section (consumer_id, mode, feed_id, bus_section_id)
+  SELECT v.consumer_id, v.mode, f.id, f.bus_section_id
+  FROM v_consumer_active_feed v
+  JOIN consumer_feeds f ON f.id = v.feed_id
+  WHERE v.consumer_id IN (OLD.consumer_id, NEW.consumer_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_consumer_mode_rules_ai_active_section
+AFTER INSERT ON consumer_mode_rules
+BEGIN
+  DELETE FROM consumer_active_section WHERE consumer_id = NEW.consumer_id;
+  INSERT INTO consumer_active_section (consumer_id, mode, feed_id, bus_section_id)
+  SELECT v.consumer_id, v.mode, f.id, f.bus_section_id
+  FROM v_consumer_active_feed v
+  JOIN consumer_feeds f ON f.id = v.feed_id
+  WHERE v.consumer_id = NEW.consumer_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_consumer_mode_rules_ad_active_section
+AFTER DELETE ON consumer_mode_rules
+BEGIN
+  DELETE FROM consumer_active_section WHERE consumer_id = OLD.consumer_id;
+  INSERT INTO consumer_active_section (consumer_id, mode, feed_id, bus_section_id)
+  SELECT v.consumer_id, v.mode, f.id, f.bus_section_id
+  FROM v_consumer_active_feed v
+  JOIN consumer_feeds f ON f.id = v.feed_id
+  WHERE v.consumer_id = OLD.consumer_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_consumer_mode_rules_au_active_section
+AFTER UPDATE ON consumer_mode_rules
+BEGIN
+  DELETE FROM consumer_active_section WHERE consumer_id IN (OLD.consumer_id, NEW.consumer_id);
+  INSERT INTO consumer_active_section (consumer_id, mode, feed_id, bus_section_id)
+  SELECT v.consumer_id, v.mode, f.id, f.bus_section_id
+  FROM v_consumer_active_feed v
+  JOIN consumer_feeds f ON f.id = v.feed_id
+  WHERE v.consumer_id IN (OLD.consumer_id, NEW.consumer_id);
+END;
+
+-- Профили нагрузки потребителей (float32 LE, совпадающий максимум по секциям)
+CREATE TABLE IF NOT EXISTS consumer_load_profiles (
+  consumer_id TEXT PRIMARY KEY REFERENCES consumers(id) ON DELETE CASCADE,
+  step_minutes INTEGER NOT NULL DEFAULT 60 CHECK (step_minutes > 0),
+  points INTEGER NOT NULL CHECK (points > 0),
+  p_kw BLOB NOT NULL CHECK (length(p_kw) = 4 * points),
+  q_kvar BLOB CHECK (q_kvar IS NULL OR length(q_kvar) = 4 * points),
+  updated_at TEXT NOT NULL
+);
+
 -- Расчёт по секциям шин (v2: NORMAL/EMERGENCY)
 CREATE TABLE IF NOT EXISTS section_calc (
   panel_id TEXT NOT NULL REFERENCES panels(id) ON DELETE CASCADE,
@@ -150,6 +279,7 @@ CREATE TABLE IF NOT EXISTS circuits (
   phase TEXT NULL CHECK (phase IN ('L1','L2','L3')),
   phase_source TEXT NOT NULL DEFAULT 'AUTO' CHECK (phase_source IN ('AUTO','MANUAL')),
   bus_section_id TEXT NULL REFERENCES bus_sections(id) ON DELETE SET NULL,
+  phase_i_a REAL NULL,
   FOREIGN KEY(panel_id) REFERENCES panels(id) ON DELETE CASCADE
 );
 
@@ -258,8 +388,26 @@ CREATE TABLE IF NOT EXISTS panel_phase_balance (
   updated_at TEXT NOT NULL,
   invalid_manual_count INT NOT NULL DEFAULT 0,
   warnings_json TEXT NULL,
+  changed_count INT NOT NULL DEFAULT 0,
+  unchanged_count INT NOT NULL DEFAULT 0,
   PRIMARY KEY(panel_id, mode)
 );
 
 CREATE INDEX IF NOT EXISTS idx_panel_phase_balance_panel_id ON panel_phase_balance(panel_id);
-CREATE INDEX IF NOT EXISTS idx_panel_phase_balance_mode ON panel_phase_balance(mode);
\ No newline at end of file
+CREATE INDEX IF NOT EXISTS idx_panel_phase_balance_mode ON panel_phase_balance(mode);
+
+-- Фазировка по секциям шин (MVP-BAL): итоги L1/L2/L3 каждой секции
+CREATE TABLE IF NOT EXISTS panel_section_phase_balance (
+  panel_id TEXT NOT NULL REFERENCES panels(id) ON DELETE CASCADE,
+  bus_section_id TEXT NOT NULL REFERENCES bus_sections(id) ON DELETE CASCADE,
+  mode TEXT NOT NULL CHECK(mode IN ('NORMAL','EMERGENCY')),
+  circuit_count INT NOT NULL DEFAULT 0,
+  i_l1 REAL NOT NULL,
+  i_l2 REAL NOT NULL,
+  i_l3 REAL NOT NULL,
+  unbalance_pct REAL NOT NULL,
+  updated_at TEXT NOT NULL,
+  PRIMARY KEY(panel_id, bus_section_id, mode)
+);
+
+CREATE INDEX IF NOT EXISTS idx_panel_section_phase_balance_panel_id ON panel_section_phase_balance(panel_id);
\ No newline at end of file
@@ -6,7 +6,7 @@
 (defun c:IMPORT_ATTRS (/ basepath dict-panel dict-circuits dict-sections
                         ss i n ent edata blocks-scanned blocks-with-guid
                         updated-count skipped-no-guid guid-not-found
-                        guid mode attrs-to-apply)
+                        guid mode attrs-to-apply grouped)
   (princ "\nIMPORT_ATTRS: Import CSV attributes into blocks by GUID.")
   ;; 1) Prompt for folder containing CSV files
   (setq basepath (getstring T "\nEnter folder path containing CSV files (e.g. out/ or C:/out): "))
@@ -18,10 +18,17 @@
       (if (and (> (strlen basepath) 0)
                (not (wcmatch basepath "*[/\\]")))
         (setq basepath (strcat basepath "/")))
-      ;; 2) Load and parse 3 CSV files
-      (setq dict-panel   (_import_parse_csv_2col (strcat basepath "attrs_panel.csv")))
-      (setq dict-circuits (_import_parse_csv_2col (strcat basepath "attrs_circuits.csv")))
-      (setq dict-sections (_import_parse_csv_3col (strcat basepath "attrs_sections.csv")))
+      ;; 2) Load attrs_grouped.sexp if exported with --grouped, else parse 3 CSV files
+      (if (setq grouped (_import_load_grouped (strcat basepath "attrs_grouped.sexp")))
+        (progn
+          (princ "\nUsing attrs_grouped.sexp")
+          (setq dict-panel    (nth 0 grouped)
+                dict-circuits (nth 1 grouped)
+                dict-sections (nth 2 grouped)))
+        (progn
+          (setq dict-panel   (_import_parse_csv_2col (strcat basepath "attrs_panel.csv")))
+          (setq dict-circuits (_import_parse_csv_2col (strcat basepath "attrs_circuits.csv")))
+          (setq dict-sections (_import_parse_csv_3col (strcat basepath "attrs_sections.csv")))))
       ;; 3) Initialize counters
       (setq blocks-scanned 0
             blocks-with-guid 0
@@ -72,6 +79,34 @@
         (princ "\nNo INSERT entities found in drawing.")))
   (princ))
 
+;;; Load grouped file: one record per line, sorted by GUID
+;;;   ("PANEL" GUID nil (ATTR . VALUE) ...) / ("CIRCUIT" GUID nil ...) / ("SECTION" GUID MODE ...)
+;;; Each line is one `read`; section modes of a GUID are consecutive, so the build is linear.
+;;; Returns (dict-panel dict-circuits dict-sections) in the CSV dict shapes, nil if no file.
+(defun _import_load_grouped (fpath / fd line rec kind guid attrs panel circuits sections)
+  (if (setq fd (open fpath "r"))
+    (progn
+      (while (setq line (read-line fd))
+        (if (and (> (strlen (vl-string-trim " \t\r" line)) 0)
+                 (setq rec (read line)))
+          (progn
+            (setq kind  (nth 0 rec)
+                  guid  (nth 1 rec)
+                  attrs (cdddr rec))
+            (cond
+              ((equal kind "PANEL")
+               (setq panel (cons (cons guid attrs) panel)))
+              ((equal kind "CIRCUIT")
+               (setq circuits (cons (cons guid attrs) circuits)))
+              ((equal kind "SECTION")
+               (if (equal guid (car (car sections)))
+                 (setq sections (cons (cons guid (cons (cons (nth 2 rec) attrs) (cdr (car sections))))
+                                      (cdr sections)))
+                 (setq sections (cons (cons guid (list (cons (nth 2 rec) attrs))) sections))))))))
+      (close fd)
+      (list (reverse panel) (reverse circuits) (reverse sections)))
+    nil))
+
 ;;; Parse CSV file: GUID,ATTR,VALUE (2-col value: ATTR,VALUE)
 ;;; Returns: ((GUID . ((ATTR . VALUE) ...)) ...)
 (defun _import_parse_csv_2col (fpath / fd line parts guid attr val result row)
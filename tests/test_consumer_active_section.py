@@ -0,0 +1,223 @@
+"""
+Feeds v2: trigger-maintained consumer_active_section (0015) vs in-memory feed resolution.
+"""
+
+from __future__ import annotations
+
+import random
+import sqlite3
+import sys
+import uuid
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+ROLES = ("MAIN", "RESERVE", "DG", None)
+
+
+def _uuid() -> str:
+    return str(uuid.uuid4())
+
+
+def _seed_panel(
+    con: sqlite3.Connection, rng: random.Random, n_consumers: int
+) -> tuple[str, list[str], list[str]]:
+    panel_id = _uuid()
+    con.execute(
+        "INSERT INTO panels (id, name, system_type, u_ll_v, u_ph_v) VALUES (?, ?, ?, ?, ?)",
+        (panel_id, "P", "3PH", 400.0, 230.0),
+    )
+    sections = [_uuid() for _ in range(3)]
+    for i, sid in enumerate(sections):
+        con.execute(
+            "INSERT INTO bus_sections (id, panel_id, name) VALUES (?, ?, ?)",
+            (sid, panel_id, f"S{i + 1}"),
+        )
+    consumers = [_uuid() for _ in range(n_consumers)]
+    for i, cid in enumerate(consumers):
+        i_a = float(rng.randint(1, 20))
+        con.execute(
+            """
+            INSERT INTO consumers (id, panel_id, name, load_ref_type, load_ref_id, p_kw, q_kvar, s_kva, i_a)
+            VALUES (?, ?, ?, 'MANUAL', ?, ?, ?, ?, ?)
+            """,
+            (cid, panel_id, f"C{i:03d}", cid, i_a / 2.0, i_a / 4.0, i_a / 1.5, i_a),
+        )
+    return panel_id, sections, consumers
+
+
+def _add_feed(con: sqlite3.Connection, rng: random.Random, consumer_id: str, sections: list[str]) -> None:
+    role = rng.choice(ROLES)
+    con.execute(
+        """
+        INSERT INTO consumer_feeds (id, consumer_id, bus_section_id, feed_role, feed_role_id, priority)
+        VALUES (?, ?, ?, ?, ?, ?)
+        """,
+        (
+            _uuid(),
+            consumer_id,
+            rng.choice(sections),
+            "NORMAL" if role in ("MAIN", None) else "RESERVE",
+            role,
+            rng.randint(1, 3),
+        ),
+    )
+
+
+def _materialized(con: sqlite3.Connection) -> dict[tuple[str, str], tuple[str, str]]:
+    rows = con.execute(
+        "SELECT consumer_id, mode, feed_id, bus_section_id FROM consumer_active_section"
+    ).fetchall()
+    return {(str(r[0]), str(r[1])): (str(r[2]), str(r[3])) for r in rows}
+
+
+def _expected(con: sqlite3.Connection) -> dict[tuple[str, str], tuple[str, str]]:
+    from calc_core.section_aggregation import default_role, load_feeds_v2, pick_feed
+
+    con.row_factory = sqlite3.Row
+    modes = ("NORMAL", "EMERGENCY")
+    active_roles, feeds_by_consumer = load_feeds_v2(con, None, modes)
+    out: dict[tuple[str, str], tuple[str, str]] = {}
+    for (cid,) in con.execute("SELECT id FROM consumers").fetchall():
+        for mode in modes:
+            role = active_roles.get((mode, str(cid)), default_role(mode))
+            feed = pick_feed(feeds_by_consumer.get(str(cid), []), role)
+            if feed is not None:
+                out[(str(cid), mode)] = (feed.feed_id, feed.bus_section_id)
+    con.row_factory = None
+    return out
+
+
+def test_triggers_follow_feed_and_rule_changes(tmp_path: Path) -> None:
+    from tools.run_calc import ensure_migrations
+
+    db_path = tmp_path / "active_section.sqlite"
+    ensure_migrations(db_path)
+    rng = random.Random(7)
+
+    con = sqlite3.connect(db_path)
+    try:
+        con.execute("PRAGMA foreign_keys = ON;")
+        _panel_id, sections, consumers = _seed_panel(con, rng, 40)
+        for cid in consumers:
+            for _ in range(rng.randint(0, 4)):
+                _add_feed(con, rng, cid, sections)
+        assert _materialized(con) == _expected(con)
+
+        for _step in range(60):
+            op = rng.randrange(6)
+            cid = rng.choice(consumers)
+            feed_ids = [r[0] for r in con.execute("SELECT id FROM consumer_feeds").fetchall()]
+            if op == 0:
+                _add_feed(con, rng, cid, sections)
+            elif op == 1 and feed_ids:
+                con.execute("DELETE FROM consumer_feeds WHERE id = ?", (rng.choice(feed_ids),))
+            elif op == 2 and feed_ids:
+                con.execute(
+                    "UPDATE consumer_feeds SET priority = ?, feed_role_id = ? WHERE id = ?",
+                    (rng.randint(1, 3), rng.choice(ROLES), rng.choice(feed_ids)),
+                )
+            elif op == 3 and feed_ids:
+                con.execute(
+                    "UPDATE consumer_feeds SET consumer_id = ? WHERE id = ?",
+                    (cid, rng.choice(feed_ids)),
+                )
+            elif op == 4:
+                con.execute(
+                    """
+                    INSERT INTO consumer_mode_rules (consumer_id, mode_id, active_feed_role_id)
+                    VALUES (?, ?, ?)
+                    ON CONFLICT(consumer_id, mode_id) DO UPDATE SET
+                      active_feed_role_id = excluded.active_feed_role_id
+                    """,
+                    (cid, rng.choice(("NORMAL", "EMERGENCY")), rng.choice(("MAIN", "RESERVE", "DG"))),
+                )
+            else:
+                con.execute("DELETE FROM consumer_mode_rules WHERE consumer_id = ?", (cid,))
+            assert _materialized(con) == _expected(con)
+
+        # Cascades: a removed bus section re-routes its consumers, a removed consumer disappears.
+        con.execute("DELETE FROM bus_sections WHERE id = ?", (sections[0],))
+        con.execute("DELETE FROM consumers WHERE id = ?", (consumers[0],))
+        assert _materialized(con) == _expected(con)
+        assert all(sid != sections[0] for _fid, sid in _materialized(con).values())
+        con.commit()
+    finally:
+        con.close()
+
+
+def test_migration_backfills_existing_consumers(tmp_path: Path) -> None:
+    db_path = tmp_path / "active_section_backfill.sqlite"
+    rng = random.Random(11)
+    migrations = sorted((ROOT / "db" / "migrations").glob("*.sql"))
+    before = [m for m in migrations if m.name < "0015"]
+    target = next(m for m in migrations if m.name.startswith("0015_"))
+
+    con = sqlite3.connect(db_path)
+    try:
+        con.execute("PRAGMA foreign_keys = ON;")
+        for mf in before:
+            con.executescript(mf.read_text(encoding="utf-8"))
+        _panel_id, sections, consumers = _seed_panel(con, rng, 15)
+        for cid in consumers:
+            for _ in range(rng.randint(1, 3)):
+                _add_feed(con, rng, cid, sections)
+        con.execute(
+            """
+            INSERT INTO consumer_mode_rules (consumer_id, mode_id, active_feed_role_id)
+            VALUES (?, 'NORMAL', 'DG')
+            """,
+            (consumers[0],),
+        )
+        con.executescript(target.read_text(encoding="utf-8"))
+        assert _materialized(con) == _expected(con)
+        assert len(_materialized(con)) == 2 * len(consumers)
+    finally:
+        con.close()
+
+
+def test_group_by_aggregation_matches_in_memory(tmp_path: Path) -> None:
+    from tools.run_calc import ensure_migrations
+    from calc_core.section_aggregation import _aggregate_modes_in_memory, calc_section_loads_project
+
+    db_path = tmp_path / "active_section_agg.sqlite"
+    ensure_migrations(db_path)
+    rng = random.Random(3)
+
+    con = sqlite3.connect(db_path)
+    try:
+        con.execute("PRAGMA foreign_keys = ON;")
+        panel_ids = []
+        for _ in range(4):
+            panel_id, sections, consumers = _seed_panel(con, rng, 25)
+            panel_ids.append(panel_id)
+            for cid in consumers:
+                for _ in range(rng.randint(0, 3)):
+                    _add_feed(con, rng, cid, sections)
+        con.commit()
+
+        counts = calc_section_loads_project(con).section_counts
+        con.row_factory = sqlite3.Row
+        expected = _aggregate_modes_in_memory(con, None, ("NORMAL", "EMERGENCY"), feeds_v2=True)
+        assert sorted(counts) == sorted(panel_ids)
+        for panel_id, by_mode in expected.items():
+            for mode, loads in by_mode.items():
+                assert counts[panel_id][mode] == len(loads)
+                rows = con.execute(
+                    """
+                    SELECT bus_section_id, p_kw, q_kvar, s_kva, i_a
+                    FROM section_calc WHERE panel_id = ? AND mode = ?
+                    """,
+                    (panel_id, mode),
+                ).fetchall()
+                stored = {str(r[0]): tuple(r)[1:] for r in rows}
+                assert set(stored) == set(loads)
+                for sid, entry in loads.items():
+                    assert stored[sid] == pytest.approx(
+                        (entry.p_kw, entry.q_kvar, entry.s_kva, entry.i_a)
+                    )
+    finally:
+        con.close()
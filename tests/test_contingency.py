@@ -0,0 +1,138 @@
+"""
+N-1 contingency over feeds and bus sections (Feeds v2).
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import sys
+import uuid
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+
+def _uuid() -> str:
+    return str(uuid.uuid4())
+
+
+def _seed(db_path: Path) -> tuple[str, dict[str, str], dict[str, str], dict[str, str]]:
+    panel_id = _uuid()
+    sections = {name: _uuid() for name in ("S1", "S2", "S3")}
+    consumers = {name: _uuid() for name in ("A", "B", "C", "D")}
+    feeds: dict[str, str] = {}
+    con = sqlite3.connect(db_path)
+    try:
+        con.execute("PRAGMA foreign_keys = ON;")
+        con.execute(
+            "INSERT INTO panels (id, name, system_type, u_ll_v, u_ph_v) VALUES (?, ?, ?, ?, ?)",
+            (panel_id, "P", "3PH", 400.0, 230.0),
+        )
+        for name, sid in sections.items():
+            con.execute(
+                "INSERT INTO bus_sections (id, panel_id, name) VALUES (?, ?, ?)",
+                (sid, panel_id, name),
+            )
+        for name, i_a in (("A", 10.0), ("B", 4.0), ("C", 6.0), ("D", 1.0)):
+            cid = consumers[name]
+            con.execute(
+                """
+                INSERT INTO consumers (id, panel_id, name, load_ref_type, load_ref_id, p_kw, q_kvar, s_kva, i_a)
+                VALUES (?, ?, ?, 'MANUAL', ?, ?, 0.0, ?, ?)
+                """,
+                (cid, panel_id, name, cid, i_a, i_a, i_a),
+            )
+        # A: S1 + reserve S2; B: S1 only; C: S2 + reserve S3; D: no feeds at all.
+        for key, consumer, section, role in (
+            ("a1", "A", "S1", "MAIN"),
+            ("a2", "A", "S2", "RESERVE"),
+            ("b1", "B", "S1", "MAIN"),
+            ("c1", "C", "S2", "MAIN"),
+            ("c2", "C", "S3", "RESERVE"),
+        ):
+            feeds[key] = _uuid()
+            con.execute(
+                """
+                INSERT INTO consumer_feeds (id, consumer_id, bus_section_id, feed_role, feed_role_id, priority)
+                VALUES (?, ?, ?, ?, ?, 1)
+                """,
+                (
+                    feeds[key],
+                    consumers[consumer],
+                    sections[section],
+                    "NORMAL" if role == "MAIN" else "RESERVE",
+                    role,
+                ),
+            )
+        con.commit()
+    finally:
+        con.close()
+    return panel_id, sections, consumers, feeds
+
+
+def test_n1_worst_case_per_section(tmp_path: Path) -> None:
+    from tools.run_calc import ensure_migrations
+    from calc_core.contingency import SCENARIO_BUS_SECTION, SCENARIO_FEED, run_n1_contingency
+
+    db_path = tmp_path / "n1.sqlite"
+    ensure_migrations(db_path)
+    panel_id, sections, consumers, feeds = _seed(db_path)
+
+    con = sqlite3.connect(db_path)
+    try:
+        result = run_n1_contingency(con, [panel_id], mode="NORMAL")
+        section_calc_rows = con.execute("SELECT COUNT(*) FROM section_calc").fetchone()[0]
+    finally:
+        con.close()
+
+    assert result.mode == "NORMAL"
+    assert result.scenario_count == len(feeds) + len(sections)
+    assert section_calc_rows == 0
+
+    by_name = {wc.section_name: wc for wc in result.sections}
+    assert [wc.section_name for wc in result.sections] == ["S1", "S2", "S3"]
+    # S1 only loses load in any outage: worst case is the base state.
+    assert (by_name["S1"].base_i_a, by_name["S1"].worst_i_a) == pytest.approx((14.0, 14.0))
+    assert by_name["S1"].worst_scenario is None
+    # A moves to its reserve on S2 (feed outages run before bus section outages).
+    assert (by_name["S2"].base_i_a, by_name["S2"].worst_i_a) == pytest.approx((6.0, 16.0))
+    assert by_name["S2"].worst_s_kva == pytest.approx(16.0)
+    assert (by_name["S2"].worst_scenario.kind, by_name["S2"].worst_scenario.outage_id) == (
+        SCENARIO_FEED,
+        feeds["a1"],
+    )
+    assert (by_name["S3"].base_i_a, by_name["S3"].worst_i_a) == pytest.approx((0.0, 6.0))
+    assert by_name["S3"].worst_scenario.outage_id == feeds["c1"]
+
+    unserved = {(s.kind, s.outage_id): ids for s, ids in result.unserved}
+    assert unserved == {
+        (SCENARIO_FEED, feeds["b1"]): (consumers["B"],),
+        (SCENARIO_BUS_SECTION, sections["S1"]): (consumers["B"],),
+    }
+
+
+def test_n1_scenario_filters_and_empty_selection(tmp_path: Path) -> None:
+    from tools.run_calc import ensure_migrations
+    from calc_core.contingency import SCENARIO_BUS_SECTION, run_n1_contingency
+
+    db_path = tmp_path / "n1_filters.sqlite"
+    ensure_migrations(db_path)
+    panel_id, sections, consumers, _feeds = _seed(db_path)
+
+    con = sqlite3.connect(db_path)
+    try:
+        result = run_n1_contingency(con, [panel_id], feeds=False)
+        assert result.scenario_count == len(sections)
+        by_name = {wc.section_name: wc for wc in result.sections}
+        assert by_name["S2"].worst_i_a == pytest.approx(16.0)
+        assert by_name["S2"].worst_scenario.kind == SCENARIO_BUS_SECTION
+        assert by_name["S2"].worst_scenario.outage_id == sections["S1"]
+        assert [ids for _s, ids in result.unserved] == [(consumers["B"],)]
+
+        empty = run_n1_contingency(con, [])
+        assert (empty.scenario_count, empty.sections, empty.unserved) == (0, (), ())
+    finally:
+        con.close()
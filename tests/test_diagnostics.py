@@ -0,0 +1,155 @@
+"""
+Diagnostics collector: counts per code, bounded samples, no stdout from calc hot loops.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import sys
+import uuid
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+
+def _uuid() -> str:
+    return str(uuid.uuid4())
+
+
+def test_counts_samples_and_merge() -> None:
+    from calc_core.diagnostics import Diagnostics
+
+    diag = Diagnostics(sample_limit=2)
+    for i in range(5):
+        diag.warn("A", n=i)
+    diag.extend([{"reason": "B", "circuit_id": "c1"}, {"circuit_id": "c2"}])
+    assert diag.counts == {"A": 5, "B": 1, "UNKNOWN": 1}
+    assert diag.samples["A"] == [{"n": 0}, {"n": 1}]
+    assert diag.samples["B"] == [{"circuit_id": "c1"}]
+
+    other = Diagnostics(sample_limit=2)
+    other.warn("A", n=10)
+    other.warn("C", n=11)
+    diag.merge(other)
+    assert diag.total == 9
+    assert diag.to_dict() == {
+        "total": 9,
+        "counts": {"A": 6, "B": 1, "C": 1, "UNKNOWN": 1},
+        "samples": {
+            "A": [{"n": 0}, {"n": 1}],
+            "B": [{"circuit_id": "c1"}],
+            "C": [{"n": 11}],
+            "UNKNOWN": [{"circuit_id": "c2"}],
+        },
+    }
+    with pytest.raises(ValueError, match="sample_limit"):
+        Diagnostics(sample_limit=-1)
+
+
+def _seed_unfed_consumers(db_path: Path, n: int) -> str:
+    panel_id = _uuid()
+    con = sqlite3.connect(db_path)
+    try:
+        con.execute(
+            "INSERT INTO panels (id, name, system_type, u_ll_v, u_ph_v) VALUES (?, ?, ?, ?, ?)",
+            (panel_id, "P", "3PH", 400.0, 230.0),
+        )
+        for i in range(n):
+            cid = _uuid()
+            con.execute(
+                """
+                INSERT INTO consumers (id, panel_id, name, load_ref_type, load_ref_id, p_kw, q_kvar, s_kva, i_a)
+                VALUES (?, ?, ?, 'MANUAL', ?, 1.0, 0.5, 1.2, 2.0)
+                """,
+                (cid, panel_id, f"C{i:03d}", cid),
+            )
+        con.commit()
+    finally:
+        con.close()
+    return panel_id
+
+
+def test_section_aggregation_records_instead_of_printing(tmp_path: Path, capsys) -> None:
+    from tools.run_calc import ensure_migrations
+    from calc_core.diagnostics import Diagnostics
+    from calc_core.section_aggregation import (
+        _aggregate_modes_in_memory,
+        calc_section_loads,
+        calc_section_loads_all_modes,
+        calc_section_loads_project,
+    )
+
+    db_path = tmp_path / "diagnostics_sections.sqlite"
+    ensure_migrations(db_path)
+    panel_id = _seed_unfed_consumers(db_path, 30)
+
+    con = sqlite3.connect(db_path)
+    try:
+        diag = Diagnostics(sample_limit=3)
+        result = calc_section_loads_all_modes(con, panel_id, diagnostics=diag)
+        assert result.section_counts == {panel_id: {"NORMAL": 0, "EMERGENCY": 0}}
+        assert result.warning_counts == (("CONSUMER_NO_ACTIVE_FEED", 60),)
+        assert diag.counts == {"CONSUMER_NO_ACTIVE_FEED": 60}
+        samples = diag.samples["CONSUMER_NO_ACTIVE_FEED"]
+        assert len(samples) == 3
+        assert set(samples[0]) == {"consumer_id", "consumer_name", "mode"}
+
+        # Same codes from the in-memory resolution (DBs without consumer_active_section).
+        in_memory = Diagnostics(sample_limit=3)
+        _aggregate_modes_in_memory(
+            con, [panel_id], ("NORMAL",), feeds_v2=True, diagnostics=in_memory
+        )
+        assert in_memory.counts == {"CONSUMER_NO_ACTIVE_FEED": 30}
+
+        # Without a collector nothing is written to stdout; counts are still returned.
+        assert calc_section_loads(con, panel_id, mode="NORMAL").warning_counts == (
+            ("CONSUMER_NO_ACTIVE_FEED", 30),
+        )
+        assert calc_section_loads_project(con, [panel_id]).warning_counts == (
+            ("CONSUMER_NO_ACTIVE_FEED", 60),
+        )
+    finally:
+        con.close()
+    assert capsys.readouterr().out == ""
+
+
+def test_phase_balance_warning_counts(tmp_path: Path) -> None:
+    from tools.run_calc import ensure_migrations
+    from calc_core.diagnostics import Diagnostics
+    from calc_core.phase_balance import calc_phase_balance
+
+    db_path = tmp_path / "diagnostics_pb.sqlite"
+    ensure_migrations(db_path)
+    panel_id = _uuid()
+    con = sqlite3.connect(db_path)
+    try:
+        con.execute(
+            "INSERT INTO panels (id, name, system_type, u_ll_v, u_ph_v) VALUES (?, ?, ?, ?, ?)",
+            (panel_id, "P", "3PH", 400.0, 230.0),
+        )
+        for i, (phase, source) in enumerate(((None, "MANUAL"), (None, "MANUAL"), (None, "AUTO"))):
+            con.execute(
+                """
+                INSERT INTO circuits (
+                  id, panel_id, name, phases, neutral_present, unbalance_mode,
+                  length_m, material, cos_phi, load_kind, i_calc_a, phase, phase_source
+                )
+                VALUES (?, ?, ?, 1, 1, 'NORMAL', 10.0, 'CU', 0.9, 'OTHER', 5.0, ?, ?)
+                """,
+                (_uuid(), panel_id, f"C{i}", phase, source),
+            )
+        con.commit()
+
+        diag = Diagnostics()
+        result = calc_phase_balance(con, panel_id, mode="EMERGENCY", diagnostics=diag)
+    finally:
+        con.close()
+    assert result.warning_counts == (
+        ("EMERGENCY_SECTIONS_NOT_COMPUTED", 1),
+        ("MANUAL_INVALID_PHASE", 2),
+    )
+    assert diag.counts == dict(result.warning_counts)
+    assert all(s["panel_id"] == panel_id for s in diag.samples["MANUAL_INVALID_PHASE"])
@@ -0,0 +1,163 @@
+"""Headless DXF attribute patcher: matching by GUID / MODE, counters, byte-exact passthrough."""
+
+from __future__ import annotations
+
+import io
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+
+def _pairs(*pairs: tuple[int, str]) -> list[str]:
+    out: list[str] = []
+    for code, value in pairs:
+        out.extend([f"{code:>3}", value])
+    return out
+
+
+def _insert(handle: str, attribs: list[tuple[str, str]], *, with_attribs: bool = True) -> list[str]:
+    lines = _pairs((0, "INSERT"), (5, handle), (8, "0"), (2, "SLD_BLOCK"))
+    if with_attribs:
+        lines += _pairs((66, "1"))
+    lines += _pairs((10, "0.0"), (20, "0.0"), (30, "0.0"))
+    for tag, value in attribs:
+        lines += _pairs(
+            (0, "ATTRIB"),
+            (8, "0"),
+            (100, "AcDbText"),
+            (1, value),
+            (100, "AcDbAttribute"),
+            (2, tag),
+            (70, "0"),
+        )
+    if with_attribs:
+        lines += _pairs((0, "SEQEND"), (8, "0"))
+    return lines
+
+
+def _dxf(acadver: str, entities: list[str], paper_space: list[str], nested: list[str], codepage: str = "ANSI_1251") -> list[str]:
+    return (
+        _pairs(
+            (0, "SECTION"),
+            (2, "HEADER"),
+            (9, "$ACADVER"),
+            (1, acadver),
+            (9, "$DWGCODEPAGE"),
+            (3, codepage),
+            (0, "ENDSEC"),
+            (0, "SECTION"),
+            (2, "BLOCKS"),
+            (0, "BLOCK"),
+            (2, "SLD_BLOCK"),
+        )
+        + nested
+        + _pairs((0, "ENDBLK"), (0, "BLOCK"), (2, "*Paper_Space"))
+        + paper_space
+        + _pairs((0, "ENDBLK"), (0, "ENDSEC"), (0, "SECTION"), (2, "ENTITIES"))
+        + entities
+        + _pairs((0, "ENDSEC"), (0, "EOF"))
+    )
+
+
+def _values():
+    from calc_core.dxf_patch import AttributeValues
+
+    return AttributeValues.from_rows(
+        {
+            "panel": [["panel-1", "PP_KW", "8.50"]],
+            "circuits": [["c-1", "I_A", "12.3"], ["c-1", "CIR_NAME", "Гр.1 ^ ✓"], ["c-1", "GUID", "x"]],
+            "sections": [["s-1", "NORMAL", "PP_KW", "4.00"], ["s-1", "RESERVE", "PP_KW", "9.00"]],
+        }
+    )
+
+
+def test_patch_matches_import_attrs_rules() -> None:
+    from calc_core.dxf_patch import patch_dxf
+
+    entities = (
+        _insert("A1", [("GUID", "c-1"), ("I_A", "0"), ("CIR_NAME", "old"), ("extra", "keep")])
+        + _insert("A2", [("GUID", "s-1"), ("MODE", "RESERVE"), ("PP_KW", "0")])
+        + _insert("A3", [("GUID", "unknown"), ("I_A", "0")])
+        + _insert("A4", [], with_attribs=False)
+        + _insert("A5", [("GUID", ""), ("I_A", "0")])
+    )
+    paper = _insert("B1", [("PP_KW", "0"), ("GUID", "panel-1")])
+    nested = _insert("N1", [("GUID", "c-1"), ("I_A", "0")])
+    lines = _dxf("AC1027", entities, paper, nested)
+    src = ("\r\n".join(lines) + "\r\n").encode("utf-8")
+
+    dst = io.BytesIO()
+    summary = patch_dxf(io.BytesIO(src), dst, _values())
+    out = dst.getvalue().decode("utf-8").split("\r\n")
+
+    assert summary.lines() == [
+        "blocks_scanned: 6",
+        "blocks_with_guid: 4",
+        "updated_attrs_count: 4",
+        "blocks_skipped_no_guid: 2",
+        "guid_not_found_in_csv: 1",
+    ]
+    assert len(out) == len(lines) + 1
+    changed = {i: (lines[i], out[i]) for i in range(len(lines)) if lines[i] != out[i]}
+    assert sorted(new for _old, new in changed.values()) == sorted(
+        ["12.3", "Гр.1 ^  ✓", "9.00", "8.50"]
+    )
+    # GUID values and the block definition (N1) are untouched.
+    assert out.count("c-1") == 2
+
+
+def test_patch_legacy_codepage_and_lf() -> None:
+    from calc_core.dxf_patch import patch_dxf
+
+    lines = _dxf("AC1018", _insert("A1", [("GUID", "c-1"), ("CIR_NAME", "x")]), [], [])
+    src = ("\n".join(lines) + "\n").encode("cp1251")
+
+    dst = io.BytesIO()
+    summary = patch_dxf(io.BytesIO(src), dst, _values())
+    assert summary.updated_attrs_count == 1
+    out = dst.getvalue()
+    assert b"\r\n" not in out
+    # Cyrillic in ANSI_1251, characters outside the code page as \U+XXXX.
+    assert "Гр.1 ^  \\U+2713\n".encode("cp1251") in out
+
+    with pytest.raises(ValueError, match="Binary DXF"):
+        patch_dxf(io.BytesIO(b"AutoCAD Binary DXF\r\n\x1a\x00"), io.BytesIO(), _values())
+
+
+def test_patch_dxf_cli_from_payload(tmp_path: Path) -> None:
+    payload = {
+        "panel": {"panel_id": "panel-1", "rtm": {"pp_kw": 8.5, "ip_a": 15.2}},
+        "circuits": [{"circuit_id": "c-1", "name": "Гр.1", "calc": {"i_calc_a": 12.34}}],
+        "bus_sections": [],
+    }
+    payload_path = tmp_path / "payload.json"
+    payload_path.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+    dxf_path = tmp_path / "sld.dxf"
+    lines = _dxf("AC1027", _insert("A1", [("GUID", "c-1"), ("I_A", "0")]), [], [])
+    dxf_path.write_bytes(("\n".join(lines) + "\n").encode("utf-8"))
+
+    proc = subprocess.run(
+        [
+            "python3",
+            str(ROOT / "tools" / "patch_dxf.py"),
+            "--dxf",
+            str(dxf_path),
+            "--out",
+            str(dxf_path),
+            "--payload",
+            str(payload_path),
+        ],
+        cwd=ROOT,
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    assert "updated_attrs_count: 1" in proc.stdout
+    assert "12.3\n" in dxf_path.read_text(encoding="utf-8")
+    assert not (tmp_path / "sld.dxf.tmp").exists()
@@ -169,3 +169,266 @@ def test_export_attributes_csv_smoke(tmp_path: Path) -> None:
     ]
     assert du_pct_rows, "Expected DU_PCT row for circuit without calc"
     assert du_pct_rows[0][2] == ""
+
+
+def test_export_attributes_csv_all_panels(tmp_path: Path) -> None:
+    root = Path(__file__).resolve().parents[1]
+    db_path = tmp_path / "project.sqlite"
+    conn = sqlite3.connect(db_path)
+    try:
+        _apply_migrations(conn, root)
+        ids = _seed_minimal_data(conn)
+        # Second panel without rtm_panel_calc: reported per panel, others still exported.
+        conn.execute(
+            "INSERT INTO panels (id, name, system_type, u_ll_v, u_ph_v) VALUES ('panel-2', 'P-2', '3PH', 400.0, 230.0)"
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+    mapping_path = tmp_path / "mapping.yaml"
+    _write_mapping(mapping_path)
+    out_dir = tmp_path / "out"
+
+    cmd = [
+        "python3",
+        str(root / "tools" / "export_attributes_csv.py"),
+        "--db",
+        str(db_path),
+        "--all-panels",
+        "--mapping",
+        str(mapping_path),
+        "--out-dir",
+        str(out_dir),
+    ]
+    proc = subprocess.run(cmd, cwd=root, capture_output=True, text=True)
+    assert proc.returncode == 1
+    assert "ERROR panel-2: rtm_panel_calc not found" in proc.stderr
+
+    panel_rows = _read_csv_rows(out_dir / "attrs_panel.csv")
+    assert {row[0] for row in panel_rows} == {ids["panel_id"]}
+    assert {row[0] for row in _read_csv_rows(out_dir / "attrs_circuits.csv")} == set(ids["circuit_ids"])
+
+
+def test_export_attributes_csv_incremental(tmp_path: Path) -> None:
+    root = Path(__file__).resolve().parents[1]
+    db_path = tmp_path / "project.sqlite"
+    conn = sqlite3.connect(db_path)
+    try:
+        _apply_migrations(conn, root)
+        ids = _seed_minimal_data(conn)
+        conn.commit()
+    finally:
+        conn.close()
+
+    mapping_path = tmp_path / "mapping.yaml"
+    _write_mapping(mapping_path)
+    out_dir = tmp_path / "out"
+
+    def run(*extra: str) -> None:
+        cmd = [
+            "python3",
+            str(root / "tools" / "export_attributes_csv.py"),
+            "--db",
+            str(db_path),
+            "--panel-id",
+            str(ids["panel_id"]),
+            "--mapping",
+            str(mapping_path),
+            "--out-dir",
+            str(out_dir),
+            "--incremental",
+            *extra,
+        ]
+        subprocess.run(cmd, check=True, cwd=root)
+
+    run("--tombstones")
+    full_circuits = _read_csv_rows(out_dir / "attrs_circuits.csv")
+    assert len(full_circuits) == 8
+    assert (out_dir / "attrs_state.json").exists()
+
+    # Nothing changed: empty CSV files (headers only).
+    run("--tombstones")
+    for name in ("attrs_panel.csv", "attrs_circuits.csv", "attrs_sections.csv", "attrs_deleted.csv"):
+        assert _read_csv_rows(out_dir / name) == []
+
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("PRAGMA foreign_keys = ON;")
+        conn.execute("UPDATE circuits SET name = 'C-1 NEW' WHERE id = ?", (ids["circuit_ids"][0],))
+        conn.execute("DELETE FROM circuits WHERE id = ?", (ids["circuit_ids"][1],))
+        conn.commit()
+    finally:
+        conn.close()
+
+    run("--tombstones")
+    assert _read_csv_rows(out_dir / "attrs_circuits.csv") == [
+        [ids["circuit_ids"][0], "CIR_NAME", "C-1 NEW"]
+    ]
+    assert _read_csv_rows(out_dir / "attrs_panel.csv") == []
+    deleted = _read_csv_rows(out_dir / "attrs_deleted.csv")
+    assert sorted(row[3] for row in deleted) == ["CIR_NAME", "DU_PCT", "I_A", "S_MM2"]
+    assert {(row[0], row[1], row[2]) for row in deleted} == {("CIRCUIT", ids["circuit_ids"][1], "")}
+
+    # Reset: every current row again.
+    run("--reset-state")
+    assert len(_read_csv_rows(out_dir / "attrs_circuits.csv")) == 4
+
+
+def _reference_rows(payload: dict, mapping: dict) -> dict[str, list[list[str]]]:
+    """Per-value path lookup, as build_rows_from_payload did before compile_mapping."""
+    from calc_core.export_attributes_csv import _format_value, _get_path_value
+
+    def attrs(key: str) -> dict:
+        return mapping[key]["attributes"]
+
+    guid = str(payload["panel"]["panel_id"])
+    rows: dict[str, list[list[str]]] = {"panel": [], "circuits": [], "sections": []}
+    for attr, path in attrs("panel").items():
+        rows["panel"].append([guid, attr, _format_value(path, _get_path_value(payload, path))])
+    for circuit in payload["circuits"]:
+        for attr, path in attrs("circuits").items():
+            rows["circuits"].append(
+                [circuit["circuit_id"], attr, _format_value(path, _get_path_value(circuit, path))]
+            )
+    for section in payload["bus_sections"]:
+        for mode in mapping["sections"]["modes"]:
+            for attr, path in attrs("sections").items():
+                path = path.replace("{MODE}", mode)
+                rows["sections"].append(
+                    [
+                        section["bus_section_id"],
+                        mode,
+                        attr,
+                        _format_value(path, _get_path_value(section, path)),
+                    ]
+                )
+    return rows
+
+
+def test_compiled_mapping_matches_path_lookup(tmp_path: Path) -> None:
+    import sys
+
+    root = Path(__file__).resolve().parents[1]
+    sys.path.insert(0, str(root))
+    from calc_core.export_attributes_csv import (
+        build_rows_from_payload,
+        compile_mapping,
+        load_compiled_mapping,
+        load_mapping,
+    )
+
+    mapping = load_mapping(root / "dwg" / "mapping_v0_5.yaml")
+    mapping["circuits"]["attributes"].update(
+        {"LEN": "calc.length_m", "OK": "calc.ok", "RAW": "calc.raw", "NONE": "missing.path", "SELF": "."}
+    )
+    payload = {
+        "panel": {"panel_id": "p-1", "rtm": {"pp_kw": 8.5, "ip_a": 15.25}},
+        "circuits": [
+            {
+                "circuit_id": "c-1",
+                "name": "Гр.1",
+                "phase": "L1",
+                "calc": {
+                    "i_calc_a": 12.345,
+                    "du_pct": 1.005,
+                    "s_mm2_selected": 2.5,
+                    "length_m": 17.6,
+                    "ok": True,
+                    "raw": 0.1000001,
+                },
+            },
+            {"circuit_id": "c-2", "name": "Гр.2", "phase": None, "calc": {"i_calc_a": float("nan")}},
+        ],
+        "bus_sections": [
+            {"bus_section_id": "s-1", "modes": {"NORMAL": {"pp_kw": -0.0, "ip_a": 3}}},
+            {"bus_section_id": "s-2", "modes": {}},
+        ],
+    }
+
+    expected = _reference_rows(payload, mapping)
+    assert build_rows_from_payload(payload, mapping) == expected
+    assert build_rows_from_payload(payload, compile_mapping(mapping)) == expected
+
+    # Mapping file: parsed and compiled once per (path, mtime, size).
+    mapping_path = tmp_path / "mapping.yaml"
+    _write_mapping(mapping_path)
+    compiled = load_compiled_mapping(mapping_path)
+    assert load_compiled_mapping(mapping_path) is compiled
+    first = load_mapping(mapping_path)
+    first["panel"]["attributes"].clear()
+    assert load_mapping(mapping_path)["panel"]["attributes"]
+
+    mapping_path.write_text(
+        mapping_path.read_text(encoding="utf-8").replace("PP_KW", "P_KW"), encoding="utf-8"
+    )
+    reloaded = load_compiled_mapping(mapping_path)
+    assert reloaded is not compiled
+    assert [attr for attr, _fn in reloaded.panel][0] == "P_KW"
+
+
+def test_export_attributes_grouped_roundtrip(tmp_path: Path) -> None:
+    import sys
+
+    root = Path(__file__).resolve().parents[1]
+    sys.path.insert(0, str(root))
+    from calc_core.export_attributes_csv import grouped_lines, parse_grouped
+
+    db_path = tmp_path / "project.sqlite"
+    conn = sqlite3.connect(db_path)
+    try:
+        _apply_migrations(conn, root)
+        ids = _seed_minimal_data(conn)
+        # Commas, quotes, backslashes and non-ASCII must survive the LISP string escapes.
+        conn.execute(
+            "UPDATE circuits SET name = ? WHERE id = ?",
+            ('Гр.1, "А\\Б"', ids["circuit_ids"][0]),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+    mapping_path = tmp_path / "mapping.yaml"
+    _write_mapping(mapping_path)
+    out_dir = tmp_path / "out"
+    cmd = [
+        "python3",
+        str(root / "tools" / "export_attributes_csv.py"),
+        "--db",
+        str(db_path),
+        "--panel-id",
+        str(ids["panel_id"]),
+        "--mapping",
+        str(mapping_path),
+        "--out-dir",
+        str(out_dir),
+        "--grouped",
+    ]
+    subprocess.run(cmd, check=True, cwd=root)
+
+    grouped_path = out_dir / "attrs_grouped.sexp"
+    text = grouped_path.read_text(encoding="utf-8")
+    lines = text.splitlines()
+    guids = [line.split('"')[3] for line in lines]
+    assert guids == sorted(guids)
+    # Panel + one line per circuit + one line per section and mode.
+    assert len(lines) == 1 + len(ids["circuit_ids"]) + 2 * len(ids["bus_section_ids"])
+    assert '"Гр.1, \\"А\\\\Б\\""' in text
+
+    grouped = parse_grouped(text)
+    for kind, filename in (
+        ("panel", "attrs_panel.csv"),
+        ("circuits", "attrs_circuits.csv"),
+        ("sections", "attrs_sections.csv"),
+    ):
+        csv_rows = _read_csv_rows(out_dir / filename)
+        assert csv_rows
+        assert sorted(grouped[kind]) == sorted(csv_rows)
+
+    # Control characters round-trip too.
+    rows = {"panel": [["p", "NOTE", "a\nb\tc\r\\"]], "circuits": [], "sections": []}
+    assert parse_grouped("\n".join(line for _key, line in grouped_lines(rows))) == rows
+
+    # A plain export removes the stale grouped file.
+    subprocess.run(cmd[:-1], check=True, cwd=root)
+    assert not grouped_path.exists()
@@ -0,0 +1,218 @@
+"""Columnar export of result tables (Arrow IPC / Parquet / npz) and memory-mapped read."""
+
+from __future__ import annotations
+
+import math
+import sqlite3
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+np = pytest.importorskip("numpy")
+
+
+def _make_db(tmp_path: Path) -> Path:
+    from tools.run_calc import ensure_migrations
+
+    db_path = tmp_path / "columnar.sqlite"
+    ensure_migrations(db_path)
+    con = sqlite3.connect(db_path)
+    try:
+        con.execute("PRAGMA foreign_keys = ON;")
+        for panel_id, name in (("p-2", "Щит 2"), ("p-1", "Щит 1")):
+            con.execute(
+                "INSERT INTO panels (id, name, system_type, u_ll_v, u_ph_v) VALUES (?, ?, '3PH', 400.0, 230.0)",
+                (panel_id, name),
+            )
+            con.execute(
+                """
+                INSERT INTO rtm_panel_calc (
+                  panel_id, sum_pn, sum_ki_pn, sum_ki_pn_tg, sum_np2,
+                  ne, kr, pp_kw, qp_kvar, sp_kva, ip_a, updated_at
+                ) VALUES (?, 10, 8, 6, 12, 4, 1.05, 8.5, 4.2, 9.4, 13.1, '2026-02-15T00:00:00Z')
+                """,
+                (panel_id,),
+            )
+        con.execute("INSERT INTO bus_sections (id, panel_id, name) VALUES ('s-1', 'p-1', 'S1')")
+        con.execute(
+            """
+            INSERT INTO section_calc (panel_id, bus_section_id, mode, p_kw, q_kvar, s_kva, i_a, updated_at)
+            VALUES ('p-1', 's-1', 'NORMAL', 5.0, 2.0, 5.4, 8.0, '2026-02-15T00:00:00Z')
+            """
+        )
+        con.executemany(
+            """
+            INSERT INTO circuits (
+              id, panel_id, name, phases, neutral_present, unbalance_mode,
+              length_m, material, cos_phi, load_kind, i_calc_a, phase
+            ) VALUES (?, 'p-1', ?, ?, 1, 'NORMAL', ?, 'CU', 0.9, 'OTHER', ?, ?)
+            """,
+            [
+                ("c-1", "Гр.1", 3, 25.0, 20.0, None),
+                ("c-2", "Гр.2", 1, 15.0, 10.0, "L2"),
+            ],
+        )
+        con.execute(
+            """
+            INSERT INTO circuit_calc (
+              circuit_id, i_calc_a, du_v, du_pct, du_limit_pct, s_mm2_selected, method, updated_at
+            ) VALUES ('c-1', 20.0, 3.1, 1.2, 5.0, 2.5, 'IEC', '2026-02-15T00:00:00Z')
+            """
+        )
+        con.execute(
+            """
+            INSERT INTO panel_phase_balance (
+              panel_id, mode, i_l1, i_l2, i_l3, unbalance_pct, updated_at,
+              invalid_manual_count, changed_count, unchanged_count
+            ) VALUES ('p-1', 'NORMAL', 20.0, 30.0, 20.0, 12.5, '2026-02-15T00:00:00Z', 0, 1, 1)
+            """
+        )
+        con.commit()
+    finally:
+        con.close()
+    return db_path
+
+
+def _as_lists(data) -> dict[str, list]:
+    if isinstance(data, dict):
+        return {name: col.tolist() for name, col in data.items()}
+    return data.to_pydict()
+
+
+@pytest.mark.parametrize("fmt", ["npz", "arrow", "parquet"])
+def test_export_columnar_tables(tmp_path: Path, fmt: str) -> None:
+    if fmt != "npz":
+        pytest.importorskip("pyarrow")
+    from calc_core.export_columnar import export_columnar, load_columnar
+
+    db_path = _make_db(tmp_path)
+    con = sqlite3.connect(db_path)
+    try:
+        paths = export_columnar(con, tmp_path / "out", fmt=fmt, batch_rows=1)
+        assert not con.in_transaction
+    finally:
+        con.close()
+
+    assert sorted(paths) == ["circuit_calc", "panel_phase_balance", "rtm_panel_calc", "section_calc"]
+    assert all(p.suffix == f".{fmt}" for p in paths.values())
+
+    rtm = _as_lists(load_columnar(paths["rtm_panel_calc"]))
+    assert rtm["panel_id"] == ["p-1", "p-2"]
+    assert rtm["pp_kw"] == [8.5, 8.5]
+
+    circuits = _as_lists(load_columnar(paths["circuit_calc"]))
+    assert circuits["circuit_id"] == ["c-1", "c-2"]
+    assert circuits["name"] == ["Гр.1", "Гр.2"]
+    assert circuits["phases"] == [3, 1]
+    assert circuits["calc_status"] == ["OK", "NO_CALC"]
+    assert circuits["i_calc_a"] == [20.0, 10.0]
+    assert circuits["du_pct"][0] == 1.2
+    # NULL: NaN in npz, null in Arrow / Parquet.
+    assert circuits["du_pct"][1] is None or math.isnan(circuits["du_pct"][1])
+    assert circuits["phase"][1] == "L2"
+    assert circuits["phase"][0] in ("", None)
+
+    sections = _as_lists(load_columnar(paths["section_calc"]))
+    assert sections["mode"] == ["NORMAL"]
+    assert sections["i_a"] == [8.0]
+
+    pb = _as_lists(load_columnar(paths["panel_phase_balance"]))
+    assert pb["unbalance_pct"] == [12.5]
+    assert pb["changed_count"] == [1]
+
+
+def test_npz_columns_are_memory_mapped(tmp_path: Path) -> None:
+    from calc_core.export_columnar import export_columnar, load_columnar
+
+    db_path = _make_db(tmp_path)
+    con = sqlite3.connect(db_path)
+    try:
+        paths = export_columnar(con, tmp_path / "out", fmt="npz")
+    finally:
+        con.close()
+
+    columns = load_columnar(paths["circuit_calc"])
+    assert isinstance(columns["length_m"], np.memmap)
+    assert columns["length_m"].dtype == np.dtype("<f8")
+    assert columns["phases"].dtype == np.dtype("<i8")
+    assert columns["name"].dtype.kind == "U"
+    # Same arrays as a regular np.load.
+    with np.load(paths["circuit_calc"]) as loaded:
+        for name in loaded.files:
+            np.testing.assert_array_equal(loaded[name], columns[name])
+
+
+def test_export_payload_cli_columnar(tmp_path: Path) -> None:
+    db_path = _make_db(tmp_path)
+    out_dir = tmp_path / "columnar"
+    proc = subprocess.run(
+        [
+            "python3",
+            str(ROOT / "tools" / "export_payload.py"),
+            "--db",
+            str(db_path),
+            "--all-panels",
+            "--out-dir",
+            str(out_dir),
+            "--columnar",
+            "npz",
+        ],
+        cwd=ROOT,
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    assert "exported circuit_calc:" in proc.stdout
+    assert sorted(p.name for p in out_dir.iterdir()) == [
+        "circuit_calc.npz",
+        "panel_phase_balance.npz",
+        "rtm_panel_calc.npz",
+        "section_calc.npz",
+    ]
+
+
+@pytest.mark.parametrize("fmt", ["npz", "arrow"])
+def test_null_phase_balance_counts(tmp_path: Path, fmt: str) -> None:
+    if fmt != "npz":
+        pytest.importorskip("pyarrow")
+    from calc_core.export_columnar import export_columnar, load_columnar
+
+    db_path = _make_db(tmp_path)
+    con = sqlite3.connect(db_path)
+    try:
+        # Counters added without NOT NULL (DB migrated outside db/migrations).
+        con.executescript(
+            """
+            ALTER TABLE panel_phase_balance RENAME TO pb_old;
+            CREATE TABLE panel_phase_balance (
+              panel_id TEXT NOT NULL, mode TEXT NOT NULL,
+              i_l1 REAL NOT NULL, i_l2 REAL NOT NULL, i_l3 REAL NOT NULL,
+              unbalance_pct REAL NOT NULL, updated_at TEXT NOT NULL,
+              invalid_manual_count INT NULL, warnings_json TEXT NULL,
+              changed_count INT NULL, unchanged_count INT NULL,
+              PRIMARY KEY(panel_id, mode)
+            );
+            INSERT INTO panel_phase_balance
+              SELECT panel_id, mode, i_l1, i_l2, i_l3, unbalance_pct, updated_at,
+                     NULL, warnings_json, NULL, unchanged_count
+              FROM pb_old;
+            DROP TABLE pb_old;
+            """
+        )
+        paths = export_columnar(con, tmp_path / "out", fmt=fmt)
+    finally:
+        con.close()
+
+    pb = load_columnar(paths["panel_phase_balance"])
+    if fmt == "npz":
+        assert pb["changed_count"].dtype == np.float64
+        assert math.isnan(pb["invalid_manual_count"][0]) and math.isnan(pb["changed_count"][0])
+        assert pb["unchanged_count"].tolist() == [1.0]
+    else:
+        assert pb.to_pydict()["changed_count"] == [None]
+        assert pb.to_pydict()["unchanged_count"] == [1]
@@ -210,3 +210,134 @@ def test_export_payload_cli_smoke(tmp_path: Path) -> None:
 
     data = json.loads(out_path.read_text(encoding="utf-8"))
     assert data["version"] == "0.4"
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 500])
+def test_write_payload_matches_build_payload(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, chunk_size: int
+) -> None:
+    import io
+
+    from calc_core import export_payload
+
+    db_path = _make_db(tmp_path)
+    panel_id = _uuid()
+    section_id_with_calc = _uuid()
+    con = sqlite3.connect(db_path)
+    try:
+        _seed_minimal_payload_data(
+            con,
+            panel_id=panel_id,
+            section_id_with_calc=section_id_with_calc,
+            section_id_no_calc=_uuid(),
+            circuit_id_ok=_uuid(),
+            circuit_id_no_calc=_uuid(),
+        )
+        con.executemany(
+            """
+            INSERT INTO circuits (
+              id, panel_id, name, phases, neutral_present, unbalance_mode,
+              length_m, material, cos_phi, load_kind, i_calc_a
+            )
+            VALUES (?, ?, ?, 1, 1, 'NORMAL', 10.0, 'CU', 0.9, 'OTHER', 5.0)
+            """,
+            [(_uuid(), panel_id, f"Линия \"{k}\"") for k in range(5)],
+        )
+        con.commit()
+
+        monkeypatch.setattr(export_payload, "_iso_utc_now", lambda: "2026-02-15T12:34:56+00:00")
+        expected = json.dumps(export_payload.build_payload(con, panel_id), ensure_ascii=False, indent=2) + "\n"
+        out = io.StringIO()
+        count = export_payload.write_payload(con, panel_id, out, chunk_size=chunk_size)
+    finally:
+        con.close()
+
+    assert count == 7
+    assert out.getvalue() == expected
+
+
+def test_write_payload_no_circuits(tmp_path: Path) -> None:
+    import io
+
+    from calc_core.export_payload import write_payload
+
+    db_path = _make_db(tmp_path)
+    panel_id = _uuid()
+    con = sqlite3.connect(db_path)
+    try:
+        _seed_minimal_payload_data(
+            con,
+            panel_id=panel_id,
+            section_id_with_calc=_uuid(),
+            section_id_no_calc=_uuid(),
+            circuit_id_ok=_uuid(),
+            circuit_id_no_calc=_uuid(),
+        )
+        con.execute("DELETE FROM circuits")
+        con.commit()
+        out = io.StringIO()
+        assert write_payload(con, panel_id, out) == 0
+        with pytest.raises(ValueError):
+            write_payload(con, panel_id, io.StringIO(), chunk_size=0)
+    finally:
+        con.close()
+
+    data = json.loads(out.getvalue())
+    assert data["circuits"] == []
+    assert '  "circuits": [],\n' in out.getvalue()
+
+
+def test_iter_payloads_one_snapshot(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    from calc_core import export_payload
+
+    db_path = _make_db(tmp_path)
+    panel_ids = [_uuid(), _uuid()]
+    broken_panel_id = _uuid()
+    missing_panel_id = _uuid()
+    con = sqlite3.connect(db_path)
+    try:
+        for panel_id in panel_ids:
+            _seed_minimal_payload_data(
+                con,
+                panel_id=panel_id,
+                section_id_with_calc=_uuid(),
+                section_id_no_calc=_uuid(),
+                circuit_id_ok=_uuid(),
+                circuit_id_no_calc=_uuid(),
+            )
+        # Panel without rtm_panel_calc: reported, does not stop the export.
+        con.execute(
+            "INSERT INTO panels (id, name, system_type, u_ll_v, u_ph_v) VALUES (?, 'A-BROKEN', '3PH', 400.0, 230.0)",
+            (broken_panel_id,),
+        )
+        con.commit()
+
+        monkeypatch.setattr(export_payload, "_iso_utc_now", lambda: "2026-02-15T12:34:56+00:00")
+        expected = {pid: export_payload.build_payload(con, pid) for pid in panel_ids}
+
+        statements: list[str] = []
+        con.set_trace_callback(statements.append)
+        items = list(
+            export_payload.iter_payloads(
+                con, [panel_ids[0], missing_panel_id, broken_panel_id, panel_ids[1]]
+            )
+        )
+        con.set_trace_callback(None)
+        everything = list(export_payload.iter_payloads(con))
+        assert not con.in_transaction
+    finally:
+        con.close()
+
+    assert statements[:2] == ["PRAGMA foreign_keys = ON;", "BEGIN"]
+    assert sum("FROM circuits c" in sql for sql in statements) == 1
+    assert sum("FROM rtm_panel_calc" in sql for sql in statements) == 1
+
+    errors = {item.panel_id: item.error for item in items if item.payload is None}
+    assert set(errors) == {broken_panel_id, missing_panel_id}
+    assert "rtm_panel_calc not found" in errors[broken_panel_id]
+    assert errors[missing_panel_id] == f"Panel not found: {missing_panel_id}"
+    assert items[-1].panel_id == missing_panel_id
+
+    payloads = {item.panel_id: item.payload for item in items if item.payload is not None}
+    assert payloads == expected
+    assert {item.panel_id for item in everything} == {*panel_ids, broken_panel_id}
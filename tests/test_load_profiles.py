@@ -0,0 +1,248 @@
+"""
+Consumer load profiles (float32 BLOBs) and coincident-peak section aggregation.
+"""
+
+from __future__ import annotations
+
+import math
+import sqlite3
+import sys
+import uuid
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+
+def _uuid() -> str:
+    return str(uuid.uuid4())
+
+
+def _seed(db_path: Path) -> tuple[str, dict[str, str], dict[str, str]]:
+    """Panel with S1 (A, B, C) and S2 (D); A/B/C/D are MANUAL consumers, A reserves on S2."""
+    panel_id = _uuid()
+    sections = {name: _uuid() for name in ("S1", "S2")}
+    consumers = {name: _uuid() for name in ("A", "B", "C", "D")}
+    con = sqlite3.connect(db_path)
+    try:
+        con.execute("PRAGMA foreign_keys = ON;")
+        con.execute(
+            "INSERT INTO panels (id, name, system_type, u_ll_v, u_ph_v) VALUES (?, ?, ?, ?, ?)",
+            (panel_id, "P", "3PH", 400.0, 230.0),
+        )
+        for name, sid in sections.items():
+            con.execute(
+                "INSERT INTO bus_sections (id, panel_id, name) VALUES (?, ?, ?)",
+                (sid, panel_id, name),
+            )
+        # (p_kw, q_kvar, s_kva, i_a): I = 2 A per kVA.
+        for name, (p, q, s, i) in (
+            ("A", (8.0, 6.0, 10.0, 20.0)),
+            ("B", (4.0, 3.0, 5.0, 10.0)),
+            ("C", (3.0, 4.0, 5.0, 10.0)),
+            ("D", (6.0, 8.0, 10.0, 20.0)),
+        ):
+            cid = consumers[name]
+            con.execute(
+                """
+                INSERT INTO consumers (id, panel_id, name, load_ref_type, load_ref_id, p_kw, q_kvar, s_kva, i_a)
+                VALUES (?, ?, ?, 'MANUAL', ?, ?, ?, ?, ?)
+                """,
+                (cid, panel_id, name, cid, p, q, s, i),
+            )
+        for consumer, section, role in (
+            ("A", "S1", "MAIN"),
+            ("A", "S2", "RESERVE"),
+            ("B", "S1", "MAIN"),
+            ("C", "S1", "MAIN"),
+            ("D", "S2", "MAIN"),
+        ):
+            con.execute(
+                """
+                INSERT INTO consumer_feeds (id, consumer_id, bus_section_id, feed_role, feed_role_id, priority)
+                VALUES (?, ?, ?, ?, ?, 1)
+                """,
+                (
+                    _uuid(),
+                    consumers[consumer],
+                    sections[section],
+                    "NORMAL" if role == "MAIN" else "RESERVE",
+                    role,
+                ),
+            )
+        con.commit()
+    finally:
+        con.close()
+    return panel_id, sections, consumers
+
+
+def test_encode_decode_roundtrip() -> None:
+    from calc_core.load_profiles import decode_profile, encode_profile
+
+    blob = encode_profile([0.5, 1.25, -2.0])
+    assert len(blob) == 12
+    assert blob[:4] == b"\x00\x00\x00\x3f"  # 0.5 as little-endian float32
+    assert decode_profile(blob) == [0.5, 1.25, -2.0]
+    with pytest.raises(ValueError):
+        encode_profile([])
+    with pytest.raises(ValueError):
+        encode_profile([1.0, math.nan])
+    with pytest.raises(ValueError):
+        decode_profile(b"\x00\x00\x00")
+
+
+def test_coincident_peak_per_section(tmp_path: Path) -> None:
+    from tools.run_calc import ensure_migrations
+    from calc_core.load_profiles import calc_section_profile_peaks, set_consumer_profile
+    from calc_core.section_aggregation import calc_section_loads_all_modes
+
+    db_path = tmp_path / "profiles.sqlite"
+    ensure_migrations(db_path)
+    panel_id, sections, consumers = _seed(db_path)
+
+    con = sqlite3.connect(db_path)
+    try:
+        # A peaks at step 2, B at step 0 (typical day of 4 points, repeated twice);
+        # C stays flat at its peak load.
+        set_consumer_profile(
+            con, consumers["A"], [2.0, 4.0, 8.0, 4.0, 2.0, 4.0, 7.0, 4.0], step_minutes=30
+        )
+        assert set_consumer_profile(
+            con, consumers["B"], [4.0, 2.0, 0.0, 2.0], [3.0, 1.5, 0.0, 1.5], step_minutes=30
+        ) == 4
+        peaks = calc_section_profile_peaks(con, [panel_id])
+        calc_section_loads_all_modes(con, panel_id)
+        section_calc = {
+            (str(r[0]), str(r[1])): float(r[2])
+            for r in con.execute("SELECT bus_section_id, mode, s_kva FROM section_calc")
+        }
+    finally:
+        con.close()
+
+    by_key = {(p.mode, p.section_name): p for p in peaks}
+    assert [(p.mode, p.section_name) for p in peaks] == [
+        ("NORMAL", "S1"),
+        ("NORMAL", "S2"),
+        ("EMERGENCY", "S1"),
+        ("EMERGENCY", "S2"),
+    ]
+    s1 = by_key[("NORMAL", "S1")]
+    # Step 2: A = 8 kW (Q by peak ratio 0.75 -> 10 kVA), B = 0, C = 5 kVA flat.
+    # Step 0: A = 2.5 kVA, B = 5 kVA, C = 5 kVA -> lower.
+    assert s1.peak_step == 2
+    assert s1.peak_hour == pytest.approx(1.0)
+    assert s1.step_minutes == 30
+    assert (s1.p_kw, s1.q_kvar, s1.s_kva, s1.i_a) == pytest.approx((11.0, 10.0, 15.0, 30.0))
+    assert (s1.static_s_kva, s1.static_i_a) == pytest.approx((20.0, 40.0))
+    assert (s1.consumer_count, s1.profiled_count) == (3, 2)
+
+    # Sections without profiles reproduce section_calc.
+    s2 = by_key[("NORMAL", "S2")]
+    assert (s2.peak_step, s2.profiled_count) == (0, 0)
+    assert s2.s_kva == pytest.approx(section_calc[(sections["S2"], "NORMAL")])
+    assert s2.s_kva == pytest.approx(s2.static_s_kva)
+
+    # EMERGENCY: A moves to S2 with D (flat 10 kVA).
+    e2 = by_key[("EMERGENCY", "S2")]
+    assert e2.peak_step == 2
+    assert (e2.s_kva, e2.i_a) == pytest.approx((20.0, 40.0))
+    assert e2.static_s_kva == pytest.approx(section_calc[(sections["S2"], "EMERGENCY")])
+
+
+def test_pure_python_fallback_matches_numpy(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    from tools.run_calc import ensure_migrations
+    from calc_core import load_profiles
+
+    db_path = tmp_path / "profiles_fallback.sqlite"
+    ensure_migrations(db_path)
+    panel_id, _sections, consumers = _seed(db_path)
+
+    con = sqlite3.connect(db_path)
+    try:
+        for k, name in enumerate(("A", "B", "C", "D")):
+            load_profiles.set_consumer_profile(
+                con, consumers[name], [float((t * (k + 3)) % 11) for t in range(48)]
+            )
+        fast = load_profiles.calc_section_profile_peaks(con, [panel_id])
+        monkeypatch.setattr(load_profiles, "_np", None)
+        slow = load_profiles.calc_section_profile_peaks(con, [panel_id])
+    finally:
+        con.close()
+
+    assert [(p.mode, p.bus_section_id, p.peak_step) for p in fast] == [
+        (p.mode, p.bus_section_id, p.peak_step) for p in slow
+    ]
+    for a, b in zip(fast, slow):
+        assert (a.p_kw, a.q_kvar, a.s_kva, a.i_a) == pytest.approx((b.p_kw, b.q_kvar, b.s_kva, b.i_a))
+
+
+def test_profile_validation(tmp_path: Path) -> None:
+    from tools.run_calc import ensure_migrations
+    from calc_core.load_profiles import (
+        calc_section_profile_peaks,
+        delete_consumer_profile,
+        set_consumer_profile,
+    )
+
+    db_path = tmp_path / "profiles_invalid.sqlite"
+    ensure_migrations(db_path)
+    panel_id, _sections, consumers = _seed(db_path)
+
+    con = sqlite3.connect(db_path)
+    try:
+        with pytest.raises(ValueError):
+            set_consumer_profile(con, consumers["A"], [1.0, 2.0], [1.0])
+        set_consumer_profile(con, consumers["A"], [1.0] * 24)
+        set_consumer_profile(con, consumers["B"], [1.0] * 10)
+        with pytest.raises(ValueError, match="cannot be repeated"):
+            calc_section_profile_peaks(con, [panel_id])
+        set_consumer_profile(con, consumers["B"], [1.0] * 24, step_minutes=15)
+        with pytest.raises(ValueError, match="step_minutes"):
+            calc_section_profile_peaks(con, [panel_id])
+        assert delete_consumer_profile(con, consumers["B"]) is True
+        assert delete_consumer_profile(con, consumers["B"]) is False
+        assert len(calc_section_profile_peaks(con, [panel_id], modes=["NORMAL"])) == 2
+
+        # Deleting a consumer removes its profile.
+        con.execute("PRAGMA foreign_keys = ON;")
+        con.execute("DELETE FROM consumers WHERE id = ?", (consumers["A"],))
+        con.commit()
+        assert con.execute("SELECT COUNT(*) FROM consumer_load_profiles").fetchone()[0] == 0
+    finally:
+        con.close()
+
+
+def test_only_sectioned_profiles_are_read(tmp_path: Path) -> None:
+    from tools.run_calc import ensure_migrations
+    from calc_core.load_profiles import calc_section_profile_peaks, set_consumer_profile
+
+    db_path = tmp_path / "profiles_filter.sqlite"
+    ensure_migrations(db_path)
+    panel_id, _sections, consumers = _seed(db_path)
+
+    con = sqlite3.connect(db_path)
+    try:
+        # E has no feed, so no section: its profile (other step) must not even be read.
+        e_id = _uuid()
+        con.execute(
+            """
+            INSERT INTO consumers (id, panel_id, name, load_ref_type, load_ref_id, p_kw, q_kvar, s_kva, i_a)
+            VALUES (?, ?, 'E', 'MANUAL', ?, 1.0, 0.0, 1.0, 2.0)
+            """,
+            (e_id, panel_id, e_id),
+        )
+        set_consumer_profile(con, e_id, [1.0] * 24, step_minutes=15)
+        set_consumer_profile(con, consumers["A"], [1.0] * 24)
+        statements: list[str] = []
+        con.set_trace_callback(statements.append)
+        peaks = calc_section_profile_peaks(con, [panel_id], modes=["NORMAL"])
+        con.set_trace_callback(None)
+    finally:
+        con.close()
+
+    assert [p.profiled_count for p in peaks] == [1, 0]
+    profile_sql = [s for s in statements if "consumer_load_profiles" in s]
+    assert profile_sql and all("consumer_id IN" in s for s in profile_sql)
+    assert not any(e_id in s for s in profile_sql)
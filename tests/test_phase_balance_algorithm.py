@@ -69,11 +69,11 @@ def test_phase_balance_algorithm_determinism_and_db_writes(tmp_path: Path) -> No
     con = sqlite3.connect(db_path)
     con.row_factory = sqlite3.Row
     try:
-        count = calc_phase_balance(con, panel_id, mode="NORMAL")
+        result = calc_phase_balance(con, panel_id, mode="NORMAL")
     finally:
         con.close()
 
-    assert count == 5
+    assert result.circuit_count == 5
 
     con = sqlite3.connect(db_path)
     con.row_factory = sqlite3.Row
@@ -0,0 +1,99 @@
+"""
+Phase balance: change-only, batched writes of circuits.phase.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import sys
+import uuid
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+
+def _uuid() -> str:
+    return str(uuid.uuid4())
+
+
+def _seed_panel(db_path: Path, currents: list[float]) -> tuple[str, list[str]]:
+    panel_id = _uuid()
+    circuit_ids = [_uuid() for _ in currents]
+    con = sqlite3.connect(db_path)
+    try:
+        con.execute(
+            "INSERT INTO panels (id, name, system_type, u_ll_v, u_ph_v) VALUES (?, ?, ?, ?, ?)",
+            (panel_id, "P1", "3PH", 400.0, 230.0),
+        )
+        for i, (cid, i_calc) in enumerate(zip(circuit_ids, currents)):
+            con.execute(
+                """
+                INSERT INTO circuits (
+                  id, panel_id, name, phases, neutral_present, unbalance_mode,
+                  length_m, material, cos_phi, load_kind, i_calc_a
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (cid, panel_id, f"C{i}", 1, 1, "NORMAL", 10.0, "CU", 0.9, "OTHER", i_calc),
+            )
+        con.commit()
+    finally:
+        con.close()
+    return panel_id, circuit_ids
+
+
+def test_rerun_writes_nothing(tmp_path: Path) -> None:
+    from tools.run_calc import ensure_migrations
+    from calc_core.phase_balance import calc_phase_balance
+
+    db_path = tmp_path / "pb_change_only.sqlite"
+    ensure_migrations(db_path)
+    panel_id, _ = _seed_panel(db_path, [12.0, 8.0, 15.0, 6.0, 10.0])
+
+    con = sqlite3.connect(db_path)
+    try:
+        first = calc_phase_balance(con, panel_id, mode="NORMAL")
+        assert first.circuit_count == 5
+        assert (first.changed_count, first.unchanged_count) == (5, 0)
+
+        changes_before = con.total_changes
+        second = calc_phase_balance(con, panel_id, mode="NORMAL")
+        assert (second.changed_count, second.unchanged_count) == (0, 5)
+        # Only the panel_phase_balance upsert touches the DB.
+        assert con.total_changes - changes_before == 1
+        assert second.unbalance_pct == first.unbalance_pct
+
+        row = con.execute(
+            "SELECT changed_count, unchanged_count FROM panel_phase_balance WHERE panel_id = ? AND mode = ?",
+            (panel_id, "NORMAL"),
+        ).fetchone()
+        assert (row["changed_count"], row["unchanged_count"]) == (0, 5)
+    finally:
+        con.close()
+
+
+def test_only_changed_rows_are_written(tmp_path: Path) -> None:
+    from tools.run_calc import ensure_migrations
+    from calc_core.phase_balance import calc_phase_balance
+
+    db_path = tmp_path / "pb_change_only_partial.sqlite"
+    ensure_migrations(db_path)
+    panel_id, circuit_ids = _seed_panel(db_path, [12.0, 8.0, 15.0, 6.0, 10.0])
+
+    con = sqlite3.connect(db_path)
+    try:
+        calc_phase_balance(con, panel_id, mode="NORMAL")
+        expected = dict(con.execute("SELECT id, phase FROM circuits WHERE panel_id = ?", (panel_id,)).fetchall())
+
+        # Disturb one circuit: exactly one row must be rewritten back.
+        wrong = "L1" if expected[circuit_ids[0]] != "L1" else "L2"
+        con.execute("UPDATE circuits SET phase = ? WHERE id = ?", (wrong, circuit_ids[0]))
+        con.commit()
+
+        result = calc_phase_balance(con, panel_id, mode="NORMAL")
+        assert (result.changed_count, result.unchanged_count) == (1, 4)
+        actual = dict(con.execute("SELECT id, phase FROM circuits WHERE panel_id = ?", (panel_id,)).fetchall())
+        assert actual == expected
+    finally:
+        con.close()
@@ -0,0 +1,141 @@
+"""
+Phase balance: slot / per-phase current limits and phase groups (method CONSTRAINED).
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import sys
+import uuid
+from collections import Counter
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+
+def _uuid() -> str:
+    return str(uuid.uuid4())
+
+
+def _seed_panel(db_path: Path, currents: list[float]) -> tuple[str, list[str]]:
+    panel_id = _uuid()
+    circuit_ids = sorted(_uuid() for _ in currents)
+    con = sqlite3.connect(db_path)
+    try:
+        con.execute(
+            "INSERT INTO panels (id, name, system_type, u_ll_v, u_ph_v) VALUES (?, ?, ?, ?, ?)",
+            (panel_id, "P1", "3PH", 400.0, 230.0),
+        )
+        for i, (cid, i_calc) in enumerate(zip(circuit_ids, currents)):
+            con.execute(
+                """
+                INSERT INTO circuits (
+                  id, panel_id, name, phases, neutral_present, unbalance_mode,
+                  length_m, material, cos_phi, load_kind, i_calc_a
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (cid, panel_id, f"C{i}", 1, 1, "NORMAL", 10.0, "CU", 0.9, "OTHER", i_calc),
+            )
+        con.commit()
+    finally:
+        con.close()
+    return panel_id, circuit_ids
+
+
+def _phases(con: sqlite3.Connection, panel_id: str) -> dict[str, str]:
+    return dict(con.execute("SELECT id, phase FROM circuits WHERE panel_id = ?", (panel_id,)).fetchall())
+
+
+def _warnings(con: sqlite3.Connection, panel_id: str) -> list[dict[str, object]]:
+    raw = con.execute(
+        "SELECT warnings_json FROM panel_phase_balance WHERE panel_id = ? AND mode = 'NORMAL'",
+        (panel_id,),
+    ).fetchone()[0]
+    return [] if raw is None else json.loads(raw)
+
+
+def test_slot_limit_is_respected(tmp_path: Path) -> None:
+    from tools.run_calc import ensure_migrations
+    from calc_core.phase_balance import PhaseConstraints, calc_phase_balance
+
+    db_path = tmp_path / "pb_constraints_slots.sqlite"
+    ensure_migrations(db_path)
+    # Plain greedy puts three 1 A circuits on L2.
+    panel_id, _ = _seed_panel(db_path, [10.0, 1.0, 1.0, 1.0, 1.0, 1.0])
+
+    con = sqlite3.connect(db_path)
+    try:
+        result = calc_phase_balance(
+            con, panel_id, constraints=PhaseConstraints(max_circuits_per_phase=2)
+        )
+        assert result.method == "CONSTRAINED"
+        assert result.optimal
+        assert sorted((result.i_l1, result.i_l2, result.i_l3)) == pytest.approx([2.0, 2.0, 11.0])
+        assert max(Counter(_phases(con, panel_id).values()).values()) == 2
+        assert _warnings(con, panel_id) == []
+    finally:
+        con.close()
+
+
+def test_groups_current_caps_and_manual_pin(tmp_path: Path) -> None:
+    from tools.run_calc import ensure_migrations
+    from calc_core.phase_balance import PhaseConstraints, calc_phase_balance
+
+    db_path = tmp_path / "pb_constraints_groups.sqlite"
+    ensure_migrations(db_path)
+    panel_id, ids = _seed_panel(db_path, [6.0, 5.0, 4.0, 3.0, 2.0, 1.0])
+
+    con = sqlite3.connect(db_path)
+    try:
+        con.execute("UPDATE circuits SET phase = 'L3', phase_source = 'MANUAL' WHERE id = ?", (ids[5],))
+        con.commit()
+        constraints = PhaseConstraints.from_dict(
+            {
+                "max_current_per_phase_a": [None, 9.0, None],
+                "same_phase_groups": [[ids[3], ids[5]]],
+                "different_phase_groups": [[ids[0], ids[1], ids[2]]],
+            }
+        )
+        result = calc_phase_balance(con, panel_id, constraints=constraints)
+        phases = _phases(con, panel_id)
+        assert phases[ids[5]] == "L3"
+        assert phases[ids[3]] == "L3"
+        assert len({phases[ids[0]], phases[ids[1]], phases[ids[2]]}) == 3
+        assert result.i_l2 <= 9.0
+        assert result.i_l1 + result.i_l2 + result.i_l3 == pytest.approx(21.0)
+        # L3 already carries 1 + 3 A and must take one of 6 / 5 / 4 A.
+        assert max(result.i_l1, result.i_l2, result.i_l3) == pytest.approx(8.0)
+        assert _warnings(con, panel_id) == []
+    finally:
+        con.close()
+
+
+def test_infeasible_constraints_are_reported(tmp_path: Path) -> None:
+    from tools.run_calc import ensure_migrations
+    from calc_core.phase_balance import PhaseConstraints, calc_phase_balance
+
+    db_path = tmp_path / "pb_constraints_infeasible.sqlite"
+    ensure_migrations(db_path)
+    panel_id, ids = _seed_panel(db_path, [4.0, 3.0, 2.0, 1.0])
+
+    con = sqlite3.connect(db_path)
+    try:
+        constraints = PhaseConstraints(
+            max_circuits_per_phase=1,
+            different_phase_groups=((ids[0], ids[1], ids[2], ids[3]),),
+        )
+        result = calc_phase_balance(con, panel_id, constraints=constraints)
+        assert not result.optimal
+        assert all(ph in ("L1", "L2", "L3") for ph in _phases(con, panel_id).values())
+        reasons = Counter(w["reason"] for w in _warnings(con, panel_id))
+        assert reasons == {"PHASE_MAX_CIRCUITS_EXCEEDED": 1, "DIFFERENT_PHASE_GROUP_CONFLICT": 1}
+    finally:
+        con.close()
+
+    with pytest.raises(ValueError, match="3 values"):
+        PhaseConstraints(max_current_per_phase_a=(10.0, 10.0))
@@ -0,0 +1,129 @@
+"""
+Phase balance: exact branch-and-bound mode for small panels.
+"""
+
+from __future__ import annotations
+
+import itertools
+import random
+import sqlite3
+import sys
+import uuid
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+
+def _uuid() -> str:
+    return str(uuid.uuid4())
+
+
+def _brute_force_max(base: tuple[float, float, float], currents: list[float]) -> float:
+    best = float("inf")
+    for combo in itertools.product((0, 1, 2), repeat=len(currents)):
+        sums = list(base)
+        for i_a, p in zip(currents, combo):
+            sums[p] += i_a
+        best = min(best, max(sums))
+    return best
+
+
+def test_exact_matches_brute_force() -> None:
+    from calc_core.phase_assignment import exact_assign, phase_sums
+
+    rng = random.Random(7)
+    for _ in range(20):
+        n = rng.randint(1, 8)
+        currents = sorted((float(rng.randint(1, 30)) for _ in range(n)), reverse=True)
+        base = (float(rng.randint(0, 10)), 0.0, float(rng.randint(0, 5)))
+        assign, optimal = exact_assign(base, currents)
+        assert optimal
+        assert max(phase_sums(base, currents, assign)) == _brute_force_max(base, currents)
+
+
+def test_exact_handles_forty_circuits_quickly() -> None:
+    from calc_core.phase_assignment import exact_assign, greedy_assign, phase_sums
+
+    rng = random.Random(3)
+    currents = sorted((round(rng.uniform(0.5, 16.0), 2) for _ in range(40)), reverse=True)
+    base = (0.0, 0.0, 0.0)
+    greedy_max = max(phase_sums(base, currents, greedy_assign(base, currents)))
+    assign, _ = exact_assign(base, currents, time_limit_s=5.0)
+    assert len(assign) == 40
+    assert max(phase_sums(base, currents, assign)) <= greedy_max
+
+
+def test_exact_node_cap_falls_back_to_incumbent() -> None:
+    from calc_core.phase_assignment import SearchStats, exact_assign, greedy_assign, phase_sums
+
+    currents = [5.0, 5.0, 4.0, 4.0, 3.0, 3.0, 3.0]
+    base = (0.0, 0.0, 0.0)
+    greedy = greedy_assign(base, currents)
+    stats = SearchStats()
+    assign, optimal = exact_assign(base, currents, incumbent=greedy, node_limit=1, stats=stats)
+    assert not optimal
+    assert assign == greedy
+    # Node budget, not the clock: deterministic and not flagged as time-capped.
+    assert stats.budget_exhausted and not stats.time_capped
+
+    assign, optimal = exact_assign(base, currents, incumbent=greedy)
+    assert optimal
+    assert max(phase_sums(base, currents, assign)) == 9.0
+
+
+def test_calc_phase_balance_exact_respects_manual(tmp_path: Path) -> None:
+    from tools.run_calc import ensure_migrations
+    from calc_core.phase_balance import calc_phase_balance
+
+    db_path = tmp_path / "pb_exact.sqlite"
+    ensure_migrations(db_path)
+
+    panel_id = _uuid()
+    manual_id = _uuid()
+    con = sqlite3.connect(db_path)
+    try:
+        con.execute(
+            "INSERT INTO panels (id, name, system_type, u_ll_v, u_ph_v) VALUES (?, ?, ?, ?, ?)",
+            (panel_id, "UPS", "3PH", 400.0, 230.0),
+        )
+        con.execute(
+            """
+            INSERT INTO circuits (
+              id, panel_id, name, phases, neutral_present, unbalance_mode,
+              length_m, material, cos_phi, load_kind, i_calc_a, phase, phase_source
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (manual_id, panel_id, "M", 1, 1, "NORMAL", 10.0, "CU", 0.9, "OTHER", 6.0, "L2", "MANUAL"),
+        )
+        for i, i_calc in enumerate([5.0, 5.0, 4.0, 4.0, 3.0, 3.0, 3.0, 3.0]):
+            con.execute(
+                """
+                INSERT INTO circuits (
+                  id, panel_id, name, phases, neutral_present, unbalance_mode,
+                  length_m, material, cos_phi, load_kind, i_calc_a
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (_uuid(), panel_id, f"C{i}", 1, 1, "NORMAL", 10.0, "CU", 0.9, "OTHER", i_calc),
+            )
+        con.commit()
+    finally:
+        con.close()
+
+    con = sqlite3.connect(db_path)
+    con.row_factory = sqlite3.Row
+    try:
+        calc_phase_balance(con, panel_id, mode="NORMAL", method="EXACT")
+        manual_phase = con.execute("SELECT phase FROM circuits WHERE id = ?", (manual_id,)).fetchone()[0]
+        assert manual_phase == "L2"
+        balance = con.execute(
+            "SELECT i_l1, i_l2, i_l3, unbalance_pct FROM panel_phase_balance WHERE panel_id = ? AND mode = ?",
+            (panel_id, "NORMAL"),
+        ).fetchone()
+        # total = 36 -> perfect 12/12/12 is reachable with L2 pre-loaded by 6 A.
+        assert sorted([balance["i_l1"], balance["i_l2"], balance["i_l3"]]) == [12.0, 12.0, 12.0]
+        assert balance["unbalance_pct"] == 0.0
+    finally:
+        con.close()
@@ -0,0 +1,199 @@
+"""
+Phase balance: incremental placement of one added/changed circuit.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import sys
+import uuid
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+
+def _uuid() -> str:
+    return str(uuid.uuid4())
+
+
+def _add_circuit(con: sqlite3.Connection, panel_id: str, name: str, i_calc: float) -> str:
+    cid = _uuid()
+    con.execute(
+        """
+        INSERT INTO circuits (
+          id, panel_id, name, phases, neutral_present, unbalance_mode,
+          length_m, material, cos_phi, load_kind, i_calc_a
+        )
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        (cid, panel_id, name, 1, 1, "NORMAL", 10.0, "CU", 0.9, "OTHER", i_calc),
+    )
+    return cid
+
+
+def _seed_balanced_panel(db_path: Path) -> tuple[str, dict[str, str]]:
+    from calc_core.phase_balance import calc_phase_balance
+
+    panel_id = _uuid()
+    con = sqlite3.connect(db_path)
+    try:
+        con.execute(
+            "INSERT INTO panels (id, name, system_type, u_ll_v, u_ph_v) VALUES (?, ?, ?, ?, ?)",
+            (panel_id, "P1", "3PH", 400.0, 230.0),
+        )
+        currents = [12.0, 8.0, 15.0, 6.0, 10.0]
+        ids = {f"C{i}": _add_circuit(con, panel_id, f"C{i}", i_calc) for i, i_calc in enumerate(currents)}
+        con.commit()
+        # Greedy: 15 -> L1, 12 -> L2, 10 -> L3, 8 -> L3, 6 -> L2 => 15 / 18 / 18
+        calc_phase_balance(con, panel_id, mode="NORMAL")
+    finally:
+        con.close()
+    return panel_id, ids
+
+
+def _phases(con: sqlite3.Connection, panel_id: str) -> dict[str, str]:
+    return dict(con.execute("SELECT id, phase FROM circuits WHERE panel_id = ?", (panel_id,)).fetchall())
+
+
+def test_new_circuit_goes_to_lightest_phase_only(tmp_path: Path) -> None:
+    from tools.run_calc import ensure_migrations
+    from calc_core.phase_balance import place_circuit_phase
+
+    db_path = tmp_path / "pb_incremental.sqlite"
+    ensure_migrations(db_path)
+    panel_id, _ = _seed_balanced_panel(db_path)
+
+    con = sqlite3.connect(db_path)
+    try:
+        before = _phases(con, panel_id)
+        new_id = _add_circuit(con, panel_id, "NEW", 3.0)
+        con.commit()
+
+        changes_before = con.total_changes
+        result = place_circuit_phase(con, new_id, mode="NORMAL")
+        assert result.method == "INCREMENTAL"
+        assert (result.circuit_count, result.changed_count, result.unchanged_count) == (1, 1, 0)
+        assert (result.i_l1, result.i_l2, result.i_l3) == pytest.approx((18.0, 18.0, 18.0))
+        # One circuits row + one panel_phase_balance row.
+        assert con.total_changes - changes_before == 2
+
+        after = _phases(con, panel_id)
+        assert after.pop(new_id) == "L1"
+        assert after == before
+
+        row = con.execute(
+            "SELECT i_l1, i_l2, i_l3, unbalance_pct FROM panel_phase_balance WHERE panel_id = ? AND mode = 'NORMAL'",
+            (panel_id,),
+        ).fetchone()
+        assert tuple(row) == pytest.approx((18.0, 18.0, 18.0, 0.0))
+        phase_i_a = con.execute("SELECT phase_i_a FROM circuits WHERE id = ?", (new_id,)).fetchone()[0]
+        assert phase_i_a == pytest.approx(3.0)
+    finally:
+        con.close()
+
+
+def test_current_change_replaces_old_contribution(tmp_path: Path) -> None:
+    from tools.run_calc import ensure_migrations
+    from calc_core.phase_balance import place_circuit_phase
+
+    db_path = tmp_path / "pb_incremental_change.sqlite"
+    ensure_migrations(db_path)
+    panel_id, ids = _seed_balanced_panel(db_path)
+
+    con = sqlite3.connect(db_path)
+    try:
+        # C3 (6 A on L2) drops to 2 A: 15 / 12 / 18 without it -> stays on L2.
+        con.execute("UPDATE circuits SET i_calc_a = 2.0 WHERE id = ?", (ids["C3"],))
+        con.commit()
+        result = place_circuit_phase(con, ids["C3"])
+        assert result.method == "INCREMENTAL"
+        assert (result.changed_count, result.unchanged_count) == (0, 1)
+        assert (result.i_l1, result.i_l2, result.i_l3) == pytest.approx((15.0, 14.0, 18.0))
+    finally:
+        con.close()
+
+
+def test_threshold_and_missing_state_fall_back_to_full(tmp_path: Path) -> None:
+    from tools.run_calc import ensure_migrations
+    from calc_core.phase_balance import place_circuit_phase
+
+    db_path = tmp_path / "pb_incremental_fallback.sqlite"
+    ensure_migrations(db_path)
+    panel_id, _ = _seed_balanced_panel(db_path)
+
+    con = sqlite3.connect(db_path)
+    try:
+        big_id = _add_circuit(con, panel_id, "BIG", 30.0)
+        con.commit()
+        # 45 / 18 / 18 exceeds the threshold -> full greedy rebalance of the panel.
+        result = place_circuit_phase(con, big_id, rebalance_threshold_pct=15.0)
+        assert result.method == "GREEDY"
+        assert result.circuit_count == 6
+        assert (result.i_l1, result.i_l2, result.i_l3) == pytest.approx((30.0, 23.0, 28.0))
+
+        # No EMERGENCY row stored yet -> full run for that mode.
+        emergency = place_circuit_phase(con, big_id, mode="EMERGENCY")
+        assert emergency.method == "GREEDY"
+
+        with pytest.raises(ValueError, match="circuit not found"):
+            place_circuit_phase(con, _uuid())
+    finally:
+        con.close()
+
+
+def test_stored_counts_kept_and_verify_falls_back(tmp_path: Path) -> None:
+    from tools.run_calc import ensure_migrations
+    from calc_core.phase_balance import place_circuit_phase
+
+    db_path = tmp_path / "pb_incremental_stale.sqlite"
+    ensure_migrations(db_path)
+    panel_id, ids = _seed_balanced_panel(db_path)
+
+    con = sqlite3.connect(db_path)
+    try:
+        counts_sql = (
+            "SELECT changed_count, unchanged_count FROM panel_phase_balance "
+            "WHERE panel_id = ? AND mode = 'NORMAL'"
+        )
+        full_counts = tuple(con.execute(counts_sql, (panel_id,)).fetchone())
+        assert full_counts == (5, 0)
+
+        new_id = _add_circuit(con, panel_id, "NEW", 3.0)
+        con.commit()
+        result = place_circuit_phase(con, new_id)
+        assert result.method == "INCREMENTAL"
+        assert (result.changed_count, result.unchanged_count) == (1, 0)
+        # Counts of the last full balance are not overwritten by one placement.
+        assert tuple(con.execute(counts_sql, (panel_id,)).fetchone()) == full_counts
+
+        # Default: stored sums are trusted, no O(n) aggregate over the panel's circuits.
+        statements: list[str] = []
+        con.set_trace_callback(statements.append)
+        newer_id = _add_circuit(con, panel_id, "NEWER", 1.0)
+        con.commit()
+        result = place_circuit_phase(con, newer_id, rebalance_threshold_pct=None)
+        con.set_trace_callback(None)
+        assert result.method == "INCREMENTAL"
+        assert not any("SUM(" in s for s in statements)
+
+        # A manual phase edit makes the stored sums stale: verify=True checks them first.
+        con.execute("UPDATE circuits SET phase = 'L1' WHERE id = ?", (ids["C3"],))
+        con.commit()
+        result = place_circuit_phase(con, ids["C3"], rebalance_threshold_pct=None, verify=True)
+        assert result.method == "GREEDY"
+        assert result.i_l1 + result.i_l2 + result.i_l3 == pytest.approx(55.0)
+
+        # Drift that would make a phase sum negative falls back even without verify.
+        con.execute(
+            "UPDATE panel_phase_balance SET i_l1 = 0.0, i_l2 = 0.0, i_l3 = 0.0 WHERE panel_id = ?",
+            (panel_id,),
+        )
+        con.commit()
+        result = place_circuit_phase(con, ids["C3"], rebalance_threshold_pct=None)
+        assert result.method == "GREEDY"
+        assert result.i_l1 + result.i_l2 + result.i_l3 == pytest.approx(55.0)
+    finally:
+        con.close()
@@ -0,0 +1,186 @@
+"""
+Phase balance: joint NORMAL/EMERGENCY optimization.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import sys
+import uuid
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+
+def _uuid() -> str:
+    return str(uuid.uuid4())
+
+
+def _insert_1ph_circuit(
+    con: sqlite3.Connection, panel_id: str, name: str, i_calc_a: float, bus_section_id: str
+) -> None:
+    con.execute(
+        """
+        INSERT INTO circuits (
+          id, panel_id, name, phases, neutral_present, unbalance_mode,
+          length_m, material, cos_phi, load_kind, i_calc_a, bus_section_id
+        )
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        (_uuid(), panel_id, name, 1, 1, "NORMAL", 10.0, "CU", 0.9, "OTHER", i_calc_a, bus_section_id),
+    )
+
+
+def _seed(db_path: Path) -> str:
+    """BS_A (active in EMERGENCY): 3 x 10 A; BS_B (inactive): 1 x 30 A."""
+    panel_id = _uuid()
+    bs_a = _uuid()
+    bs_b = _uuid()
+    con = sqlite3.connect(db_path)
+    try:
+        con.execute(
+            "INSERT INTO panels (id, name, system_type, u_ll_v, u_ph_v) VALUES (?, ?, ?, ?, ?)",
+            (panel_id, "P1", "3PH", 400.0, 230.0),
+        )
+        for bs_id, name in ((bs_a, "BS_A"), (bs_b, "BS_B")):
+            con.execute(
+                "INSERT INTO bus_sections (id, panel_id, name) VALUES (?, ?, ?)",
+                (bs_id, panel_id, name),
+            )
+        for i in range(3):
+            _insert_1ph_circuit(con, panel_id, f"A{i}", 10.0, bs_a)
+        _insert_1ph_circuit(con, panel_id, "B0", 30.0, bs_b)
+        for bs_id, load in ((bs_a, 1.0), (bs_b, 0.0)):
+            con.execute(
+                """
+                INSERT INTO section_calc (panel_id, bus_section_id, mode, p_kw, q_kvar, s_kva, i_a, updated_at)
+                VALUES (?, ?, 'EMERGENCY', 0, 0, ?, ?, datetime('now'))
+                """,
+                (panel_id, bs_id, load, load),
+            )
+        con.commit()
+    finally:
+        con.close()
+    return panel_id
+
+
+def test_joint_beats_normal_only_on_weighted_objective(tmp_path: Path) -> None:
+    from tools.run_calc import ensure_migrations
+    from calc_core.phase_balance import calc_phase_balance, calc_phase_balance_joint
+
+    db_path = tmp_path / "pb_joint.sqlite"
+    ensure_migrations(db_path)
+    panel_id = _seed(db_path)
+
+    con = sqlite3.connect(db_path)
+    try:
+        # NORMAL-only greedy: 30 | 10+10 | 10 -> EMERGENCY subset 0 | 20 | 10.
+        normal_only = calc_phase_balance(con, panel_id, mode="NORMAL")
+        assert normal_only.unbalance_pct == 50.0
+        emergency_sums = sorted(
+            r[0]
+            for r in con.execute(
+                """
+                SELECT SUM(i_calc_a) FROM circuits
+                WHERE panel_id = ? AND name LIKE 'A%'
+                GROUP BY phase
+                """,
+                (panel_id,),
+            ).fetchall()
+        )
+        assert emergency_sums == [10.0, 20.0]
+
+        con.execute("UPDATE circuits SET phase = NULL WHERE panel_id = ?", (panel_id,))
+        con.commit()
+
+        results = calc_phase_balance_joint(con, panel_id)
+        assert set(results) == {"NORMAL", "EMERGENCY"}
+        assert results["EMERGENCY"].unbalance_pct == 0.0
+        assert results["EMERGENCY"].circuit_count == 3
+        assert results["NORMAL"].circuit_count == 4
+        assert results["NORMAL"].method == "JOINT"
+        # 0.5 * 100 + 0.5 * 0 < 0.5 * 50 + 0.5 * 100
+        assert 0.5 * results["NORMAL"].unbalance_pct + 0.5 * results["EMERGENCY"].unbalance_pct == 50.0
+
+        rows = {
+            r["mode"]: r
+            for r in con.execute(
+                "SELECT mode, i_l1, i_l2, i_l3, unbalance_pct FROM panel_phase_balance WHERE panel_id = ?",
+                (panel_id,),
+            ).fetchall()
+        }
+        assert sorted([rows["EMERGENCY"]["i_l1"], rows["EMERGENCY"]["i_l2"], rows["EMERGENCY"]["i_l3"]]) == [
+            10.0,
+            10.0,
+            10.0,
+        ]
+        assert rows["NORMAL"]["unbalance_pct"] == results["NORMAL"].unbalance_pct
+
+        rerun = calc_phase_balance_joint(con, panel_id)
+        assert rerun["NORMAL"].changed_count == 0
+    finally:
+        con.close()
+
+
+def test_joint_local_search_never_worsens_objective() -> None:
+    import random
+
+    from calc_core.phase_assignment import (
+        joint_greedy_assign,
+        joint_local_search,
+        joint_objective,
+        phase_sums,
+    )
+
+    rng = random.Random(11)
+    currents = sorted((float(rng.randint(1, 25)) for _ in range(30)), reverse=True)
+    masks = ([True] * 30, [rng.random() < 0.5 for _ in range(30)])
+    bases = ((3.0, 0.0, 0.0), (0.0, 2.0, 0.0))
+    weights = (0.3, 0.7)
+
+    def _objective(assign: list[int]) -> float:
+        sums = [
+            phase_sums(base, [x if m else 0.0 for x, m in zip(currents, mask)], assign)
+            for base, mask in zip(bases, masks)
+        ]
+        return joint_objective(sums, weights)
+
+    seed_assign = joint_greedy_assign(bases, currents, masks, weights)
+    improved = joint_local_search(bases, currents, masks, weights, seed_assign, seed=3)
+    assert _objective(improved) <= _objective(seed_assign) + 1e-9
+    assert improved == joint_local_search(bases, currents, masks, weights, seed_assign, seed=3)
+
+
+@pytest.mark.parametrize("max_evals", [2_000_000, 5_000])
+def test_joint_local_search_numpy_blocks_match_scalar_scan(
+    monkeypatch: pytest.MonkeyPatch, max_evals: int
+) -> None:
+    import random
+
+    from calc_core import phase_assignment
+    from calc_core.phase_assignment import SearchStats, joint_greedy_assign, joint_local_search
+
+    if phase_assignment._np is None:
+        pytest.skip("numpy is not installed")
+    rng = random.Random(5)
+    n = phase_assignment._JOINT_NUMPY_MIN_ITEMS + 50
+    currents = [float(rng.randint(0, 300)) / 10 for _ in range(n)]
+    masks = ([True] * n, [rng.random() < 0.6 for _ in range(n)])
+    bases = ((3.0, 0.0, 1.0), (0.0, 2.0, 0.0))
+    weights = (1.0, 0.5)
+    seed_assign = joint_greedy_assign(bases, currents, masks, weights)
+
+    runs = []
+    for np_module in (phase_assignment._np, None):
+        monkeypatch.setattr(phase_assignment, "_np", np_module)
+        stats = SearchStats()
+        assign = joint_local_search(
+            bases, currents, masks, weights, seed_assign, max_evals=max_evals, seed=3, stats=stats
+        )
+        runs.append((assign, stats))
+    # Same first-improvement scan: identical assignment, evaluation count and budget flag.
+    assert runs[0] == runs[1]
+    assert runs[0][1].budget_exhausted == (max_evals == 5_000)
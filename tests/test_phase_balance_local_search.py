@@ -0,0 +1,143 @@
+"""
+Phase balance: move/swap local search after greedy (evaluation budget,
+wall-clock safety cap).
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import sys
+import uuid
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+
+def _uuid() -> str:
+    return str(uuid.uuid4())
+
+
+# Classic LPT counterexample for 3 bins: greedy max=11, optimum max=9.
+LPT_CURRENTS = [5.0, 5.0, 4.0, 4.0, 3.0, 3.0, 3.0]
+
+
+def test_local_search_improves_greedy_to_optimum() -> None:
+    from calc_core.phase_assignment import greedy_assign, local_search, phase_sums
+
+    base = (0.0, 0.0, 0.0)
+    greedy = greedy_assign(base, LPT_CURRENTS)
+    assert max(phase_sums(base, LPT_CURRENTS, greedy)) == 11.0
+
+    improved = local_search(base, LPT_CURRENTS, greedy, seed=0)
+    assert max(phase_sums(base, LPT_CURRENTS, improved)) == 9.0
+
+
+def test_local_search_is_deterministic_for_seed() -> None:
+    from calc_core.phase_assignment import greedy_assign, local_search
+
+    currents = [float((i * 37) % 23 + 1) for i in range(60)]
+    base = (7.0, 0.0, 3.0)
+    greedy = greedy_assign(base, currents)
+    a = local_search(base, currents, greedy, seed=42)
+    b = local_search(base, currents, greedy, seed=42)
+    assert a == b
+
+
+def test_local_search_stops_on_eval_budget() -> None:
+    from calc_core.phase_assignment import SearchStats, greedy_assign, local_search
+
+    currents = [float((i * 37) % 23 + 1) for i in range(60)]
+    base = (7.0, 0.0, 3.0)
+    greedy = greedy_assign(base, currents)
+    runs = []
+    for _ in range(2):
+        stats = SearchStats()
+        runs.append(local_search(base, currents, greedy, max_evals=300, seed=42, stats=stats))
+        assert stats.evals == 300
+        assert stats.budget_exhausted and not stats.time_capped
+    # Budget in evaluations, not seconds: the truncated result is reproducible too.
+    assert runs[0] == runs[1]
+
+
+def test_local_search_time_cap_is_recorded() -> None:
+    from calc_core.phase_assignment import SearchStats, greedy_assign, local_search
+
+    currents = [float((i * 37) % 23 + 1) for i in range(60)]
+    greedy = greedy_assign((0.0, 0.0, 0.0), currents)
+    stats = SearchStats()
+    local_search((0.0, 0.0, 0.0), currents, greedy, time_cap_s=0.0, stats=stats)
+    assert stats.time_capped
+
+
+def test_local_search_disabled_without_budget() -> None:
+    from calc_core.phase_assignment import greedy_assign, local_search
+
+    greedy = greedy_assign((0.0, 0.0, 0.0), LPT_CURRENTS)
+    assert local_search((0.0, 0.0, 0.0), LPT_CURRENTS, greedy, max_evals=0) == greedy
+
+
+def test_calc_phase_balance_with_improve_budget(tmp_path: Path) -> None:
+    from tools.run_calc import ensure_migrations
+    from calc_core.phase_balance import calc_phase_balance
+
+    db_path = tmp_path / "pb_local_search.sqlite"
+    ensure_migrations(db_path)
+
+    panel_id = _uuid()
+    con = sqlite3.connect(db_path)
+    try:
+        con.execute(
+            "INSERT INTO panels (id, name, system_type, u_ll_v, u_ph_v) VALUES (?, ?, ?, ?, ?)",
+            (panel_id, "P1", "3PH", 400.0, 230.0),
+        )
+        for i, i_calc in enumerate(LPT_CURRENTS):
+            con.execute(
+                """
+                INSERT INTO circuits (
+                  id, panel_id, name, phases, neutral_present, unbalance_mode,
+                  length_m, material, cos_phi, load_kind, i_calc_a
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (_uuid(), panel_id, f"C{i}", 1, 1, "NORMAL", 10.0, "CU", 0.9, "LIGHTING", i_calc),
+            )
+        con.commit()
+    finally:
+        con.close()
+
+    con = sqlite3.connect(db_path)
+    con.row_factory = sqlite3.Row
+    try:
+        calc_phase_balance(con, panel_id, mode="NORMAL", improve_budget_s=5.0, seed=1)
+        balance = con.execute(
+            "SELECT i_l1, i_l2, i_l3, unbalance_pct FROM panel_phase_balance WHERE panel_id = ? AND mode = ?",
+            (panel_id, "NORMAL"),
+        ).fetchone()
+        assert sorted([balance["i_l1"], balance["i_l2"], balance["i_l3"]]) == [9.0, 9.0, 9.0]
+        assert balance["unbalance_pct"] == 0.0
+
+        sums = {
+            r["phase"]: r["total"]
+            for r in con.execute(
+                "SELECT phase, SUM(i_calc_a) AS total FROM circuits WHERE panel_id = ? GROUP BY phase",
+                (panel_id,),
+            ).fetchall()
+        }
+        assert sums == {"L1": 9.0, "L2": 9.0, "L3": 9.0}
+
+        # Evaluation budget alone enables the search; no time cap → no SEARCH_TIME_CAP.
+        result = calc_phase_balance(con, panel_id, mode="NORMAL", improve_max_evals=10_000, seed=1)
+        assert result.unbalance_pct == 0.0
+        assert result.warning_counts == ()
+
+        # Safety cap that fires: the result is flagged in warnings_json / warning_counts.
+        result = calc_phase_balance(con, panel_id, mode="NORMAL", improve_budget_s=1e-9, seed=2)
+        assert result.warning_counts == (("SEARCH_TIME_CAP", 1),)
+        stored = con.execute(
+            "SELECT warnings_json FROM panel_phase_balance WHERE panel_id = ? AND mode = 'NORMAL'",
+            (panel_id,),
+        ).fetchone()
+        assert '"SEARCH_TIME_CAP"' in stored["warnings_json"]
+    finally:
+        con.close()
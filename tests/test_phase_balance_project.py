@@ -0,0 +1,111 @@
+"""
+Phase balance: project-wide batch over many panels.
+"""
+
+from __future__ import annotations
+
+import shutil
+import sqlite3
+import sys
+import uuid
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+
+def _uuid() -> str:
+    return str(uuid.uuid4())
+
+
+def _seed(db_path: Path) -> list[str]:
+    panel_ids = sorted(_uuid() for _ in range(3))
+    currents_by_panel = [[12.0, 8.0, 15.0, 6.0, 10.0], [5.0, 5.0, 4.0, 4.0, 3.0, 3.0, 3.0], []]
+    con = sqlite3.connect(db_path)
+    try:
+        for panel_id, currents in zip(panel_ids, currents_by_panel):
+            con.execute(
+                "INSERT INTO panels (id, name, system_type, u_ll_v, u_ph_v) VALUES (?, ?, ?, ?, ?)",
+                (panel_id, "P", "3PH", 400.0, 230.0),
+            )
+            for i, i_calc in enumerate(currents):
+                con.execute(
+                    """
+                    INSERT INTO circuits (
+                      id, panel_id, name, phases, neutral_present, unbalance_mode,
+                      length_m, material, cos_phi, load_kind, i_calc_a
+                    )
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (_uuid(), panel_id, f"C{i}", 1, 1, "NORMAL", 10.0, "CU", 0.9, "OTHER", i_calc),
+                )
+        con.commit()
+    finally:
+        con.close()
+    return panel_ids
+
+
+def _snapshot(db_path: Path) -> tuple[list[tuple], list[tuple]]:
+    con = sqlite3.connect(db_path)
+    try:
+        phases = con.execute("SELECT id, phase FROM circuits ORDER BY id").fetchall()
+        balance = con.execute(
+            """
+            SELECT panel_id, mode, i_l1, i_l2, i_l3, unbalance_pct, changed_count, unchanged_count
+            FROM panel_phase_balance ORDER BY panel_id, mode
+            """
+        ).fetchall()
+        return phases, balance
+    finally:
+        con.close()
+
+
+def test_project_matches_per_panel_runs(tmp_path: Path) -> None:
+    from tools.run_calc import ensure_migrations
+    from calc_core.phase_balance import calc_phase_balance, calc_phase_balance_project
+
+    db_project = tmp_path / "pb_project.sqlite"
+    ensure_migrations(db_project)
+    panel_ids = _seed(db_project)
+    db_single = tmp_path / "pb_single.sqlite"
+    shutil.copyfile(db_project, db_single)
+
+    con = sqlite3.connect(db_project)
+    try:
+        summary = calc_phase_balance_project(con, "NORMAL")
+    finally:
+        con.close()
+    assert [r.panel_id for r in summary] == panel_ids
+    assert [r.circuit_count for r in summary] == [5, 7, 0]
+    assert [r.changed_count for r in summary] == [5, 7, 0]
+
+    con = sqlite3.connect(db_single)
+    try:
+        singles = [calc_phase_balance(con, pid, mode="NORMAL") for pid in panel_ids]
+    finally:
+        con.close()
+    assert [(r.i_l1, r.i_l2, r.i_l3) for r in summary] == [(r.i_l1, r.i_l2, r.i_l3) for r in singles]
+    assert _snapshot(db_project)[0] == _snapshot(db_single)[0]
+    assert [row[:6] for row in _snapshot(db_project)[1]] == [row[:6] for row in _snapshot(db_single)[1]]
+
+
+def test_project_subset_and_rerun(tmp_path: Path) -> None:
+    from tools.run_calc import ensure_migrations
+    from calc_core.phase_balance import calc_phase_balance_project
+
+    db_path = tmp_path / "pb_project_subset.sqlite"
+    ensure_migrations(db_path)
+    panel_ids = _seed(db_path)
+
+    con = sqlite3.connect(db_path)
+    try:
+        summary = calc_phase_balance_project(con, "EMERGENCY", panel_ids=[panel_ids[1]])
+        assert [r.panel_id for r in summary] == [panel_ids[1]]
+        assert summary[0].mode == "EMERGENCY"
+        count = con.execute("SELECT COUNT(*) FROM panel_phase_balance").fetchone()[0]
+        assert count == 1
+
+        rerun = calc_phase_balance_project(con, "EMERGENCY", panel_ids=[panel_ids[1]])
+        assert (rerun[0].changed_count, rerun[0].unchanged_count) == (0, 7)
+    finally:
+        con.close()
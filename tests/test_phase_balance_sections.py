@@ -0,0 +1,133 @@
+"""
+Phase balance: per-bus-section balancing (each section is its own 3-phase system).
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import sys
+import uuid
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+
+def _uuid() -> str:
+    return str(uuid.uuid4())
+
+
+def _seed(db_path: Path, currents_by_section: dict[str, list[float]]) -> tuple[str, dict[str, str]]:
+    panel_id = _uuid()
+    bs_ids: dict[str, str] = {}
+    con = sqlite3.connect(db_path)
+    try:
+        con.execute(
+            "INSERT INTO panels (id, name, system_type, u_ll_v, u_ph_v) VALUES (?, ?, ?, ?, ?)",
+            (panel_id, "P1", "3PH", 400.0, 230.0),
+        )
+        for name, currents in currents_by_section.items():
+            bs_id = None
+            if name != "-":
+                bs_id = _uuid()
+                bs_ids[name] = bs_id
+                con.execute(
+                    "INSERT INTO bus_sections (id, panel_id, name) VALUES (?, ?, ?)",
+                    (bs_id, panel_id, name),
+                )
+            for i, i_calc in enumerate(currents):
+                con.execute(
+                    """
+                    INSERT INTO circuits (
+                      id, panel_id, name, phases, neutral_present, unbalance_mode,
+                      length_m, material, cos_phi, load_kind, i_calc_a, bus_section_id
+                    )
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (_uuid(), panel_id, f"{name}{i}", 1, 1, "NORMAL", 10.0, "CU", 0.9, "OTHER", i_calc, bs_id),
+                )
+        con.commit()
+    finally:
+        con.close()
+    return panel_id, bs_ids
+
+
+def test_sections_are_balanced_independently(tmp_path: Path) -> None:
+    from tools.run_calc import ensure_migrations
+    from calc_core.phase_balance import calc_phase_balance_sections
+
+    db_path = tmp_path / "pb_sections.sqlite"
+    ensure_migrations(db_path)
+    # Panel-wide pooling could put both 10 A circuits of BS1 on one phase;
+    # per section each 3 x 10 A section must be perfectly balanced.
+    panel_id, bs_ids = _seed(
+        db_path,
+        {"BS1": [10.0, 10.0, 10.0], "BS2": [10.0, 10.0, 10.0], "-": [5.0]},
+    )
+
+    con = sqlite3.connect(db_path)
+    try:
+        result = calc_phase_balance_sections(con, panel_id, mode="NORMAL")
+        assert result.circuit_count == 7
+        assert [s.bus_section_id for s in result.sections] == sorted(bs_ids.values()) + [None]
+        assert sorted([result.i_l1, result.i_l2, result.i_l3]) == [20.0, 20.0, 25.0]
+
+        rows = con.execute(
+            """
+            SELECT bus_section_id, circuit_count, i_l1, i_l2, i_l3, unbalance_pct
+            FROM panel_section_phase_balance
+            WHERE panel_id = ? AND mode = 'NORMAL'
+            ORDER BY bus_section_id
+            """,
+            (panel_id,),
+        ).fetchall()
+        assert [r["bus_section_id"] for r in rows] == sorted(bs_ids.values())
+        for r in rows:
+            assert r["circuit_count"] == 3
+            assert (r["i_l1"], r["i_l2"], r["i_l3"]) == (10.0, 10.0, 10.0)
+            assert r["unbalance_pct"] == 0.0
+
+        per_section_phases = con.execute(
+            """
+            SELECT bus_section_id, COUNT(DISTINCT phase)
+            FROM circuits
+            WHERE panel_id = ? AND bus_section_id IS NOT NULL
+            GROUP BY bus_section_id
+            """,
+            (panel_id,),
+        ).fetchall()
+        assert all(r[1] == 3 for r in per_section_phases)
+
+        panel_row = con.execute(
+            "SELECT i_l1, i_l2, i_l3 FROM panel_phase_balance WHERE panel_id = ? AND mode = 'NORMAL'",
+            (panel_id,),
+        ).fetchone()
+        assert sorted(panel_row) == [20.0, 20.0, 25.0]
+    finally:
+        con.close()
+
+
+def test_parallel_path_matches_sequential(tmp_path: Path) -> None:
+    from tools.run_calc import ensure_migrations
+    from calc_core.phase_balance import calc_phase_balance_sections
+
+    db_path = tmp_path / "pb_sections_parallel.sqlite"
+    ensure_migrations(db_path)
+    currents = {
+        "BS1": [float((i * 7) % 13 + 1) for i in range(40)],
+        "BS2": [float((i * 5) % 11 + 1) for i in range(40)],
+    }
+    panel_id, _ = _seed(db_path, currents)
+
+    con = sqlite3.connect(db_path)
+    try:
+        sequential = calc_phase_balance_sections(con, panel_id, improve_budget_s=5.0)
+        con.execute("UPDATE circuits SET phase = NULL WHERE panel_id = ?", (panel_id,))
+        con.commit()
+        parallel = calc_phase_balance_sections(
+            con, panel_id, improve_budget_s=5.0, parallel_min_circuits=1, max_workers=2
+        )
+        assert parallel.sections == sequential.sections
+        assert parallel.changed_count == 80
+    finally:
+        con.close()
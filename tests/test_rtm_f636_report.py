@@ -0,0 +1,194 @@
+"""
+Отчёт Ф636-92 по всем щитам (rtm_rows / rtm_row_calc / rtm_panel_calc):
+порядок записей, итоги, CSV / JSON Lines и CLI tools/export_results.py.
+"""
+
+from __future__ import annotations
+
+import csv
+import json
+import sqlite3
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+
+def _make_db(tmp_path: Path) -> tuple[Path, dict[str, str]]:
+    from calc_core.rtm_f636 import run_panel_calc
+    from tools.run_calc import (
+        ensure_demo_input_rows,
+        ensure_migrations,
+        get_or_create_panel,
+        seed_kr_table_if_empty,
+    )
+
+    db_path = tmp_path / "f636.sqlite"
+    ensure_migrations(db_path)
+    seed_kr_table_if_empty(db_path)
+    ids = {}
+    for name in ("P-B", "P-A", "P-EMPTY"):
+        ids[name] = get_or_create_panel(
+            db_path, panel_id=None, panel_name=name, system_type="3PH", u_ll_v=400.0, u_ph_v=230.0
+        )
+    for name in ("P-B", "P-A"):
+        ensure_demo_input_rows(db_path, ids[name])
+        run_panel_calc(str(db_path), ids[name])
+    return db_path, ids
+
+
+def test_report_records(tmp_path: Path) -> None:
+    from calc_core.rtm_f636_report import REPORT_COLUMNS, iter_f636_report
+
+    db_path, ids = _make_db(tmp_path)
+    con = sqlite3.connect(db_path)
+    try:
+        records = [dict(zip(REPORT_COLUMNS, r)) for r in iter_f636_report(con)]
+        assert not con.in_transaction
+        totals_db = {
+            str(r[0]): r[1:]
+            for r in con.execute("SELECT panel_id, sum_pn, sum_ki_pn, pp_kw, ip_a FROM rtm_panel_calc")
+        }
+        with pytest.raises(ValueError, match="Panel not found: nope"):
+            list(iter_f636_report(con, [ids["P-A"], "nope"]))
+        only_b = list(iter_f636_report(con, [ids["P-B"]]))
+    finally:
+        con.close()
+
+    # Panels by name, rows by name, TOTAL after its rows; P-EMPTY has neither.
+    assert [(r["kind"], r["panel_name"]) for r in records] == [
+        ("ROW", "P-A"),
+        ("ROW", "P-A"),
+        ("TOTAL", "P-A"),
+        ("ROW", "P-B"),
+        ("ROW", "P-B"),
+        ("TOTAL", "P-B"),
+    ]
+    rows_a = [r for r in records if r["panel_name"] == "P-A" and r["kind"] == "ROW"]
+    total_a = records[2]
+    assert rows_a[0]["pn_total"] == pytest.approx(rows_a[0]["n"] * rows_a[0]["pn_kw"])
+    assert total_a["n"] == sum(r["n"] for r in rows_a)
+    assert total_a["pn_total"] == pytest.approx(sum(r["pn_total"] for r in rows_a))
+    assert total_a["ki"] == pytest.approx(total_a["ki_pn"] / total_a["pn_total"])
+    sum_pn, sum_ki_pn, pp_kw, ip_a = totals_db[ids["P-A"]]
+    assert (total_a["pn_total"], total_a["ki_pn"], total_a["pp_kw"], total_a["ip_a"]) == (
+        sum_pn,
+        sum_ki_pn,
+        pp_kw,
+        ip_a,
+    )
+    assert rows_a[0]["pp_kw"] is None
+    assert [r[2] for r in only_b] == ["P-B"] * 3
+
+
+def test_report_order_across_chunks(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    import calc_core.rtm_f636_report as report
+
+    db_path, ids = _make_db(tmp_path)
+    con = sqlite3.connect(db_path)
+    try:
+        # Ids and names sort in opposite directions; TOTAL-only panels (no rtm_rows).
+        for k in range(520):
+            con.execute(
+                "INSERT INTO panels (id, name, system_type) VALUES (?, ?, '3PH')",
+                (f"bulk-{k:04d}", f"Q-{519 - k:04d}"),
+            )
+            con.execute("INSERT INTO rtm_panel_calc (panel_id) VALUES (?)", (f"bulk-{k:04d}",))
+        con.commit()
+        wanted = [f"bulk-{k:04d}" for k in range(520)] + [ids["P-B"], ids["P-A"]]
+
+        names = [r[2] for r in report.iter_f636_report(con, wanted) if r[0] == "TOTAL"]
+        assert names == ["P-A", "P-B"] + [f"Q-{k:04d}" for k in range(520)]
+        monkeypatch.setattr(report, "_IN_CHUNK", 7)
+        assert [r[2] for r in report.iter_f636_report(con, wanted) if r[0] == "TOTAL"] == names
+    finally:
+        con.close()
+
+
+@pytest.mark.parametrize("fmt", ["csv", "jsonl"])
+def test_export_results_cli(tmp_path: Path, fmt: str) -> None:
+    db_path, _ids = _make_db(tmp_path)
+    out_path = tmp_path / "out" / f"f636.{fmt}"
+    proc = subprocess.run(
+        [
+            "python3",
+            str(ROOT / "tools" / "export_results.py"),
+            "--db",
+            str(db_path),
+            "--all-panels",
+            "--format",
+            fmt,
+            "--out",
+            str(out_path),
+        ],
+        cwd=ROOT,
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    assert "records: 6" in proc.stdout
+    assert not out_path.with_name(out_path.name + ".tmp").exists()
+
+    if fmt == "csv":
+        with out_path.open("r", encoding="utf-8", newline="") as fp:
+            rows = list(csv.DictReader(fp))
+        assert rows[2]["kind"] == "TOTAL"
+        assert rows[2]["row_name"] == ""
+        assert float(rows[2]["sp_kva"]) > 0
+    else:
+        rows = [json.loads(line) for line in out_path.read_text(encoding="utf-8").splitlines()]
+        assert rows[0]["row_name"].startswith("Демо")
+        assert rows[2]["kind"] == "TOTAL"
+        assert rows[2]["row_name"] is None
+
+
+def test_export_results_cli_by_name(tmp_path: Path) -> None:
+    db_path, _ids = _make_db(tmp_path)
+    out_path = tmp_path / "f636.csv"
+    cmd = [
+        "python3",
+        str(ROOT / "tools" / "export_results.py"),
+        "--db",
+        str(db_path),
+        "--panel-name",
+        "P-B",
+        "--format",
+        "csv",
+        "--out",
+        str(out_path),
+    ]
+    subprocess.run(cmd, cwd=ROOT, check=True, capture_output=True)
+    with out_path.open("r", encoding="utf-8", newline="") as fp:
+        assert {r["panel_name"] for r in csv.DictReader(fp)} == {"P-B"}
+
+    cmd[cmd.index("P-B")] = "NOPE"
+    proc = subprocess.run(cmd, cwd=ROOT, capture_output=True, text=True)
+    assert proc.returncode != 0
+    assert "Panel not found by name: NOPE" in proc.stderr
+
+
+def test_xlsx_write_only(tmp_path: Path) -> None:
+    from calc_core.rtm_f636_report import REPORT_COLUMNS, iter_f636_report, write_f636_xlsx
+
+    db_path, _ids = _make_db(tmp_path)
+    out_path = tmp_path / "f636.xlsx"
+    con = sqlite3.connect(db_path)
+    try:
+        try:
+            import openpyxl
+        except ImportError:
+            with pytest.raises(ValueError, match="openpyxl"):
+                write_f636_xlsx(iter_f636_report(con), str(out_path))
+            return
+        assert write_f636_xlsx(iter_f636_report(con), str(out_path)) == 6
+    finally:
+        con.close()
+
+    ws = openpyxl.load_workbook(out_path, read_only=True)["F636"]
+    rows = list(ws.iter_rows(values_only=True))
+    assert rows[0] == REPORT_COLUMNS
+    assert len(rows) == 7
@@ -0,0 +1,164 @@
+"""
+RTM rows phase allocation (AUTO/FIXED/3PH) -> panel_phase_calc.
+"""
+
+from __future__ import annotations
+
+import math
+import sqlite3
+import sys
+import uuid
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+
+def _uuid() -> str:
+    return str(uuid.uuid4())
+
+
+def _insert_row(
+    con: sqlite3.Connection,
+    panel_id: str,
+    name: str,
+    ki_pn: float,
+    *,
+    phases: int = 1,
+    phase_mode: str = "AUTO",
+    phase_fixed: str | None = None,
+    with_calc: bool = True,
+) -> str:
+    row_id = _uuid()
+    con.execute(
+        """
+        INSERT INTO rtm_rows (id, panel_id, name, n, pn_kw, ki, cos_phi, tg_phi, phases, phase_mode, phase_fixed)
+        VALUES (?, ?, ?, 1, ?, 1.0, 1.0, 0.0, ?, ?, ?)
+        """,
+        (row_id, panel_id, name, ki_pn, phases, phase_mode, phase_fixed),
+    )
+    if with_calc:
+        con.execute(
+            "INSERT INTO rtm_row_calc (row_id, pn_total, ki_pn, ki_pn_tg, n_pn2) VALUES (?, ?, ?, 0.0, ?)",
+            (row_id, ki_pn, ki_pn, ki_pn * ki_pn),
+        )
+    return row_id
+
+
+def _insert_panel(con: sqlite3.Connection, name: str) -> str:
+    panel_id = _uuid()
+    con.execute(
+        "INSERT INTO panels (id, name, system_type, u_ll_v, u_ph_v) VALUES (?, ?, ?, ?, ?)",
+        (panel_id, name, "3PH", 400.0, 250.0),
+    )
+    return panel_id
+
+
+def test_allocate_auto_fixed_and_3ph(tmp_path: Path) -> None:
+    from tools.run_calc import ensure_migrations
+    from calc_core.rtm_phase_calc import METHOD, calc_panel_phase_calc
+
+    db_path = tmp_path / "rtm_phase_calc.sqlite"
+    ensure_migrations(db_path)
+
+    con = sqlite3.connect(db_path)
+    con.row_factory = sqlite3.Row
+    try:
+        p1 = _insert_panel(con, "P1")
+        p2 = _insert_panel(con, "P2")
+        # P1: 1PH at U_ph=250 V -> 4 A per kW.
+        _insert_row(con, p1, "fixed_a", 2.5, phase_mode="FIXED", phase_fixed="A")  # 10 A on A
+        _insert_row(con, p1, "auto_1", 2.0)  # 8 A
+        _insert_row(con, p1, "auto_2", 1.5)  # 6 A
+        _insert_row(con, p1, "auto_3", 1.0)  # 4 A
+        _insert_row(con, p1, "none", 5.0, phase_mode="NONE")  # excluded
+        _insert_row(con, p1, "three_phase", math.sqrt(3.0) * 0.4, phases=3, phase_mode="NONE")  # 1 A each
+        # P2: a single AUTO row.
+        _insert_row(con, p2, "auto", 1.0)
+        con.commit()
+
+        results = {r.panel_id: r for r in calc_panel_phase_calc(con)}
+        con.commit()
+
+        # Greedy: base A=10; 8 -> B, 6 -> C, 4 -> C (C=6 < B=8); + 1 A on each phase.
+        assert results[p1].ia_a == pytest.approx(11.0)
+        assert results[p1].ib_a == pytest.approx(9.0)
+        assert results[p1].ic_a == pytest.approx(11.0)
+        assert (results[p2].ia_a, results[p2].ib_a, results[p2].ic_a) == pytest.approx((4.0, 0.0, 0.0))
+
+        row = con.execute("SELECT * FROM panel_phase_calc WHERE panel_id = ?", (p1,)).fetchone()
+        assert row["method"] == METHOD
+        assert row["imax_a"] == pytest.approx(11.0)
+        assert row["iavg_a"] == pytest.approx(31.0 / 3.0)
+        assert row["unbalance_pct"] == pytest.approx(100.0 * (11.0 - 31.0 / 3.0) / (31.0 / 3.0))
+        assert row["updated_at"]
+
+        only_p2 = calc_panel_phase_calc(con, [p2])
+        assert [r.panel_id for r in only_p2] == [p2]
+    finally:
+        con.close()
+
+
+def test_missing_row_calc_raises(tmp_path: Path) -> None:
+    from tools.run_calc import ensure_migrations
+    from calc_core.rtm_phase_calc import calc_panel_phase_calc
+
+    db_path = tmp_path / "rtm_phase_calc_missing.sqlite"
+    ensure_migrations(db_path)
+
+    con = sqlite3.connect(db_path)
+    try:
+        panel_id = _insert_panel(con, "P1")
+        _insert_row(con, panel_id, "auto", 1.0, with_calc=False)
+        con.commit()
+        with pytest.raises(ValueError, match="rtm_row_calc missing"):
+            calc_panel_phase_calc(con, [panel_id])
+    finally:
+        con.close()
+
+
+def test_stale_rows_removed_and_large_panel_list(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    from tools.run_calc import ensure_migrations
+    from calc_core import rtm_phase_calc
+    from calc_core.rtm_phase_calc import calc_panel_phase_calc
+
+    db_path = tmp_path / "rtm_phase_calc_stale.sqlite"
+    ensure_migrations(db_path)
+
+    con = sqlite3.connect(db_path)
+    con.row_factory = sqlite3.Row
+    try:
+        p1 = _insert_panel(con, "P1")
+        p2 = _insert_panel(con, "P2")
+        _insert_row(con, p1, "auto", 1.0)
+        row_id = _insert_row(con, p2, "auto", 2.0)
+        con.commit()
+        calc_panel_phase_calc(con)
+        con.commit()
+
+        # P2 loses all its rows: its panel_phase_calc row must not keep the old currents.
+        con.execute("DELETE FROM rtm_rows WHERE id = ?", (row_id,))
+        # More ids than one IN (...) chunk.
+        wanted = [p2, p1] + [_uuid() for _ in range(1200)]
+        results = calc_panel_phase_calc(con, wanted)
+        con.commit()
+        assert [r.panel_id for r in results] == [p1]
+        stored = {r["panel_id"] for r in con.execute("SELECT panel_id FROM panel_phase_calc")}
+        assert stored == {p1}
+
+        # Pure-Python currents match the NumPy path.
+        default = calc_panel_phase_calc(con)
+        monkeypatch.setattr(rtm_phase_calc, "_np", None)
+        fallback = calc_panel_phase_calc(con)
+        assert [(r.panel_id, r.ia_a, r.ib_a, r.ic_a) for r in fallback] == [
+            (r.panel_id, pytest.approx(r.ia_a), r.ib_a, r.ic_a) for r in default
+        ]
+
+        # All panels (None) clears stale rows as well.
+        con.execute("DELETE FROM rtm_rows WHERE panel_id = ?", (p1,))
+        assert calc_panel_phase_calc(con) == []
+        assert con.execute("SELECT COUNT(*) FROM panel_phase_calc").fetchone()[0] == 0
+    finally:
+        con.close()
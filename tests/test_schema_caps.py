@@ -0,0 +1,145 @@
+"""Schema capability registry: flags per schema generation, one probe per call, cache invalidation."""
+
+from __future__ import annotations
+
+import sqlite3
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+
+def _apply(con: sqlite3.Connection, names: list[str]) -> None:
+    con.execute("PRAGMA foreign_keys = ON;")
+    for name in names:
+        con.executescript((ROOT / "db" / "migrations" / name).read_text(encoding="utf-8"))
+
+
+def test_flags_full_schema(tmp_path: Path) -> None:
+    from calc_core.schema_caps import schema_caps
+    from tools.run_calc import ensure_migrations
+
+    db_path = tmp_path / "caps_full.sqlite"
+    ensure_migrations(db_path)
+    con = sqlite3.connect(db_path)
+    try:
+        caps = schema_caps(con)
+        assert caps.feeds_v2
+        assert caps.active_section
+        assert caps.phase_balance
+        assert caps.phase_source
+        assert caps.bus_section_id
+        assert caps.phase_i_a
+        assert caps.pb_warnings
+        assert caps.pb_change_counts
+        assert caps.section_phase_balance
+        assert caps.has_column("consumer_feeds", "priority")
+        assert not caps.has_table("no_such_table")
+        assert caps.columns_of("no_such_table") == frozenset()
+    finally:
+        con.close()
+
+
+def test_flags_feeds_v2_only_schema(tmp_path: Path) -> None:
+    from calc_core.schema_caps import schema_caps
+
+    db_path = tmp_path / "caps_0006.sqlite"
+    con = sqlite3.connect(db_path)
+    try:
+        _apply(
+            con,
+            [
+                "0001_init.sql",
+                "0002_circuits.sql",
+                "0003_bus_and_feeds.sql",
+                "0004_section_calc.sql",
+                "0005_feeds_v2_refs.sql",
+                "0006_section_calc_mode_emergency.sql",
+            ],
+        )
+        caps = schema_caps(con)
+        assert caps.feeds_v2
+        assert not caps.active_section
+        assert not caps.phase_balance
+        assert not caps.phase_source
+        assert not caps.bus_section_id
+        assert not caps.phase_i_a
+        assert not caps.pb_warnings
+        assert not caps.section_phase_balance
+    finally:
+        con.close()
+
+
+def test_cached_call_runs_single_statement(tmp_path: Path) -> None:
+    from calc_core.schema_caps import schema_caps
+    from tools.run_calc import ensure_migrations
+
+    db_path = tmp_path / "caps_cache.sqlite"
+    ensure_migrations(db_path)
+    con = sqlite3.connect(db_path)
+    try:
+        first = schema_caps(con)
+
+        # A new connection to the same file reuses the inspected schema.
+        con2 = sqlite3.connect(db_path)
+        try:
+            statements: list[str] = []
+            con2.set_trace_callback(statements.append)
+            assert schema_caps(con2) is first
+            # "-- PRAGMA ..." lines trace the table-valued pragmas of that one query.
+            assert [sql for sql in statements if not sql.startswith("--")] == [statements[0]]
+        finally:
+            con2.close()
+    finally:
+        con.close()
+
+
+def test_ddl_invalidates_cache(tmp_path: Path) -> None:
+    from calc_core.schema_caps import schema_caps
+
+    db_path = tmp_path / "caps_ddl.sqlite"
+    con = sqlite3.connect(db_path)
+    try:
+        _apply(
+            con,
+            [
+                "0001_init.sql",
+                "0002_circuits.sql",
+                "0003_bus_and_feeds.sql",
+                "0004_section_calc.sql",
+                "0005_feeds_v2_refs.sql",
+                "0006_section_calc_mode_emergency.sql",
+                "0007_phase_balance.sql",
+            ],
+        )
+        assert not schema_caps(con).phase_source
+
+        # Migration applied from another connection.
+        other = sqlite3.connect(db_path)
+        try:
+            _apply(other, ["0008_phase_source.sql"])
+            other.commit()
+        finally:
+            other.close()
+        assert schema_caps(con).phase_source
+
+        con.execute("ALTER TABLE circuits ADD COLUMN extra_note TEXT")
+        assert schema_caps(con).has_column("circuits", "extra_note")
+    finally:
+        con.close()
+
+
+def test_memory_db_not_cached() -> None:
+    from calc_core.schema_caps import schema_caps
+
+    a = sqlite3.connect(":memory:")
+    b = sqlite3.connect(":memory:")
+    try:
+        a.execute("CREATE TABLE t (x INTEGER)")
+        b.execute("CREATE TABLE t (y INTEGER)")
+        assert schema_caps(a).columns_of("t") == frozenset({"x"})
+        assert schema_caps(b).columns_of("t") == frozenset({"y"})
+    finally:
+        a.close()
+        b.close()
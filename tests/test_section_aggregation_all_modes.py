@@ -0,0 +1,143 @@
+"""Section aggregation: NORMAL and EMERGENCY in one call (calc_section_loads_all_modes)."""
+
+from __future__ import annotations
+
+import shutil
+import sqlite3
+import sys
+import uuid
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+
+def _uuid() -> str:
+    return str(uuid.uuid4())
+
+
+def _seed(db_path: Path) -> tuple[str, str, str]:
+    parent_panel_id = _uuid()
+    child_panel_id = _uuid()
+    s1, s2 = _uuid(), _uuid()
+    con = sqlite3.connect(db_path)
+    try:
+        con.execute("PRAGMA foreign_keys = ON;")
+        for pid, name in ((parent_panel_id, "PARENT"), (child_panel_id, "CHILD")):
+            con.execute(
+                "INSERT INTO panels (id, name, system_type, u_ll_v, u_ph_v) VALUES (?, ?, ?, ?, ?)",
+                (pid, name, "3PH", 400.0, 230.0),
+            )
+        for sid, name in ((s1, "S1"), (s2, "S2")):
+            con.execute(
+                "INSERT INTO bus_sections (id, panel_id, name) VALUES (?, ?, ?)",
+                (sid, parent_panel_id, name),
+            )
+        con.execute(
+            """
+            INSERT INTO rtm_panel_calc (panel_id, pp_kw, qp_kvar, sp_kva, ip_a, updated_at)
+            VALUES (?, 10.0, 5.0, 11.0, 17.0, '2026-01-01T00:00:00Z')
+            """,
+            (child_panel_id,),
+        )
+        rtm_consumer, manual_consumer = _uuid(), _uuid()
+        con.execute(
+            "INSERT INTO consumers (id, panel_id, name, load_ref_type, load_ref_id) VALUES (?, ?, ?, ?, ?)",
+            (rtm_consumer, parent_panel_id, "C-RTM", "RTM_PANEL", child_panel_id),
+        )
+        con.execute(
+            """
+            INSERT INTO consumers (id, panel_id, name, load_ref_type, load_ref_id, p_kw, q_kvar, s_kva, i_a)
+            VALUES (?, ?, ?, 'MANUAL', ?, 2.0, 1.0, 2.5, 4.0)
+            """,
+            (manual_consumer, parent_panel_id, "C-MAN", manual_consumer),
+        )
+        feeds = [
+            (rtm_consumer, s1, "MAIN"),
+            (rtm_consumer, s2, "RESERVE"),
+            (manual_consumer, s1, "MAIN"),  # no RESERVE feed -> MAIN fallback in EMERGENCY
+        ]
+        for cid, sid, role in feeds:
+            con.execute(
+                """
+                INSERT INTO consumer_feeds (id, consumer_id, bus_section_id, feed_role, feed_role_id, priority)
+                VALUES (?, ?, ?, ?, ?, 1)
+                """,
+                (_uuid(), cid, sid, "NORMAL" if role == "MAIN" else "RESERVE", role),
+            )
+        con.commit()
+    finally:
+        con.close()
+    return parent_panel_id, s1, s2
+
+
+def _section_calc(db_path: Path) -> list[tuple]:
+    con = sqlite3.connect(db_path)
+    try:
+        return con.execute(
+            """
+            SELECT panel_id, bus_section_id, mode, p_kw, q_kvar, s_kva, i_a
+            FROM section_calc ORDER BY panel_id, bus_section_id, mode
+            """
+        ).fetchall()
+    finally:
+        con.close()
+
+
+def test_all_modes_matches_per_mode_calls(tmp_path: Path) -> None:
+    from tools.run_calc import ensure_migrations
+    from calc_core.section_aggregation import calc_section_loads, calc_section_loads_all_modes
+
+    db_all = tmp_path / "sections_all_modes.sqlite"
+    ensure_migrations(db_all)
+    parent_panel_id, s1, s2 = _seed(db_all)
+    db_single = tmp_path / "sections_per_mode.sqlite"
+    shutil.copyfile(db_all, db_single)
+
+    con = sqlite3.connect(db_all)
+    try:
+        statements: list[str] = []
+        con.set_trace_callback(statements.append)
+        counts = calc_section_loads_all_modes(con, parent_panel_id).section_counts[parent_panel_id]
+        con.set_trace_callback(None)
+    finally:
+        con.close()
+    assert counts == {"NORMAL": 1, "EMERGENCY": 2}
+    # Both modes from one GROUP BY over the trigger-maintained active sections.
+    assert sum("FROM consumer_active_section a" in sql for sql in statements) == 1
+    assert not any("FROM consumer_feeds f" in sql for sql in statements)
+
+    con = sqlite3.connect(db_single)
+    try:
+        calc_section_loads(con, parent_panel_id, mode="NORMAL")
+        calc_section_loads(con, parent_panel_id, mode="EMERGENCY")
+    finally:
+        con.close()
+
+    rows = _section_calc(db_all)
+    assert rows == _section_calc(db_single)
+    by_key = {(r[1], r[2]): r[3:] for r in rows}
+    assert by_key[(s1, "NORMAL")] == pytest.approx((12.0, 6.0, 13.5, 21.0))
+    assert by_key[(s2, "EMERGENCY")] == pytest.approx((10.0, 5.0, 11.0, 17.0))
+    assert by_key[(s1, "EMERGENCY")] == pytest.approx((2.0, 1.0, 2.5, 4.0))
+
+
+def test_modes_subset_and_alias(tmp_path: Path) -> None:
+    from tools.run_calc import ensure_migrations
+    from calc_core.section_aggregation import calc_section_loads_all_modes
+
+    db_path = tmp_path / "sections_all_modes_subset.sqlite"
+    ensure_migrations(db_path)
+    parent_panel_id, _, _ = _seed(db_path)
+
+    con = sqlite3.connect(db_path)
+    try:
+        # RESERVE is the deprecated alias of EMERGENCY; duplicates collapse.
+        result = calc_section_loads_all_modes(con, parent_panel_id, ["RESERVE", "EMERGENCY"])
+        assert result.section_counts == {parent_panel_id: {"EMERGENCY": 2}}
+        with pytest.raises(ValueError):
+            calc_section_loads_all_modes(con, parent_panel_id, ["BOGUS"])
+    finally:
+        con.close()
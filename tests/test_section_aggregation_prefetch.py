@@ -0,0 +1,112 @@
+"""Section aggregation: rtm_panel_calc rows of RTM_PANEL consumers are prefetched at once."""
+
+from __future__ import annotations
+
+import sqlite3
+import sys
+import uuid
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+
+def _uuid() -> str:
+    return str(uuid.uuid4())
+
+
+def _seed(db_path: Path, n_children: int) -> tuple[str, str, list[str]]:
+    parent_panel_id = _uuid()
+    section_id = _uuid()
+    child_ids = sorted(_uuid() for _ in range(n_children))
+    con = sqlite3.connect(db_path)
+    try:
+        con.execute("PRAGMA foreign_keys = ON;")
+        for pid, name in [(parent_panel_id, "PARENT")] + [(c, f"CHILD{i}") for i, c in enumerate(child_ids)]:
+            con.execute(
+                "INSERT INTO panels (id, name, system_type, u_ll_v, u_ph_v) VALUES (?, ?, ?, ?, ?)",
+                (pid, name, "3PH", 400.0, 230.0),
+            )
+        con.execute(
+            "INSERT INTO bus_sections (id, panel_id, name) VALUES (?, ?, ?)",
+            (section_id, parent_panel_id, "S1"),
+        )
+        for i, child_id in enumerate(child_ids):
+            consumer_id = _uuid()
+            con.execute(
+                """
+                INSERT INTO consumers (id, panel_id, name, load_ref_type, load_ref_id)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (consumer_id, parent_panel_id, f"C{i:03d}", "RTM_PANEL", child_id),
+            )
+            con.execute(
+                """
+                INSERT INTO consumer_feeds (id, consumer_id, bus_section_id, feed_role, feed_role_id, priority)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (_uuid(), consumer_id, section_id, "NORMAL", "MAIN", 1),
+            )
+        con.commit()
+    finally:
+        con.close()
+    return parent_panel_id, section_id, child_ids
+
+
+def _add_rtm_calc(con: sqlite3.Connection, panel_ids: list[str]) -> None:
+    con.executemany(
+        """
+        INSERT INTO rtm_panel_calc (panel_id, pp_kw, qp_kvar, sp_kva, ip_a, updated_at)
+        VALUES (?, 1.0, 0.5, 1.2, 2.0, '2026-01-01T00:00:00Z')
+        """,
+        [(pid,) for pid in panel_ids],
+    )
+    con.commit()
+
+
+def test_rtm_panel_calc_prefetched_in_one_query(tmp_path: Path) -> None:
+    from tools.run_calc import ensure_migrations
+    from calc_core.section_aggregation import aggregate_section_loads
+
+    db_path = tmp_path / "section_prefetch.sqlite"
+    ensure_migrations(db_path)
+    parent_panel_id, section_id, child_ids = _seed(db_path, 120)
+
+    con = sqlite3.connect(db_path)
+    try:
+        _add_rtm_calc(con, child_ids)
+        statements: list[str] = []
+        con.set_trace_callback(statements.append)
+        loads = aggregate_section_loads(con, parent_panel_id, mode="NORMAL")
+        con.set_trace_callback(None)
+
+        # "-- PRAGMA ..." lines are traces of table-valued pragmas (schema_caps probe).
+        queries = [sql for sql in statements if not sql.startswith("--")]
+        assert sum("rtm_panel_calc" in sql for sql in queries) == 1
+        entry = loads[section_id]
+        assert (entry.p_kw, entry.q_kvar, entry.s_kva, entry.i_a) == pytest.approx((120.0, 60.0, 144.0, 240.0))
+    finally:
+        con.close()
+
+
+def test_missing_rtm_panel_calc_reported_together(tmp_path: Path) -> None:
+    from tools.run_calc import ensure_migrations
+    from calc_core.section_aggregation import aggregate_section_loads
+
+    db_path = tmp_path / "section_prefetch_missing.sqlite"
+    ensure_migrations(db_path)
+    parent_panel_id, _, child_ids = _seed(db_path, 3)
+
+    con = sqlite3.connect(db_path)
+    try:
+        _add_rtm_calc(con, child_ids[1:2])
+        with pytest.raises(ValueError) as exc_info:
+            aggregate_section_loads(con, parent_panel_id, mode="NORMAL")
+        message = str(exc_info.value)
+        assert message.startswith("rtm_panel_calc not found for panel_id=")
+        assert child_ids[0] in message and child_ids[2] in message
+        assert child_ids[1] not in message
+    finally:
+        con.close()
@@ -0,0 +1,139 @@
+"""Section aggregation: project-wide engine (calc_section_loads_project)."""
+
+from __future__ import annotations
+
+import shutil
+import sqlite3
+import sys
+import uuid
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+
+def _uuid() -> str:
+    return str(uuid.uuid4())
+
+
+def _seed(db_path: Path, n_parents: int) -> list[str]:
+    """Each parent: sections S1/S2, one RTM_PANEL consumer (MAIN->S1, RESERVE->S2), one MANUAL (MAIN->S2)."""
+    parent_ids = sorted(_uuid() for _ in range(n_parents))
+    con = sqlite3.connect(db_path)
+    try:
+        con.execute("PRAGMA foreign_keys = ON;")
+        for k, parent_id in enumerate(parent_ids):
+            child_id = _uuid()
+            for pid, name in ((parent_id, f"P{k}"), (child_id, f"P{k}-CHILD")):
+                con.execute(
+                    "INSERT INTO panels (id, name, system_type, u_ll_v, u_ph_v) VALUES (?, ?, ?, ?, ?)",
+                    (pid, name, "3PH", 400.0, 230.0),
+                )
+            s1, s2 = _uuid(), _uuid()
+            for sid, name in ((s1, "S1"), (s2, "S2")):
+                con.execute(
+                    "INSERT INTO bus_sections (id, panel_id, name) VALUES (?, ?, ?)",
+                    (sid, parent_id, name),
+                )
+            con.execute(
+                """
+                INSERT INTO rtm_panel_calc (panel_id, pp_kw, qp_kvar, sp_kva, ip_a, updated_at)
+                VALUES (?, ?, ?, ?, ?, '2026-01-01T00:00:00Z')
+                """,
+                (child_id, 1.0 + k, 0.5, 1.5 + k, 2.0 + k),
+            )
+            rtm_consumer, manual_consumer = _uuid(), _uuid()
+            con.execute(
+                "INSERT INTO consumers (id, panel_id, name, load_ref_type, load_ref_id) VALUES (?, ?, ?, ?, ?)",
+                (rtm_consumer, parent_id, "C-RTM", "RTM_PANEL", child_id),
+            )
+            con.execute(
+                """
+                INSERT INTO consumers (id, panel_id, name, load_ref_type, load_ref_id, p_kw, q_kvar, s_kva, i_a)
+                VALUES (?, ?, ?, 'MANUAL', ?, 3.0, 1.0, 3.2, 5.0)
+                """,
+                (manual_consumer, parent_id, "C-MAN", manual_consumer),
+            )
+            for cid, sid, role, priority in (
+                (rtm_consumer, s1, "MAIN", 1),
+                (rtm_consumer, s2, "RESERVE", 1),
+                (manual_consumer, s2, "MAIN", 1),
+            ):
+                con.execute(
+                    """
+                    INSERT INTO consumer_feeds (id, consumer_id, bus_section_id, feed_role, feed_role_id, priority)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    """,
+                    (_uuid(), cid, sid, "NORMAL" if role == "MAIN" else "RESERVE", role, priority),
+                )
+        con.commit()
+    finally:
+        con.close()
+    return parent_ids
+
+
+def _section_calc(db_path: Path) -> list[tuple]:
+    con = sqlite3.connect(db_path)
+    try:
+        return con.execute(
+            """
+            SELECT panel_id, bus_section_id, mode, p_kw, q_kvar, s_kva, i_a
+            FROM section_calc ORDER BY panel_id, bus_section_id, mode
+            """
+        ).fetchall()
+    finally:
+        con.close()
+
+
+def test_project_matches_per_panel_calls(tmp_path: Path) -> None:
+    from tools.run_calc import ensure_migrations
+    from calc_core.section_aggregation import calc_section_loads, calc_section_loads_project
+
+    db_project = tmp_path / "sections_project.sqlite"
+    ensure_migrations(db_project)
+    parent_ids = _seed(db_project, 30)
+    db_single = tmp_path / "sections_single.sqlite"
+    shutil.copyfile(db_project, db_single)
+
+    con = sqlite3.connect(db_project)
+    try:
+        statements: list[str] = []
+        con.set_trace_callback(statements.append)
+        summary = calc_section_loads_project(con).section_counts
+        con.set_trace_callback(None)
+    finally:
+        con.close()
+    # Parents with consumers only; NORMAL: S1 + S2, EMERGENCY: S2 (RESERVE) + S2 (MANUAL, MAIN fallback).
+    assert list(summary) == parent_ids
+    assert all(counts == {"NORMAL": 2, "EMERGENCY": 1} for counts in summary.values())
+    assert sum("FROM consumer_active_section a" in sql for sql in statements) == 1
+    for table in ("FROM consumer_feeds f", "FROM consumer_mode_rules", "FROM rtm_panel_calc"):
+        assert not any(table in sql for sql in statements), table
+
+    con = sqlite3.connect(db_single)
+    try:
+        for parent_id in parent_ids:
+            calc_section_loads(con, parent_id, mode="NORMAL")
+            calc_section_loads(con, parent_id, mode="EMERGENCY")
+    finally:
+        con.close()
+    assert _section_calc(db_project) == _section_calc(db_single)
+
+
+def test_project_subset_and_single_mode(tmp_path: Path) -> None:
+    from tools.run_calc import ensure_migrations
+    from calc_core.section_aggregation import calc_section_loads_project
+
+    db_path = tmp_path / "sections_project_subset.sqlite"
+    ensure_migrations(db_path)
+    parent_ids = _seed(db_path, 3)
+
+    con = sqlite3.connect(db_path)
+    try:
+        summary = calc_section_loads_project(con, [parent_ids[2], parent_ids[0]], ["EMERGENCY"])
+        assert summary.section_counts == {parent_ids[0]: {"EMERGENCY": 1}, parent_ids[2]: {"EMERGENCY": 1}}
+        rows = con.execute("SELECT DISTINCT panel_id, mode FROM section_calc ORDER BY panel_id").fetchall()
+        assert [tuple(r) for r in rows] == [(parent_ids[0], "EMERGENCY"), (parent_ids[2], "EMERGENCY")]
+        assert calc_section_loads_project(con, []).section_counts == {}
+    finally:
+        con.close()
@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 import argparse
+import contextlib
 import csv
 import sqlite3
 import sys
@@ -13,10 +14,26 @@ ROOT = Path(__file__).resolve().parents[1]
 sys.path.insert(0, str(ROOT))
 
 from calc_core.export_attributes_csv import (  # noqa: E402
+    CompiledMapping,
     build_rows_from_payload,
-    load_mapping,
+    diff_rows,
+    grouped_lines,
+    load_export_state,
+    load_compiled_mapping,
+    save_export_state,
 )
-from calc_core.export_payload import build_payload  # noqa: E402
+from calc_core.export_payload import iter_payloads  # noqa: E402
+
+# file name -> header
+CSV_FILES = {
+    "panel": ("attrs_panel.csv", ["GUID", "ATTR", "VALUE"]),
+    "circuits": ("attrs_circuits.csv", ["GUID", "ATTR", "VALUE"]),
+    "sections": ("attrs_sections.csv", ["GUID", "MODE", "ATTR", "VALUE"]),
+}
+TOMBSTONES_FILE = ("attrs_deleted.csv", ["KIND", "GUID", "MODE", "ATTR"])
+STATE_FILE = "attrs_state.json"
+# One s-expression per GUID (+ MODE), sorted by GUID; read by IMPORT_ATTRS when present.
+GROUPED_FILE = "attrs_grouped.sexp"
 
 
 def _db_uri(db_path: Path) -> str:
@@ -24,12 +41,66 @@ def _db_uri(db_path: Path) -> str:
     return f"file:{quote(str(db_abs), safe='/')}?mode=ro"
 
 
-def _write_csv(path: Path, header: list[str], rows: list[list[str]]) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("w", encoding="utf-8", newline="") as handle:
-        writer = csv.writer(handle)
-        writer.writerow(header)
-        writer.writerows(rows)
+def _export(
+    con: sqlite3.Connection,
+    panel_ids: list[str] | None,
+    mapping: CompiledMapping,
+    out_dir: Path,
+    *,
+    state: dict[str, dict[str, str]] | None = None,
+    reset_state: bool = False,
+    tombstones: bool = False,
+    grouped: bool = False,
+) -> int:
+    """
+    One combined CSV set for all panels; failed panels are reported and skipped.
+    state (incremental mode): panel_id -> hashes of the last export; only changed
+    rows are written and `state` is updated in place for exported panels
+    (reset_state: exported panels are diffed against an empty state).
+    grouped: also write GROUPED_FILE with the same rows; without it a stale
+    GROUPED_FILE is removed so IMPORT_ATTRS never picks up old values.
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    failed = 0
+    grouped_out: list[tuple[tuple[str, str, str], str]] = []
+    with contextlib.ExitStack() as stack:
+        writers = {}
+        files = dict(CSV_FILES)
+        if tombstones:
+            files["tombstones"] = TOMBSTONES_FILE
+        for key, (filename, header) in files.items():
+            handle = stack.enter_context(
+                (out_dir / filename).open("w", encoding="utf-8", newline="")
+            )
+            writers[key] = csv.writer(handle)
+            writers[key].writerow(header)
+        for item in iter_payloads(con, panel_ids):
+            try:
+                if item.payload is None:
+                    raise ValueError(item.error)
+                rows = build_rows_from_payload(item.payload, mapping)
+            except ValueError as exc:
+                failed += 1
+                print(f"ERROR {item.panel_id}: {exc}", file=sys.stderr)
+                continue
+            if state is not None:
+                previous = {} if reset_state else state.get(item.panel_id, {})
+                rows, deleted, state[item.panel_id] = diff_rows(rows, previous)
+                if tombstones:
+                    writers["tombstones"].writerows(deleted)
+            for key in CSV_FILES:
+                writers[key].writerows(rows[key])
+            if grouped:
+                grouped_out.extend(grouped_lines(rows))
+
+    grouped_path = out_dir / GROUPED_FILE
+    if grouped:
+        grouped_out.sort(key=lambda item: item[0])
+        with grouped_path.open("w", encoding="utf-8", newline="") as handle:
+            handle.writelines(line + "\n" for _key, line in grouped_out)
+    elif grouped_path.exists():
+        grouped_path.unlink()
+    return 1 if failed else 0
 
 
 def main() -> int:
@@ -37,7 +108,16 @@ def main() -> int:
         description="Export DWG block attributes CSV (v0.5) from SQLite (read-only)."
     )
     ap.add_argument("--db", required=True, help="Path to SQLite DB (e.g. db/project.sqlite)")
-    ap.add_argument("--panel-id", required=True, help="Panel id (GUID).")
+    ap.add_argument(
+        "--panel-id",
+        action="append",
+        help="Panel id (GUID). Repeat for several panels (one combined CSV set).",
+    )
+    ap.add_argument(
+        "--all-panels",
+        action="store_true",
+        help="Export every panel of the DB from one snapshot into one CSV set.",
+    )
     ap.add_argument(
         "--mapping",
         default="dwg/mapping_v0_5.yaml",
@@ -48,29 +128,68 @@ def main() -> int:
         default="out",
         help="Directory to write CSV files (default: out).",
     )
+    ap.add_argument(
+        "--incremental",
+        action="store_true",
+        help=f"Write only rows changed since the last incremental export (state: <out-dir>/{STATE_FILE}).",
+    )
+    ap.add_argument(
+        "--state",
+        default=None,
+        help=f"State file for --incremental (default: <out-dir>/{STATE_FILE}).",
+    )
+    ap.add_argument(
+        "--reset-state",
+        action="store_true",
+        help="With --incremental: ignore the stored state of the exported panels and export every row.",
+    )
+    ap.add_argument(
+        "--tombstones",
+        action="store_true",
+        help=f"With --incremental: list attributes gone since the last export in {TOMBSTONES_FILE[0]}.",
+    )
+    ap.add_argument(
+        "--grouped",
+        action="store_true",
+        help=f"Also write {GROUPED_FILE}: one line per GUID (+ MODE) for a linear LISP import.",
+    )
     args = ap.parse_args()
+    if args.all_panels == bool(args.panel_id):
+        ap.error("use either --panel-id or --all-panels")
+    if not args.incremental and (args.reset_state or args.tombstones or args.state):
+        ap.error("--state / --reset-state / --tombstones require --incremental")
+
+    mapping = load_compiled_mapping(args.mapping)
+    out_dir = Path(args.out_dir)
+    state_path = Path(args.state) if args.state else out_dir / STATE_FILE
+    state = None
+    if args.incremental:
+        try:
+            state = load_export_state(state_path)
+        except ValueError:
+            if not args.reset_state:
+                raise
+            state = {}
 
     db_uri = _db_uri(Path(args.db))
     con = sqlite3.connect(db_uri, uri=True)
     try:
-        payload = build_payload(con, args.panel_id)
+        rc = _export(
+            con,
+            None if args.all_panels else args.panel_id,
+            mapping,
+            out_dir,
+            state=state,
+            reset_state=args.reset_state,
+            tombstones=args.tombstones,
+            grouped=args.grouped,
+        )
     finally:
         con.close()
-
-    mapping = load_mapping(args.mapping)
-    rows = build_rows_from_payload(payload, mapping)
-
-    out_dir = Path(args.out_dir)
-    _write_csv(out_dir / "attrs_panel.csv", ["GUID", "ATTR", "VALUE"], rows["panel"])
-    _write_csv(
-        out_dir / "attrs_circuits.csv", ["GUID", "ATTR", "VALUE"], rows["circuits"]
-    )
-    _write_csv(
-        out_dir / "attrs_sections.csv",
-        ["GUID", "MODE", "ATTR", "VALUE"],
-        rows["sections"],
-    )
-    return 0
+    # Saved only after the CSV files are complete (failed panels keep their old state).
+    if state is not None:
+        save_export_state(state_path, state)
+    return rc
 
 
 if __name__ == "__main__":
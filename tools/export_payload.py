@@ -4,6 +4,7 @@ from __future__ import annotations
 
 import argparse
 import json
+import os
 import sqlite3
 import sys
 from pathlib import Path
@@ -12,7 +13,12 @@ from urllib.parse import quote
 ROOT = Path(__file__).resolve().parents[1]
 sys.path.insert(0, str(ROOT))
 
-from calc_core.export_payload import build_payload  # noqa: E402
+from calc_core.export_columnar import (  # noqa: E402
+    COLUMNAR_FORMATS,
+    default_format,
+    export_columnar,
+)
+from calc_core.export_payload import iter_payloads, write_payload  # noqa: E402
 
 
 def _db_uri(db_path: Path) -> str:
@@ -20,30 +26,95 @@ def _db_uri(db_path: Path) -> str:
     return f"file:{quote(str(db_abs), safe='/')}?mode=ro"
 
 
+def _export_one(con: sqlite3.Connection, panel_id: str, out_path: Path) -> None:
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    # Streamed to a temp file: a failed export never leaves a truncated payload behind.
+    tmp_path = out_path.with_name(out_path.name + ".tmp")
+    try:
+        with tmp_path.open("w", encoding="utf-8") as fp:
+            write_payload(con, panel_id, fp)
+        os.replace(tmp_path, out_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def _export_many(con: sqlite3.Connection, panel_ids: list[str] | None, out_dir: Path) -> int:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    failed = 0
+    for item in iter_payloads(con, panel_ids):
+        if item.payload is None:
+            failed += 1
+            print(f"ERROR {item.panel_id}: {item.error}", file=sys.stderr)
+            continue
+        out_path = out_dir / f"payload_{item.panel_id}.json"
+        tmp_path = out_path.with_name(out_path.name + ".tmp")
+        try:
+            tmp_path.write_text(
+                json.dumps(item.payload, ensure_ascii=False, indent=2) + "\n",
+                encoding="utf-8",
+            )
+            os.replace(tmp_path, out_path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        print(f"exported {item.panel_id}: {out_path}")
+    return 1 if failed else 0
+
+
 def main() -> int:
     ap = argparse.ArgumentParser(
         description="Export DWG sync payload (v0.4) from SQLite (read-only)."
     )
     ap.add_argument("--db", required=True, help="Path to SQLite DB (e.g. db/project.sqlite)")
-    ap.add_argument("--panel-id", required=True, help="Panel id (GUID).")
-    ap.add_argument("--out", required=True, help="Output JSON path.")
+    ap.add_argument(
+        "--panel-id",
+        action="append",
+        help="Panel id (GUID). Repeat for several panels (requires --out-dir).",
+    )
+    ap.add_argument(
+        "--all-panels",
+        action="store_true",
+        help="Export every panel of the DB from one snapshot (requires --out-dir).",
+    )
+    ap.add_argument("--out", help="Output JSON path (single --panel-id).")
+    ap.add_argument(
+        "--out-dir",
+        help="Output directory for payload_<panel_id>.json (several panels / --all-panels).",
+    )
+    ap.add_argument(
+        "--columnar",
+        choices=["auto", *COLUMNAR_FORMATS],
+        help=(
+            "With --all-panels: write rtm_panel_calc / section_calc / circuit_calc / "
+            "panel_phase_balance as columnar files to --out-dir instead of JSON "
+            "(auto: arrow with pyarrow, else npz)."
+        ),
+    )
     args = ap.parse_args()
 
-    db_path = Path(args.db)
-    db_uri = _db_uri(db_path)
+    panel_ids = args.panel_id or []
+    if args.all_panels == bool(panel_ids):
+        ap.error("use either --panel-id or --all-panels")
+    many = args.all_panels or len(panel_ids) > 1 or args.out_dir is not None
+    if many and (args.out_dir is None or args.out is not None):
+        ap.error("several panels / --all-panels require --out-dir (not --out)")
+    if not many and args.out is None:
+        ap.error("--out is required for a single --panel-id")
+    if args.columnar and not args.all_panels:
+        ap.error("--columnar exports the whole project (use --all-panels)")
 
+    db_uri = _db_uri(Path(args.db))
     con = sqlite3.connect(db_uri, uri=True)
     try:
-        payload = build_payload(con, args.panel_id)
+        if args.columnar:
+            fmt = default_format() if args.columnar == "auto" else args.columnar
+            for table, path in export_columnar(con, args.out_dir, fmt=fmt).items():
+                print(f"exported {table}: {path}")
+            return 0
+        if many:
+            return _export_many(con, None if args.all_panels else panel_ids, Path(args.out_dir))
+        _export_one(con, panel_ids[0], Path(args.out))
     finally:
         con.close()
-
-    out_path = Path(args.out)
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    out_path.write_text(
-        json.dumps(payload, ensure_ascii=False, indent=2) + "\n",
-        encoding="utf-8",
-    )
     return 0
 
 
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from calc_core.dxf_patch import AttributeValues, load_export_dir, patch_dxf_file  # noqa: E402
+from calc_core.export_attributes_csv import (  # noqa: E402
+    build_rows_from_payload,
+    load_compiled_mapping,
+)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(
+        description="Apply exported attribute values to block references in an ASCII DXF (IMPORT_ATTRS without AutoCAD)."
+    )
+    ap.add_argument("--dxf", required=True, help="Input ASCII DXF.")
+    ap.add_argument("--out", required=True, help="Output DXF (may be the input file).")
+    source = ap.add_mutually_exclusive_group(required=True)
+    source.add_argument(
+        "--attrs-dir",
+        help="Output dir of export_attributes_csv.py (attrs_grouped.sexp or attrs_*.csv).",
+    )
+    source.add_argument(
+        "--payload",
+        action="append",
+        help="Payload JSON (v0.4) from export_payload.py. Repeat for several panels.",
+    )
+    ap.add_argument(
+        "--mapping",
+        default="dwg/mapping_v0_5.yaml",
+        help="Mapping YAML for --payload (default: dwg/mapping_v0_5.yaml).",
+    )
+    args = ap.parse_args()
+
+    if args.attrs_dir:
+        values = load_export_dir(args.attrs_dir)
+    else:
+        mapping = load_compiled_mapping(args.mapping)
+        values = AttributeValues()
+        for payload_path in args.payload:
+            payload = json.loads(Path(payload_path).read_text(encoding="utf-8"))
+            values.add_rows(build_rows_from_payload(payload, mapping))
+
+    summary = patch_dxf_file(args.dxf, args.out, values)
+    print("--- patch_dxf summary ---")
+    for line in summary.lines():
+        print(f"  {line}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 import argparse
+import json
 import sys
 import sqlite3
 import uuid
@@ -14,8 +15,25 @@ ROOT = Path(__file__).resolve().parents[1]
 sys.path.insert(0, str(ROOT))
 
 from calc_core import run_panel_calc  # noqa: E402
-from calc_core.phase_balance import calc_phase_balance  # noqa: E402
-from calc_core.section_aggregation import calc_section_loads  # noqa: E402
+from calc_core.contingency import run_n1_contingency  # noqa: E402
+from calc_core.diagnostics import Diagnostics  # noqa: E402
+from calc_core.load_profiles import calc_section_profile_peaks  # noqa: E402
+from calc_core.phase_balance import (  # noqa: E402
+    INCREMENTAL_REBALANCE_THRESHOLD_PCT,
+    JOINT_IMPROVE_BUDGET_S,
+    PhaseConstraints,
+    calc_phase_balance,
+    calc_phase_balance_joint,
+    calc_phase_balance_project,
+    calc_phase_balance_sections,
+    place_circuit_phase,
+)
+from calc_core.rtm_phase_calc import calc_panel_phase_calc  # noqa: E402
+from calc_core.section_aggregation import (  # noqa: E402
+    calc_section_loads,
+    calc_section_loads_all_modes,
+    calc_section_loads_project,
+)
 from calc_core.voltage_drop import calc_panel_du  # noqa: E402
 
 
@@ -209,6 +227,19 @@ def ensure_demo_input_rows(db_path: Path, panel_id: str) -> int:
         con.close()
 
 
+def _read_section_rows(con: sqlite3.Connection, panel_id: str, mode: str) -> list[tuple]:
+    return con.execute(
+        """
+        SELECT bs.name, sc.p_kw, sc.q_kvar, sc.s_kva, sc.i_a
+        FROM section_calc sc
+        JOIN bus_sections bs ON bs.id = sc.bus_section_id
+        WHERE sc.panel_id = ? AND sc.mode = ?
+        ORDER BY bs.name ASC
+        """,
+        (panel_id, mode),
+    ).fetchall()
+
+
 def main() -> int:
     ap = argparse.ArgumentParser(
         description="Run RTM F636 calc and optional voltage drop (ΔU) for one panel (SQLite = truth)."
@@ -227,6 +258,11 @@ def main() -> int:
     ap.add_argument("--no-seed-kr", action="store_true", help="Do not seed kr_table when empty.")
     ap.add_argument("--no-demo-input", action="store_true", help="Do not create demo input rows when none exist.")
     ap.add_argument("--calc-du", action="store_true", help="Calculate ΔU for all panel circuits.")
+    ap.add_argument(
+        "--calc-rtm-phases",
+        action="store_true",
+        help="Allocate 1PH rtm_rows to phases A/B/C (AUTO/FIXED) and write panel_phase_calc.",
+    )
     ap.add_argument(
         "--calc-sections",
         action="store_true",
@@ -234,9 +270,36 @@ def main() -> int:
     )
     ap.add_argument(
         "--sections-mode",
-        choices=("NORMAL", "EMERGENCY"),
+        choices=("NORMAL", "EMERGENCY", "ALL"),
         default=None,
-        help="Calculation mode for section aggregation (default: NORMAL).",
+        help="Calculation mode for section aggregation (default: NORMAL). ALL computes NORMAL and EMERGENCY in one pass.",
+    )
+    ap.add_argument(
+        "--sections-all-panels",
+        action="store_true",
+        help="Aggregate sections for all panels in the DB in one transaction (prints a per-panel summary).",
+    )
+    ap.add_argument(
+        "--calc-n1",
+        action="store_true",
+        help="Run N-1 contingency (single feed / bus section outages) for the panel and print worst cases.",
+    )
+    ap.add_argument(
+        "--n1-mode",
+        choices=("NORMAL", "EMERGENCY"),
+        default="NORMAL",
+        help="Mode for --calc-n1 (default: NORMAL).",
+    )
+    ap.add_argument(
+        "--calc-profiles",
+        action="store_true",
+        help="Coincident peak per bus section from consumer load profiles (NORMAL and EMERGENCY).",
+    )
+    ap.add_argument(
+        "--diagnostics-samples",
+        type=int,
+        default=5,
+        help="Max sample warnings printed per diagnostics code (default: 5; counts are always printed).",
     )
     ap.add_argument(
         "--mode",
@@ -252,9 +315,21 @@ def main() -> int:
     )
     ap.add_argument(
         "--pb-mode",
-        choices=("NORMAL", "EMERGENCY"),
+        choices=("NORMAL", "EMERGENCY", "JOINT"),
         default="NORMAL",
-        help="Mode for panel_phase_balance (default: NORMAL).",
+        help="Mode for panel_phase_balance (default: NORMAL). JOINT optimizes NORMAL and EMERGENCY together.",
+    )
+    ap.add_argument(
+        "--pb-weight-normal",
+        type=float,
+        default=0.5,
+        help="JOINT phase balance: weight of NORMAL unbalance_pct (default: 0.5).",
+    )
+    ap.add_argument(
+        "--pb-weight-emergency",
+        type=float,
+        default=0.5,
+        help="JOINT phase balance: weight of EMERGENCY unbalance_pct (default: 0.5).",
     )
     ap.add_argument(
         "--no-respect-manual-phases",
@@ -262,7 +337,91 @@ def main() -> int:
         dest="no_respect_manual_phases",
         help="Do not protect MANUAL phase assignments; algorithm may overwrite any phase (default: respect manual).",
     )
+    ap.add_argument(
+        "--pb-improve-budget-s",
+        type=float,
+        default=None,
+        help=(
+            "Enable move/swap local search after greedy phase balance with this wall-clock safety cap "
+            "in seconds (default: off). The search itself stops after --pb-improve-max-evals evaluations."
+        ),
+    )
+    ap.add_argument(
+        "--pb-improve-max-evals",
+        type=int,
+        default=None,
+        help="Deterministic local search budget: candidate evaluations (default: LOCAL_SEARCH_MAX_EVALS when enabled).",
+    )
+    ap.add_argument(
+        "--pb-method",
+        choices=("GREEDY", "EXACT"),
+        default="GREEDY",
+        help="Phase balance method: GREEDY (default) or EXACT branch-and-bound for small panels.",
+    )
+    ap.add_argument(
+        "--pb-per-section",
+        action="store_true",
+        help="Balance each bus section as its own 3-phase system (per-section totals in panel_section_phase_balance).",
+    )
+    ap.add_argument(
+        "--pb-all-panels",
+        action="store_true",
+        help="Run phase balance for all panels in the DB in one transaction (prints a per-panel summary).",
+    )
+    ap.add_argument(
+        "--pb-constraints",
+        default=None,
+        metavar="JSON_PATH",
+        help=(
+            "Constrained phase balance: JSON with max_circuits_per_phase, max_current_per_phase_a, "
+            "same_phase_groups, different_phase_groups (violations go to warnings_json)."
+        ),
+    )
+    ap.add_argument(
+        "--pb-place-circuit",
+        default=None,
+        metavar="CIRCUIT_ID",
+        help="Incremental phase balance: place only this circuit on the lightest phase (full rebalance above threshold).",
+    )
+    ap.add_argument(
+        "--pb-rebalance-threshold-pct",
+        type=float,
+        default=INCREMENTAL_REBALANCE_THRESHOLD_PCT,
+        help=(
+            "With --pb-place-circuit: unbalance_pct above which the panel is rebalanced in full "
+            f"(default: {INCREMENTAL_REBALANCE_THRESHOLD_PCT})."
+        ),
+    )
+    ap.add_argument(
+        "--pb-verify-sums",
+        action="store_true",
+        help=(
+            "With --pb-place-circuit: check the stored phase sums against the circuits "
+            "first (O(n) query) and rebalance in full when they are out of date."
+        ),
+    )
+    ap.add_argument(
+        "--pb-seed",
+        type=int,
+        default=0,
+        help="Seed for phase balance local search scan order (default: 0).",
+    )
     args = ap.parse_args()
+    if args.pb_per_section and args.pb_mode == "JOINT":
+        ap.error("--pb-per-section cannot be combined with --pb-mode JOINT")
+    if args.pb_all_panels and (args.pb_per_section or args.pb_mode == "JOINT"):
+        ap.error("--pb-all-panels supports only --pb-mode NORMAL/EMERGENCY without --pb-per-section")
+    if args.pb_place_circuit and (args.pb_all_panels or args.pb_per_section or args.pb_mode == "JOINT"):
+        ap.error("--pb-place-circuit supports only --pb-mode NORMAL/EMERGENCY")
+    if args.pb_constraints and (
+        args.pb_place_circuit or args.pb_all_panels or args.pb_per_section or args.pb_mode == "JOINT"
+    ):
+        ap.error("--pb-constraints supports only single-panel --pb-mode NORMAL/EMERGENCY")
+    pb_constraints = None
+    if args.pb_constraints:
+        pb_constraints = PhaseConstraints.from_dict(
+            json.loads(Path(args.pb_constraints).read_text(encoding="utf-8"))
+        )
 
     db_path = Path(args.db)
     ensure_migrations(db_path)
@@ -295,10 +454,22 @@ def main() -> int:
 
     res = run_panel_calc(str(db_path), panel_id, note="tools/run_calc.py")
 
+    rtm_phase = None
+    if args.calc_rtm_phases:
+        con = sqlite3.connect(db_path)
+        try:
+            rtm_phase = calc_panel_phase_calc(con, [panel_id])
+            con.commit()
+        finally:
+            con.close()
+
     du_count = None
-    section_count = None
-    section_rows = []
-    pb_count = None
+    section_results = None
+    section_project = None
+    n1_result = None
+    profile_peaks = None
+    pb_results = None
+    diagnostics = Diagnostics(sample_limit=args.diagnostics_samples)
     if args.calc_du:
         seed_cable_sections_if_empty(db_path)
         con = sqlite3.connect(db_path)
@@ -312,12 +483,73 @@ def main() -> int:
         con = sqlite3.connect(db_path)
         try:
             con.execute("PRAGMA foreign_keys = ON;")
-            pb_count = calc_phase_balance(
-                con,
-                panel_id,
-                mode=args.pb_mode,
-                respect_manual=not args.no_respect_manual_phases,
-            )
+            if args.pb_mode == "JOINT":
+                pb_results = list(
+                    calc_phase_balance_joint(
+                        con,
+                        panel_id,
+                        respect_manual=not args.no_respect_manual_phases,
+                        weight_normal=args.pb_weight_normal,
+                        weight_emergency=args.pb_weight_emergency,
+                        improve_budget_s=(
+                            args.pb_improve_budget_s
+                            if args.pb_improve_budget_s is not None
+                            else JOINT_IMPROVE_BUDGET_S
+                        ),
+                        improve_max_evals=args.pb_improve_max_evals,
+                        seed=args.pb_seed,
+                        diagnostics=diagnostics,
+                    ).values()
+                )
+            elif args.pb_place_circuit:
+                pb_results = [
+                    place_circuit_phase(
+                        con,
+                        args.pb_place_circuit,
+                        mode=args.pb_mode,
+                        respect_manual=not args.no_respect_manual_phases,
+                        rebalance_threshold_pct=args.pb_rebalance_threshold_pct,
+                        verify=args.pb_verify_sums,
+                        diagnostics=diagnostics,
+                    )
+                ]
+            elif args.pb_all_panels:
+                pb_results = calc_phase_balance_project(
+                    con,
+                    args.pb_mode,
+                    respect_manual=not args.no_respect_manual_phases,
+                    improve_budget_s=args.pb_improve_budget_s,
+                    improve_max_evals=args.pb_improve_max_evals,
+                    seed=args.pb_seed,
+                    method=args.pb_method,
+                    diagnostics=diagnostics,
+                )
+            elif pb_constraints is not None:
+                pb_results = [
+                    calc_phase_balance(
+                        con,
+                        panel_id,
+                        mode=args.pb_mode,
+                        respect_manual=not args.no_respect_manual_phases,
+                        constraints=pb_constraints,
+                        diagnostics=diagnostics,
+                    )
+                ]
+            else:
+                pb_func = calc_phase_balance_sections if args.pb_per_section else calc_phase_balance
+                pb_results = [
+                    pb_func(
+                        con,
+                        panel_id,
+                        mode=args.pb_mode,
+                        respect_manual=not args.no_respect_manual_phases,
+                        improve_budget_s=args.pb_improve_budget_s,
+                        improve_max_evals=args.pb_improve_max_evals,
+                        seed=args.pb_seed,
+                        method=args.pb_method,
+                        diagnostics=diagnostics,
+                    )
+                ]
         finally:
             con.close()
 
@@ -330,29 +562,53 @@ def main() -> int:
         con = sqlite3.connect(db_path)
         try:
             con.execute("PRAGMA foreign_keys = ON;")
-            section_count = calc_section_loads(con, panel_id, mode=effective_sections_mode)
-            section_rows = con.execute(
-                """
-                SELECT bs.name, sc.p_kw, sc.q_kvar, sc.s_kva, sc.i_a
-                FROM section_calc sc
-                JOIN bus_sections bs ON bs.id = sc.bus_section_id
-                WHERE sc.panel_id = ? AND sc.mode = ?
-                ORDER BY bs.name ASC
-                """,
-                (panel_id, effective_sections_mode),
-            ).fetchall()
-            if not section_rows and effective_sections_mode == "EMERGENCY":
-                # Compatibility: legacy DBs used mode=RESERVE.
-                section_rows = con.execute(
-                    """
-                    SELECT bs.name, sc.p_kw, sc.q_kvar, sc.s_kva, sc.i_a
-                    FROM section_calc sc
-                    JOIN bus_sections bs ON bs.id = sc.bus_section_id
-                    WHERE sc.panel_id = ? AND sc.mode = ?
-                    ORDER BY bs.name ASC
-                    """,
-                    (panel_id, "RESERVE"),
-                ).fetchall()
+            if args.sections_all_panels:
+                section_project = calc_section_loads_project(
+                    con,
+                    modes=None if effective_sections_mode == "ALL" else [effective_sections_mode],
+                    diagnostics=diagnostics,
+                )
+                counts = section_project.section_counts.get(panel_id) or {
+                    m: 0
+                    for m in (
+                        ("NORMAL", "EMERGENCY")
+                        if effective_sections_mode == "ALL"
+                        else (effective_sections_mode,)
+                    )
+                }
+            elif effective_sections_mode == "ALL":
+                counts = calc_section_loads_all_modes(
+                    con, panel_id, diagnostics=diagnostics
+                ).section_counts[panel_id]
+            else:
+                counts = {
+                    effective_sections_mode: calc_section_loads(
+                        con, panel_id, mode=effective_sections_mode, diagnostics=diagnostics
+                    ).section_count
+                }
+            section_results = []
+            for sections_mode, section_count in counts.items():
+                section_rows = _read_section_rows(con, panel_id, sections_mode)
+                if not section_rows and sections_mode == "EMERGENCY":
+                    # Compatibility: legacy DBs used mode=RESERVE.
+                    section_rows = _read_section_rows(con, panel_id, "RESERVE")
+                section_results.append((sections_mode, section_count, section_rows))
+        finally:
+            con.close()
+
+    if args.calc_n1:
+        con = sqlite3.connect(db_path)
+        try:
+            n1_result = run_n1_contingency(
+                con, [panel_id], mode=args.n1_mode, diagnostics=diagnostics
+            )
+        finally:
+            con.close()
+
+    if args.calc_profiles:
+        con = sqlite3.connect(db_path)
+        try:
+            profile_peaks = calc_section_profile_peaks(con, [panel_id], diagnostics=diagnostics)
         finally:
             con.close()
 
@@ -364,15 +620,33 @@ def main() -> int:
     if input_n is not None:
         print("input_rows:", input_n)
     print("row_calc_rows:", res.row_count)
+    if rtm_phase:
+        ph = rtm_phase[0]
+        print("rtm_phase_ia_ib_ic_a:", f"{ph.ia_a:.2f} / {ph.ib_a:.2f} / {ph.ic_a:.2f}")
+        print("rtm_phase_unbalance_pct:", f"{ph.unbalance_pct:.2f}")
     if du_count is not None:
         print("du_circuits_processed:", du_count)
-    if pb_count is not None:
-        print("phase_balance_circuits:", pb_count)
-    if section_count is not None:
-        print(f"sections_mode: {effective_sections_mode}")
-        if section_count == 0:
-            print("sections: none")
-        else:
+    if pb_results is not None:
+        for pb_result in pb_results:
+            if args.pb_all_panels:
+                prefix = f"phase_balance[{pb_result.panel_id}]"
+            elif len(pb_results) > 1:
+                prefix = f"phase_balance_{pb_result.mode.lower()}"
+            else:
+                prefix = "phase_balance"
+            print(f"{prefix}_circuits:", pb_result.circuit_count)
+            print(f"{prefix}_changed:", pb_result.changed_count)
+            print(f"{prefix}_unchanged:", pb_result.unchanged_count)
+    if section_project is not None:
+        for project_panel_id, counts in section_project.items():
+            for sections_mode, section_count in counts.items():
+                print(f"sections[{project_panel_id}]_{sections_mode.lower()}:", section_count)
+    if section_results is not None:
+        for sections_mode, section_count, section_rows in section_results:
+            print(f"sections_mode: {sections_mode}")
+            if section_count == 0:
+                print("sections: none")
+                continue
             for name, p_kw, q_kvar, s_kva, i_a in section_rows:
                 print(
                     "section:",
@@ -386,6 +660,52 @@ def main() -> int:
                     "I_a=",
                     round(float(i_a), 6),
                 )
+    if n1_result is not None:
+        print(f"n1_mode: {n1_result.mode}")
+        print("n1_scenarios:", n1_result.scenario_count)
+        for wc in n1_result.sections:
+            scenario = (
+                f"{wc.worst_scenario.kind}:{wc.worst_scenario.outage_id}"
+                if wc.worst_scenario is not None
+                else "BASE"
+            )
+            print(
+                "n1_section:",
+                wc.section_name,
+                "I_base_a=",
+                round(wc.base_i_a, 6),
+                "I_worst_a=",
+                round(wc.worst_i_a, 6),
+                "worst=",
+                scenario,
+            )
+        for scenario, consumer_ids in n1_result.unserved:
+            print(
+                f"n1_unserved: {scenario.kind}:{scenario.outage_id}",
+                ", ".join(consumer_ids),
+            )
+    if profile_peaks is not None:
+        for peak in profile_peaks:
+            print(
+                f"profile_section[{peak.mode}]:",
+                peak.section_name,
+                "S_peak_kva=",
+                round(peak.s_kva, 6),
+                "I_peak_a=",
+                round(peak.i_a, 6),
+                "peak_hour=",
+                round(peak.peak_hour, 6),
+                "S_sum_kva=",
+                round(peak.static_s_kva, 6),
+                "profiled=",
+                f"{peak.profiled_count}/{peak.consumer_count}",
+            )
+    if diagnostics.total:
+        print("diagnostics_total:", diagnostics.total)
+        for code, count in sorted(diagnostics.counts.items()):
+            print(f"diagnostics[{code}]:", count)
+            for sample in diagnostics.samples.get(code, ()):
+                print(f"diagnostics_sample[{code}]:", json.dumps(sample, ensure_ascii=False))
     return 0
 
 